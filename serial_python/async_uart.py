@@ -0,0 +1,417 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+import serial
+
+from uart import Uart, ColorPrint
+from queue_t import ByteRingBuffer
+from mission_schema import MissionRegistry
+from capture import DIR_RX, DIR_TX
+from request_manager import RequestManager
+
+
+class AsyncUart(Uart):
+    def __init__(self, uart_length=16, queue_capacity=4096,
+                 queue_overflow=ByteRingBuffer.OVERFLOW_DROP_OLDEST, frame_queue_size=1024,
+                 write_high_water=4096, mission_registry: Optional[MissionRegistry] = None,
+                 crc=None, framing=Uart.FRAMING_FIXED, max_payload=4096,
+                 backend=Uart.BACKEND_PYSERIAL):
+        """
+        基于asyncio的串口类，将串口文件描述符注册到事件循环，不使用线程
+        :param uart_length: 每帧数据长度
+        :param queue_capacity: 读队列容量（字节）
+        :param queue_overflow: 读队列溢出策略，见ByteRingBuffer
+        :param frame_queue_size: 已对齐帧队列的最大帧数，满时丢弃最旧的帧
+        :param write_high_water: 写缓冲积压超过该字节数时，发送协程等待写空
+        :param mission_registry: 任务注册表，默认包含任务1、任务2
+        :param crc: 帧校验，None表示不校验，或算法名/FrameCrc对象，见crc.py
+        :param framing: 帧格式，fixed或variable
+        :param max_payload: 变长帧的最大负载长度（字节）
+        :param backend: 串口后端，pyserial或native
+        """
+        super().__init__(uart_length, queue_capacity, queue_overflow,
+                         mission_registry=mission_registry, crc=crc, framing=framing,
+                         max_payload=max_payload, backend=backend)
+
+        self.enable_show_read = False
+        self.enable_show_write = False
+        self.write_high_water = write_high_water
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fd = -1
+
+        # 已对齐的帧，以及异常（如断线）；每个队列可有多个等待的协程，新数据到达时全部唤醒
+        self.frame_queue_size = frame_queue_size
+        self.frame_queue: deque = deque()
+        self.frame_waiters = []
+        self.dropped_frames = 0
+        # JustFloat采样块，满frame_queue_size块时丢弃最旧的块
+        self.just_float_queue: deque = deque()
+        self.just_float_waiters = []
+        self.dropped_just_float_blocks = 0
+        # 压缩遥测采样块，同上
+        self.telemetry_queue: deque = deque()
+        self.telemetry_waiters = []
+        self.dropped_telemetry_blocks = 0
+        self.error: Optional[Exception] = None
+
+        # 写缓冲及等待写空的协程
+        self.write_backlog = bytearray()
+        self.writer_registered = False
+        self.drain_waiters = []
+
+        # 请求/应答，超时由事件循环定时处理
+        self.requests: Optional[RequestManager] = None
+        self.request_timer: Optional[asyncio.TimerHandle] = None
+
+    async def open(self, dev: str, baudrate: int = 115200) -> bool:
+        """
+        打开串口并注册到当前事件循环
+        :param dev: 串口设备名
+        :param baudrate: 波特率
+        :return: True成功，False失败
+        """
+        if not self.init_serial_port(dev, baudrate, timeout=0):
+            return False
+
+        self.loop = asyncio.get_running_loop()
+        self.fd = self.serial_port.fileno()
+        self.error = None
+        self.loop.add_reader(self.fd, self._on_readable)
+        return True
+
+    def _on_readable(self):
+        """事件循环回调：读出所有待读数据并对齐"""
+        try:
+            read_length = self._read_pending_into(memoryview(self.read_chunk))
+        except (OSError, serial.SerialException) as e:
+            self._fail(e)
+            return
+
+        if read_length == 0:
+            return
+        self._stamp_read(read_length)
+
+        if self.capture is not None:
+            self.capture.record(DIR_RX, memoryview(self.read_chunk)[:read_length])
+        if self.enable_show_read:
+            self.show_read_buff(memoryview(self.read_chunk)[:read_length])
+
+        self.read_buff_queue.push_bytes(memoryview(self.read_chunk)[:read_length])
+        ret, frames = self.get_aligned_frames_from_queue()
+        if ret != 1:
+            return
+        if self.just_float_blocks:
+            self.dropped_just_float_blocks += self._push_blocks(self.just_float_queue,
+                                                                self.just_float_blocks)
+            self._wake(self.just_float_waiters)
+        if self.telemetry_blocks:
+            self.dropped_telemetry_blocks += self._push_blocks(self.telemetry_queue,
+                                                               self.telemetry_blocks)
+            self._wake(self.telemetry_waiters)
+        if not frames:
+            return
+
+        requests = self.requests
+        for frame in frames:
+            if requests is not None and requests.on_frame(frame):
+                continue
+            if len(self.frame_queue) >= self.frame_queue_size:
+                self.frame_queue.popleft()
+                self.dropped_frames += 1
+            self.frame_queue.append(frame)
+        self._wake(self.frame_waiters)
+
+    def _push_blocks(self, queue: deque, blocks: list) -> int:
+        """
+        采样块入队，满frame_queue_size块时丢弃最旧的块
+        :return: 丢弃的块数
+        """
+        dropped = 0
+        for block in blocks:
+            if len(queue) >= self.frame_queue_size:
+                queue.popleft()
+                dropped += 1
+            queue.append(block)
+        return dropped
+
+    @staticmethod
+    def _wake(waiters: list):
+        """唤醒等待某个队列的所有协程，取到数据的返回，其余重新等待"""
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        waiters.clear()
+
+    async def _pop(self, queue: deque, waiters: list):
+        """
+        取出队列中最早的元素，队列为空时等待，可被多个协程同时调用
+        :param queue: 帧或采样块队列
+        :param waiters: 该队列的等待者列表
+        :return: 队列元素
+        """
+        while not queue:
+            if self.error is not None:
+                raise self.error
+            if self.loop is None:
+                raise serial.SerialException("AsyncUart is not open")
+            waiter = self.loop.create_future()
+            waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                # 被取消时从等待者中移除
+                if waiter in waiters:
+                    waiters.remove(waiter)
+        return queue.popleft()
+
+    def _fail(self, error: Exception, show: bool = True):
+        """
+        串口出错（如断线），注销文件描述符并通知所有等待者
+        :param error: 异常
+        :param show: 是否打印错误信息
+        """
+        if self.error is not None:
+            return
+
+        if show:
+            ColorPrint.red(f"Uart {self.uart_dev} error: {error}")
+        self.error = error
+        self._unregister()
+        if self.requests is not None:
+            self.requests.close(error)
+        self._wake(self.frame_waiters)
+        self._wake(self.just_float_waiters)
+        self._wake(self.telemetry_waiters)
+        for waiter in self.drain_waiters:
+            if not waiter.done():
+                waiter.set_exception(error)
+        self.drain_waiters.clear()
+
+    def _unregister(self):
+        if self.loop is None or self.fd < 0:
+            return
+
+        self.loop.remove_reader(self.fd)
+        if self.writer_registered:
+            self.loop.remove_writer(self.fd)
+            self.writer_registered = False
+
+    async def read_frame(self) -> bytes:
+        """
+        等待下一帧对齐好的数据
+        :return: 数据帧
+        """
+        return await self._pop(self.frame_queue, self.frame_waiters)
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """
+        异步迭代对齐好的数据帧，串口断开时抛出异常
+        用法: async for frame in uart.frames(): ...
+        """
+        while True:
+            yield await self.read_frame()
+
+    async def read_just_float(self) -> tuple:
+        """
+        等待下一块JustFloat采样，需先enable_just_float_receive()
+        :return: (N×C的float32数组, 最后一个采样的接收时间)
+        """
+        return await self._pop(self.just_float_queue, self.just_float_waiters)
+
+    async def just_float_samples(self) -> AsyncIterator[tuple]:
+        """
+        异步迭代JustFloat采样块，串口断开时抛出异常
+        用法: async for samples, t_ns in uart.just_float_samples(): ...
+        """
+        while True:
+            yield await self.read_just_float()
+
+    async def read_telemetry(self) -> tuple:
+        """
+        等待下一包压缩遥测采样，需先enable_telemetry_receive()
+        :return: (N×C的float32数组, 包尾的接收时间)
+        """
+        return await self._pop(self.telemetry_queue, self.telemetry_waiters)
+
+    async def telemetry_samples(self) -> AsyncIterator[tuple]:
+        """
+        异步迭代压缩遥测采样块，串口断开时抛出异常
+        用法: async for samples, t_ns in uart.telemetry_samples(): ...
+        """
+        while True:
+            yield await self.read_telemetry()
+
+    async def write(self, data) -> int:
+        """
+        写串口，写缓冲积压超过write_high_water时等待写空（背压）
+        :param data: 待写入的数据
+        :return: 写入的字节数
+        """
+        length = self._write_nowait(data)
+        if len(self.write_backlog) > self.write_high_water:
+            await self.drain()
+
+        return length
+
+    def _write_nowait(self, data) -> int:
+        """
+        写串口，不能立即写出的部分放入写缓冲，由事件循环继续写出
+        :param data: 待写入的数据
+        :return: 写入的字节数
+        """
+        if self.error is not None:
+            raise self.error
+        if self.fd < 0:
+            raise serial.SerialException("AsyncUart is not open")
+
+        view = memoryview(data).cast('B')
+        length = len(view)
+        if not self.write_backlog:
+            try:
+                written = os.write(self.fd, view)
+            except BlockingIOError:
+                written = 0
+            except OSError as e:
+                self._fail(e)
+                raise
+            if self.capture is not None and written:
+                self.capture.record(DIR_TX, view[:written])
+            view = view[written:]
+
+        if len(view):
+            self.write_backlog += view
+            if not self.writer_registered:
+                self.loop.add_writer(self.fd, self._on_writable)
+                self.writer_registered = True
+        return length
+
+    def _on_writable(self):
+        """事件循环回调：继续写出写缓冲中的数据"""
+        try:
+            written = os.write(self.fd, self.write_backlog)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(e)
+            return
+
+        if self.capture is not None and written:
+            self.capture.record(DIR_TX, memoryview(self.write_backlog)[:written])
+        del self.write_backlog[:written]
+        if self.write_backlog:
+            return
+
+        self.loop.remove_writer(self.fd)
+        self.writer_registered = False
+        for waiter in self.drain_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self.drain_waiters.clear()
+
+    async def drain(self):
+        """等待写缓冲中的数据全部交给操作系统"""
+        if self.error is not None:
+            raise self.error
+        if not self.write_backlog:
+            return
+
+        waiter = self.loop.create_future()
+        self.drain_waiters.append(waiter)
+        await waiter
+
+    async def mission_send(self, assignment_func, *args, **kwargs) -> int:
+        """
+        任务发送串口模板函数
+        :param assignment_func: 为write_buff赋值的函数，或已注册的任务ID/任务名
+        :param args: 函数参数或按字段顺序的值
+        :param kwargs: 函数关键字参数或按字段名的值
+        :return: 写入的字节数
+        """
+        self.assign_write_buff(assignment_func, *args, **kwargs)
+
+        if self.enable_show_write:
+            print("Mission Send:", end=" ")
+            self.show_write_buff(self.write_buff)
+
+        return await self.write(bytes(self.write_buff))
+
+    def enable_requests(self, window=16, timeout=0.2, retries=2, seq_field="seq") -> RequestManager:
+        """
+        开启请求/应答，已开启时只更新配置
+        :param window: 同时等待应答的最大请求数
+        :param timeout: 每次发送后等待应答的超时时间（秒）
+        :param retries: 超时后的最大重发次数
+        :param seq_field: 请求与应答任务中序号字段的名字，须为第一个字段
+        :return: 请求管理器
+        """
+        requests = self.requests
+        if requests is None:
+            requests = RequestManager(self.mission_registry, self._build_request_frame,
+                                      self._write_nowait, window, timeout, retries, seq_field)
+            requests.wakeup = self._arm_request_timer
+            self.requests = requests
+        else:
+            requests.window = window
+            requests.timeout = timeout
+            requests.retries = retries
+            requests.seq_field = seq_field
+        return requests
+
+    async def request(self, mission, *args, timeout: Optional[float] = None,
+                      retries: Optional[int] = None, **kwargs):
+        """
+        发送请求并等待应答；多个协程同时请求时最多window个请求同时等待应答
+        :param mission: 请求任务ID或任务名，第一个字段为序号，由管理器填写
+        :param args: 序号之后按字段顺序的值
+        :param timeout: 本请求的超时时间（秒），默认为enable_requests()的配置
+        :param retries: 本请求的最大重发次数，默认为enable_requests()的配置
+        :param kwargs: 按字段名的值
+        :return: 应答帧中序号之后的字段值，超时后抛出TimeoutError
+        """
+        if self.error is not None:
+            raise self.error
+        requests = self.requests
+        if requests is None:
+            requests = self.enable_requests()
+
+        future = requests.submit(mission, args, kwargs, timeout, retries)
+        if len(self.write_backlog) > self.write_high_water:
+            await self.drain()
+        return await asyncio.wrap_future(future)
+
+    def _build_request_frame(self, mission, args: tuple, kwargs: dict) -> bytes:
+        """按任务布局编码一帧请求"""
+        self.assign_write_buff(mission, *args, **kwargs)
+        return bytes(self.write_buff)
+
+    def _arm_request_timer(self, deadline_ns: int):
+        """在最早的请求截止时间处理超时"""
+        if self.loop is None:
+            return
+        if self.request_timer is not None:
+            self.request_timer.cancel()
+        delay = max(0.0, (deadline_ns - time.monotonic_ns()) / 1e9)
+        self.request_timer = self.loop.call_later(delay, self._on_request_timer)
+
+    def _on_request_timer(self):
+        self.request_timer = None
+        if self.requests is None:
+            return
+        next_ns = self.requests.expire()
+        if next_ns is not None:
+            self._arm_request_timer(next_ns)
+
+    def close(self):
+        """注销文件描述符并关闭串口"""
+        if self.request_timer is not None:
+            self.request_timer.cancel()
+            self.request_timer = None
+        self._unregister()
+        if self.error is None:
+            self._fail(serial.SerialException("AsyncUart closed"), show=False)
+        super().close()
+        self.fd = -1
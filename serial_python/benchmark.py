@@ -0,0 +1,1949 @@
+"""
+串口库性能测试
+
+用法:
+    python benchmark.py align --frame-length 16 --corruption 0 0.01 0.1
+    python benchmark.py queue --chunk 64
+    python benchmark.py write --frame-length 8 --burst 1 8
+    python benchmark.py decode --missions 2 32
+    python benchmark.py batch --missions 1 4 --frames 100000
+    python benchmark.py vofa --channels 32 --block 256
+    python benchmark.py justfloat --channels 4 16 --mission-ratio 0 0.1
+    python benchmark.py telemetry --channels 4 16 --block 1 10 50 --baud 115200
+    python benchmark.py --json suite --baud 115200 921600 --frame-length 8 16 --corruption 0 0.05
+    python benchmark.py hub --ports 1 2 4 8 --rate 200
+    python benchmark.py crc --frame-length 16 --corruption 0 0.05
+    python benchmark.py varlen --blob-size 2048
+    python benchmark.py request --window 1 4 16 --echo-delay 0.004 --loss 0 0.05
+    python benchmark.py lanes --send-hz 1000 --telemetry-hz 2000 --control-hz 50
+    python benchmark.py conflate --send-hz 200 --setpoint-hz 2000
+    python benchmark.py schedule --send-hz 300 --spin-us 0 200
+    python benchmark.py dispatch --callback-ms 1 --frame-hz 2000
+    python benchmark.py gil --load-threads 0 1 2 --hold-ms 20
+    python benchmark.py clock --ppm 0 200 --load-threads 0 1
+    python benchmark.py backend --read-mode fixed drain --frame-hz 1000
+"""
+
+import argparse
+import fcntl
+import json
+import math
+import os
+import queue
+import random
+import select
+import struct
+import threading
+import time
+from typing import List
+
+from crc import FrameCrc
+from frame_aligner import FrameAligner, MixedAligner
+from mission_schema import MissionRegistry
+import vofa
+import telemetry
+from pty_harness import PtyLoopback, FakeMcu
+from queue_t import Queue_T, ByteRingBuffer, LaneQueue, WriteLane
+from dispatcher import Dispatcher
+import frame_batch
+from frame_batch import FrameBatch
+
+
+def make_frame(rng: random.Random, frame_length: int) -> bytes:
+    """生成一帧带头尾帧、负载随机的合法数据"""
+    payload = bytes(rng.getrandbits(8) for _ in range(frame_length - 3))
+    return b'?!' + payload + b'!'
+
+
+def make_stream(n_frames: int, frame_length: int, corruption: float,
+                seed: int = 0) -> bytes:
+    """
+    生成带干扰的合成数据流
+    :param n_frames: 帧数
+    :param frame_length: 每帧数据长度
+    :param corruption: 每帧被干扰的概率（插入垃圾数据、翻转字节或截断）
+    :param seed: 随机种子
+    :return: 数据流
+    """
+    rng = random.Random(seed)
+    stream = bytearray()
+    for _ in range(n_frames):
+        frame = bytearray(make_frame(rng, frame_length))
+        if rng.random() < corruption:
+            kind = rng.randrange(3)
+            if kind == 0:
+                stream += bytes(rng.getrandbits(8)
+                                for _ in range(rng.randint(1, frame_length)))
+            elif kind == 1:
+                frame[rng.randrange(frame_length)] ^= 1 << rng.randrange(8)
+            else:
+                del frame[rng.randint(1, frame_length - 1):]
+        stream += frame
+    return bytes(stream)
+
+
+def _legacy_get_aligned_from_queue(queue: Queue_T, uart_length: int) -> tuple:
+    """原逐字节对齐实现，作为对照"""
+    if uart_length > queue.size():
+        return 0, None
+
+    while uart_length <= queue.size():
+        if (queue[0] == ord('?') and
+                queue[1] == ord('!') and
+                queue[uart_length - 1] == ord('!')):
+            data = bytearray()
+            for i in range(uart_length):
+                data.append(queue.pop())
+            return 1, data
+        else:
+            queue.pop()
+
+    return -1, None
+
+
+def _run_legacy(stream: bytes, frame_length: int, chunk: int) -> int:
+    queue = Queue_T(max_length=max(4 * chunk, 4 * frame_length))
+    n_frames = 0
+    for offset in range(0, len(stream), chunk):
+        for byte in stream[offset:offset + chunk]:
+            queue.push(byte)
+        while True:
+            ret, _ = _legacy_get_aligned_from_queue(queue, frame_length)
+            if ret != 1:
+                break
+            n_frames += 1
+    return n_frames
+
+
+def _run_aligner(stream: bytes, frame_length: int, chunk: int) -> int:
+    aligner = FrameAligner(frame_length)
+    pending = bytearray()
+    n_frames = 0
+    for offset in range(0, len(stream), chunk):
+        pending += stream[offset:offset + chunk]
+        frames, consumed = aligner.align(pending)
+        del pending[:consumed]
+        n_frames += len(frames)
+    return n_frames
+
+
+def _run_aligner_ring(stream: bytes, frame_length: int, chunk: int) -> int:
+    aligner = FrameAligner(frame_length)
+    queue = ByteRingBuffer(4096)
+    n_frames = 0
+    view = memoryview(stream)
+    for offset in range(0, len(stream), chunk):
+        queue.push_bytes(view[offset:offset + chunk])
+        buf, start, end = queue.linear()
+        frames, pos = aligner.align(buf, start, end)
+        queue.skip(pos - start)
+        n_frames += len(frames)
+    return n_frames
+
+
+def bench_align(frame_length: int = 16, corruption: float = 0.0,
+                n_frames: int = 20000, chunk: int = 64, seed: int = 0) -> dict:
+    """
+    对比原逐字节对齐与批量对齐器的吞吐
+    :return: 测试结果
+    """
+    stream = make_stream(n_frames, frame_length, corruption, seed)
+    result = {
+        "bench": "align",
+        "frame_length": frame_length,
+        "corruption": corruption,
+        "chunk": chunk,
+        "stream_bytes": len(stream),
+    }
+    for name, run in (("legacy", _run_legacy), ("aligner", _run_aligner),
+                      ("aligner_ring", _run_aligner_ring)):
+        start = time.perf_counter()
+        found = run(stream, frame_length, chunk)
+        elapsed = time.perf_counter() - start
+        result[name] = {
+            "frames": found,
+            "seconds": elapsed,
+            "frames_per_s": found / elapsed if elapsed > 0 else 0.0,
+            "mb_per_s": len(stream) / elapsed / 1e6 if elapsed > 0 else 0.0,
+        }
+    result["speedup"] = result["legacy"]["seconds"] / max(result["aligner"]["seconds"], 1e-12)
+    return result
+
+
+def _make_crc_stream(n_frames: int, frame_length: int, corruption: float, crc,
+                     seed: int = 0) -> tuple:
+    """
+    生成负载中大量出现'?'、'!'的数据流（如打包的浮点数、整数），可选带CRC
+    :return: (数据流, 原始帧集合)
+    """
+    rng = random.Random(seed)
+    crc_size = crc.size if crc is not None else 0
+    payload_length = frame_length - 4 - crc_size
+    stream = bytearray()
+    originals = set()
+    for _ in range(n_frames):
+        frame = bytearray(b'?!')
+        frame.append(rng.randrange(1, 8))
+        frame += bytes(rng.choice((0x3F, 0x21, rng.getrandbits(8)))
+                       for _ in range(payload_length))
+        frame += bytes(crc_size) + b'!'
+        if crc is not None:
+            crc.seal(frame)
+        originals.add(bytes(frame))
+        if rng.random() < corruption:
+            kind = rng.randrange(3)
+            if kind == 0:
+                stream += bytes(rng.choice((0x3F, 0x21, rng.getrandbits(8)))
+                                for _ in range(rng.randint(1, frame_length)))
+            elif kind == 1:
+                frame[rng.randrange(frame_length)] ^= 1 << rng.randrange(8)
+            else:
+                del frame[rng.randint(1, frame_length - 1):]
+        stream += frame
+    return bytes(stream), originals
+
+
+def bench_crc(frame_length: int = 16, corruption: float = 0.05, n_frames: int = 20000,
+              chunk: int = 64, seed: int = 0) -> dict:
+    """
+    CRC开销与误对齐对比：每帧封装校验的开销、带校验对齐的开销、错误接受的帧数
+    :return: 测试结果
+    """
+    result = {
+        "bench": "crc",
+        "frame_length": frame_length,
+        "corruption": corruption,
+        "frames": n_frames,
+    }
+    for algorithm in (None, FrameCrc.CRC8, FrameCrc.CRC16_MODBUS, FrameCrc.CRC16_CCITT):
+        crc = FrameCrc(algorithm) if algorithm is not None else None
+        stream, originals = _make_crc_stream(n_frames, frame_length, corruption, crc, seed)
+
+        seal_ns = 0.0
+        if crc is not None:
+            frame = bytearray(next(iter(originals)))
+            start = time.perf_counter_ns()
+            for _ in range(n_frames):
+                crc.seal(frame)
+            seal_ns = (time.perf_counter_ns() - start) / n_frames
+
+        aligner = FrameAligner(frame_length, crc=FrameCrc(algorithm) if algorithm else None)
+        queue = ByteRingBuffer(4096)
+        view = memoryview(stream)
+        found = false_frames = 0
+        start = time.perf_counter_ns()
+        for offset in range(0, len(stream), chunk):
+            queue.push_bytes(view[offset:offset + chunk])
+            buf, begin, end = queue.linear()
+            frames, pos = aligner.align(buf, begin, end)
+            queue.skip(pos - begin)
+            found += len(frames)
+            for f in frames:
+                if f not in originals:
+                    false_frames += 1
+        align_ns = (time.perf_counter_ns() - start) / n_frames
+
+        result[algorithm or "none"] = {
+            "seal_ns_per_frame": seal_ns,
+            "align_ns_per_frame": align_ns,
+            "frames": found,
+            "false_frames": false_frames,
+            "crc_failures": aligner.crc.failures if aligner.crc is not None else 0,
+        }
+    return result
+
+
+def bench_varlen(n_messages: int = 20000, blob_size: int = 2048, blob_ratio: float = 0.01,
+                 chunk: int = 256, seed: int = 0) -> dict:
+    """
+    定长帧与变长帧对比：混合大小消息（1字节命令、8字节字段、大块数据）的线路字节数与对齐吞吐，
+    定长帧按能容纳8字节字段的帧长发送，大块数据需手动拆成多帧
+    :return: 测试结果
+    """
+    from uart import Uart
+
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(n_messages):
+        r = rng.random()
+        if r < blob_ratio:
+            size = blob_size
+        elif r < 0.6:
+            size = 1
+        else:
+            size = 8
+        payloads.append(bytes(rng.getrandbits(8) for _ in range(size)))
+    payload_bytes = sum(len(p) for p in payloads)
+
+    result = {
+        "bench": "varlen",
+        "messages": n_messages,
+        "blob_size": blob_size,
+        "blob_ratio": blob_ratio,
+        "payload_bytes": payload_bytes,
+    }
+    for framing in (Uart.FRAMING_FIXED, Uart.FRAMING_VARIABLE):
+        uart = Uart(3 + 8 + 1, framing=framing, max_payload=max(blob_size, 8))
+        uart.mission_registry.register_raw(0x20, "raw")
+
+        # 编码
+        stream = bytearray()
+        n_frames = 0
+        start = time.perf_counter_ns()
+        for payload in payloads:
+            parts = ([payload[i:i + 8] for i in range(0, len(payload), 8)]
+                     if framing == Uart.FRAMING_FIXED else [payload])
+            for part in parts:
+                uart.assign_write_buff(0x20, part)
+                stream += uart.write_buff
+                n_frames += 1
+        encode_ns = time.perf_counter_ns() - start
+
+        # 对齐
+        queue = ByteRingBuffer(max(4096, 4 * uart.frame_aligner.min_frame_length + 2 * blob_size))
+        aligner = uart.frame_aligner
+        view = memoryview(stream)
+        found = 0
+        start = time.perf_counter_ns()
+        for offset in range(0, len(stream), chunk):
+            queue.push_bytes(view[offset:offset + chunk])
+            buf, begin, end = queue.linear()
+            frames, pos = aligner.align(buf, begin, end)
+            queue.skip(pos - begin)
+            found += len(frames)
+        align_ns = time.perf_counter_ns() - start
+
+        result[framing] = {
+            "frames": n_frames,
+            "wire_bytes": len(stream),
+            "wire_bytes_per_payload_byte": len(stream) / payload_bytes,
+            "encode_us_per_message": encode_ns / n_messages / 1000,
+            "aligned_frames": found,
+            "align_mb_per_s": len(stream) / align_ns * 1000 if align_ns else 0.0,
+            "align_messages_per_s": n_messages / align_ns * 1e9 if align_ns else 0.0,
+        }
+    result["wire_saving"] = 1 - (result[Uart.FRAMING_VARIABLE]["wire_bytes"] /
+                                 result[Uart.FRAMING_FIXED]["wire_bytes"])
+    return result
+
+
+def bench_queue(n_bytes: int = 1 << 20, chunk: int = 64) -> dict:
+    """
+    对比Queue_T逐字节入队出队与ByteRingBuffer批量入队出队
+    :return: 测试结果
+    """
+    data = bytes(range(256)) * (chunk // 256 + 1)
+    data = data[:chunk]
+    rounds = n_bytes // chunk
+    result = {"bench": "queue", "chunk": chunk, "bytes": rounds * chunk}
+
+    queue = Queue_T(max_length=4 * chunk)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for byte in data:
+            queue.push(byte)
+        out = bytearray()
+        while not queue.is_empty():
+            out.append(queue.pop())
+    elapsed = time.perf_counter() - start
+    result["queue_t"] = {"seconds": elapsed, "mb_per_s": rounds * chunk / elapsed / 1e6}
+
+    ring = ByteRingBuffer(4 * chunk)
+    out = bytearray(chunk)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        ring.push_bytes(data)
+        ring.pop_into(out)
+    elapsed = time.perf_counter() - start
+    result["ring_buffer"] = {"seconds": elapsed, "mb_per_s": rounds * chunk / elapsed / 1e6}
+
+    result["speedup"] = result["queue_t"]["seconds"] / max(elapsed, 1e-12)
+    return result
+
+
+def bench_write(frame_length: int = 8, burst: int = 1, n_frames: int = 20000) -> dict:
+    """
+    对比原逐字节queue.Queue写队列与整帧写队列（单通道LaneQueue）的每帧CPU开销（不含串口写入与休眠）
+    :return: 测试结果
+    """
+    frame = make_frame(random.Random(0), frame_length)
+    result = {"bench": "write", "frame_length": frame_length, "burst": burst,
+              "frames": n_frames}
+
+    byte_queue = queue.Queue()
+    writes = 0
+    start = time.process_time()
+    for _ in range(n_frames):
+        for byte in frame:
+            byte_queue.put(byte)
+        local_write_buff = []
+        while not byte_queue.empty():
+            local_write_buff.append(byte_queue.get())
+        i = 0
+        while i < len(local_write_buff):
+            write_buff = bytearray()
+            for j in range(frame_length):
+                write_buff.append(local_write_buff[i + j])
+            writes += 1
+            i += frame_length
+    elapsed = time.process_time() - start
+    result["legacy"] = {"cpu_us_per_frame": elapsed / n_frames * 1e6, "writes": writes}
+
+    frame_queue = LaneQueue.single(max(burst, 1) * 4)
+    writes = 0
+    start = time.process_time()
+    for i in range(n_frames):
+        frame_queue.put(frame)
+        if len(frame_queue) >= burst or i == n_frames - 1:
+            frames = frame_queue.get_batch(burst, timeout=0)
+            write_buff = frames[0] if len(frames) == 1 else b''.join(frames)
+            writes += 1
+    elapsed = time.process_time() - start
+    result["frame_queue"] = {"cpu_us_per_frame": elapsed / n_frames * 1e6, "writes": writes}
+
+    result["speedup"] = (result["legacy"]["cpu_us_per_frame"] /
+                         max(result["frame_queue"]["cpu_us_per_frame"], 1e-12))
+    return result
+
+
+def bench_decode(n_missions: int = 32, n_frames: int = 100000, frame_length: int = 16) -> dict:
+    """
+    对比if/elif链加切片struct.unpack与任务注册表查表分发的解码开销
+    :param n_missions: 注册的任务类型数，帧在各任务间均匀分布
+    :return: 测试结果
+    """
+    rng = random.Random(0)
+    frames = []
+    for i in range(n_frames):
+        frame = bytearray(make_frame(rng, frame_length))
+        frame[2] = i % n_missions + 1
+        frames.append(bytes(frame))
+
+    result = {"bench": "decode", "missions": n_missions, "frames": n_frames}
+    sink = []
+    handler = sink.append
+
+    # if/elif链，最后一个分支的任务需要比较n_missions次
+    def legacy(data):
+        mission_id = data[2]
+        for candidate in range(1, n_missions + 1):
+            if mission_id == candidate:
+                handler(struct.unpack('<I', data[3:7])[0])
+                return
+
+    start = time.perf_counter()
+    for frame in frames:
+        legacy(frame)
+    elapsed = time.perf_counter() - start
+    result["legacy"] = {"us_per_frame": elapsed / n_frames * 1e6}
+
+    registry = MissionRegistry()
+    for mission_id in range(1, n_missions + 1):
+        registry.register(mission_id, [("X", "I")], handler=handler)
+    dispatch = registry.dispatch
+
+    start = time.perf_counter()
+    for frame in frames:
+        dispatch(frame)
+    elapsed = time.perf_counter() - start
+    result["registry"] = {"us_per_frame": elapsed / n_frames * 1e6}
+
+    result["speedup"] = result["legacy"]["us_per_frame"] / max(result["registry"]["us_per_frame"], 1e-12)
+    return result
+
+
+def bench_batch(n_missions: int = 1, n_frames: int = 100000, frame_length: int = 16) -> dict:
+    """
+    对比逐帧回调与按批解码为结构化数组：回调中记录每帧字段后逐帧统计（均值、标准差、超过阈值的帧数），
+    与读线程只把帧追加到FrameBatch、使用者按批取出解码后向量化统计
+    :param n_missions: 任务类型数，帧在各任务间均匀分布，每个任务含I、f、h三个字段
+    :return: 读线程侧与使用者侧的每帧开销
+    """
+    rng = random.Random(0)
+    fields = [("seq", "I"), ("value", "f"), ("temp", "h")]
+    layout = struct.Struct('<Ifh')
+    frames = []
+    for i in range(n_frames):
+        frame = bytearray(frame_length)
+        frame[0:2] = b'?!'
+        frame[2] = i % n_missions + 1
+        layout.pack_into(frame, 3, i, rng.random(), rng.randrange(-1000, 1000))
+        frame[-1] = ord('!')
+        frames.append(bytes(frame))
+
+    result = {"bench": "batch", "missions": n_missions, "frames": n_frames,
+              "numpy": frame_batch.np is not None}
+
+    # 逐帧回调，记录各字段后统计
+    logs = {}
+
+    def make_handler(mission_id: int):
+        log = logs.setdefault(mission_id, ([], [], []))
+        seqs, values, temps = log
+
+        def handler(seq: int, value: float, temp: int):
+            seqs.append(seq)
+            values.append(value)
+            temps.append(temp)
+        return handler
+
+    registry = MissionRegistry()
+    for mission_id in range(1, n_missions + 1):
+        registry.register(mission_id, fields, handler=make_handler(mission_id))
+    dispatch = registry.dispatch
+    start = time.perf_counter()
+    for frame in frames:
+        dispatch(frame)
+    receive_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    callback_stats = {}
+    for mission_id, (seqs, values, temps) in logs.items():
+        mean = sum(values) / len(values)
+        std = (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+        callback_stats[mission_id] = (mean, std, sum(1 for t in temps if t > 500))
+    stats_elapsed = time.perf_counter() - start
+    result["callback"] = {
+        "receive_us_per_frame": receive_elapsed / n_frames * 1e6,
+        "stats_us_per_frame": stats_elapsed / n_frames * 1e6,
+        "us_per_frame": (receive_elapsed + stats_elapsed) / n_frames * 1e6,
+    }
+
+    # 读线程只追加，使用者按批解码后向量化统计
+    registry = MissionRegistry()
+    for mission_id in range(1, n_missions + 1):
+        registry.register(mission_id, fields)
+    batch = FrameBatch(registry, max_frames=n_frames)
+    append = batch.append
+    # 预热：首次解码需要生成dtype
+    for frame in frames[:n_missions]:
+        append(frame, 0)
+    batch.read(timeout=0)
+
+    start = time.perf_counter()
+    for frame in frames:
+        append(frame, 0)
+    receive_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = batch.read(timeout=0)
+    decode_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    batch_stats = {}
+    for mission_id, records in decoded.items():
+        if frame_batch.np is not None:
+            values = records["value"]
+            batch_stats[mission_id] = (float(values.mean()), float(values.std()),
+                                       int((records["temp"] > 500).sum()))
+        else:
+            columns = frame_batch.unpack_columns(records, registry.get(mission_id))
+            values, temps = columns["value"].tolist(), columns["temp"].tolist()
+            mean = sum(values) / len(values)
+            std = (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+            batch_stats[mission_id] = (mean, std, sum(1 for t in temps if t > 500))
+    stats_elapsed = time.perf_counter() - start
+    result["batch"] = {
+        "receive_us_per_frame": receive_elapsed / n_frames * 1e6,
+        "decode_us_per_frame": decode_elapsed / n_frames * 1e6,
+        "stats_us_per_frame": stats_elapsed / n_frames * 1e6,
+        "us_per_frame": (receive_elapsed + decode_elapsed + stats_elapsed) / n_frames * 1e6,
+    }
+    result["speedup"] = result["callback"]["us_per_frame"] / max(result["batch"]["us_per_frame"], 1e-12)
+    return result
+
+
+def bench_vofa(channels: int = 32, block: int = 256, n_samples: int = 20000) -> dict:
+    """
+    对比逐采样struct.pack加逐采样write()与整块编码加一次write()的Vofa JustFloat发送速率（写入/dev/null）
+    :param channels: 通道数
+    :param block: 每块采样数
+    :return: 测试结果
+    """
+    rng = random.Random(0)
+    rows = [[rng.random() for _ in range(channels)] for _ in range(block)]
+    rounds = max(1, n_samples // block)
+    total = rounds * block
+    result = {"bench": "vofa", "channels": channels, "block_size": block, "samples": total,
+              "numpy": vofa.np is not None}
+
+    fd = os.open(os.devnull, os.O_WRONLY)
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for data in rows:
+                buffer = bytearray()
+                for value in data:
+                    buffer.extend(struct.pack('<f', value))
+                buffer.extend([0x00, 0x00, 0x80, 0x7f])
+                os.write(fd, buffer)
+        elapsed = time.perf_counter() - start
+        result["legacy"] = {"samples_per_s": total / elapsed, "writes": total}
+
+        encoder = vofa.JustFloatEncoder()
+        samples = rows if vofa.np is None else vofa.np.asarray(rows, dtype='<f4')
+        start = time.perf_counter()
+        for _ in range(rounds):
+            os.write(fd, encoder.encode(samples))
+        elapsed = time.perf_counter() - start
+        result["block_encoder"] = {"samples_per_s": total / elapsed, "writes": rounds}
+    finally:
+        os.close(fd)
+
+    result["speedup"] = result["block_encoder"]["samples_per_s"] / result["legacy"]["samples_per_s"]
+    return result
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """已排序列表的分位数"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _wait_idle(counter, settle: float, timeout: float):
+    """等待计数不再增长"""
+    deadline = time.monotonic() + timeout
+    last = -1
+    while time.monotonic() < deadline:
+        current = counter()
+        if current == last:
+            return
+        last = current
+        time.sleep(settle)
+
+
+def bench_just_float(channels: int = 16, mission_ratio: float = 0.0, n_samples: int = 50000,
+                     chunk: int = 4096) -> dict:
+    """
+    对比逐采样查找帧尾并struct.unpack的解析脚本与JustFloat接收解码器（MixedAligner成批校验、整段解码）的接收速率
+    :param channels: 通道数
+    :param mission_ratio: 每个采样后插入一个任务帧的概率
+    :param n_samples: 采样数
+    :param chunk: 每次送入的字节数，模拟每次读到的数据量
+    :return: 两种方式的每采样耗时与加速比
+    """
+    rng = random.Random(0)
+    encoder = vofa.JustFloatEncoder()
+    stream = bytearray()
+    n_missions = 0
+    for i in range(n_samples):
+        stream += encoder.encode([[rng.random() for _ in range(channels)]])
+        if rng.random() < mission_ratio:
+            stream += make_frame(rng, 8)
+            n_missions += 1
+    stream = bytes(stream)
+
+    result = {"bench": "just_float", "channels": channels, "mission_ratio": mission_ratio,
+              "samples": n_samples, "numpy": vofa.np is not None}
+
+    # 逐采样：查找帧尾后按固定通道数解出一个采样
+    row = struct.Struct(f'<{channels}f')
+    tail = vofa.JUST_FLOAT_TAIL
+    stride = row.size + 4
+    buf = bytearray()
+    decoded = 0
+    start = time.perf_counter()
+    for offset in range(0, len(stream), chunk):
+        buf += stream[offset:offset + chunk]
+        pos = 0
+        while True:
+            index = buf.find(tail, pos + row.size)
+            if index < 0:
+                break
+            if index - row.size >= pos:
+                row.unpack_from(buf, index - row.size)
+                decoded += 1
+            pos = index + 4
+        del buf[:pos]
+    elapsed = time.perf_counter() - start
+    result["per_sample"] = {"decoded": decoded, "us_per_sample": elapsed / n_samples * 1e6}
+
+    # 成批校验帧尾并整段解码，任务帧同时对齐
+    aligner = FrameAligner(8)
+    mixed = MixedAligner(aligner, vofa.JustFloatDecoder(channels))
+    buf = bytearray()
+    decoded = 0
+    frames = 0
+    start = time.perf_counter()
+    for offset in range(0, len(stream), chunk):
+        buf += stream[offset:offset + chunk]
+        aligned, pos = mixed.align(buf, 0, len(buf))
+        frames += len(aligned)
+        for samples, _ in mixed.blocks:
+            decoded += len(samples)
+        del buf[:pos]
+    elapsed_bulk = time.perf_counter() - start
+    result["bulk"] = {"decoded": decoded, "mission_frames": frames, "expected_frames": n_missions,
+                      "us_per_sample": elapsed_bulk / n_samples * 1e6}
+    result["speedup"] = elapsed / max(elapsed_bulk, 1e-12)
+    return result
+
+
+def bench_telemetry(channels: int = 8, block: int = 10, baudrate: int = 115200, scale: float = 1e-3,
+                    noise: float = 0.002, n_samples: int = 20000, order: int = 2) -> dict:
+    """
+    对比JustFloat与压缩遥测（量化、差分、zig-zag varint）的每采样字节数，以及给定波特率下可达的采样率
+    :param channels: 通道数
+    :param block: 每包的采样数
+    :param baudrate: 波特率，按每字节10位计算线路容量
+    :param scale: 量化步长
+    :param noise: 叠加在正弦信号上的高斯噪声标准差
+    :param n_samples: 采样数
+    :param order: 差分的预测阶数
+    :return: 两种格式的每采样字节数、可达采样率、编解码耗时与量化误差
+    """
+    rng = random.Random(0)
+    rows = [[(c + 1) * math.sin(i * 2 * math.pi / 500 + c) + rng.gauss(0, noise)
+             for c in range(channels)] for i in range(n_samples)]
+    bytes_per_s = baudrate / 10
+    result = {"bench": "telemetry", "channels": channels, "block": block, "baudrate": baudrate,
+              "scale": scale, "order": order, "samples": n_samples,
+              "numpy": telemetry.np is not None}
+
+    raw_bytes = n_samples * (channels + 1) * 4
+    result["just_float"] = {"bytes_per_sample": raw_bytes / n_samples,
+                            "max_samples_per_s": bytes_per_s * n_samples / raw_bytes}
+
+    encoder = telemetry.TelemetryEncoder(channels, scale, order=order)
+    start = time.perf_counter()
+    packets = [encoder.encode(rows[i:i + block]) for i in range(0, n_samples, block)]
+    elapsed_encode = time.perf_counter() - start
+    stream = b''.join(packets)
+
+    mixed = MixedAligner(FrameAligner(8), telemetry=telemetry.TelemetryDecoder(channels, scale))
+    buf = bytearray()
+    decoded = []
+    start = time.perf_counter()
+    for offset in range(0, len(stream), 4096):
+        buf += stream[offset:offset + 4096]
+        _, pos = mixed.align(buf, 0, len(buf))
+        for samples, _ in mixed.telemetry_blocks:
+            decoded.extend(tuple(row) for row in samples)
+        del buf[:pos]
+    elapsed_decode = time.perf_counter() - start
+
+    max_error = max(abs(a - b) for row, got in zip(rows, decoded) for a, b in zip(row, got))
+    result["telemetry"] = {"bytes_per_sample": len(stream) / n_samples,
+                           "max_samples_per_s": bytes_per_s * n_samples / len(stream),
+                           "decoded": len(decoded),
+                           "max_error": max_error,
+                           "encode_us_per_sample": elapsed_encode / n_samples * 1e6,
+                           "decode_us_per_sample": elapsed_decode / n_samples * 1e6}
+    result["compression_ratio"] = raw_bytes / len(stream)
+    return result
+
+
+def bench_pty_rx(baudrate: int = 115200, frame_length: int = 8, corruption: float = 0.0,
+                 n_frames: int = 2000) -> dict:
+    """
+    伪终端回环接收测试：FakeMcu按波特率发送带序号的帧，UartThread__读线程接收并回调
+    :return: 吞吐、延迟分位数、丢帧、重新对齐丢弃字节、CPU时间
+    """
+    from uart_thread import UartThread__
+
+    recv_ns = [0] * n_frames
+
+    def on_frame(seq: int):
+        if seq < n_frames:
+            recv_ns[seq] = time.monotonic_ns()
+
+    registry = MissionRegistry()
+    registry.register(0x01, [("seq", "I")], "seq", handler=on_frame)
+
+    loop = PtyLoopback()
+    uart = UartThread__(frame_length, mission_registry=registry)
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+    try:
+        if not uart.init_with_threads(loop.slave_name, enable_thread_read=True, baudrate=baudrate):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+
+        mcu = FakeMcu(loop.master_fd, frame_length, baudrate, n_frames, corruption)
+        cpu_start = time.process_time()
+        mcu.start()
+        time.sleep(n_frames * frame_length * 10.0 / baudrate)
+        _wait_idle(lambda: sum(1 for t in recv_ns if t), 0.1, 5.0)
+        cpu = time.process_time() - cpu_start
+        report = mcu.stop()
+    finally:
+        uart.close()
+        loop.close()
+
+    corrupted = set(report["corrupted"])
+    send_ns = report["send_ns"]
+    received = [seq for seq in range(n_frames) if recv_ns[seq]]
+    latencies = sorted((recv_ns[seq] - send_ns[seq]) / 1000 for seq in received)
+    lost_clean = sum(1 for seq in range(n_frames) if not recv_ns[seq] and seq not in corrupted)
+    span = (max(recv_ns[seq] for seq in received) - send_ns[0]) / 1e9 if received else 0.0
+
+    return {
+        "bench": "pty_rx",
+        "baudrate": baudrate,
+        "frame_length": frame_length,
+        "corruption": corruption,
+        "sent_frames": n_frames,
+        "corrupted_frames": len(corrupted),
+        "received_frames": len(received),
+        "lost_clean_frames": lost_clean,
+        "resync_dropped_bytes": uart.frame_aligner.dropped_bytes,
+        "queue_dropped_bytes": uart.read_buff_queue.dropped_bytes,
+        "frames_per_s": len(received) / span if span > 0 else 0.0,
+        "latency_p50_us": _percentile(latencies, 0.50),
+        "latency_p99_us": _percentile(latencies, 0.99),
+        "cpu_s": cpu,
+        "cpu_us_per_frame": cpu / len(received) * 1e6 if received else 0.0,
+    }
+
+
+def bench_pty_tx(baudrate: int = 115200, frame_length: int = 8, n_frames: int = 2000,
+                 send_frequency_hz: float = 1000.0, burst: int = 1) -> dict:
+    """
+    伪终端回环发送测试：主机按发送频率通过写线程mission_send带序号的帧，FakeMcu接收
+    :return: 吞吐、排队加发送延迟分位数、丢帧、CPU时间
+    """
+    from uart_thread import UartThread__
+
+    loop = PtyLoopback()
+    uart = UartThread__(frame_length, send_frequency_hz, write_queue_size=n_frames,
+                        write_burst=burst)
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+    send_ns = [0] * n_frames
+    try:
+        if not uart.init_with_threads(loop.slave_name, enable_thread_write=True, baudrate=baudrate):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+
+        mcu = FakeMcu(loop.master_fd, frame_length, baudrate)
+        mcu.start()
+        cpu_start = time.process_time()
+        # 按发送频率产生帧，延迟反映写线程排队与节奏控制
+        period_ns = int(1e9 / send_frequency_hz)
+        next_ns = time.monotonic_ns()
+        for seq in range(n_frames):
+            delay = (next_ns - time.monotonic_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+            send_ns[seq] = time.monotonic_ns()
+            uart.mission_send(0x01, seq)
+            next_ns += period_ns
+        _wait_idle(lambda: len(uart.write_buff_queue), 0.1, 10.0)
+        time.sleep(0.1)
+        cpu = time.process_time() - cpu_start
+        report = mcu.stop()
+    finally:
+        uart.close()
+        loop.close()
+
+    rx_seq = report["rx_seq"]
+    rx_ns = report["rx_ns"]
+    latencies = sorted((rx_ns[i] - send_ns[seq]) / 1000 for i, seq in enumerate(rx_seq)
+                       if seq < n_frames)
+    span = (rx_ns[-1] - send_ns[0]) / 1e9 if len(rx_ns) else 0.0
+
+    return {
+        "bench": "pty_tx",
+        "baudrate": baudrate,
+        "frame_length": frame_length,
+        "send_frequency_hz": send_frequency_hz,
+        "burst": burst,
+        "sent_frames": n_frames,
+        "received_frames": len(rx_seq),
+        "dropped_frames": uart.write_buff_queue.dropped_frames,
+        "frames_per_s": len(rx_seq) / span if span > 0 else 0.0,
+        "latency_p50_us": _percentile(latencies, 0.50),
+        "latency_p99_us": _percentile(latencies, 0.99),
+        "cpu_s": cpu,
+        "cpu_us_per_frame": cpu / len(rx_seq) * 1e6 if len(rx_seq) else 0.0,
+    }
+
+
+def bench_pty_vofa(channels: int = 16, block: int = 64, n_samples: int = 20000) -> dict:
+    """
+    伪终端回环Vofa JustFloat发送测试：主机整块发送，FakeMcu按帧尾计数
+    :return: 采样吞吐与CPU时间
+    """
+    from uart_thread import UartThread__
+
+    rng = random.Random(0)
+    rows = [[rng.random() for _ in range(channels)] for _ in range(block)]
+    samples = rows if vofa.np is None else vofa.np.asarray(rows, dtype='<f4')
+    rounds = max(1, n_samples // block)
+
+    loop = PtyLoopback()
+    uart = UartThread__(8)
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+    try:
+        if not uart.init_with_threads(loop.slave_name):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+
+        mcu = FakeMcu(loop.master_fd)
+        mcu.start()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            uart.mission_send_vofa_just_float_block(samples)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        time.sleep(0.2)
+        report = mcu.stop()
+    finally:
+        uart.close()
+        loop.close()
+
+    return {
+        "bench": "pty_vofa",
+        "channels": channels,
+        "block_size": block,
+        "sent_samples": rounds * block,
+        "received_samples": report["rx_vofa_samples"],
+        "samples_per_s": rounds * block / elapsed if elapsed > 0 else 0.0,
+        "cpu_s": cpu,
+    }
+
+
+def bench_suite(baudrates: List[int], frame_lengths: List[int], corruptions: List[float],
+                n_frames: int, send_frequency_hz: float) -> List[dict]:
+    """
+    伪终端回环测试套件，遍历波特率、帧长与干扰率
+    :return: 测试结果列表
+    """
+    results = []
+    for baudrate in baudrates:
+        for frame_length in frame_lengths:
+            for corruption in corruptions:
+                results.append(bench_pty_rx(baudrate, frame_length, corruption, n_frames))
+            results.append(bench_pty_tx(baudrate, frame_length, n_frames, send_frequency_hz))
+    results.append(bench_pty_vofa())
+    return results
+
+
+def bench_hub(n_ports: int, use_hub: bool, rate_hz: float = 200.0, frame_length: int = 8,
+              duration: float = 2.0, baudrate: int = 921600) -> dict:
+    """
+    多串口测试：每个串口同时以rate_hz收发带序号的帧，对比每串口独立线程与共用UartHub
+    :return: 线程数、空闲与收发时的CPU占用、接收延迟分位数、发送间隔误差
+    """
+    from uart_thread import UartThread__
+    from uart_hub import UartHub
+
+    n_frames = int(rate_hz * duration)
+    threads_before = threading.active_count()
+    hub = UartHub() if use_hub else None
+
+    loops, uarts, mcus, recv_ns = [], [], [], []
+    try:
+        for _ in range(n_ports):
+            port_recv_ns = [0] * n_frames
+
+            def on_frame(seq: int, port_recv_ns=port_recv_ns):
+                if seq < n_frames:
+                    port_recv_ns[seq] = time.monotonic_ns()
+
+            registry = MissionRegistry()
+            registry.register(0x01, [("seq", "I")], "seq", handler=on_frame)
+            loop = PtyLoopback()
+            uart = UartThread__(frame_length, rate_hz, write_queue_size=n_frames,
+                                mission_registry=registry, hub=hub)
+            uart.enable_show_read = False
+            uart.enable_show_write = False
+            loops.append(loop)
+            uarts.append(uart)
+            recv_ns.append(port_recv_ns)
+            if not uart.init_with_threads(loop.slave_name, True, True, baudrate):
+                raise RuntimeError(f"Failed to open {loop.slave_name}")
+            mcus.append(FakeMcu(loop.master_fd, frame_length, baudrate, n_frames,
+                                frame_hz=rate_hz))
+        threads = threading.active_count() - threads_before
+
+        # 串口已打开但无数据收发时的CPU占用，反映线程空转唤醒的开销
+        idle_start = time.process_time()
+        time.sleep(1.0)
+        idle_cpu = time.process_time() - idle_start
+
+        cpu_start = time.process_time()
+        wall_start = time.monotonic()
+        for mcu in mcus:
+            mcu.start()
+        # 发送帧一次性入队，由写线程或hub按发送频率定时发出
+        for uart in uarts:
+            for seq in range(n_frames):
+                uart.mission_send(0x01, seq)
+        _wait_idle(lambda: sum(len(u.write_buff_queue) for u in uarts), 0.1, duration * 3)
+        _wait_idle(lambda: sum(1 for r in recv_ns for t in r if t), 0.1, 5.0)
+        cpu = time.process_time() - cpu_start
+        wall = time.monotonic() - wall_start
+        reports = [mcu.stop() for mcu in mcus]
+    finally:
+        for uart in uarts:
+            uart.close()
+        for loop in loops:
+            loop.close()
+        if hub is not None:
+            hub.close()
+
+    latencies, interval_errors = [], []
+    received = tx_received = 0
+    period_us = 1e6 / rate_hz
+    for port_recv_ns, report in zip(recv_ns, reports):
+        send_ns = report["send_ns"]
+        for seq, t in enumerate(port_recv_ns):
+            if t:
+                received += 1
+                latencies.append((t - send_ns[seq]) / 1000)
+        rx_ns = report["rx_ns"]
+        tx_received += len(report["rx_seq"])
+        interval_errors.extend(abs((rx_ns[i] - rx_ns[i - 1]) / 1000 - period_us)
+                               for i in range(1, len(rx_ns)))
+    latencies.sort()
+    interval_errors.sort()
+
+    return {
+        "bench": "hub",
+        "mode": "hub" if use_hub else "threads",
+        "ports": n_ports,
+        "rate_hz": rate_hz,
+        "baudrate": baudrate,
+        "threads": threads,
+        "rx_frames": received,
+        "tx_frames": tx_received,
+        "expected_frames": n_ports * n_frames,
+        "idle_cpu_percent": idle_cpu * 100,
+        "cpu_percent": cpu / wall * 100 if wall > 0 else 0.0,
+        "cpu_us_per_frame": cpu / (received + tx_received) * 1e6 if received + tx_received else 0.0,
+        "rx_latency_p50_us": _percentile(latencies, 0.50),
+        "rx_latency_p99_us": _percentile(latencies, 0.99),
+        "tx_interval_error_p50_us": _percentile(interval_errors, 0.50),
+        "tx_interval_error_p99_us": _percentile(interval_errors, 0.99),
+    }
+
+
+def bench_request(window: int, n_requests: int = 500, echo_delay: float = 0.004,
+                  loss: float = 0.0, timeout: float = 0.05, baudrate: int = 921600) -> dict:
+    """
+    伪终端回环请求/应答测试：FakeMcu将带序号的请求延迟echo_delay后原样回传，
+    window=1即逐个发送并等待应答，window>1时多个请求的往返延迟互相重叠
+    :return: 每秒完成的请求数、往返时间、重发与超时次数
+    """
+    from uart_thread import UartThread__
+
+    registry = MissionRegistry.default()
+    registry.register(0x30, [("seq", "H"), ("index", "H"), ("value", "f")], "param")
+    frame_length = registry.payload_offset + registry.get("param").size + registry.trailer_length
+
+    loop = PtyLoopback()
+    uart = UartThread__(frame_length, mission_registry=registry)
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+    mcu = None
+    try:
+        if not uart.init_with_threads(loop.slave_name, enable_thread_read=True, baudrate=baudrate):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+        mcu = FakeMcu(loop.master_fd, frame_length, baudrate, echo_mission_id=0x30,
+                      echo_delay=echo_delay, echo_loss=loss)
+        mcu.start()
+        uart.enable_requests(window, timeout, retries=10)
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        futures = [uart.request("param", i & 0xFFFF, float(i)) for i in range(n_requests)]
+        completed = 0
+        for future in futures:
+            try:
+                future.result(timeout=30.0)
+                completed += 1
+            except TimeoutError:
+                pass
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        stats = uart.requests.stats()
+    finally:
+        uart.close()
+        if mcu is not None:
+            mcu.stop()
+        loop.close()
+
+    return {
+        "bench": "request",
+        "window": window,
+        "echo_delay_ms": echo_delay * 1000,
+        "loss": loss,
+        "requests": n_requests,
+        "completed": completed,
+        "requests_per_s": completed / elapsed if elapsed > 0 else 0.0,
+        "rtt_p50_us": stats["rtt_us"]["p50"],
+        "rtt_p99_us": stats["rtt_us"]["p99"],
+        "retransmits": stats["retransmits"],
+        "timeouts": stats["timeouts"],
+        "cpu_us_per_request": cpu / n_requests * 1e6,
+    }
+
+
+def bench_lanes(use_lanes: bool, send_frequency_hz: float = 1000.0, telemetry_hz: float = 2000.0,
+                control_hz: float = 50.0, vofa_hz: float = 100.0, duration: float = 2.0,
+                baudrate: int = 921600) -> dict:
+    """
+    写队列通道测试：遥测帧以超过发送频率的速度持续入队、同时发送Vofa数据块，
+    对比单一FIFO与多通道（控制帧严格优先）下控制帧从入队到下位机收到的延迟
+    :return: 控制帧延迟分位数、遥测吞吐与丢帧
+    """
+    from uart_thread import UartThread__
+
+    control_id = 0x10
+    registry = MissionRegistry.default()
+    registry.register(control_id, [("seq", "I")], "control")
+
+    if use_lanes:
+        lanes = LaneQueue([
+            WriteLane("control", strict=True, max_frames=64, missions=[control_id]),
+            WriteLane("telemetry", share=3, max_frames=1000),
+            WriteLane("vofa", share=1, rate_hz=vofa_hz, max_frames=16),
+        ], default="telemetry", vofa="vofa")
+    else:
+        lanes = LaneQueue.single(1000)
+
+    loop = PtyLoopback()
+    uart = UartThread__(8, send_frequency_hz, mission_registry=registry, write_lanes=lanes)
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+    control_base = 1 << 30
+    control_ns = []
+    end_ns = 0
+    mcu = None
+    try:
+        if not uart.init_with_threads(loop.slave_name, enable_thread_write=True, baudrate=baudrate):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+        mcu = FakeMcu(loop.master_fd, 8, baudrate)
+        mcu.start()
+
+        vofa_block = [[float(i)] * 8 for i in range(4)]
+        start_ns = time.monotonic_ns()
+        end_ns = start_ns + int(duration * 1e9)
+        next_telemetry = next_control = next_vofa = start_ns
+        telemetry_seq = 0
+        while True:
+            now_ns = time.monotonic_ns()
+            if now_ns >= end_ns:
+                break
+            while next_telemetry <= now_ns:
+                uart.mission_send(0x01, telemetry_seq)
+                telemetry_seq += 1
+                next_telemetry += int(1e9 / telemetry_hz)
+            if next_vofa <= now_ns:
+                uart.mission_send_vofa_just_float_block(vofa_block)
+                next_vofa += int(1e9 / vofa_hz)
+            if next_control <= now_ns:
+                control_ns.append(time.monotonic_ns())
+                uart.mission_send(control_id, control_base + len(control_ns) - 1)
+                next_control += int(1e9 / control_hz)
+            time.sleep(max(0.0, (min(next_telemetry, next_control, next_vofa) -
+                                 time.monotonic_ns()) / 1e9))
+        time.sleep(0.1)
+        stats = uart.write_buff_queue.stats()
+    finally:
+        uart.close()
+        report = mcu.stop() if mcu is not None else None
+        loop.close()
+
+    latencies = sorted((rx_ns - control_ns[seq - control_base]) / 1000
+                       for seq, rx_ns in zip(report["rx_seq"], report["rx_ns"])
+                       if control_base <= seq < control_base + len(control_ns))
+    telemetry_rx = sum(1 for seq, rx_ns in zip(report["rx_seq"], report["rx_ns"])
+                       if seq < control_base and rx_ns <= end_ns)
+    result = {
+        "bench": "lanes",
+        "mode": "lanes" if use_lanes else "fifo",
+        "send_frequency_hz": send_frequency_hz,
+        "telemetry_hz": telemetry_hz,
+        "control_sent": len(control_ns),
+        "control_received": len(latencies),
+        "control_latency_p50_us": _percentile(latencies, 0.50),
+        "control_latency_p99_us": _percentile(latencies, 0.99),
+        "control_latency_max_us": latencies[-1] if latencies else 0.0,
+        "telemetry_frames_per_s": telemetry_rx / duration,
+        "vofa_samples": report["rx_vofa_samples"],
+        "dropped_frames": sum(lane["dropped_frames"] for lane in stats.values()),
+    }
+    for name, lane in stats.items():
+        result[f"{name}_wait_p99_us"] = lane["wait_us"]["p99"]
+    return result
+
+
+def bench_conflate(latest: bool, send_frequency_hz: float = 200.0, setpoint_hz: float = 2000.0,
+                   duration: float = 2.0, baudrate: int = 921600) -> dict:
+    """
+    合并发送测试：控制循环以高于发送频率的速度更新设定值，
+    对比mission_send逐帧排队与mission_send_latest只发送最新值时下位机收到的设定值的陈旧程度
+    :return: 设定值从产生到下位机收到的时间分位数、写队列深度与被替换的帧数
+    """
+    from uart_thread import UartThread__
+
+    loop = PtyLoopback()
+    uart = UartThread__(8, send_frequency_hz, write_queue_size=int(setpoint_hz * duration))
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+    produced_ns = []
+    max_depth = 0
+    mcu = None
+    try:
+        if not uart.init_with_threads(loop.slave_name, enable_thread_write=True, baudrate=baudrate):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+        mcu = FakeMcu(loop.master_fd, 8, baudrate)
+        mcu.start()
+
+        send = uart.mission_send_latest if latest else uart.mission_send
+        period_ns = int(1e9 / setpoint_hz)
+        next_ns = time.monotonic_ns()
+        end_ns = next_ns + int(duration * 1e9)
+        while next_ns < end_ns:
+            delay = (next_ns - time.monotonic_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+            produced_ns.append(time.monotonic_ns())
+            send(0x01, len(produced_ns) - 1)
+            max_depth = max(max_depth, len(uart.write_buff_queue))
+            next_ns += period_ns
+        time.sleep(0.1)
+        backlog = len(uart.write_buff_queue)
+        superseded = uart.write_buff_queue.superseded_frames
+    finally:
+        uart.close()
+        report = mcu.stop() if mcu is not None else None
+        loop.close()
+
+    # 只统计控制循环运行期间收到的设定值
+    ages = sorted((rx_ns - produced_ns[seq]) / 1000
+                  for seq, rx_ns in zip(report["rx_seq"], report["rx_ns"])
+                  if seq < len(produced_ns) and rx_ns <= end_ns)
+    return {
+        "bench": "conflate",
+        "mode": "latest" if latest else "queue",
+        "send_frequency_hz": send_frequency_hz,
+        "setpoint_hz": setpoint_hz,
+        "produced": len(produced_ns),
+        "received": len(ages),
+        "setpoint_age_p50_us": _percentile(ages, 0.50),
+        "setpoint_age_p99_us": _percentile(ages, 0.99),
+        "max_queue_depth": max_depth,
+        "backlog_at_end": backlog,
+        "superseded": superseded,
+    }
+
+
+def bench_schedule(mode: str, send_frequency_hz: float = 300.0, duration: float = 2.0,
+                   spin_us: float = 200.0, baudrate: int = 921600) -> dict:
+    """
+    周期发送节奏测试：下位机测量相邻两帧的到达间隔，
+    对比每次写入后sleep一个周期（旧写线程）与按绝对截止时间调度的schedule_mission()
+    :param mode: sleep或deadline
+    :param spin_us: deadline模式的忙等时间（微秒）
+    :return: 实际发送频率、到达间隔相对周期的偏差分位数，deadline模式另有调度器记录的发送延迟
+    """
+    from uart_thread import UartThread__
+    from scheduler import DeadlineScheduler
+
+    loop = PtyLoopback()
+    uart = UartThread__(8, send_frequency_hz, write_scheduler=DeadlineScheduler(spin_us))
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+    seq = [0]
+
+    def next_seq():
+        seq[0] += 1
+        return (seq[0] - 1,)
+
+    mcu = None
+    task = None
+    try:
+        if not uart.init_with_threads(loop.slave_name, enable_thread_write=True, baudrate=baudrate):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+        mcu = FakeMcu(loop.master_fd, 8, baudrate)
+        mcu.start()
+
+        cpu_start = time.process_time()
+        if mode == "deadline":
+            task = uart.schedule_mission(0x01, 1.0 / send_frequency_hz, next_seq)
+            time.sleep(duration)
+            uart.unschedule_mission(0x01)
+        else:
+            # 旧写线程的节奏：写入、打印等耗时累加到每个周期上
+            end = time.monotonic() + duration
+            while time.monotonic() < end:
+                with uart.mutex_write_uart:
+                    uart.assign_write_buff(0x01, *next_seq())
+                    uart.write_buffer(bytes(uart.write_buff))
+                time.sleep(1.0 / send_frequency_hz)
+        cpu = time.process_time() - cpu_start
+        time.sleep(0.1)
+    finally:
+        uart.close()
+        report = mcu.stop() if mcu is not None else None
+        loop.close()
+
+    rx_ns = report["rx_ns"]
+    period_us = 1e6 / send_frequency_hz
+    jitter = sorted(abs((rx_ns[i] - rx_ns[i - 1]) / 1000 - period_us) for i in range(1, len(rx_ns)))
+    span = (rx_ns[-1] - rx_ns[0]) / 1e9 if len(rx_ns) > 1 else 0.0
+    result = {
+        "bench": "schedule",
+        "mode": mode,
+        "send_frequency_hz": send_frequency_hz,
+        "spin_us": spin_us if mode == "deadline" else 0.0,
+        "received": len(rx_ns),
+        "frames_per_s": (len(rx_ns) - 1) / span if span > 0 else 0.0,
+        "jitter_p50_us": _percentile(jitter, 0.50),
+        "jitter_p99_us": _percentile(jitter, 0.99),
+        "cpu_s": cpu,
+    }
+    if task is not None:
+        result["lateness_p99_us"] = task.lateness_ns.percentile(0.99) / 1000
+        result["skipped"] = task.skipped
+    return result
+
+
+def bench_dispatch(mode: str, overflow: str = Dispatcher.OVERFLOW_DROP_OLDEST,
+                   callback_ms: float = 1.0, frame_hz: float = 2000.0, duration: float = 2.0,
+                   max_frames: int = 256, baudrate: int = 921600) -> dict:
+    """
+    慢回调测试：回调耗时超过帧间隔时，对比在读线程中直接调用与交给分发线程时读线程是否跟得上
+    :param mode: 分发方式，见Dispatcher
+    :param overflow: 分发队列满时的处理策略
+    :param callback_ms: 每次回调的耗时（毫秒，time.sleep模拟打印、写数据库等I/O）
+    :return: 读线程处理到帧的延迟、回调收到的帧数、分发队列的丢弃与合并计数及排队延迟
+    """
+    from uart_thread import UartThread__
+
+    n_frames = int(frame_hz * duration)
+    submit_ns = [0] * n_frames
+    callback_seqs = []
+
+    def on_frame(seq: int):
+        callback_seqs.append(seq)
+        time.sleep(callback_ms / 1000)
+
+    registry = MissionRegistry()
+    registry.register(0x01, [("seq", "I")], "seq", handler=on_frame)
+    dispatcher = Dispatcher(mode, max_frames, overflow)
+
+    loop = PtyLoopback()
+    uart = UartThread__(8, mission_registry=registry, dispatcher=dispatcher)
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+
+    # 记录读线程把每帧交给分发器的时间
+    submit = dispatcher.submit
+
+    def timed_submit(frame: bytes, t_ns: int = 0) -> bool:
+        seq = struct.unpack_from('<I', frame, 3)[0]
+        if seq < n_frames:
+            submit_ns[seq] = time.monotonic_ns()
+        return submit(frame, t_ns)
+
+    dispatcher.submit = timed_submit
+    mcu = None
+    try:
+        if not uart.init_with_threads(loop.slave_name, enable_thread_read=True, baudrate=baudrate):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+        mcu = FakeMcu(loop.master_fd, 8, baudrate, n_frames, frame_hz=frame_hz)
+        mcu.start()
+        time.sleep(duration + 0.2)
+        report = mcu.stop()
+        mcu = None
+        read = sum(1 for t in submit_ns if t)
+        dispatcher.wait_idle(5.0)
+        stats = dispatcher.stats()
+    finally:
+        if mcu is not None:
+            mcu.stop()
+        uart.close()
+        loop.close()
+
+    send_ns = report["send_ns"]
+    reads = sorted((submit_ns[seq] - send_ns[seq]) / 1000 for seq in range(n_frames) if submit_ns[seq])
+    return {
+        "bench": "dispatch",
+        "mode": mode,
+        "overflow": overflow if mode != Dispatcher.MODE_INLINE else "-",
+        "callback_ms": callback_ms,
+        "frame_hz": frame_hz,
+        "sent_frames": n_frames,
+        "read_frames_in_time": read,
+        "read_latency_p50_us": _percentile(reads, 0.50),
+        "read_latency_p99_us": _percentile(reads, 0.99),
+        "callback_frames": len(callback_seqs),
+        "dropped": stats["dropped_frames"],
+        "coalesced": stats["coalesced_frames"],
+        "lag_p99_us": stats["lag_us"]["p99"],
+    }
+
+
+def _gil_load(hold_ms: float, stop: threading.Event, counter: list):
+    """
+    人为的GIL重负载：反复对列表排序，list.sort在C代码中执行，整个排序期间不释放GIL
+    :param hold_ms: 单次持有GIL的目标时间（毫秒）
+    :param stop: 停止事件
+    :param counter: counter[0]累计完成的排序次数
+    """
+    rng = random.Random(0)
+    n = 10000
+    data = [rng.random() for _ in range(n)]
+    start = time.perf_counter()
+    sorted(data)
+    n = max(1000, int(n * hold_ms / 1000 / max(time.perf_counter() - start, 1e-6)))
+    data = [rng.random() for _ in range(n)]
+    while not stop.is_set():
+        sorted(data)
+        counter[0] += 1
+
+
+def bench_gil(mode: str, load_threads: int = 1, hold_ms: float = 20.0, frame_hz: float = 1000.0,
+              duration: float = 2.0, baudrate: int = 921600) -> dict:
+    """
+    GIL重负载下的接收测试：主进程中的线程反复长时间持有GIL，对比UartThread__读线程
+    与UartProcess子进程读取时的帧延迟
+    :param mode: thread为UartThread__读线程，process为UartProcess
+    :param load_threads: 负载线程数，0表示无负载
+    :param hold_ms: 负载单次持有GIL的时间（毫秒）
+    :return: 发送到子进程读取、发送到主进程处理的延迟分位数及丢帧数
+    """
+    from uart_thread import UartThread__
+    from uart_process import UartProcess
+
+    n_frames = int(frame_hz * duration)
+    read_ns = [0] * n_frames
+    recv_ns = [0] * n_frames
+
+    def on_frame(seq: int):
+        if seq < n_frames:
+            recv_ns[seq] = time.monotonic_ns()
+
+    loop = PtyLoopback()
+    stop = threading.Event()
+    load_count = [0]
+    loads = []
+    mcu = None
+    consumer = None
+    if mode == "process":
+        uart = UartProcess(8)
+        opened = uart.open(loop.slave_name, baudrate)
+
+        def consume():
+            # 零拷贝按批取出，记录子进程读取的时间戳
+            while not stop.is_set():
+                view, n = uart.read_batch(timeout=0.1)
+                now = time.monotonic_ns()
+                for ready_ns, frame in uart.iter_frames(view, n):
+                    seq = struct.unpack_from('<I', frame, 3)[0]
+                    if seq < n_frames:
+                        read_ns[seq] = ready_ns
+                        recv_ns[seq] = now
+                view.release()
+                uart.release(n)
+
+        consumer = threading.Thread(target=consume, daemon=True)
+    else:
+        registry = MissionRegistry()
+        registry.register(0x01, [("seq", "I")], "seq", handler=on_frame)
+        uart = UartThread__(8, mission_registry=registry)
+        uart.enable_show_read = False
+        uart.enable_show_write = False
+        opened = uart.init_with_threads(loop.slave_name, enable_thread_read=True, baudrate=baudrate)
+    try:
+        if not opened:
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+        if consumer is not None:
+            consumer.start()
+        for _ in range(load_threads):
+            load = threading.Thread(target=_gil_load, args=(hold_ms, stop, load_count), daemon=True)
+            load.start()
+            loads.append(load)
+
+        mcu = FakeMcu(loop.master_fd, 8, baudrate, n_frames, frame_hz=frame_hz)
+        mcu.start()
+        time.sleep(duration + 0.2)
+        _wait_idle(lambda: sum(1 for t in recv_ns if t), 0.1, 5.0)
+    finally:
+        stop.set()
+        for load in loads:
+            load.join()
+        if consumer is not None:
+            consumer.join()
+        report = mcu.stop() if mcu is not None else None
+        uart.close()
+        loop.close()
+
+    send_ns = report["send_ns"]
+    received = [seq for seq in range(n_frames) if recv_ns[seq]]
+    latencies = sorted((recv_ns[seq] - send_ns[seq]) / 1000 for seq in received)
+    result = {
+        "bench": "gil",
+        "mode": mode,
+        "load_threads": load_threads,
+        "hold_ms": hold_ms,
+        "frame_hz": frame_hz,
+        "sent_frames": n_frames,
+        "received_frames": len(received),
+        "load_iterations": load_count[0],
+        "latency_p50_us": _percentile(latencies, 0.50),
+        "latency_p99_us": _percentile(latencies, 0.99),
+        "latency_max_us": latencies[-1] if latencies else 0.0,
+    }
+    if mode == "process":
+        reads = sorted((read_ns[seq] - send_ns[seq]) / 1000 for seq in received)
+        result["read_latency_p50_us"] = _percentile(reads, 0.50)
+        result["read_latency_p99_us"] = _percentile(reads, 0.99)
+    return result
+
+
+def bench_clock(clock_ppm: float = 0.0, load_threads: int = 0, hold_ms: float = 5.0,
+                frame_hz: float = 500.0, duration: float = 4.0, warmup: float = 1.0,
+                ping_period: float = 0.02, window: int = 10, clock_offset_us: int = 4000000000,
+                baudrate: int = 921600) -> dict:
+    """
+    伪终端回环时钟同步测试：FakeMcu模拟带偏移、频率误差并会回绕的32位微秒时钟，数据帧带下位机采样时间，
+    对比回调收到的帧接收时间与按时钟同步换算的采样时间相对真实采样时间（FakeMcu的send_ns）的误差
+    :param clock_ppm: 下位机时钟相对主机的快慢（ppm）
+    :param load_threads: 持有GIL的负载线程数，使帧接收时间抖动
+    :param warmup: 开始统计前的同步时间（秒）
+    :return: 两种时间的误差分位数（微秒）、往返时间、估计的偏移与频率误差
+    """
+    from uart_thread import UartThread__
+
+    n_frames = int(frame_hz * (duration + warmup))
+    sample_ns = [0] * n_frames
+    receive_ns = [0] * n_frames
+
+    def on_sample(seq: int, mcu_time: int, t_ns: int):
+        if seq < n_frames:
+            sample_ns[seq] = t_ns
+
+    registry = MissionRegistry()
+    registry.register(0x01, [("seq", "I"), ("mcu_time", "I")], "sample", handler=on_sample,
+                      with_time=True)
+    registry.register(0x40, [("ping_seq", "H")], "ping")
+    registry.register(0x41, [("ping_seq", "H"), ("mcu_time", "I")], "pong")
+    frame_length = 16
+
+    loop = PtyLoopback()
+    uart = UartThread__(frame_length, mission_registry=registry)
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+
+    # 记录每帧的接收时间
+    submit = uart.dispatcher.submit
+
+    def timed_submit(frame: bytes, t_ns: int = 0) -> bool:
+        seq = struct.unpack_from('<I', frame, 3)[0]
+        if frame[2] == 0x01 and seq < n_frames:
+            receive_ns[seq] = t_ns
+        return submit(frame, t_ns)
+
+    uart.dispatcher.submit = timed_submit
+    stop = threading.Event()
+    load = [0]
+    loaders = [threading.Thread(target=_gil_load, args=(hold_ms, stop, load), daemon=True)
+               for _ in range(load_threads)]
+    mcu = None
+    try:
+        if not uart.init_with_threads(loop.slave_name, enable_thread_read=True, baudrate=baudrate):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+        mcu = FakeMcu(loop.master_fd, frame_length, baudrate, n_frames, frame_hz=frame_hz,
+                      ping_mission_id=0x40, pong_mission_id=0x41,
+                      clock_offset_us=clock_offset_us, clock_ppm=clock_ppm)
+        mcu.start()
+        clock = uart.enable_clock_sync("ping", "pong", ping_period, window=window)
+        for loader in loaders:
+            loader.start()
+        time.sleep(duration + warmup + 0.2)
+        stop.set()
+        report = mcu.stop()
+        mcu = None
+        uart.dispatcher.wait_idle(5.0)
+        stats = clock.stats()
+    finally:
+        stop.set()
+        if mcu is not None:
+            mcu.stop()
+        uart.close()
+        loop.close()
+
+    send_ns = report["send_ns"]
+    first = int(frame_hz * warmup)
+    seqs = [seq for seq in range(first, min(n_frames, len(send_ns))) if sample_ns[seq]]
+    raw = sorted((receive_ns[seq] - send_ns[seq]) / 1000 for seq in seqs)
+    synced = sorted((sample_ns[seq] - send_ns[seq]) / 1000 for seq in seqs)
+    synced_abs = sorted(abs(error) for error in synced)
+    return {
+        "bench": "clock",
+        "clock_ppm": clock_ppm,
+        "load_threads": load_threads,
+        "samples": len(seqs),
+        "receive_error_p50_us": _percentile(raw, 0.50),
+        "receive_error_p99_us": _percentile(raw, 0.99),
+        "synced_error_p50_us": _percentile(synced, 0.50),
+        "synced_abs_error_p99_us": _percentile(synced_abs, 0.99),
+        "rtt_min_us": stats["rtt_min_us"],
+        "rtt_p50_us": stats["rtt_us"]["p50"],
+        "pongs": stats["pongs"],
+        "estimated_skew_ppm": stats["mcu_skew_ppm"],
+    }
+
+
+def _thread_io_counts() -> tuple:
+    """当前线程的读、写系统调用次数（/proc/thread-self/io，Linux）"""
+    counts = {}
+    with open("/proc/thread-self/io") as f:
+        for line in f:
+            key, value = line.split(":")
+            counts[key] = int(value)
+    return counts["syscr"], counts["syscw"]
+
+
+class _CallCounter:
+    """统计select.select与fcntl.ioctl的调用次数，这两类系统调用不计入/proc的读写次数"""
+
+    def __init__(self):
+        self.select_calls = 0
+        self.ioctl_calls = 0
+        self.select = select.select
+        self.ioctl = fcntl.ioctl
+
+    def __enter__(self):
+        def counted_select(*args):
+            self.select_calls += 1
+            return self.select(*args)
+
+        def counted_ioctl(*args):
+            self.ioctl_calls += 1
+            return self.ioctl(*args)
+
+        select.select = counted_select
+        fcntl.ioctl = counted_ioctl
+        return self
+
+    def __exit__(self, *exc):
+        select.select = self.select
+        fcntl.ioctl = self.ioctl
+
+
+def bench_backend(backend: str, read_mode: str = "fixed", frame_hz: float = 1000.0,
+                  n_frames: int = 2000, n_tx_frames: int = 5000, frame_length: int = 8,
+                  baudrate: int = 921600) -> dict:
+    """
+    伪终端回环串口后端对比：在单线程中用read_buffer（fixed，逐帧阻塞读取）或read_available（drain）接收FakeMcu
+    按frame_hz发送的帧，再用write_buffer逐帧发送；统计每帧的读写系统调用次数（内核计数）、select/ioctl次数、
+    帧从FakeMcu发出到对齐完成的延迟与CPU时间
+    :param backend: 串口后端，pyserial或native
+    :param read_mode: fixed或drain
+    :return: 每帧系统调用次数、延迟分位数与CPU时间
+    """
+    from uart import Uart
+
+    loop = PtyLoopback()
+    uart = Uart(frame_length, backend=backend)
+    recv_ns = [0] * n_frames
+    mcu = None
+    try:
+        if not uart.init_serial_port(loop.slave_name, baudrate, timeout=1.0):
+            raise RuntimeError(f"Failed to open {loop.slave_name}")
+        mcu = FakeMcu(loop.master_fd, frame_length, baudrate, n_frames, frame_hz=frame_hz)
+        mcu.start()
+
+        received = 0
+        deadline = time.monotonic() + n_frames / frame_hz + 5.0
+        with _CallCounter() as rx_calls:
+            syscr, syscw = _thread_io_counts()
+            cpu_start = time.thread_time()
+            while received < n_frames and time.monotonic() < deadline:
+                if read_mode == "fixed":
+                    read_length = uart.read_buffer()
+                    if read_length:
+                        uart.push_read_buff_to_queue(read_length)
+                else:
+                    read_length = uart.read_available(0.1)
+                    if read_length:
+                        uart.read_buff_queue.push_bytes(memoryview(uart.read_chunk)[:read_length])
+                ret, frames = uart.get_aligned_frames_from_queue()
+                now = time.monotonic_ns()
+                for frame in frames:
+                    seq = struct.unpack_from('<I', frame, 3)[0]
+                    if seq < n_frames:
+                        recv_ns[seq] = now
+                        received += 1
+            rx_cpu = time.thread_time() - cpu_start
+            rx_syscr, rx_syscw = _thread_io_counts()
+        rx_syscr -= syscr
+
+        frame = bytearray(frame_length)
+        frame[0:2] = b'?!'
+        frame[2] = 0x01
+        frame[-1] = ord('!')
+        with _CallCounter() as tx_calls:
+            syscr, syscw = _thread_io_counts()
+            cpu_start = time.thread_time()
+            start = time.perf_counter_ns()
+            for _ in range(n_tx_frames):
+                uart.write_buffer(frame)
+            tx_ns = time.perf_counter_ns() - start
+            tx_cpu = time.thread_time() - cpu_start
+            _, tx_syscw = _thread_io_counts()
+        tx_syscw -= syscw
+        time.sleep(0.2)
+        report = mcu.stop()
+        mcu = None
+        low_latency = getattr(uart.serial_port, "low_latency", None)
+    finally:
+        if mcu is not None:
+            mcu.stop()
+        uart.close()
+        loop.close()
+
+    send_ns = report["send_ns"]
+    latencies = sorted((recv_ns[seq] - send_ns[seq]) / 1000
+                       for seq in range(min(n_frames, len(send_ns))) if recv_ns[seq])
+    return {
+        "bench": "backend",
+        "backend": backend,
+        "read_mode": read_mode,
+        "frames": received,
+        "rx_read_syscalls_per_frame": rx_syscr / max(received, 1),
+        "rx_select_per_frame": rx_calls.select_calls / max(received, 1),
+        "rx_ioctl_per_frame": rx_calls.ioctl_calls / max(received, 1),
+        "rx_cpu_us_per_frame": rx_cpu / max(received, 1) * 1e6,
+        "latency_p50_us": _percentile(latencies, 0.50),
+        "latency_p99_us": _percentile(latencies, 0.99),
+        "tx_frames_received": report["rx_bytes"] // frame_length,
+        "tx_write_syscalls_per_frame": tx_syscw / n_tx_frames,
+        "tx_select_per_frame": tx_calls.select_calls / n_tx_frames,
+        "tx_us_per_frame": tx_ns / n_tx_frames / 1000,
+        "tx_cpu_us_per_frame": tx_cpu / n_tx_frames * 1e6,
+        "low_latency": low_latency,
+    }
+
+
+def _print_results(results: List[dict], as_json: bool):
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for r in results:
+        fields = ", ".join(f"{k}={v}" for k, v in r.items() if not isinstance(v, dict))
+        print(fields)
+        for k, v in r.items():
+            if isinstance(v, dict):
+                print(f"  {k}: " + ", ".join(
+                    f"{kk}={vv:.4g}" if isinstance(vv, float) else f"{kk}={vv}"
+                    for kk, vv in v.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="串口库性能测试")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    parser.add_argument("--output", help="同时将JSON结果写入文件")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("align", help="帧对齐吞吐对比")
+    p.add_argument("--frame-length", type=int, default=16)
+    p.add_argument("--corruption", type=float, nargs="+", default=[0.0, 0.01, 0.1, 0.3])
+    p.add_argument("--frames", type=int, default=20000)
+    p.add_argument("--chunk", type=int, default=64)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("queue", help="队列入队出队吞吐对比")
+    p.add_argument("--bytes", type=int, default=1 << 20)
+    p.add_argument("--chunk", type=int, default=64)
+
+    p = sub.add_parser("write", help="写队列每帧CPU开销对比")
+    p.add_argument("--frame-length", type=int, default=8)
+    p.add_argument("--burst", type=int, nargs="+", default=[1, 8])
+    p.add_argument("--frames", type=int, default=20000)
+
+    p = sub.add_parser("decode", help="任务解码分发开销对比")
+    p.add_argument("--missions", type=int, nargs="+", default=[2, 32])
+    p.add_argument("--frames", type=int, default=100000)
+
+    p = sub.add_parser("batch", help="逐帧回调与按批解码为结构化数组对比")
+    p.add_argument("--missions", type=int, nargs="+", default=[1, 4])
+    p.add_argument("--frames", type=int, default=100000)
+
+    p = sub.add_parser("justfloat", help="逐采样解析与成批解码的JustFloat接收速率对比")
+    p.add_argument("--channels", type=int, nargs="+", default=[4, 16])
+    p.add_argument("--mission-ratio", type=float, nargs="+", default=[0.0, 0.1])
+    p.add_argument("--samples", type=int, default=50000)
+
+    p = sub.add_parser("telemetry", help="JustFloat与压缩遥测的每采样字节数与可达采样率对比")
+    p.add_argument("--channels", type=int, nargs="+", default=[4, 16])
+    p.add_argument("--block", type=int, nargs="+", default=[1, 10, 50])
+    p.add_argument("--baud", type=int, default=115200)
+    p.add_argument("--scale", type=float, default=1e-3)
+    p.add_argument("--order", type=int, nargs="+", default=[2], choices=[1, 2])
+    p.add_argument("--samples", type=int, default=20000)
+
+    p = sub.add_parser("vofa", help="Vofa JustFloat发送速率对比")
+    p.add_argument("--channels", type=int, nargs="+", default=[8, 32])
+    p.add_argument("--block", type=int, default=256)
+    p.add_argument("--samples", type=int, default=20000)
+
+    p = sub.add_parser("suite", help="伪终端回环吞吐/延迟测试套件")
+    p.add_argument("--baud", type=int, nargs="+", default=[115200, 921600])
+    p.add_argument("--frame-length", type=int, nargs="+", default=[8, 16])
+    p.add_argument("--corruption", type=float, nargs="+", default=[0.0, 0.05])
+    p.add_argument("--frames", type=int, default=2000)
+    p.add_argument("--send-hz", type=float, default=1000.0)
+
+    p = sub.add_parser("crc", help="帧校验开销与误对齐对比")
+    p.add_argument("--frame-length", type=int, default=16)
+    p.add_argument("--corruption", type=float, nargs="+", default=[0.0, 0.05])
+    p.add_argument("--frames", type=int, default=20000)
+    p.add_argument("--chunk", type=int, default=64)
+
+    p = sub.add_parser("varlen", help="定长帧与变长帧的线路开销与对齐吞吐对比")
+    p.add_argument("--messages", type=int, default=20000)
+    p.add_argument("--blob-size", type=int, nargs="+", default=[2048])
+    p.add_argument("--blob-ratio", type=float, default=0.01)
+
+    p = sub.add_parser("request", help="逐个等待应答与流水线请求对比")
+    p.add_argument("--window", type=int, nargs="+", default=[1, 4, 16])
+    p.add_argument("--requests", type=int, default=500)
+    p.add_argument("--echo-delay", type=float, default=0.004)
+    p.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.05])
+    p.add_argument("--timeout", type=float, default=0.05)
+
+    p = sub.add_parser("lanes", help="单一写队列与多通道写队列的控制帧延迟对比")
+    p.add_argument("--send-hz", type=float, default=1000.0)
+    p.add_argument("--telemetry-hz", type=float, default=2000.0)
+    p.add_argument("--control-hz", type=float, default=50.0)
+    p.add_argument("--vofa-hz", type=float, default=100.0)
+    p.add_argument("--duration", type=float, default=2.0)
+
+    p = sub.add_parser("conflate", help="逐帧排队与合并发送最新值对比")
+    p.add_argument("--send-hz", type=float, default=200.0)
+    p.add_argument("--setpoint-hz", type=float, default=2000.0)
+    p.add_argument("--duration", type=float, default=2.0)
+
+    p = sub.add_parser("schedule", help="每次写入后sleep与绝对截止时间调度的发送节奏对比")
+    p.add_argument("--send-hz", type=float, default=300.0)
+    p.add_argument("--spin-us", type=float, nargs="+", default=[0.0, 200.0])
+    p.add_argument("--duration", type=float, default=2.0)
+
+    p = sub.add_parser("dispatch", help="慢回调在读线程中直接调用与交给分发线程对比")
+    p.add_argument("--callback-ms", type=float, default=1.0)
+    p.add_argument("--frame-hz", type=float, default=2000.0)
+    p.add_argument("--duration", type=float, default=2.0)
+    p.add_argument("--max-frames", type=int, default=256)
+
+    p = sub.add_parser("gil", help="GIL重负载下读线程与子进程接收的延迟对比")
+    p.add_argument("--load-threads", type=int, nargs="+", default=[0, 1])
+    p.add_argument("--hold-ms", type=float, default=20.0)
+    p.add_argument("--frame-hz", type=float, default=1000.0)
+    p.add_argument("--duration", type=float, default=2.0)
+
+    p = sub.add_parser("clock", help="帧接收时间与时钟同步换算的采样时间误差对比")
+    p.add_argument("--ppm", type=float, nargs="+", default=[0.0, 200.0])
+    p.add_argument("--load-threads", type=int, nargs="+", default=[0, 1])
+    p.add_argument("--hold-ms", type=float, default=5.0)
+    p.add_argument("--frame-hz", type=float, default=500.0)
+    p.add_argument("--duration", type=float, default=4.0)
+
+    p = sub.add_parser("backend", help="pyserial与termios直接读写的串口后端对比")
+    p.add_argument("--read-mode", nargs="+", default=["fixed", "drain"])
+    p.add_argument("--frame-hz", type=float, default=1000.0)
+    p.add_argument("--frames", type=int, default=2000)
+    p.add_argument("--tx-frames", type=int, default=5000)
+
+    p = sub.add_parser("hub", help="多串口独立线程与UartHub对比")
+    p.add_argument("--ports", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--rate", type=float, default=200.0)
+    p.add_argument("--frame-length", type=int, default=8)
+    p.add_argument("--duration", type=float, default=2.0)
+
+    args = parser.parse_args()
+
+    results = []
+    if args.bench == "align":
+        for corruption in args.corruption:
+            results.append(bench_align(args.frame_length, corruption,
+                                       args.frames, args.chunk, args.seed))
+    elif args.bench == "queue":
+        results.append(bench_queue(args.bytes, args.chunk))
+    elif args.bench == "write":
+        for burst in args.burst:
+            results.append(bench_write(args.frame_length, burst, args.frames))
+    elif args.bench == "decode":
+        for n_missions in args.missions:
+            results.append(bench_decode(n_missions, args.frames))
+    elif args.bench == "batch":
+        for n_missions in args.missions:
+            results.append(bench_batch(n_missions, args.frames))
+    elif args.bench == "justfloat":
+        for mission_ratio in args.mission_ratio:
+            for channels in args.channels:
+                results.append(bench_just_float(channels, mission_ratio, args.samples))
+    elif args.bench == "telemetry":
+        for order in args.order:
+            for channels in args.channels:
+                for block in args.block:
+                    results.append(bench_telemetry(channels, block, args.baud, args.scale,
+                                                   n_samples=args.samples, order=order))
+    elif args.bench == "vofa":
+        for channels in args.channels:
+            results.append(bench_vofa(channels, args.block, args.samples))
+    elif args.bench == "suite":
+        results.extend(bench_suite(args.baud, args.frame_length, args.corruption,
+                                   args.frames, args.send_hz))
+    elif args.bench == "crc":
+        for corruption in args.corruption:
+            results.append(bench_crc(args.frame_length, corruption, args.frames, args.chunk))
+    elif args.bench == "varlen":
+        for blob_size in args.blob_size:
+            results.append(bench_varlen(args.messages, blob_size, args.blob_ratio))
+    elif args.bench == "request":
+        for loss in args.loss:
+            for window in args.window:
+                results.append(bench_request(window, args.requests, args.echo_delay, loss,
+                                             args.timeout))
+    elif args.bench == "lanes":
+        for use_lanes in (False, True):
+            results.append(bench_lanes(use_lanes, args.send_hz, args.telemetry_hz,
+                                       args.control_hz, args.vofa_hz, args.duration))
+    elif args.bench == "conflate":
+        for latest in (False, True):
+            results.append(bench_conflate(latest, args.send_hz, args.setpoint_hz, args.duration))
+    elif args.bench == "schedule":
+        results.append(bench_schedule("sleep", args.send_hz, args.duration))
+        for spin_us in args.spin_us:
+            results.append(bench_schedule("deadline", args.send_hz, args.duration, spin_us))
+    elif args.bench == "dispatch":
+        for mode, overflow in ((Dispatcher.MODE_INLINE, Dispatcher.OVERFLOW_DROP_OLDEST),
+                               (Dispatcher.MODE_THREAD, Dispatcher.OVERFLOW_BLOCK),
+                               (Dispatcher.MODE_THREAD, Dispatcher.OVERFLOW_DROP_OLDEST),
+                               (Dispatcher.MODE_THREAD, Dispatcher.OVERFLOW_COALESCE)):
+            results.append(bench_dispatch(mode, overflow, args.callback_ms, args.frame_hz,
+                                          args.duration, args.max_frames))
+    elif args.bench == "gil":
+        for load_threads in args.load_threads:
+            for mode in ("thread", "process"):
+                results.append(bench_gil(mode, load_threads, args.hold_ms, args.frame_hz,
+                                         args.duration))
+    elif args.bench == "clock":
+        for clock_ppm in args.ppm:
+            for load_threads in args.load_threads:
+                results.append(bench_clock(clock_ppm, load_threads, args.hold_ms, args.frame_hz,
+                                           args.duration))
+    elif args.bench == "backend":
+        for read_mode in args.read_mode:
+            for backend in ("pyserial", "native"):
+                results.append(bench_backend(backend, read_mode, args.frame_hz, args.frames,
+                                             args.tx_frames))
+    elif args.bench == "hub":
+        for n_ports in args.ports:
+            for use_hub in (False, True):
+                results.append(bench_hub(n_ports, use_hub, args.rate, args.frame_length,
+                                         args.duration))
+
+    _print_results(results, args.json)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+串口原始数据抓包
+
+记录格式：文件头 b'SCAP' + 版本号(1字节)，随后为若干条记录，
+每条记录为 <时间戳ns(int64) 方向(uint8) 长度(uint16)> + 数据，小端序。
+时间戳为time.monotonic_ns()。
+"""
+
+import glob
+import os
+import struct
+import threading
+import time
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+CAPTURE_MAGIC = b'SCAP'
+CAPTURE_VERSION = 1
+CAPTURE_HEADER = CAPTURE_MAGIC + bytes((CAPTURE_VERSION,))
+
+# 方向
+DIR_RX = 0
+DIR_TX = 1
+
+RECORD_HEADER = struct.Struct('<qBH')
+MAX_RECORD_DATA = 0xFFFF
+
+
+class CaptureWriter:
+    def __init__(self, path_prefix: str, chunk_size: int = 64 * 1024, n_chunks: int = 16,
+                 max_file_bytes: int = 64 * 1024 * 1024, max_files: int = 8,
+                 flush_interval: float = 0.5):
+        """
+        后台抓包写入器。热路径只把记录拷贝进预分配的块，写文件由后台线程完成；
+        空闲块耗尽时丢弃记录并计数，不阻塞调用者
+        :param path_prefix: 文件路径前缀，实际文件为 前缀.0000.scap、前缀.0001.scap ...
+        :param chunk_size: 每个块的大小（字节）
+        :param n_chunks: 预分配的块数
+        :param max_file_bytes: 单个文件达到该大小后轮转
+        :param max_files: 最多保留的文件数，0表示不限制
+        :param flush_interval: 未写满的块最长多久写入一次文件（秒）
+        """
+        if chunk_size < RECORD_HEADER.size + 1:
+            raise ValueError("chunk_size is too small")
+
+        self.path_prefix = path_prefix
+        self.chunk_size = chunk_size
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+
+        # 空闲块、当前块及待写入文件的块
+        self.free_chunks = deque(bytearray(chunk_size) for _ in range(n_chunks - 1))
+        self.chunk: Optional[bytearray] = bytearray(chunk_size)
+        self.chunk_used = 0
+        self.full_chunks = deque()
+
+        self.mutex = threading.Lock()
+        self.cv = threading.Condition(self.mutex)
+
+        # 统计
+        self.records = 0
+        self.bytes = 0
+        self.dropped_records = 0
+
+        # 文件
+        self.file_index = 0
+        self.file = None
+        self.file_bytes = 0
+        self.files: List[str] = []
+
+        self.running = True
+        self.thread = threading.Thread(target=self._thread_write, daemon=True)
+        self.thread.start()
+
+    def record(self, direction: int, data, timestamp_ns: Optional[int] = None):
+        """
+        记录一段原始数据
+        :param direction: DIR_RX或DIR_TX
+        :param data: 支持buffer协议的数据
+        :param timestamp_ns: time.monotonic_ns()时间戳，默认为当前时间
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+
+        view = memoryview(data).cast('B')
+        limit = min(MAX_RECORD_DATA, self.chunk_size - RECORD_HEADER.size)
+        while len(view) > limit:
+            self.record(direction, view[:limit], timestamp_ns)
+            view = view[limit:]
+
+        size = RECORD_HEADER.size + len(view)
+        with self.mutex:
+            if self.chunk is None or self.chunk_used + size > self.chunk_size:
+                if not self._swap_chunk():
+                    self.dropped_records += 1
+                    return
+
+            chunk = self.chunk
+            used = self.chunk_used
+            RECORD_HEADER.pack_into(chunk, used, timestamp_ns, direction, len(view))
+            used += RECORD_HEADER.size
+            chunk[used:used + len(view)] = view
+            self.chunk_used = used + len(view)
+            self.records += 1
+            self.bytes += len(view)
+
+    def _swap_chunk(self) -> bool:
+        """将当前块交给后台线程并取一个空闲块，需持有mutex"""
+        if self.chunk is not None and self.chunk_used:
+            self.full_chunks.append((self.chunk, self.chunk_used))
+            self.chunk = None
+            self.cv.notify()
+
+        if self.chunk is None:
+            if not self.free_chunks:
+                return False
+            self.chunk = self.free_chunks.popleft()
+        self.chunk_used = 0
+        return True
+
+    def _thread_write(self):
+        """后台写文件线程"""
+        while True:
+            with self.cv:
+                if not self.full_chunks and self.running:
+                    self.cv.wait(self.flush_interval)
+                if not self.full_chunks and self.chunk is not None and self.chunk_used:
+                    # 超时后把未写满的块也写入文件
+                    self._swap_chunk()
+                pending = list(self.full_chunks)
+                self.full_chunks.clear()
+                running = self.running
+
+            for chunk, used in pending:
+                try:
+                    self._write_chunk(chunk, used)
+                except OSError as e:
+                    print(f"Capture write error: {str(e)}")
+                with self.mutex:
+                    self.free_chunks.append(chunk)
+
+            if not running and not pending:
+                break
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _write_chunk(self, chunk: bytearray, used: int):
+        if self.file is None or self.file_bytes >= self.max_file_bytes:
+            self._rotate()
+        self.file.write(memoryview(chunk)[:used])
+        self.file.flush()
+        self.file_bytes += used
+
+    def _rotate(self):
+        """打开下一个文件，并删除超出数量的旧文件"""
+        if self.file is not None:
+            self.file.close()
+
+        path = f"{self.path_prefix}.{self.file_index:04d}.scap"
+        self.file_index += 1
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "wb")
+        self.file.write(CAPTURE_HEADER)
+        self.file_bytes = len(CAPTURE_HEADER)
+        self.files.append(path)
+
+        while self.max_files and len(self.files) > self.max_files:
+            old = self.files.pop(0)
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def close(self):
+        """写入剩余数据并停止后台线程"""
+        with self.cv:
+            if not self.running:
+                return
+            if self.chunk is not None and self.chunk_used:
+                self._swap_chunk()
+            self.running = False
+            self.cv.notify()
+        self.thread.join(timeout=5.0)
+
+    def stats(self) -> dict:
+        return {
+            "records": self.records,
+            "bytes": self.bytes,
+            "dropped_records": self.dropped_records,
+            "files": list(self.files),
+        }
+
+
+def capture_files(path: str) -> List[str]:
+    """
+    展开抓包路径：可以是单个文件，也可以是写入时的路径前缀
+    :param path: 文件或前缀
+    :return: 按顺序排列的文件列表
+    """
+    if os.path.isfile(path):
+        return [path]
+    return sorted(glob.glob(f"{glob.escape(path)}.[0-9][0-9][0-9][0-9].scap"))
+
+
+def read_capture(path: str) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    读取抓包记录
+    :param path: 文件或写入时的路径前缀
+    :return: 迭代 (时间戳ns, 方向, 数据)
+    """
+    for file_path in capture_files(path):
+        with open(file_path, "rb") as f:
+            content = f.read()
+        if len(content) < len(CAPTURE_HEADER) or content[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            raise ValueError(f"{file_path} is not a capture file")
+        version = content[len(CAPTURE_MAGIC)]
+        if version != CAPTURE_VERSION:
+            raise ValueError(f"{file_path} has unsupported capture version {version}")
+
+        view = memoryview(content)
+        pos = len(CAPTURE_HEADER)
+        while pos + RECORD_HEADER.size <= len(content):
+            timestamp_ns, direction, length = RECORD_HEADER.unpack_from(content, pos)
+            pos += RECORD_HEADER.size
+            if pos + length > len(content):
+                # 文件末尾的记录不完整（如进程异常退出）
+                break
+            yield timestamp_ns, direction, bytes(view[pos:pos + length])
+            pos += length
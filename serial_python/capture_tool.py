@@ -0,0 +1,182 @@
+"""
+抓包分析工具
+
+用法:
+    python capture_tool.py dump capture/uart0 --dir rx
+    python capture_tool.py dump capture/uart0 --mission 1 --frame-length 8
+    python capture_tool.py replay capture/uart0 --frame-length 8 --speed 1.0
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from capture import read_capture, DIR_RX, DIR_TX
+from crc import FrameCrc, make_frame_crc
+from frame_aligner import FrameAligner, VarFrameAligner
+from uart import Uart
+
+DIR_NAMES = {DIR_RX: "RX", DIR_TX: "TX"}
+DIR_FILTERS = {"rx": (DIR_RX,), "tx": (DIR_TX,), "all": (DIR_RX, DIR_TX)}
+
+
+def dump(path: str, directions: tuple, limit: int = 0):
+    """
+    按时间顺序打印原始记录
+    :param path: 抓包文件或路径前缀
+    :param directions: 要打印的方向
+    :param limit: 最多打印的记录数，0表示不限制
+    """
+    start_ns = None
+    n = 0
+    for timestamp_ns, direction, data in read_capture(path):
+        if start_ns is None:
+            start_ns = timestamp_ns
+        if direction not in directions:
+            continue
+        print(f"{(timestamp_ns - start_ns) / 1e9:12.6f} {DIR_NAMES.get(direction, direction)} "
+              f"{len(data):5d}B: {data.hex(' ')}")
+        n += 1
+        if limit and n >= limit:
+            break
+
+
+def dump_frames(path: str, directions: tuple, frame_length: int, mission_id: int = -1,
+                limit: int = 0, crc=None, framing: str = Uart.FRAMING_FIXED):
+    """
+    按方向重组字节流、对齐成帧后打印，可按任务ID过滤
+    :param path: 抓包文件或路径前缀
+    :param directions: 要打印的方向
+    :param frame_length: 每帧数据长度
+    :param mission_id: 任务ID，-1表示不过滤
+    :param limit: 最多打印的帧数，0表示不限制
+    :param crc: 帧校验算法名，None表示不校验
+    :param framing: 帧格式，fixed或variable（变长帧忽略frame_length）
+    """
+    if framing == Uart.FRAMING_VARIABLE:
+        aligners = {direction: VarFrameAligner(crc=make_frame_crc(crc)) for direction in directions}
+    else:
+        aligners = {direction: FrameAligner(frame_length, crc=make_frame_crc(crc))
+                    for direction in directions}
+    pending = {direction: bytearray() for direction in directions}
+    start_ns = None
+    n = 0
+    for timestamp_ns, direction, data in read_capture(path):
+        if start_ns is None:
+            start_ns = timestamp_ns
+        if direction not in directions:
+            continue
+
+        buf = pending[direction]
+        buf += data
+        frames, pos = aligners[direction].align(buf)
+        del buf[:pos]
+        for frame in frames:
+            if mission_id >= 0 and frame[2] != mission_id:
+                continue
+            print(f"{(timestamp_ns - start_ns) / 1e9:12.6f} {DIR_NAMES[direction]} "
+                  f"mission {frame[2]:3d}: {frame.hex(' ')}")
+            n += 1
+            if limit and n >= limit:
+                return
+
+
+def replay(path: str, frame_length: int, speed: float = 0.0, direction: int = DIR_RX,
+           verbose: bool = False, crc=None, framing: str = Uart.FRAMING_FIXED) -> dict:
+    """
+    将抓到的数据按原始节奏或最快速度送入Uart的对齐与解码流程
+    :param path: 抓包文件或路径前缀
+    :param frame_length: 每帧数据长度
+    :param speed: 回放倍速，1.0为原始速度，0表示最快速度
+    :param direction: 回放的方向
+    :param verbose: 是否打印每个解码结果
+    :param crc: 帧校验算法名，None表示不校验
+    :param framing: 帧格式，fixed或variable
+    :return: 回放统计
+    """
+    uart = Uart(frame_length, crc=crc, framing=framing)
+    registry = uart.mission_registry
+    frames_by_mission = Counter()
+    undecoded = 0
+    n_bytes = 0
+
+    first_ns = None
+    wall_start = time.monotonic()
+    for timestamp_ns, record_direction, data in read_capture(path):
+        if record_direction != direction:
+            continue
+        if first_ns is None:
+            first_ns = timestamp_ns
+        if speed > 0:
+            delay = (timestamp_ns - first_ns) / 1e9 / speed - (time.monotonic() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        n_bytes += len(data)
+        uart.read_buff_queue.push_bytes(data)
+        ret, frames = uart.get_aligned_frames_from_queue()
+        for frame in frames:
+            decoded = registry.decode(frame)
+            frames_by_mission[frame[2]] += 1
+            if decoded is None:
+                undecoded += 1
+                if verbose:
+                    print(f"mission {frame[2]:3d}: {frame.hex(' ')}")
+            elif verbose:
+                schema, values = decoded
+                print(f"mission {frame[2]:3d}: {dict(zip(schema.field_names, values))}")
+
+    return {
+        "bytes": n_bytes,
+        "frames": sum(frames_by_mission.values()),
+        "frames_by_mission": dict(frames_by_mission),
+        "undecoded_frames": undecoded,
+        "resync_dropped_bytes": uart.frame_aligner.dropped_bytes,
+        "crc_failures": uart.crc.failures if uart.crc is not None else 0,
+        "seconds": time.monotonic() - wall_start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓包分析工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("dump", help="打印原始记录或对齐后的帧")
+    p.add_argument("path", help="抓包文件或路径前缀")
+    p.add_argument("--dir", choices=sorted(DIR_FILTERS), default="all")
+    p.add_argument("--mission", type=int, default=None, help="只打印该任务ID的帧")
+    p.add_argument("--frames", action="store_true", help="打印对齐后的帧而不是原始记录")
+    p.add_argument("--frame-length", type=int, default=8)
+    p.add_argument("--limit", type=int, default=0)
+    p.add_argument("--crc", choices=sorted(FrameCrc.ALGORITHMS), default=None)
+    p.add_argument("--framing", choices=[Uart.FRAMING_FIXED, Uart.FRAMING_VARIABLE],
+                   default=Uart.FRAMING_FIXED)
+
+    p = sub.add_parser("replay", help="回放到对齐与解码流程")
+    p.add_argument("path", help="抓包文件或路径前缀")
+    p.add_argument("--frame-length", type=int, default=8)
+    p.add_argument("--speed", type=float, default=0.0, help="回放倍速，0表示最快速度")
+    p.add_argument("--dir", choices=["rx", "tx"], default="rx")
+    p.add_argument("--verbose", action="store_true")
+    p.add_argument("--crc", choices=sorted(FrameCrc.ALGORITHMS), default=None)
+    p.add_argument("--framing", choices=[Uart.FRAMING_FIXED, Uart.FRAMING_VARIABLE],
+                   default=Uart.FRAMING_FIXED)
+
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        directions = DIR_FILTERS[args.dir]
+        if args.frames or args.mission is not None:
+            mission_id = -1 if args.mission is None else args.mission
+            dump_frames(args.path, directions, args.frame_length, mission_id, args.limit,
+                        args.crc, args.framing)
+        else:
+            dump(args.path, directions, args.limit)
+    elif args.command == "replay":
+        direction = DIR_RX if args.dir == "rx" else DIR_TX
+        print(replay(args.path, args.frame_length, args.speed, direction, args.verbose,
+                     args.crc, args.framing))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+from metrics import Histogram
+from mission_schema import MissionRegistry
+
+# 时间字段的struct格式字符对应的位数
+TIME_BITS = {"B": 8, "H": 16, "I": 32, "Q": 64}
+
+
+class ClockSync:
+    def __init__(self, registry: MissionRegistry, ping_mission, pong_mission,
+                 build: Callable[[object, tuple, dict], bytes], send: Callable[[bytes], None],
+                 seq_field: str = "ping_seq", time_field: str = "mcu_time", tick_ns: int = 1000,
+                 window: int = 16, history: int = 32):
+        """
+        主机与下位机的时钟同步：周期性发送ping，下位机在pong中带回序号及收到ping时的本机时间，
+        由往返时间估计时钟偏移（offset = 主机时间 - 下位机时间）。排队等随机延迟只会使往返时间变长，
+        每window个样本中取往返时间最短的一个作为该时段的偏移测量（最小值滤波），
+        再对最近history个测量做最小二乘直线拟合，跟踪两个时钟的频率差（漂移）
+        :param registry: 任务注册表
+        :param ping_mission: ping任务ID或任务名，含序号字段
+        :param pong_mission: pong任务ID或任务名，含序号字段与下位机时间字段（无符号整数）
+        :param build: build(任务, 按顺序的字段值, 按字段名的值) -> 帧
+        :param send: send(帧)，立即写入串口，不经过写队列
+        :param seq_field: 序号字段名
+        :param time_field: 下位机时间字段名
+        :param tick_ns: 下位机时间字段每个单位对应的纳秒数，如微秒计数为1000
+        :param window: 最小值滤波的样本数
+        :param history: 用于拟合漂移的测量数
+        """
+        ping = registry.get(ping_mission)
+        pong = registry.get(pong_mission)
+        for schema, fields in ((ping, (seq_field,)), (pong, (seq_field, time_field))):
+            for field in fields:
+                if field not in schema.field_names:
+                    raise ValueError(f"{schema.name} needs a '{field}' field")
+        time_format = pong.fields[pong.field_names.index(time_field)][1]
+        seq_format = pong.fields[pong.field_names.index(seq_field)][1]
+        if time_format not in TIME_BITS or seq_format not in TIME_BITS:
+            raise ValueError(f"{pong.name}: '{seq_field}' and '{time_field}' must be unsigned integers")
+
+        self.registry = registry
+        self.ping_mission = ping.mission_id
+        self.pong_id = pong.mission_id
+        self.pong_schema = pong
+        self.seq_index = pong.field_names.index(seq_field)
+        self.time_index = pong.field_names.index(time_field)
+        self.build = build
+        self.send = send
+        self.seq_field = seq_field
+        self.time_field = time_field
+        self.tick_ns = tick_ns
+        self.wrap = 1 << TIME_BITS[time_format]
+        self.seq_space = 1 << TIME_BITS[seq_format]
+        self.window = max(1, window)
+
+        self.mutex = threading.Lock()
+        self.next_seq = 0
+        self.pending: OrderedDict = OrderedDict()  # 序号 -> 发送时间
+        self.max_pending = 64
+
+        # 展开回绕后的下位机时间参考（计数），用于展开其他帧中的时间字段
+        self.ref_ticks: Optional[int] = None
+        # 当前窗口中往返时间最短的样本(往返时间, 下位机时间ns, 偏移ns)，及窗口内样本数
+        self.best: Optional[tuple] = None
+        self.window_count = 0
+        # 每个窗口的测量(下位机时间ns, 偏移ns)
+        self.points = deque(maxlen=max(2, history))
+        # 模型(参考下位机时间ns, 参考偏移ns, 偏移变化率)，整体替换以便无锁读取
+        self.model: Optional[tuple] = None
+
+        # 统计
+        self.pings = 0
+        self.pongs = 0
+        self.lost = 0
+        self.unmatched = 0
+        self.rtt_ns = Histogram()
+        self.rtt_min_ns = 0
+
+        self.period = 0.1
+        self.running = False
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def ping(self):
+        """发送一次ping"""
+        with self.mutex:
+            seq = self.next_seq
+            self.next_seq = (seq + 1) % self.seq_space
+        frame = self.build(self.ping_mission, (), {self.seq_field: seq})
+        with self.mutex:
+            self.pending[seq] = time.monotonic_ns()
+            while len(self.pending) > self.max_pending:
+                # 长时间没有回应的ping视为丢失
+                self.pending.popitem(last=False)
+                self.lost += 1
+            self.pings += 1
+        self.send(frame)
+
+    def on_frame(self, frame, t_ns: int) -> bool:
+        """
+        检查收到的帧是否为pong，读线程在分发前调用
+        :param frame: 一帧数据
+        :param t_ns: 帧的接收时间（monotonic_ns）
+        :return: True已作为pong处理
+        """
+        if frame[self.registry.id_offset] != self.pong_id:
+            return False
+        decoded = self.registry.decode(frame)
+        if decoded is None:
+            return False
+        values = decoded[1]
+        self.on_pong(values[self.seq_index], values[self.time_index], t_ns)
+        return True
+
+    def on_pong(self, seq: int, mcu_ticks: int, t_ns: int) -> bool:
+        """
+        处理一个pong样本
+        :param seq: 序号
+        :param mcu_ticks: 下位机收到ping时的时间字段
+        :param t_ns: pong的接收时间（monotonic_ns）
+        :return: True匹配到发出的ping
+        """
+        with self.mutex:
+            sent_ns = self.pending.pop(seq, None)
+            if sent_ns is None or t_ns <= sent_ns:
+                self.unmatched += 1
+                return False
+
+            rtt = t_ns - sent_ns
+            mcu_ns = self._unwrap(mcu_ticks) * self.tick_ns
+            # 假设去程与回程延迟相同，下位机打时间戳的时刻对应主机的往返中点
+            offset = sent_ns + rtt // 2 - mcu_ns
+            self.pongs += 1
+            self.rtt_ns.record(rtt)
+            if not self.rtt_min_ns or rtt < self.rtt_min_ns:
+                self.rtt_min_ns = rtt
+
+            if self.best is None or rtt < self.best[0]:
+                self.best = (rtt, mcu_ns, offset)
+            self.window_count += 1
+            points = list(self.points)
+            points.append(self.best[1:])
+            if self.window_count >= self.window:
+                self.points.append(self.best[1:])
+                self.best = None
+                self.window_count = 0
+            self.model = self._fit(points)
+        return True
+
+    def _unwrap(self, ticks: int) -> int:
+        """将回绕的下位机时间展开为离参考最近的值，需持有mutex或只读"""
+        ref = self.ref_ticks
+        if ref is None:
+            self.ref_ticks = ticks
+            return ticks
+        half = self.wrap >> 1
+        unwrapped = ref + ((ticks - ref + half) % self.wrap) - half
+        if unwrapped > ref:
+            self.ref_ticks = unwrapped
+        return unwrapped
+
+    @staticmethod
+    def _fit(points: list) -> tuple:
+        """
+        最小二乘拟合偏移随下位机时间的变化
+        :param points: [(下位机时间ns, 偏移ns), ...]
+        :return: (参考下位机时间ns, 参考偏移ns, 偏移变化率)
+        """
+        n = len(points)
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        sxx = sum((x - mean_x) ** 2 for x, _ in points)
+        if n < 2 or sxx <= 0:
+            return points[-1][0], points[-1][1], 0.0
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx
+        return mean_x, mean_y, slope
+
+    def synced(self) -> bool:
+        return self.model is not None
+
+    def to_host_ns(self, mcu_ticks: int) -> Optional[int]:
+        """
+        将下位机时间字段换算为主机monotonic_ns
+        :param mcu_ticks: 下位机时间字段的值
+        :return: 主机时间，尚未收到pong时为None
+        """
+        model = self.model
+        if model is None:
+            return None
+        ref = self.ref_ticks
+        half = self.wrap >> 1
+        mcu_ns = (ref + ((mcu_ticks - ref + half) % self.wrap) - half) * self.tick_ns
+        mcu_ref, offset_ref, slope = model
+        return int(mcu_ns + offset_ref + slope * (mcu_ns - mcu_ref))
+
+    def offset_ns(self) -> Optional[int]:
+        """当前的时钟偏移（主机时间 - 下位机时间），尚未同步时为None"""
+        model = self.model
+        if model is None or self.ref_ticks is None:
+            return None
+        mcu_ns = self.ref_ticks * self.tick_ns
+        return int(model[1] + model[2] * (mcu_ns - model[0]))
+
+    def start(self, period: float = 0.1):
+        """
+        启动ping线程
+        :param period: ping周期（秒）
+        """
+        self.period = period
+        if self.running:
+            return
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._thread_ping, daemon=True)
+        self.thread.start()
+
+    def _thread_ping(self):
+        while self.running:
+            try:
+                self.ping()
+            except Exception as e:
+                print(f"Clock sync error: {str(e)}")
+            self.stop_event.wait(self.period)
+
+    def stop(self):
+        """停止ping线程"""
+        self.running = False
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        self.thread = None
+
+    def stats(self) -> dict:
+        """
+        获取统计快照
+        :return: 同步状态、偏移（微秒）、下位机时钟相对主机的快慢（ppm）、往返时间（微秒）
+        """
+        model = self.model
+        offset = self.offset_ns()
+        return {
+            "synced": model is not None,
+            "pings": self.pings,
+            "pongs": self.pongs,
+            "lost": self.lost,
+            "unmatched": self.unmatched,
+            "offset_us": offset / 1000 if offset is not None else None,
+            "mcu_skew_ppm": -model[2] * 1e6 if model is not None else None,
+            "measurements": len(self.points),
+            "rtt_min_us": self.rtt_min_ns / 1000,
+            "rtt_us": self.rtt_ns.snapshot(1000.0),
+        }
@@ -0,0 +1,148 @@
+"""
+帧校验
+
+带校验的帧格式：头帧 + 任务ID + 字段 + CRC + 尾帧，CRC覆盖从头帧到字段末尾的所有字节，
+紧挨尾帧之前。下位机需使用相同的算法参数：
+
+    crc8          CRC-8/SMBUS   多项式0x07，初值0x00，不反射，1字节
+    crc16_modbus  CRC-16/MODBUS 多项式0x8005（反射0xA001），初值0xFFFF，反射，2字节低字节在前
+    crc16_ccitt   CRC-16/CCITT-FALSE 多项式0x1021，初值0xFFFF，不反射，2字节高字节在前
+"""
+
+import binascii
+from typing import List, Optional
+
+
+def _make_crc8_table(poly: int) -> bytes:
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+
+def _make_crc16_reflected_table(poly: int) -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+CRC8_TABLE = _make_crc8_table(0x07)
+CRC16_MODBUS_TABLE = _make_crc16_reflected_table(0xA001)
+
+
+def crc8(data, crc: int = 0x00) -> int:
+    """
+    CRC-8/SMBUS，查表计算
+    :param data: 支持buffer协议的数据
+    :param crc: 初值，可用于分段计算
+    :return: 校验值
+    """
+    table = CRC8_TABLE
+    for b in bytes(data):
+        crc = table[crc ^ b]
+    return crc
+
+
+def crc16_modbus(data, crc: int = 0xFFFF) -> int:
+    """
+    CRC-16/MODBUS，查表计算
+    :param data: 支持buffer协议的数据
+    :param crc: 初值，可用于分段计算
+    :return: 校验值
+    """
+    table = CRC16_MODBUS_TABLE
+    for b in bytes(data):
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def crc16_ccitt(data, crc: int = 0xFFFF) -> int:
+    """
+    CRC-16/CCITT-FALSE，使用binascii.crc_hqx（C实现的查表算法）
+    :param data: 支持buffer协议的数据
+    :param crc: 初值，可用于分段计算
+    :return: 校验值
+    """
+    return binascii.crc_hqx(data, crc)
+
+
+class FrameCrc:
+    # 算法
+    CRC8 = "crc8"
+    CRC16_MODBUS = "crc16_modbus"
+    CRC16_CCITT = "crc16_ccitt"
+
+    # 算法: (计算函数, 初值, 字节数, 字节序)
+    ALGORITHMS = {
+        CRC8: (crc8, 0x00, 1, "little"),
+        CRC16_MODBUS: (crc16_modbus, 0xFFFF, 2, "little"),
+        CRC16_CCITT: (crc16_ccitt, 0xFFFF, 2, "big"),
+    }
+
+    def __init__(self, algorithm: str = CRC16_MODBUS, tail_length: int = 1):
+        """
+        帧尾之前的CRC校验字段
+        :param algorithm: 算法，crc8、crc16_modbus或crc16_ccitt
+        :param tail_length: 尾帧长度，CRC位于尾帧之前
+        """
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown CRC algorithm: {algorithm}")
+
+        self.algorithm = algorithm
+        self.func, self.init, self.size, self.byteorder = self.ALGORITHMS[algorithm]
+        self.tail_length = tail_length
+
+        # 校验失败次数
+        self.failures = 0
+
+    def compute(self, data) -> int:
+        """
+        计算校验值
+        :param data: 支持buffer协议的数据
+        :return: 校验值
+        """
+        return self.func(data, self.init)
+
+    def seal(self, frame):
+        """
+        计算一帧的CRC并写入帧尾之前
+        :param frame: 已赋值的一帧（bytearray）
+        """
+        offset = len(frame) - self.tail_length - self.size
+        with memoryview(frame) as view:
+            crc = self.func(view[:offset], self.init)
+        frame[offset:offset + self.size] = crc.to_bytes(self.size, self.byteorder)
+
+    def check(self, buf, start: int, end: int) -> bool:
+        """
+        校验缓冲区中的一帧
+        :param buf: 缓冲区
+        :param start: 帧起始下标
+        :param end: 帧结束下标（不包含）
+        :return: True校验通过
+        """
+        offset = end - self.tail_length - self.size
+        with memoryview(buf) as view:
+            crc = self.func(view[start:offset], self.init)
+            ok = crc == int.from_bytes(view[offset:offset + self.size], self.byteorder)
+        if not ok:
+            self.failures += 1
+        return ok
+
+
+def make_frame_crc(crc) -> Optional[FrameCrc]:
+    """
+    将配置转换为FrameCrc
+    :param crc: None表示不校验（兼容无校验的下位机），算法名，或FrameCrc对象
+    :return: FrameCrc或None
+    """
+    if crc is None or isinstance(crc, FrameCrc):
+        return crc
+    return FrameCrc(crc)
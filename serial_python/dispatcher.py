@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from metrics import Histogram
+
+
+class _Worker:
+    def __init__(self, name: str):
+        """一个分发线程及其有界队列，元素为[帧, 入队时间戳, 任务ID, 帧的接收时间]"""
+        self.name = name
+        self.items = deque()
+        self.latest: Dict[int, list] = {}  # 任务ID -> 队列中该任务最新的元素，用于合并
+        self.running = False  # 正在执行回调
+        self.thread: Optional[threading.Thread] = None
+
+
+class Dispatcher:
+    # 分发方式
+    MODE_INLINE = "inline"  # 在读线程中直接调用回调（旧行为）
+    MODE_THREAD = "thread"  # 一个专用分发线程按到达顺序调用回调
+    MODE_POOL = "pool"      # 多个分发线程，按任务ID分配，同一任务始终在同一线程中按序调用
+
+    # 队列满时的处理策略
+    OVERFLOW_BLOCK = "block"              # 读线程等待队列有空位
+    OVERFLOW_DROP_OLDEST = "drop_oldest"  # 丢弃最旧的帧
+    OVERFLOW_COALESCE = "coalesce"        # 用新帧替换队列中同一任务最新的帧，该任务没有排队的帧时丢弃最旧的帧
+
+    def __init__(self, mode: str = MODE_INLINE, max_frames: int = 1024,
+                 overflow: str = OVERFLOW_DROP_OLDEST, workers: int = 4, id_offset: int = 2):
+        """
+        接收回调的分发器，使读线程只负责读取与对齐，慢回调不会阻塞读取
+        :param mode: 分发方式，inline、thread或pool
+        :param max_frames: 每个分发线程的队列最大帧数
+        :param overflow: 队列满时的处理策略，block、drop_oldest或coalesce
+        :param workers: pool方式的分发线程数
+        :param id_offset: 任务ID在帧中的偏移
+        """
+        if mode not in (self.MODE_INLINE, self.MODE_THREAD, self.MODE_POOL):
+            raise ValueError(f"Unknown dispatch mode: {mode}")
+        if overflow not in (self.OVERFLOW_BLOCK, self.OVERFLOW_DROP_OLDEST, self.OVERFLOW_COALESCE):
+            raise ValueError(f"Unknown dispatch overflow policy: {overflow}")
+
+        self.mode = mode
+        self.max_frames = max(1, max_frames)
+        self.overflow = overflow
+        self.id_offset = id_offset
+        n_workers = max(1, workers) if mode == self.MODE_POOL else 1
+        self.workers = [_Worker(f"Dispatch-{i}") for i in range(n_workers)]
+
+        self.handler: Optional[Callable[[bytes, int], Any]] = None
+        self.running = False
+        self.cond = threading.Condition()
+
+        # 统计
+        self.submitted = 0
+        self.dispatched = 0
+        self.dropped_frames = 0
+        self.coalesced_frames = 0
+        self.blocked_count = 0
+        self.callback_errors = 0
+        self.max_depth = 0
+        self.lag_ns = Histogram()      # 入队到开始执行回调
+        self.runtime_ns = Histogram()  # 回调执行时间
+        self.runtime_by_mission: Dict[int, Histogram] = {}
+
+    def start(self, handler: Callable[[bytes, int], Any]):
+        """
+        设置回调并启动分发线程
+        :param handler: handler(帧, 接收时间)，如MissionRegistry.dispatch
+        """
+        self.handler = handler
+        if self.mode == self.MODE_INLINE or self.running:
+            return
+        self.running = True
+        for worker in self.workers:
+            worker.thread = threading.Thread(target=self._thread_dispatch, args=(worker,),
+                                             name=worker.name, daemon=True)
+            worker.thread.start()
+
+    def submit(self, frame: bytes, t_ns: int = 0) -> bool:
+        """
+        提交一帧，读线程调用
+        :param frame: 对齐好的一帧
+        :param t_ns: 帧的接收时间（monotonic_ns），原样交给回调
+        :return: True已分发或入队，False被丢弃
+        """
+        if self.mode == self.MODE_INLINE or not self.running:
+            self.submitted += 1
+            start_ns, end_ns = self._call(frame, t_ns)
+            self._record(frame, start_ns, start_ns, end_ns)
+            return True
+
+        mission_id = frame[self.id_offset]
+        worker = self.workers[mission_id % len(self.workers)]
+        with self.cond:
+            self.submitted += 1
+            items = worker.items
+            if len(items) >= self.max_frames:
+                if self.overflow == self.OVERFLOW_BLOCK:
+                    self.blocked_count += 1
+                    while len(worker.items) >= self.max_frames and self.running:
+                        self.cond.wait()
+                    if not self.running:
+                        self.dropped_frames += 1
+                        return False
+                elif self.overflow == self.OVERFLOW_COALESCE and mission_id in worker.latest:
+                    # 该任务排队中最新的帧之前都是更旧的帧，替换后同一任务的顺序不变
+                    item = worker.latest[mission_id]
+                    item[0] = frame
+                    item[3] = t_ns
+                    self.coalesced_frames += 1
+                    return True
+                else:
+                    self._discard(worker, items.popleft())
+                    self.dropped_frames += 1
+
+            item = [frame, time.perf_counter_ns(), mission_id, t_ns]
+            items.append(item)
+            worker.latest[mission_id] = item
+            if len(items) > self.max_depth:
+                self.max_depth = len(items)
+            self.cond.notify_all()
+        return True
+
+    @staticmethod
+    def _discard(worker: _Worker, item: list):
+        """元素出队后更新合并索引，需持有cond"""
+        if worker.latest.get(item[2]) is item:
+            del worker.latest[item[2]]
+
+    def _thread_dispatch(self, worker: _Worker):
+        """分发线程函数"""
+        while True:
+            with self.cond:
+                while not worker.items and self.running:
+                    self.cond.wait()
+                if not worker.items:
+                    return
+                item = worker.items.popleft()
+                self._discard(worker, item)
+                worker.running = True
+                # 唤醒等待空位的读线程
+                self.cond.notify_all()
+
+            start_ns, end_ns = self._call(item[0], item[3])
+            with self.cond:
+                worker.running = False
+                self._record(item[0], item[1], start_ns, end_ns)
+                self.cond.notify_all()
+
+    def _call(self, frame: bytes, t_ns: int) -> tuple:
+        """
+        调用回调，异常不会终止分发线程
+        :return: (开始时间戳, 结束时间戳)
+        """
+        start_ns = time.perf_counter_ns()
+        try:
+            self.handler(frame, t_ns)
+        except Exception as e:
+            self.callback_errors += 1
+            print(f"Dispatch error: {str(e)}")
+        return start_ns, time.perf_counter_ns()
+
+    def _record(self, frame: bytes, enqueue_ns: int, start_ns: int, end_ns: int):
+        """记录排队延迟与执行时间，分发线程中需持有cond"""
+        self.dispatched += 1
+        self.lag_ns.record(start_ns - enqueue_ns)
+        runtime_ns = end_ns - start_ns
+        self.runtime_ns.record(runtime_ns)
+        mission_id = frame[self.id_offset]
+        histogram = self.runtime_by_mission.get(mission_id)
+        if histogram is None:
+            histogram = self.runtime_by_mission[mission_id] = Histogram()
+        histogram.record(runtime_ns)
+
+    def __len__(self) -> int:
+        return sum(len(worker.items) for worker in self.workers)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的帧全部分发完毕
+        :param timeout: 超时时间（秒），None表示一直等待
+        :return: True已空闲，False超时
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while any(worker.items or worker.running for worker in self.workers):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+    def stop(self, drain: bool = True, timeout: float = 2.0):
+        """
+        停止分发线程
+        :param drain: True先分发完队列中的帧，False丢弃
+        :param timeout: 等待的超时时间（秒）
+        """
+        if not self.running:
+            return
+        if drain:
+            self.wait_idle(timeout)
+        with self.cond:
+            self.running = False
+            for worker in self.workers:
+                self.dropped_frames += len(worker.items)
+                worker.items.clear()
+                worker.latest.clear()
+            self.cond.notify_all()
+        for worker in self.workers:
+            if worker.thread is not None and worker.thread is not threading.current_thread():
+                worker.thread.join(timeout)
+            worker.thread = None
+
+    def stats(self) -> dict:
+        """
+        获取统计快照
+        :return: 计数器、队列深度，排队延迟与回调执行时间分位数（微秒）
+        """
+        return {
+            "mode": self.mode,
+            "overflow": self.overflow,
+            "workers": len(self.workers),
+            "depth": len(self),
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "dispatched": self.dispatched,
+            "dropped_frames": self.dropped_frames,
+            "coalesced_frames": self.coalesced_frames,
+            "blocked_count": self.blocked_count,
+            "callback_errors": self.callback_errors,
+            "lag_us": self.lag_ns.snapshot(1000.0),
+            "runtime_us": self.runtime_ns.snapshot(1000.0),
+            "runtime_by_mission_us": {mission_id: histogram.snapshot(1000.0)
+                                      for mission_id, histogram in self.runtime_by_mission.items()},
+        }
@@ -0,0 +1,404 @@
+import struct
+from typing import List, Optional, Tuple
+
+from vofa import JustFloatDecoder, JUST_FLOAT_TAIL
+
+
+class FrameAligner:
+    def __init__(self, frame_length=16, header=b'?!', tail=b'!', crc=None):
+        """
+        定长帧对齐器，在连续字节缓冲区上批量查找帧
+        :param frame_length: 每帧数据长度（包含头尾帧）
+        :param header: 头帧
+        :param tail: 尾帧
+        :param crc: FrameCrc对象，设置后头尾帧匹配的候选帧还需通过校验，None表示不校验
+        """
+        crc_size = crc.size if crc is not None else 0
+        if frame_length < len(header) + len(tail) + crc_size:
+            raise ValueError("frame_length is shorter than header + tail + crc")
+
+        self.frame_length = frame_length
+        self.header = bytes(header)
+        self.tail = bytes(tail)
+        self.crc = crc
+        self.min_frame_length = frame_length
+
+        # 重新对齐时丢弃的字节数
+        self.dropped_bytes = 0
+
+    def align(self, buf, start: int = 0, end: Optional[int] = None,
+              max_frames: Optional[int] = None,
+              ends: Optional[List[int]] = None) -> Tuple[List[bytes], int]:
+        """
+        从缓冲区中提取所有完整的帧
+        :param buf: bytes或bytearray缓冲区
+        :param start: 起始下标
+        :param end: 结束下标（不包含），默认为缓冲区末尾
+        :param max_frames: 最多提取的帧数，默认不限制
+        :param ends: 不为None时追加每帧的结束下标，用于按字节位置插值时间戳
+        :return: (帧列表, 已处理到的下标)，调用者应丢弃该下标之前的数据
+        """
+        if end is None:
+            end = len(buf)
+
+        frame_length = self.frame_length
+        header = self.header
+        tail = self.tail
+        crc = self.crc
+        tail_offset = frame_length - len(tail)
+        keep = len(header) - 1
+
+        frames = []
+        pos = start
+        with memoryview(buf) as view:
+            while end - pos >= frame_length:
+                # 直接跳到下一个可能的头帧，中间的垃圾数据一次性丢弃
+                index = buf.find(header, pos, end)
+                if index < 0:
+                    # 保留末尾可能是半个头帧的数据
+                    pos = max(pos, end - keep)
+                    break
+
+                if end - index < frame_length:
+                    # 帧不完整，等待后续数据
+                    pos = index
+                    break
+
+                if (buf.startswith(tail, index + tail_offset) and
+                        (crc is None or crc.check(view, index, index + frame_length))):
+                    frames.append(bytes(view[index:index + frame_length]))
+                    pos = index + frame_length
+                    if ends is not None:
+                        ends.append(pos)
+                    if max_frames is not None and len(frames) >= max_frames:
+                        break
+                else:
+                    # 尾帧或校验不合法，前进一个字节继续查找
+                    pos = index + 1
+
+        self.dropped_bytes += pos - start - len(frames) * frame_length
+        return frames, pos
+
+    def match_at(self, buf, view: memoryview, index: int, end: int) -> int:
+        """
+        检查以index处头帧开始的候选帧
+        :return: 帧的结束下标，0表示不是合法的帧，-1表示数据不完整
+        """
+        frame_end = index + self.frame_length
+        if frame_end > end:
+            return -1
+        if (buf.startswith(self.tail, frame_end - len(self.tail)) and
+                (self.crc is None or self.crc.check(view, index, frame_end))):
+            return frame_end
+        return 0
+
+
+class VarFrameAligner:
+    # 变长帧：头帧 + 任务ID(1字节) + 负载长度(uint16，小端) + 负载 + [CRC] + 尾帧
+    ID_OFFSET = 2
+    LENGTH_OFFSET = 3
+    PAYLOAD_OFFSET = 5
+    LENGTH_FIELD = struct.Struct('<H')
+
+    def __init__(self, max_payload=4096, header=b'?!', tail=b'!', crc=None):
+        """
+        变长帧对齐器，按长度字段直接跳到帧尾，不逐字节查找
+        :param max_payload: 最大负载长度，长度字段超过该值的候选帧直接丢弃
+        :param header: 头帧，长度须为2，与任务ID、长度字段的偏移一致
+        :param tail: 尾帧
+        :param crc: FrameCrc对象，设置后候选帧还需通过校验，None表示不校验
+        """
+        if len(header) != self.ID_OFFSET:
+            raise ValueError(f"header must be {self.ID_OFFSET} bytes")
+        if not 0 <= max_payload <= 0xFFFF:
+            raise ValueError("max_payload must be in 0-65535")
+
+        self.header = bytes(header)
+        self.tail = bytes(tail)
+        self.crc = crc
+        self.max_payload = max_payload
+
+        # 除负载外每帧的固定开销
+        self.overhead = self.PAYLOAD_OFFSET + (crc.size if crc is not None else 0) + len(tail)
+        self.min_frame_length = self.overhead
+        self.max_frame_length = self.overhead + max_payload
+
+        # 重新对齐时丢弃的字节数
+        self.dropped_bytes = 0
+
+    def frame_length(self, payload_length: int) -> int:
+        """
+        负载长度对应的帧长
+        :param payload_length: 负载长度
+        :return: 帧长
+        """
+        return self.overhead + payload_length
+
+    def align(self, buf, start: int = 0, end: Optional[int] = None,
+              max_frames: Optional[int] = None,
+              ends: Optional[List[int]] = None) -> Tuple[List[bytes], int]:
+        """
+        从缓冲区中提取所有完整的帧
+        :param buf: bytes或bytearray缓冲区
+        :param start: 起始下标
+        :param end: 结束下标（不包含），默认为缓冲区末尾
+        :param max_frames: 最多提取的帧数，默认不限制
+        :param ends: 不为None时追加每帧的结束下标，用于按字节位置插值时间戳
+        :return: (帧列表, 已处理到的下标)，调用者应丢弃该下标之前的数据
+        """
+        if end is None:
+            end = len(buf)
+
+        header = self.header
+        tail = self.tail
+        crc = self.crc
+        overhead = self.overhead
+        max_payload = self.max_payload
+        length_offset = self.LENGTH_OFFSET
+        unpack_length = self.LENGTH_FIELD.unpack_from
+        keep = len(header) - 1
+
+        frames = []
+        accepted = 0
+        pos = start
+        with memoryview(buf) as view:
+            while end - pos >= overhead:
+                # 已对齐时下一帧紧接上一帧，否则跳到下一个候选头帧
+                if buf.startswith(header, pos):
+                    index = pos
+                else:
+                    index = buf.find(header, pos, end)
+                    if index < 0:
+                        pos = max(pos, end - keep)
+                        break
+
+                if end - index < overhead:
+                    pos = index
+                    break
+
+                payload_length = unpack_length(buf, index + length_offset)[0]
+                if payload_length > max_payload:
+                    # 长度字段不合法，前进一个字节继续查找
+                    pos = index + 1
+                    continue
+
+                frame_end = index + overhead + payload_length
+                if frame_end > end:
+                    # 帧不完整，等待后续数据
+                    pos = index
+                    break
+
+                if (buf.startswith(tail, frame_end - len(tail)) and
+                        (crc is None or crc.check(view, index, frame_end))):
+                    frames.append(bytes(view[index:frame_end]))
+                    accepted += frame_end - index
+                    pos = frame_end
+                    if ends is not None:
+                        ends.append(pos)
+                    if max_frames is not None and len(frames) >= max_frames:
+                        break
+                else:
+                    # 尾帧或校验不合法，前进一个字节继续查找
+                    pos = index + 1
+
+        self.dropped_bytes += pos - start - accepted
+        return frames, pos
+
+    def match_at(self, buf, view: memoryview, index: int, end: int) -> int:
+        """
+        检查以index处头帧开始的候选帧
+        :return: 帧的结束下标，0表示不是合法的帧，-1表示数据不完整
+        """
+        if end - index < self.overhead:
+            return -1
+        payload_length = self.LENGTH_FIELD.unpack_from(buf, index + self.LENGTH_OFFSET)[0]
+        if payload_length > self.max_payload:
+            return 0
+        frame_end = index + self.overhead + payload_length
+        if frame_end > end:
+            return -1
+        if (buf.startswith(self.tail, frame_end - len(self.tail)) and
+                (self.crc is None or self.crc.check(view, index, frame_end))):
+            return frame_end
+        return 0
+
+
+class MixedAligner:
+    def __init__(self, inner, decoder: Optional[JustFloatDecoder] = None, telemetry=None):
+        """
+        同一串口上任务帧与Vofa JustFloat采样、压缩遥测包交错时的对齐器，接口与FrameAligner相同。
+        已确定JustFloat通道数时，当前位置的帧尾对得上就把连续的采样成批解码；当前位置是压缩遥测包头且校验通过时解码整包；
+        否则按任务帧处理，都不是时直接跳到下一个头帧、包头或下一个帧尾对应的采样起点。
+        JustFloat通道数未确定时先扫描帧尾推断
+        :param inner: 任务帧对齐器，FrameAligner或VarFrameAligner
+        :param decoder: JustFloat解码器，None表示不接收JustFloat
+        :param telemetry: 压缩遥测解码器（TelemetryDecoder），None表示不接收压缩遥测
+        """
+        self.inner = inner
+        self.decoder = decoder
+        self.telemetry = telemetry
+        self.header = inner.header
+        self.tail = inner.tail
+        self.crc = inner.crc
+        if hasattr(inner, "max_frame_length"):
+            self.max_frame_length = inner.max_frame_length
+
+        # 本次align()解码出的JustFloat采样块、压缩遥测采样块及其结束下标
+        self.blocks: List[Tuple[object, int]] = []
+        self.telemetry_blocks: List[Tuple[object, int]] = []
+
+        # buf[start]在数据流中的绝对位置，及推断通道数时已扫描到的绝对位置
+        self.base = 0
+        self.scanned = 0
+        self.own_dropped_bytes = 0
+
+    @property
+    def min_frame_length(self) -> int:
+        length = self.inner.min_frame_length
+        if self.decoder is not None and self.decoder.stride:
+            length = min(length, self.decoder.stride)
+        if self.telemetry is not None:
+            length = min(length, self.telemetry.min_packet_length)
+        return length
+
+    @property
+    def dropped_bytes(self) -> int:
+        return self.inner.dropped_bytes + self.own_dropped_bytes
+
+    def reset(self):
+        """读队列被清空（如重连）后调用，丢弃推断状态与差分参考"""
+        if self.decoder is not None:
+            self.decoder.reset()
+        if self.telemetry is not None:
+            self.telemetry.reset()
+        self.scanned = self.base
+
+    def align(self, buf, start: int = 0, end: Optional[int] = None,
+              max_frames: Optional[int] = None,
+              ends: Optional[List[int]] = None) -> Tuple[List[bytes], int]:
+        """
+        从缓冲区中提取所有完整的任务帧、JustFloat采样与压缩遥测包，采样块见blocks与telemetry_blocks
+        :param buf: bytes或bytearray缓冲区
+        :param start: 起始下标
+        :param end: 结束下标（不包含），默认为缓冲区末尾
+        :param max_frames: 最多提取的任务帧数，默认不限制
+        :param ends: 不为None时追加每个任务帧的结束下标
+        :return: (任务帧列表, 已处理到的下标)，调用者应丢弃该下标之前的数据
+        """
+        if end is None:
+            end = len(buf)
+        self.blocks = []
+        self.telemetry_blocks = []
+        decoder = self.decoder
+
+        if decoder is not None and not decoder.stride:
+            # 只扫描新到的数据，保留3字节以免漏掉跨越末尾的帧尾
+            scan_from = max(start, start + self.scanned - self.base)
+            self.scanned = self.base + max(0, end - start - 3)
+            locked = decoder.observe(buf, scan_from, end, self.base + scan_from - start)
+            if not locked and self.telemetry is None:
+                frames, pos = self.inner.align(buf, start, end, max_frames, ends)
+                self.base += pos - start
+                return frames, pos
+
+        frames, pos = self._align_mixed(buf, start, end, max_frames, ends)
+        self.base += pos - start
+        self.scanned = max(self.scanned, self.base)
+        return frames, pos
+
+    def _align_mixed(self, buf, start: int, end: int, max_frames: Optional[int],
+                     ends: Optional[List[int]]) -> Tuple[List[bytes], int]:
+        """交替提取JustFloat采样、压缩遥测包与任务帧，本次的所有JustFloat采样合为一块"""
+        decoder = self.decoder
+        telemetry = self.telemetry
+        inner = self.inner
+        header = self.header
+        telemetry_blocks = self.telemetry_blocks
+        stride = decoder.stride if decoder is not None else 0
+        magic = telemetry.MAGIC if telemetry is not None else None
+        keep = max(len(header), stride, 2 if magic is not None else 0) - 1
+
+        runs = []
+        run_end = -1
+        relock = False
+
+        frames = []
+        accepted = 0
+        pos = start
+        with memoryview(buf) as view:
+            while pos < end:
+                # 刚结束一段采样时当前位置已确定不是采样，不必再比较
+                if stride and pos != run_end:
+                    n = decoder.match(buf, pos, end)
+                    if n:
+                        if n > 1:
+                            decoder.misses = 0
+                        runs.append((pos, n))
+                        accepted += n * stride
+                        pos += n * stride
+                        run_end = pos
+                        continue
+
+                if magic is not None and buf.startswith(magic, pos):
+                    packet_end = telemetry.match(buf, pos, end)
+                    if packet_end < 0:
+                        # 包不完整，等待后续数据
+                        break
+                    if packet_end > 0:
+                        samples = telemetry.decode(buf, pos, packet_end)
+                        if samples is not None:
+                            telemetry_blocks.append((samples, packet_end))
+                        accepted += packet_end - pos
+                        pos = packet_end
+                        continue
+
+                if buf.startswith(header, pos):
+                    frame_end = inner.match_at(buf, view, pos, end)
+                    if frame_end < 0:
+                        # 帧不完整，等待后续数据
+                        break
+                    if frame_end > 0:
+                        frames.append(bytes(view[pos:frame_end]))
+                        accepted += frame_end - pos
+                        pos = frame_end
+                        if stride:
+                            decoder.misses = 0
+                        if ends is not None:
+                            ends.append(pos)
+                        if max_frames is not None and len(frames) >= max_frames:
+                            break
+                        continue
+
+                if end - pos < stride:
+                    # 可能是尚未收完的采样
+                    break
+
+                # 跳到下一个头帧、包头或下一个帧尾对应的采样起点
+                index = buf.find(header, pos + 1, end)
+                if magic is not None:
+                    packet = buf.find(magic, pos + 1, end)
+                    if packet >= 0 and (index < 0 or packet < index):
+                        index = packet
+                sample = -1
+                if stride:
+                    tail_index = buf.find(JUST_FLOAT_TAIL, pos + stride - 3, end)
+                    sample = tail_index - stride + 4 if tail_index >= 0 else -1
+                if sample >= 0 and (index < 0 or sample < index):
+                    pos = sample
+                    if decoder.miss():
+                        # 通道数已失效，剩余数据下次重新推断
+                        relock = True
+                        break
+                elif index >= 0:
+                    pos = index
+                else:
+                    pos = max(pos, end - keep)
+                    break
+
+        if runs:
+            run_start, count = runs[-1]
+            self.blocks.append((decoder.decode(buf, runs), run_start + count * stride))
+        if relock:
+            decoder.unlock()
+        self.own_dropped_bytes += pos - start - accepted
+        return frames, pos
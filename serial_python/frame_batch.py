@@ -0,0 +1,318 @@
+"""
+批量帧解码：把一批定长记录（帧）按任务ID分组，每个任务一个NumPy结构化数组
+
+结构化数组的dtype由任务的字段布局生成，字段偏移即帧内偏移、itemsize即记录长度，因此数组直接覆盖在帧数据上，
+records["X"]即为该任务所有帧的X字段，后续的筛选与统计可以向量化，不再逐帧调用回调、逐帧struct.unpack。
+未安装NumPy时，每个任务返回形状为(帧数, 记录长度)的memoryview（只有一个任务时直接覆盖在记录数据上），
+用unpack_columns()按字段取出。原始负载任务与未注册的任务没有字段布局，返回整帧（uint8二维数组或memoryview）。
+"""
+
+import re
+import struct
+import sys
+import threading
+import time
+from array import array
+from itertools import compress
+from operator import itemgetter
+from typing import Dict, Optional
+
+from mission_schema import MissionRegistry, RawMissionSchema
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖
+    np = None
+
+# struct格式字符对应的NumPy类型，均为小端序
+_NUMPY_FORMATS = {
+    'b': 'i1', 'B': 'u1', '?': '?', 'c': 'S1',
+    'h': '<i2', 'H': '<u2', 'i': '<i4', 'I': '<u4', 'l': '<i4', 'L': '<u4',
+    'q': '<i8', 'Q': '<u8', 'e': '<f2', 'f': '<f4', 'd': '<f8',
+}
+_FIELD_FORMAT = re.compile(r'(\d*)([a-zA-Z?])')
+# struct格式字符对应的memoryview格式（本机小端序时与struct的小端标准大小一致）
+_VIEW_FORMATS = {
+    'b': 'b', 'B': 'B', '?': '?', 'h': 'h', 'H': 'H', 'i': 'i', 'I': 'I', 'l': 'i', 'L': 'I',
+    'q': 'q', 'Q': 'Q', 'f': 'f', 'd': 'd',
+}
+
+
+def schema_dtype(schema, record_size: int, frame_offset: int = 0):
+    """
+    由任务字段布局生成结构化dtype，每个元素覆盖一条记录
+    :param schema: 任务布局
+    :param record_size: 每条记录的字节数
+    :param frame_offset: 帧在记录中的偏移
+    :return: numpy.dtype，字段超出记录时为None
+    """
+    names, formats, offsets = [], [], []
+    prefix = '<'
+    for field_name, fmt in schema.fields:
+        match = _FIELD_FORMAT.fullmatch(fmt)
+        if match is None or (match.group(2) not in _NUMPY_FORMATS and match.group(2) not in 'sx'):
+            raise ValueError(f"{schema.name}: field '{field_name}' format '{fmt}' has no NumPy type")
+        count, code = match.group(1), match.group(2)
+        offset = frame_offset + schema.payload_offset + struct.calcsize(prefix)
+        prefix += fmt
+        if code == 'x':
+            continue
+        if code == 's':
+            numpy_format = f'S{count or 1}'
+        elif count:
+            numpy_format = (_NUMPY_FORMATS[code], (int(count),))
+        else:
+            numpy_format = _NUMPY_FORMATS[code]
+        names.append(field_name)
+        formats.append(numpy_format)
+        offsets.append(offset)
+
+    if frame_offset + schema.payload_offset + schema.size > record_size:
+        return None
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets,
+                     "itemsize": record_size})
+
+
+class BatchDecoder:
+    def __init__(self, registry: MissionRegistry):
+        """
+        批量解码器，dtype按(任务ID, 记录长度, 帧偏移)缓存
+        :param registry: 任务注册表
+        """
+        self.registry = registry
+        self.dtypes: Dict[tuple, object] = {}
+
+    def _dtype(self, mission_id: int, record_size: int, frame_offset: int):
+        key = (mission_id, record_size, frame_offset)
+        if key not in self.dtypes:
+            schema = self.registry.schemas.get(mission_id)
+            if schema is None or isinstance(schema, RawMissionSchema):
+                self.dtypes[key] = None
+            else:
+                self.dtypes[key] = schema_dtype(schema, record_size, frame_offset)
+        return self.dtypes[key]
+
+    def decode(self, buf, n: int, record_size: int, frame_offset: int = 0, times=None,
+               time_offset: int = -1, copy: bool = False, rows: Optional[list] = None) -> dict:
+        """
+        按任务ID分组解码n条连续的定长记录
+        :param buf: 支持buffer协议的记录数据
+        :param n: 记录数
+        :param record_size: 每条记录的字节数
+        :param frame_offset: 帧在记录中的偏移
+        :param times: 各记录的时间戳序列，与time_offset二选一，均未给出时不返回时间戳
+        :param time_offset: 记录内<q时间戳的偏移，-1表示没有
+        :param copy: True时结果不引用buf（buf随后会被覆盖或释放）；False时只有一个任务的批次直接覆盖在buf上
+        :param rows: buf中各条记录的bytes列表，已有时未安装NumPy的多任务分组直接从中挑选，不再切分buf
+        :return: {任务ID: 记录}，需要时间戳时为{任务ID: (记录, 时间戳)}；
+                 记录为结构化数组，没有字段布局的任务为(帧数, 记录长度)的uint8数组，未安装NumPy时为memoryview
+        """
+        if n <= 0:
+            return {}
+        if np is None:
+            return self._decode_fallback(buf, n, record_size, frame_offset, times, time_offset, copy, rows)
+
+        raw = np.frombuffer(buf, np.uint8, count=n * record_size).reshape(n, record_size)
+        ids = raw[:, frame_offset + self.registry.id_offset]
+        stamps = None
+        if time_offset >= 0:
+            stamps = raw[:, time_offset:time_offset + 8].copy().view('<i8').reshape(n)
+        elif times is not None:
+            stamps = np.asarray(times, dtype=np.int64)
+
+        missions, counts = np.unique(ids, return_counts=True)
+        if len(missions) == 1:
+            groups = [(int(missions[0]), raw.copy() if copy else raw, stamps)]
+        else:
+            # 按任务ID稳定排序后一次取出，每个任务是其中连续的一段，同一任务内保持到达顺序
+            order = np.argsort(ids, kind='stable')
+            rows = raw[order]
+            rows_ns = stamps[order] if stamps is not None else None
+            bounds = np.concatenate(([0], np.cumsum(counts))).tolist()
+            groups = [(mission_id, rows[begin:end], rows_ns[begin:end] if rows_ns is not None else None)
+                      for mission_id, begin, end in zip(missions.tolist(), bounds, bounds[1:])]
+
+        result = {}
+        for mission_id, rows, rows_ns in groups:
+            dtype = self._dtype(mission_id, record_size, frame_offset)
+            records = rows if dtype is None else rows.view(dtype).reshape(len(rows))
+            result[mission_id] = records if rows_ns is None else (records, rows_ns)
+        return result
+
+    def _decode_fallback(self, buf, n: int, record_size: int, frame_offset: int, times,
+                         time_offset: int, copy: bool, rows: Optional[list]) -> dict:
+        """未安装NumPy时按任务ID分组，返回二维memoryview，逐帧的工作都在C中完成"""
+        view = memoryview(buf).cast('B')[:n * record_size]
+        id_index = frame_offset + self.registry.id_offset
+        ids = bytes(view[id_index::record_size])
+        with_time = times is not None or time_offset >= 0
+        if time_offset >= 0:
+            stamp = struct.Struct(f'<{time_offset}xq{record_size - time_offset - 8}x')
+            times = array('q', map(itemgetter(0), stamp.iter_unpack(view)))
+        elif with_time and not isinstance(times, array):
+            times = array('q', times)
+
+        if ids.count(ids[0]) == n:
+            # 只有一个任务：直接覆盖在记录数据上
+            records = memoryview(bytes(view)) if copy else view
+            records = records.cast('B', (n, record_size))
+            return {ids[0]: (records, times) if with_time else records}
+
+        if rows is None:
+            rows = list(map(itemgetter(0), struct.iter_unpack(f'{record_size}s', view)))
+        result = {}
+        for mission_id in sorted(set(ids)):
+            # translate把该任务的ID映射为1、其余为0，得到逐帧的选择掩码
+            table = bytearray(256)
+            table[mission_id] = 1
+            selected = ids.translate(table)
+            group = b''.join(compress(rows, selected))
+            records = memoryview(group).cast('B', (len(group) // record_size, record_size))
+            result[mission_id] = (records, array('q', compress(times, selected))) if with_time else records
+        return result
+
+
+def unpack_columns(records, schema, frame_offset: int = 0) -> dict:
+    """
+    未安装NumPy时按字段取出decode()返回的二维memoryview：字段的每个字节按记录长度步长切片后拼成连续的一列，
+    再按字段类型cast，全部在C中完成，不为每帧创建对象
+    :param records: (帧数, 记录长度)的memoryview
+    :param schema: 任务布局，registry.get(任务ID)
+    :param frame_offset: 帧在记录中的偏移
+    :return: {字段名: memoryview}，数组字段的形状为(帧数, 个数)；s、e等没有对应类型的字段为每帧一个值的列表
+    """
+    n, record_size = records.shape
+    flat = records.cast('B')
+    offset = frame_offset + schema.payload_offset
+    columns = {}
+    for field_name, fmt in schema.fields:
+        match = _FIELD_FORMAT.fullmatch(fmt)
+        count, code = match.group(1), match.group(2)
+        size = struct.calcsize('<' + fmt)
+        view_format = _VIEW_FORMATS.get(code) if sys.byteorder == 'little' else None
+        if code == 'x':
+            pass
+        elif view_format is not None:
+            column = bytearray(n * size)
+            for k in range(size):
+                column[k::size] = flat[offset + k::record_size]
+            shape = (n, int(count)) if count else (n,)
+            columns[field_name] = memoryview(column).cast(view_format, shape)
+        else:
+            field = struct.Struct(f'<{offset}x{fmt}{record_size - offset - size}x')
+            columns[field_name] = [values[0] if len(values) == 1 else values
+                                   for values in field.iter_unpack(flat)]
+        offset += size
+    return columns
+
+
+def _concat(a, b):
+    if np is not None:
+        return np.concatenate((a, b))
+    if isinstance(a, array):
+        return a + b
+    return memoryview(a.tobytes() + b.tobytes()).cast('B', (len(a) + len(b), a.shape[1]))
+
+
+def merge_batches(result: dict, batch: dict):
+    """
+    将decode()的结果合并到result中，同一任务的记录按顺序拼接
+    :param result: 累积的结果，原地修改
+    :param batch: 新的一批结果
+    """
+    for mission_id, records in batch.items():
+        if mission_id not in result:
+            result[mission_id] = records
+        elif isinstance(records, tuple):
+            result[mission_id] = tuple(_concat(a, b) for a, b in zip(result[mission_id], records))
+        else:
+            result[mission_id] = _concat(result[mission_id], records)
+
+
+class FrameBatch:
+    def __init__(self, registry: MissionRegistry, max_frames: int = 65536):
+        """
+        帧批量缓冲：读线程逐帧追加，使用者按批取出并解码
+        :param registry: 任务注册表
+        :param max_frames: 最多缓存的帧数，满时丢弃最旧的帧
+        """
+        self.decoder = BatchDecoder(registry)
+        self.max_frames = max(1, max_frames)
+        # 超出max_frames后再多缓存slack帧才整段丢弃，避免缓存满时每追加一帧都移动整个列表
+        self.slack = max(1, self.max_frames // 8)
+        # 帧与接收时间分开存放，list与array的append、切片和整段删除在GIL下都是原子的，追加不加锁；
+        # 先追加帧再追加时间，使用者以times的长度为准
+        self.frames = []
+        self.times = array('q')
+        self.lock = threading.Lock()  # 丢弃最旧的帧与取出互斥
+        self.cond = threading.Condition(self.lock)
+        self.waiting = False  # 有使用者在等待，追加后需要唤醒
+        self.dropped_frames = 0
+
+    def append(self, frame: bytes, t_ns: int = 0):
+        """
+        追加一帧，读线程调用
+        :param frame: 对齐好的一帧
+        :param t_ns: 帧的接收时间（monotonic_ns）
+        """
+        self.frames.append(frame)
+        self.times.append(t_ns)
+        if len(self.times) > self.max_frames + self.slack:
+            with self.lock:
+                self._trim()
+        if self.waiting:
+            with self.cond:
+                self.cond.notify()
+
+    def _trim(self):
+        """丢弃超出max_frames的最旧的帧，需持有lock"""
+        excess = len(self.times) - self.max_frames
+        if excess > 0:
+            del self.frames[:excess]
+            del self.times[:excess]
+            self.dropped_frames += excess
+
+    def __len__(self) -> int:
+        return min(len(self.times), self.max_frames)
+
+    def read(self, max_n: int = 0, timeout: Optional[float] = 0.1, with_time: bool = False) -> dict:
+        """
+        取出缓存的帧并按任务批量解码
+        :param max_n: 最多取出的帧数，0表示全部
+        :param timeout: 没有帧时的等待时间（秒），None表示一直等待
+        :param with_time: 是否同时返回各帧的接收时间
+        :return: 见BatchDecoder.decode，没有帧时为空字典
+        """
+        with self.cond:
+            if not self.times and timeout != 0:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                # 先置等待标志再检查，追加发生在检查之后时一定会唤醒
+                self.waiting = True
+                try:
+                    while not self.times:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            break
+                        self.cond.wait(remaining)
+                finally:
+                    self.waiting = False
+
+            self._trim()
+            n = len(self.times)
+            if max_n > 0:
+                n = min(n, max_n)
+            if n == 0:
+                return {}
+            # 读线程只在末尾追加，取走开头n帧不影响并发的追加
+            frames = self.frames[:n]
+            times = self.times[:n]
+            del self.frames[:n]
+            del self.times[:n]
+
+        record_size = max(map(len, frames))
+        buf = b''.join(frames)
+        if len(buf) != n * record_size:
+            # 变长帧补零到相同长度
+            frames = [frame.ljust(record_size, b'\0') for frame in frames]
+            buf = b''.join(frames)
+        return self.decoder.decode(buf, n, record_size, times=times if with_time else None, rows=frames)
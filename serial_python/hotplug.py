@@ -0,0 +1,162 @@
+import ctypes
+import os
+import select
+import struct
+import sys
+import time
+from typing import Optional
+
+# inotify事件掩码
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+INOTIFY_EVENT = struct.Struct('iIII')
+WATCH_MASK = IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+
+def _load_libc():
+    # 进程已链接libc，直接从主程序取符号，避免find_library调用ldconfig子进程
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+class DeviceWatcher:
+    def __init__(self, path: str, poll_interval: float = 0.5):
+        """
+        监视串口设备节点的删除与重新创建
+        Linux下用inotify监视设备所在目录，事件到达立即返回；其他平台或inotify不可用时
+        （如devpts等不产生事件的文件系统）退化为按poll_interval检查os.path.exists
+        :param path: 设备路径，如/dev/ttyUSB0或/dev/serial/by-id/...
+        :param poll_interval: 轮询检查的间隔（秒）
+        """
+        self.path = path
+        self.name = os.path.basename(path)
+        self.poll_interval = poll_interval
+        self.last_exists = os.path.exists(path)
+
+        # 用于从其他线程唤醒wait()
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        os.set_blocking(self.wakeup_r, False)
+        os.set_blocking(self.wakeup_w, False)
+
+        self.inotify_fd = -1
+        libc = _libc
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                directory = os.path.dirname(os.path.abspath(path)) or "/"
+                if libc.inotify_add_watch(fd, directory.encode(), WATCH_MASK) >= 0:
+                    self.inotify_fd = fd
+                else:
+                    os.close(fd)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        等待设备节点变化、被wake()唤醒或超时
+        :param timeout: 超时时间（秒），None表示一直等待
+        :return: True表示设备节点可能发生了变化或被唤醒，False表示超时且无变化
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        fds = [self.wakeup_r]
+        if self.inotify_fd >= 0:
+            fds.append(self.inotify_fd)
+
+        while True:
+            wait = self.poll_interval
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+
+            readable, _, _ = select.select(fds, [], [], wait)
+            changed = False
+            if self.wakeup_r in readable:
+                self._drain(self.wakeup_r)
+                changed = True
+            if self.inotify_fd in readable and self._read_events():
+                changed = True
+
+            exists = self.exists()
+            if exists != self.last_exists:
+                self.last_exists = exists
+                changed = True
+            if changed:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def fileno(self) -> int:
+        """inotify文件描述符，供外部事件循环监视，不可用时为-1"""
+        return self.inotify_fd
+
+    def poll(self) -> bool:
+        """
+        不阻塞地处理已到达的事件，供外部事件循环在fileno()可读或定时检查时调用
+        :return: True表示设备节点可能发生了变化
+        """
+        changed = self.inotify_fd >= 0 and self._read_events()
+        exists = self.exists()
+        if exists != self.last_exists:
+            self.last_exists = exists
+            changed = True
+        return changed
+
+    def _read_events(self) -> bool:
+        """读取inotify事件，返回是否有与设备相关的事件"""
+        try:
+            data = os.read(self.inotify_fd, 4096)
+        except BlockingIOError:
+            return False
+
+        pos = 0
+        matched = False
+        while pos + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, pos)
+            pos += INOTIFY_EVENT.size
+            name = data[pos:pos + length].rstrip(b'\0').decode(errors="replace")
+            pos += length
+            if name == self.name or mask & (IN_Q_OVERFLOW | IN_DELETE_SELF):
+                matched = True
+        return matched
+
+    @staticmethod
+    def _drain(fd: int):
+        try:
+            while os.read(fd, 64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def wake(self):
+        """从其他线程唤醒wait()，如读写线程检测到I/O错误时"""
+        try:
+            os.write(self.wakeup_w, b'\0')
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (self.inotify_fd, self.wakeup_r, self.wakeup_w):
+            if fd >= 0:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.inotify_fd = self.wakeup_r = self.wakeup_w = -1
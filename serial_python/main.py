@@ -12,7 +12,7 @@ class CustomUartThread(UartThread__):
         """重写任务1接收回调"""
         print(f"自定义处理: 接收到任务1数据 X = {X}")
     def _on_serial_disconnected(self):
-        print("串口断开连接，尝试重连...")
+        print("串口断开连接，等待自动重连...")
 
 def example_basic_usage():
 
@@ -0,0 +1,177 @@
+import threading
+from typing import Callable, Optional
+
+
+# 直方图每个2的幂区间再细分为2^SUB_BITS个桶，相对误差不超过1/8
+SUB_BITS = 3
+N_BUCKETS = (65 - SUB_BITS) << SUB_BITS
+
+
+def _bucket_index(value: int) -> int:
+    bit_length = value.bit_length()
+    if bit_length <= SUB_BITS + 1:
+        return value
+    shift = bit_length - SUB_BITS - 1
+    return (shift << SUB_BITS) + (value >> shift)
+
+
+def _bucket_upper(index: int) -> int:
+    if index < 2 << SUB_BITS:
+        return index
+    shift = (index >> SUB_BITS) - 1
+    mantissa = index - (shift << SUB_BITS)
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    def __init__(self):
+        """
+        对数分桶直方图（每个2的幂区间细分8个桶），记录一次只需几次整数运算，不加锁
+        """
+        self.buckets = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value: int):
+        """
+        记录一个非负整数值
+        :param value: 值（如纳秒）
+        """
+        if value < 0:
+            value = 0
+        self.buckets[_bucket_index(value)] += 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> int:
+        """
+        估算分位数（取所在桶的上界，且不超过最大值）
+        :param q: 分位（0-1）
+        :return: 估算值
+        """
+        if self.count == 0:
+            return 0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return min(_bucket_upper(i), self.max)
+        return self.max
+
+    def reset(self):
+        self.buckets = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def snapshot(self, scale: float = 1.0) -> dict:
+        """
+        导出统计快照
+        :param scale: 输出时的除数，如1000表示纳秒转微秒
+        :return: 数量、平均、最小、最大、p50、p90、p99
+        """
+        count = self.count
+        return {
+            "count": count,
+            "avg": self.total / count / scale if count else 0.0,
+            "min": self.min / scale,
+            "max": self.max / scale,
+            "p50": self.percentile(0.50) / scale,
+            "p90": self.percentile(0.90) / scale,
+            "p99": self.percentile(0.99) / scale,
+        }
+
+
+class UartMetrics:
+    def __init__(self):
+        """单个串口的计数器与直方图，各字段只由一个线程写入"""
+        # 读写字节数与帧数
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_out = 0
+        self.frames_in = [0] * 256
+        self.just_float_samples = 0
+        self.telemetry_samples = 0
+
+        # 错误计数
+        self.align_failures = 0
+        self.read_errors = 0
+        self.write_errors = 0
+        
+        # 断线与重连次数
+        self.disconnects = 0
+        self.reconnects = 0
+
+        # 实际发送间隔、写队列深度、数据可读到回调完成的延迟
+        self.send_interval_ns = Histogram()
+        self.write_queue_depth = Histogram()
+        self.read_to_callback_ns = Histogram()
+        
+        # 从检测到断线到重连成功的耗时
+        self.reconnect_ns = Histogram()
+
+    def snapshot(self) -> dict:
+        """
+        导出统计快照
+        :return: 计数器与直方图（时间单位为微秒）
+        """
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "frames_out": self.frames_out,
+            "frames_in": {mission_id: n for mission_id, n in enumerate(self.frames_in) if n},
+            "just_float_samples_in": self.just_float_samples,
+            "telemetry_samples_in": self.telemetry_samples,
+            "align_failures": self.align_failures,
+            "read_errors": self.read_errors,
+            "write_errors": self.write_errors,
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "send_interval_us": self.send_interval_ns.snapshot(1000.0),
+            "write_queue_depth": self.write_queue_depth.snapshot(),
+            "read_to_callback_us": self.read_to_callback_ns.snapshot(1000.0),
+            "reconnect_ms": self.reconnect_ns.snapshot(1e6),
+        }
+
+
+class MetricsExporter:
+    def __init__(self, get_stats: Callable[[], dict], callback: Callable[[dict], None],
+                 interval: float = 1.0):
+        """
+        周期性导出统计快照
+        :param get_stats: 获取快照的函数
+        :param callback: 接收快照的回调
+        :param interval: 导出周期（秒）
+        """
+        self.get_stats = get_stats
+        self.callback = callback
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动导出线程"""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._thread_export, daemon=True)
+        self.thread.start()
+
+    def _thread_export(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.callback(self.get_stats())
+            except Exception as e:
+                print(f"Metrics exporter error: {str(e)}")
+
+    def stop(self):
+        """停止导出线程"""
+        self.stop_event.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
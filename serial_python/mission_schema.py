@@ -0,0 +1,303 @@
+import struct
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+
+class MissionSchema:
+    def __init__(self, mission_id: int, fields: Sequence[Tuple[str, str]], name: str = "",
+                 payload_offset: int = 3):
+        """
+        任务帧字段布局，编码和解码共用同一个预编译的struct.Struct
+        :param mission_id: 任务ID（0-255），位于帧的id_offset处
+        :param fields: 字段列表 [(字段名, struct格式字符), ...]，小端序
+        :param name: 任务名，可用于按名字发送
+        :param payload_offset: 第一个字段在帧中的偏移
+        """
+        if not 0 <= mission_id <= 0xFF:
+            raise ValueError(f"mission_id must be in 0-255, got {mission_id}")
+
+        self.mission_id = mission_id
+        self.name = name or f"mission{mission_id}"
+        self.fields = list(fields)
+        self.field_names = tuple(field_name for field_name, _ in self.fields)
+        self.format = '<' + ''.join(fmt for _, fmt in self.fields)
+        self.struct = struct.Struct(self.format)
+        self.payload_offset = payload_offset
+        self.size = self.struct.size
+
+    def payload_size(self, *args, **kwargs) -> int:
+        """
+        编码后的负载长度
+        :return: 字节数
+        """
+        return self.size
+
+    def encode_into(self, buf, *args, **kwargs):
+        """
+        将字段值编码进buf
+        :param buf: 帧缓冲区
+        :param args: 按字段顺序的值
+        :param kwargs: 按字段名的值
+        """
+        if kwargs:
+            args = self._merge_args(args, kwargs)
+        self.struct.pack_into(buf, self.payload_offset, *args)
+
+    def decode(self, frame) -> tuple:
+        """
+        从帧中解码字段，不切片不拷贝
+        :param frame: 一帧数据
+        :return: 按字段顺序的值
+        """
+        return self.struct.unpack_from(frame, self.payload_offset)
+
+    def decode_dict(self, frame) -> dict:
+        """
+        从帧中解码字段
+        :param frame: 一帧数据
+        :return: {字段名: 值}
+        """
+        return dict(zip(self.field_names, self.decode(frame)))
+
+    def _merge_args(self, args: tuple, kwargs: dict) -> tuple:
+        values = list(args)
+        for field_name in self.field_names[len(args):]:
+            if field_name not in kwargs:
+                raise TypeError(f"{self.name} missing field '{field_name}'")
+            values.append(kwargs.pop(field_name))
+        if kwargs:
+            raise TypeError(f"{self.name} got unexpected fields {list(kwargs)}")
+        return tuple(values)
+
+
+class RawMissionSchema(MissionSchema):
+    def __init__(self, mission_id: int, name: str = "", payload_offset: int = 3):
+        """
+        负载为原始字节的任务，用于标定表、参数导出等大块数据，长度由帧决定
+        :param mission_id: 任务ID（0-255）
+        :param name: 任务名
+        :param payload_offset: 负载在帧中的偏移
+        """
+        super().__init__(mission_id, [], name, payload_offset)
+        self.field_names = ("data",)
+
+    def payload_size(self, data=b'', **kwargs) -> int:
+        return len(data)
+
+    def encode_into(self, buf, data=b'', **kwargs):
+        """
+        将原始字节写入buf
+        :param buf: 帧缓冲区
+        :param data: 支持buffer协议的负载
+        """
+        buf[self.payload_offset:self.payload_offset + len(data)] = data
+
+    def decode(self, frame, trailer_length: int = 1) -> tuple:
+        """
+        取出负载
+        :param frame: 一帧数据
+        :param trailer_length: 帧尾占用的字节数
+        :return: (负载bytes,)
+        """
+        return (bytes(frame[self.payload_offset:len(frame) - trailer_length]),)
+
+
+class MissionRegistry:
+    def __init__(self, id_offset: int = 2, payload_offset: int = 3, trailer_length: int = 1):
+        """
+        任务注册表，按任务ID查表分发（O(1)），新增任务类型不增加热路径开销
+        :param id_offset: 任务ID在帧中的偏移
+        :param payload_offset: 字段起始偏移
+        :param trailer_length: 帧尾占用的字节数，字段不得覆盖帧尾
+        """
+        self.id_offset = id_offset
+        self.payload_offset = payload_offset
+        self.trailer_length = trailer_length
+
+        self.schemas: Dict[int, MissionSchema] = {}
+        self.names: Dict[str, MissionSchema] = {}
+
+        # 分发表，下标为任务ID，元素为(unpack_from, payload_offset, 最短帧长, 回调, 回调是否需要时间, 下位机时间字段下标)
+        self.dispatch_table: List[Optional[tuple]] = [None] * 256
+        self.handlers: List[Optional[Callable]] = [None] * 256
+        self.timed: List[bool] = [False] * 256
+
+        # 下位机时间换算为主机monotonic_ns，含time_field字段的任务以换算后的时间作为采样时间
+        self.time_field = "mcu_time"
+        self.to_host_ns: Optional[Callable[[int], Optional[int]]] = None
+
+    def register(self, mission_id: int, fields: Sequence[Tuple[str, str]], name: str = "",
+                 handler: Optional[Callable] = None, with_time: bool = False) -> MissionSchema:
+        """
+        注册任务
+        :param mission_id: 任务ID
+        :param fields: 字段列表 [(字段名, struct格式字符), ...]
+        :param name: 任务名
+        :param handler: 收到该任务时的回调，参数为按字段顺序解码的值
+        :param with_time: 为True时回调额外以关键字参数t_ns收到采样时间，见dispatch()
+        :return: 任务布局
+        """
+        return self._add(MissionSchema(mission_id, fields, name, self.payload_offset),
+                         handler, with_time)
+
+    def register_raw(self, mission_id: int, name: str = "",
+                     handler: Optional[Callable] = None, with_time: bool = False) -> RawMissionSchema:
+        """
+        注册负载为原始字节的任务，发送时传入bytes，回调参数为负载bytes
+        :param mission_id: 任务ID
+        :param name: 任务名
+        :param handler: 收到该任务时的回调
+        :param with_time: 为True时回调额外以关键字参数t_ns收到接收时间
+        :return: 任务布局
+        """
+        return self._add(RawMissionSchema(mission_id, name, self.payload_offset), handler, with_time)
+
+    def _add(self, schema: MissionSchema, handler: Optional[Callable], with_time: bool):
+        """加入任务布局，重新注册且未给出回调时保留原回调"""
+        mission_id = schema.mission_id
+        old = self.schemas.get(mission_id)
+        if old is not None:
+            self.names.pop(old.name, None)
+            if handler is None:
+                handler = self.handlers[mission_id]
+                with_time = self.timed[mission_id]
+
+        self.schemas[mission_id] = schema
+        self.names[schema.name] = schema
+        self.handlers[mission_id] = handler
+        self.timed[mission_id] = with_time
+        self._update_dispatch(mission_id)
+        return schema
+
+    def set_handler(self, mission, handler: Optional[Callable], with_time: bool = False):
+        """
+        设置任务回调
+        :param mission: 任务ID或任务名
+        :param handler: 回调，参数为按字段顺序解码的值
+        :param with_time: 为True时回调额外以关键字参数t_ns收到采样时间，见dispatch()
+        """
+        schema = self.get(mission)
+        self.handlers[schema.mission_id] = handler
+        self.timed[schema.mission_id] = with_time
+        self._update_dispatch(schema.mission_id)
+
+    def set_clock(self, to_host_ns: Optional[Callable[[int], Optional[int]]],
+                  time_field: str = "mcu_time"):
+        """
+        设置下位机时间换算，含time_field字段的任务以该字段换算后的主机时间作为采样时间
+        :param to_host_ns: to_host_ns(下位机时间字段的值) -> 主机monotonic_ns，尚未同步时返回None，
+                           None表示不换算，见ClockSync.to_host_ns
+        :param time_field: 下位机时间字段名
+        """
+        self.to_host_ns = to_host_ns
+        self.time_field = time_field
+        for mission_id in self.schemas:
+            self._update_dispatch(mission_id)
+
+    def set_trailer_length(self, trailer_length: int):
+        """
+        修改帧尾占用的字节数（如帧尾前增加CRC），并更新分发表中的最短帧长
+        :param trailer_length: 帧尾占用的字节数
+        """
+        self.trailer_length = trailer_length
+        for mission_id in self.schemas:
+            self._update_dispatch(mission_id)
+
+    def _update_dispatch(self, mission_id: int):
+        schema = self.schemas[mission_id]
+        handler = self.handlers[mission_id]
+        with_time = self.timed[mission_id]
+        min_length = self.payload_offset + schema.size + self.trailer_length
+        if isinstance(schema, RawMissionSchema):
+            # 原始负载的长度由帧长决定，取负载时需去掉帧尾
+            trailer_length = self.trailer_length
+            self.dispatch_table[mission_id] = (lambda frame, _: schema.decode(frame, trailer_length),
+                                               schema.payload_offset, min_length, handler,
+                                               with_time, -1)
+        else:
+            time_index = (schema.field_names.index(self.time_field)
+                          if self.to_host_ns is not None and self.time_field in schema.field_names
+                          else -1)
+            self.dispatch_table[mission_id] = (schema.struct.unpack_from, schema.payload_offset,
+                                               min_length, handler, with_time, time_index)
+
+    def get(self, mission: Union[int, str]) -> MissionSchema:
+        """
+        查找任务
+        :param mission: 任务ID或任务名
+        :return: 任务布局，不存在时抛出KeyError
+        """
+        if isinstance(mission, str):
+            return self.names[mission]
+        return self.schemas[mission]
+
+    def __contains__(self, mission) -> bool:
+        return mission in self.names if isinstance(mission, str) else mission in self.schemas
+
+    def encode_into(self, buf, mission, *args, **kwargs) -> MissionSchema:
+        """
+        按任务布局为帧缓冲区赋值（包括任务ID）
+        :param buf: 帧缓冲区（已带头尾帧）
+        :param mission: 任务ID或任务名
+        :return: 任务布局
+        """
+        schema = self.get(mission)
+        size = schema.payload_size(*args, **kwargs)
+        if schema.payload_offset + size > len(buf) - self.trailer_length:
+            raise ValueError(f"{schema.name} needs {schema.payload_offset + size + self.trailer_length}"
+                             f" bytes per frame, frame length is {len(buf)}")
+        buf[self.id_offset] = schema.mission_id
+        schema.encode_into(buf, *args, **kwargs)
+        return schema
+
+    def decode(self, frame) -> Optional[tuple]:
+        """
+        解码一帧
+        :param frame: 一帧数据
+        :return: (任务布局, 字段值)，未注册或帧长不足时返回None
+        """
+        entry = self.dispatch_table[frame[self.id_offset]]
+        if entry is None or len(frame) < entry[2]:
+            return None
+        schema = self.schemas[frame[self.id_offset]]
+        return schema, entry[0](frame, entry[1])
+
+    def dispatch(self, frame, t_ns: int = 0) -> bool:
+        """
+        查表解码一帧并调用对应回调
+        以with_time注册的回调额外收到关键字参数t_ns：任务含下位机时间字段且已设置set_clock()时为
+        该字段换算后的主机monotonic_ns，否则为帧的接收时间
+        :param frame: 一帧数据
+        :param t_ns: 帧的接收时间（monotonic_ns）
+        :return: True已分发，False未注册或帧长不足
+        """
+        entry = self.dispatch_table[frame[self.id_offset]]
+        if entry is None:
+            return False
+
+        unpack_from, payload_offset, min_length, handler, with_time, time_index = entry
+        if len(frame) < min_length:
+            return False
+        if handler is not None:
+            values = unpack_from(frame, payload_offset)
+            if with_time:
+                to_host_ns = self.to_host_ns
+                if time_index >= 0 and to_host_ns is not None:
+                    sample_ns = to_host_ns(values[time_index])
+                    if sample_ns is not None:
+                        t_ns = sample_ns
+                handler(*values, t_ns=t_ns)
+            else:
+                handler(*values)
+        return True
+
+    @staticmethod
+    def default(payload_offset: int = 3) -> "MissionRegistry":
+        """
+        创建包含内置任务1、任务2的注册表
+        :param payload_offset: 字段起始偏移，变长帧为5
+        :return: 注册表
+        """
+        registry = MissionRegistry(payload_offset=payload_offset)
+        registry.register(0x01, [("X", "I")], "mission1")
+        registry.register(0x02, [("X", "H"), ("Y", "f")], "mission2")
+        return registry
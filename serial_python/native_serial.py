@@ -0,0 +1,236 @@
+"""
+直接基于termios与文件描述符的串口后端（Linux/POSIX）
+
+pyserial的每次read()都新建bytes，并在Python层循环select与超时计算，每次write()先复制数据、写后还要select；
+NativeSerial用os.open打开设备，以termios配置原始模式、波特率与VMIN/VTIME，文件描述符为非阻塞，
+读写直接在调用者的缓冲区上os.readv/os.write，不分配临时对象，写入在内核发送缓冲有空间时只有一次系统调用。
+接口与Uart用到的pyserial子集相同（is_open、fileno、in_waiting、read、readinto、write、close），
+可直接替换serial_port。
+
+低延迟：USB转串口芯片默认攒满缓冲或等待latency_timer（FTDI为16ms）才上报数据，打开时尝试
+设置驱动的ASYNC_LOW_LATENCY标志，并将FTDI的latency_timer改为1ms（需要写sysfs的权限），失败时忽略。
+"""
+
+import array
+import fcntl
+import os
+import select
+import struct
+import termios
+import time
+from typing import Optional
+
+import serial
+
+# Linux的termios2，用于设置非标准波特率
+_TCGETS2 = 0x802C542A
+_TCSETS2 = 0x402C542B
+_BOTHER = 0o010000
+_CBAUD = 0o010017
+_TERMIOS2 = struct.Struct('4I B 19B 2I')
+
+# serial_struct.flags中的低延迟标志
+_ASYNC_LOW_LATENCY = 0x2000
+
+
+class NativeSerial:
+    def __init__(self, port: str, baudrate: int = 115200, timeout: Optional[float] = 1.0,
+                 write_timeout: Optional[float] = None, vmin: int = 1, vtime: int = 0,
+                 low_latency: bool = True):
+        """
+        打开并配置串口为8N1原始模式
+        :param port: 串口设备名
+        :param baudrate: 波特率
+        :param timeout: read/readinto等待凑满的超时时间（秒），0表示不等待，None表示一直等待
+        :param write_timeout: write等待内核发送缓冲的超时时间（秒），None表示一直等待
+        :param vmin: termios的VMIN，非阻塞读取不受其影响，文件描述符交给阻塞读取的代码时生效
+        :param vtime: termios的VTIME（0.1秒）
+        :param low_latency: 是否尝试开启驱动的低延迟模式
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.fd = os.open(port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        self.is_open = True
+        try:
+            self._configure(vmin, vtime)
+        except Exception:
+            self.close()
+            raise
+
+        # 低延迟设置的结果，None表示设备不支持
+        self.low_latency: Optional[bool] = None
+        self.latency_timer_ms: Optional[int] = None
+        if low_latency:
+            self.low_latency = self._set_low_latency()
+            self.latency_timer_ms = self._set_latency_timer(1)
+
+    def _configure(self, vmin: int, vtime: int):
+        """配置原始模式、8N1、无流控、波特率与VMIN/VTIME"""
+        iflag, oflag, cflag, lflag, ispeed, ospeed, cc = termios.tcgetattr(self.fd)
+        iflag &= ~(termios.IGNBRK | termios.BRKINT | termios.PARMRK | termios.ISTRIP |
+                   termios.INLCR | termios.IGNCR | termios.ICRNL | termios.IXON |
+                   termios.IXOFF | termios.IXANY | termios.INPCK)
+        oflag &= ~termios.OPOST
+        lflag &= ~(termios.ECHO | termios.ECHONL | termios.ICANON | termios.ISIG |
+                   termios.IEXTEN)
+        cflag &= ~(termios.CSIZE | termios.PARENB | termios.CSTOPB |
+                   getattr(termios, "CRTSCTS", 0))
+        cflag |= termios.CS8 | termios.CREAD | termios.CLOCAL
+        cc[termios.VMIN] = vmin
+        cc[termios.VTIME] = vtime
+
+        speed = getattr(termios, f"B{self.baudrate}", None)
+        if speed is not None:
+            ispeed = ospeed = speed
+        else:
+            ispeed = ospeed = getattr(termios, "B38400")
+        termios.tcsetattr(self.fd, termios.TCSANOW,
+                          [iflag, oflag, cflag, lflag, ispeed, ospeed, cc])
+        if speed is None:
+            self._set_custom_baudrate()
+
+    def _set_custom_baudrate(self):
+        """通过termios2设置任意波特率（Linux）"""
+        buf = bytearray(_TERMIOS2.size)
+        try:
+            fcntl.ioctl(self.fd, _TCGETS2, buf)
+            fields = list(_TERMIOS2.unpack(buf))
+            fields[2] = (fields[2] & ~_CBAUD) | _BOTHER
+            fields[-2] = fields[-1] = self.baudrate
+            fcntl.ioctl(self.fd, _TCSETS2, _TERMIOS2.pack(*fields))
+        except OSError as e:
+            raise ValueError(f"Unsupported baudrate {self.baudrate}: {e}") from None
+
+    def _set_low_latency(self) -> Optional[bool]:
+        """设置驱动的ASYNC_LOW_LATENCY标志，伪终端等不支持的设备返回None"""
+        request = getattr(termios, "TIOCGSERIAL", None)
+        if request is None:
+            return None
+        buf = array.array('i', [0] * 32)
+        try:
+            fcntl.ioctl(self.fd, request, buf)
+            buf[4] |= _ASYNC_LOW_LATENCY
+            fcntl.ioctl(self.fd, termios.TIOCSSERIAL, buf)
+            return True
+        except OSError:
+            return None
+
+    def _set_latency_timer(self, ms: int) -> Optional[int]:
+        """
+        设置FTDI芯片的latency_timer
+        :return: 设置后的值（毫秒），无此属性时为None，无权限时为原值
+        """
+        name = os.path.basename(os.path.realpath(self.port))
+        path = f"/sys/bus/usb-serial/devices/{name}/latency_timer"
+        try:
+            with open(path) as f:
+                current = int(f.read())
+        except (OSError, ValueError):
+            return None
+        if current <= ms:
+            return current
+        try:
+            with open(path, "w") as f:
+                f.write(str(ms))
+            return ms
+        except OSError:
+            return current
+
+    def fileno(self) -> int:
+        return self.fd
+
+    @property
+    def in_waiting(self) -> int:
+        """内核接收缓冲中待读的字节数"""
+        buf = fcntl.ioctl(self.fd, termios.FIONREAD, b'\0\0\0\0')
+        return struct.unpack('I', buf)[0]
+
+    def readinto(self, buf) -> int:
+        """
+        读入buf，凑满或超时后返回；先等待可读再读取，每批数据为一次select与一次readv
+        :param buf: 支持可写buffer协议的缓冲区
+        :return: 读取的字节数
+        """
+        view = memoryview(buf).cast('B')
+        size = len(view)
+        total = 0
+        deadline = None if not self.timeout else time.monotonic() + self.timeout
+        while total < size:
+            if self.timeout != 0:
+                wait = None
+                if deadline is not None:
+                    wait = deadline - time.monotonic()
+                    if wait <= 0:
+                        break
+                readable, _, _ = select.select([self.fd], [], [], wait)
+                if not readable:
+                    break
+            try:
+                n = os.readv(self.fd, [view[total:]])
+            except BlockingIOError:
+                if self.timeout == 0:
+                    break
+                continue
+            if n == 0:
+                # 可读但读不到数据，说明设备已断开
+                raise serial.SerialException("device reports readiness to read but returned no data")
+            total += n
+        return total
+
+    def read(self, size: int = 1) -> bytes:
+        """
+        读取size字节，超时返回已读到的数据
+        :param size: 字节数
+        :return: 读到的数据
+        """
+        buf = bytearray(size)
+        n = self.readinto(buf)
+        return bytes(memoryview(buf)[:n])
+
+    def write(self, data) -> int:
+        """
+        写入全部数据，内核发送缓冲有空间时只有一次系统调用
+        :param data: 支持buffer协议的数据
+        :return: 写入的字节数
+        """
+        view = memoryview(data).cast('B')
+        size = len(view)
+        total = 0
+        deadline = None
+        while total < size:
+            try:
+                total += os.write(self.fd, view[total:])
+                continue
+            except BlockingIOError:
+                pass
+
+            if self.write_timeout is None:
+                wait = None
+            else:
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self.write_timeout
+                wait = deadline - now
+                if wait <= 0:
+                    raise serial.SerialTimeoutException("Write timeout")
+            _, writable, _ = select.select([], [self.fd], [], wait)
+            if not writable and wait is not None:
+                raise serial.SerialTimeoutException("Write timeout")
+        return total
+
+    def reset_input_buffer(self):
+        """丢弃内核接收缓冲中的数据"""
+        termios.tcflush(self.fd, termios.TCIFLUSH)
+
+    def close(self):
+        """关闭串口"""
+        if not self.is_open:
+            return
+        self.is_open = False
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+        self.fd = -1
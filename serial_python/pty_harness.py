@@ -0,0 +1,247 @@
+"""
+无需硬件的伪终端回环测试工具
+
+PtyLoopback创建一对伪终端，slave端交给Uart/UartThread__打开，master端由FakeMcu驱动。
+FakeMcu在子进程中运行，按波特率节奏发送?!…!帧（可注入干扰），同时接收主机发来的帧和
+Vofa JustFloat数据，可将指定任务的帧延迟后原样回传作为应答，可模拟带偏移与频率误差的下位机时钟并应答ping，
+结束后回传统计结果。时间戳统一使用time.monotonic_ns，跨进程可比。
+"""
+
+import multiprocessing
+import os
+import pty
+import random
+import select
+import struct
+import time
+import tty
+from array import array
+from collections import deque
+from typing import Optional
+
+from frame_aligner import FrameAligner
+from vofa import JUST_FLOAT_TAIL
+
+
+class PtyLoopback:
+    def __init__(self):
+        """创建一对原始模式的伪终端"""
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.master_fd)
+        tty.setraw(self.slave_fd)
+        self.slave_name = os.ttyname(self.slave_fd)
+
+    def close(self):
+        """关闭伪终端"""
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.master_fd = self.slave_fd = -1
+
+
+def _corrupt(rng: random.Random, frame: bytearray) -> bytes:
+    """对一帧注入干扰：前插垃圾数据、翻转一个比特或截断"""
+    kind = rng.randrange(3)
+    if kind == 0:
+        return bytes(rng.getrandbits(8) for _ in range(rng.randint(1, len(frame)))) + bytes(frame)
+    if kind == 1:
+        frame[rng.randrange(len(frame))] ^= 1 << rng.randrange(8)
+        return bytes(frame)
+    return bytes(frame[:rng.randint(1, len(frame) - 1)])
+
+
+def _run_fake_mcu(master_fd: int, conn, frame_length: int, baudrate: int, n_frames: int,
+                  corruption: float, mission_id: int, seed: int, frame_hz: float,
+                  echo_mission_id: int, echo_delay: float, echo_loss: float, ping_mission_id: int,
+                  pong_mission_id: int, clock_offset_us: int, clock_ppm: float):
+    """FakeMcu子进程主循环"""
+    rng = random.Random(seed)
+    aligner = FrameAligner(frame_length)
+    rx_pending = bytearray()
+    os.set_blocking(master_fd, False)
+
+    send_ns = array('q')
+    corrupted = array('l')
+    rx_seq = array('l')
+    rx_ns = array('q')
+    rx_bytes = 0
+    rx_vofa_samples = 0
+    tail_carry = b''
+    echo_pending = deque()
+    echo_frames = 0
+    echo_lost = 0
+    pong_frames = 0
+    mcu_clock = pong_mission_id >= 0
+    clock_rate = (1.0 + clock_ppm * 1e-6) / 1000.0
+
+    def mcu_time_us(t_ns: int) -> int:
+        # 下位机的32位微秒计数，会回绕
+        return int(t_ns * clock_rate + clock_offset_us) & 0xFFFFFFFF
+
+    bytes_per_s = baudrate / 10.0
+    tx_backlog = b''
+    tx_bytes = 0
+    seq = 0
+    t0 = time.monotonic_ns()
+
+    while True:
+        now = time.monotonic_ns()
+
+        # 按波特率节奏发送，设置frame_hz时同时限制帧率
+        allowed = int((now - t0) * bytes_per_s / 1e9) - tx_bytes
+        due = int((now - t0) * frame_hz / 1e9) + 1 if frame_hz > 0 else n_frames
+        while seq < min(n_frames, due) and len(tx_backlog) < allowed:
+            frame = bytearray(frame_length)
+            frame[0:2] = b'?!'
+            frame[2] = mission_id
+            struct.pack_into('<I', frame, 3, seq)
+            if mcu_clock:
+                struct.pack_into('<I', frame, 7, mcu_time_us(now))
+            frame[frame_length - 1] = ord('!')
+            if corruption > 0 and rng.random() < corruption:
+                corrupted.append(seq)
+                tx_backlog += _corrupt(rng, frame)
+            else:
+                tx_backlog += frame
+            send_ns.append(now)
+            seq += 1
+        # 到期的应答
+        while echo_pending and echo_pending[0][0] <= now:
+            tx_backlog += echo_pending.popleft()[1]
+        if tx_backlog and allowed > 0:
+            try:
+                written = os.write(master_fd, tx_backlog[:max(allowed, 1)])
+            except BlockingIOError:
+                written = 0
+            tx_backlog = tx_backlog[written:]
+            tx_bytes += written
+
+        if tx_backlog or (seq < n_frames and frame_hz <= 0):
+            timeout = max(0.0, frame_length / bytes_per_s)
+        elif seq < n_frames:
+            timeout = max(0.0, (t0 + seq * 1e9 / frame_hz - time.monotonic_ns()) / 1e9)
+        else:
+            timeout = 0.01
+        if echo_pending:
+            timeout = min(timeout, max(0.0, (echo_pending[0][0] - time.monotonic_ns()) / 1e9))
+        readable, _, _ = select.select([master_fd, conn], [], [], timeout)
+
+        if master_fd in readable:
+            try:
+                data = os.read(master_fd, 65536)
+            except (BlockingIOError, OSError):
+                data = b''
+            if data:
+                recv_ns = time.monotonic_ns()
+                rx_bytes += len(data)
+                # JustFloat按帧尾计数，考虑帧尾跨越两次读取
+                joined = tail_carry + data
+                rx_vofa_samples += joined.count(JUST_FLOAT_TAIL)
+                tail_carry = joined[-(len(JUST_FLOAT_TAIL) - 1):]
+                rx_pending += data
+                frames, pos = aligner.align(rx_pending)
+                del rx_pending[:pos]
+                for frame in frames:
+                    rx_seq.append(struct.unpack_from('<I', frame, 3)[0])
+                    rx_ns.append(recv_ns)
+                    if frame[2] == ping_mission_id and mcu_clock:
+                        pong = bytearray(frame_length)
+                        pong[0:2] = b'?!'
+                        pong[2] = pong_mission_id
+                        pong[3:5] = frame[3:5]
+                        struct.pack_into('<I', pong, 5, mcu_time_us(recv_ns))
+                        pong[frame_length - 1] = ord('!')
+                        tx_backlog += pong
+                        pong_frames += 1
+                    elif frame[2] == echo_mission_id:
+                        if echo_loss > 0 and rng.random() < echo_loss:
+                            echo_lost += 1
+                        else:
+                            echo_pending.append((recv_ns + int(echo_delay * 1e9), bytes(frame)))
+                            echo_frames += 1
+
+        if conn in readable and conn.recv() == "stop":
+            break
+
+    conn.send({
+        "tx_frames": seq,
+        "tx_bytes": tx_bytes,
+        "send_ns": send_ns.tobytes(),
+        "corrupted": corrupted.tobytes(),
+        "rx_bytes": rx_bytes,
+        "rx_seq": rx_seq.tobytes(),
+        "rx_ns": rx_ns.tobytes(),
+        "rx_vofa_samples": rx_vofa_samples,
+        "rx_dropped_bytes": aligner.dropped_bytes,
+        "echo_frames": echo_frames,
+        "echo_lost": echo_lost,
+        "pong_frames": pong_frames,
+    })
+    conn.close()
+
+
+class FakeMcu:
+    def __init__(self, master_fd: int, frame_length: int = 8, baudrate: int = 115200,
+                 n_frames: int = 0, corruption: float = 0.0, mission_id: int = 0x01,
+                 seed: int = 0, frame_hz: float = 0.0, echo_mission_id: int = -1,
+                 echo_delay: float = 0.0, echo_loss: float = 0.0, ping_mission_id: int = -1,
+                 pong_mission_id: int = -1, clock_offset_us: int = 0, clock_ppm: float = 0.0):
+        """
+        伪终端master端的模拟下位机
+        :param master_fd: 伪终端master端文件描述符
+        :param frame_length: 每帧数据长度，帧内任务字段为<I序号
+        :param baudrate: 模拟的波特率，用于控制发送节奏
+        :param n_frames: 要发送给主机的帧数，0表示只接收
+        :param corruption: 每帧被干扰的概率
+        :param mission_id: 发送帧的任务ID
+        :param seed: 随机种子
+        :param frame_hz: 发送帧率，0表示按波特率连续发送
+        :param echo_mission_id: 收到该任务的帧后原样回传（如带序号的请求），-1表示不回传
+        :param echo_delay: 回传延迟（秒），模拟USB串口延迟与下位机处理时间，各帧的延迟互相重叠
+        :param echo_loss: 请求帧被丢弃、不回传的概率
+        :param ping_mission_id: 收到该任务的帧（偏移3为<H序号）后立即回复pong，-1表示不回复
+        :param pong_mission_id: pong任务ID，帧内为<H序号与收到ping时的<I下位机时间（微秒），
+                                不为-1时发送的每帧在偏移7写入<I下位机时间，帧长至少为12
+        :param clock_offset_us: 下位机时钟相对主机monotonic时钟的偏移（微秒）
+        :param clock_ppm: 下位机时钟相对主机的快慢（ppm）
+        """
+        self.master_fd = master_fd
+        self.args = (frame_length, baudrate, n_frames, corruption, mission_id, seed, frame_hz,
+                     echo_mission_id, echo_delay, echo_loss, ping_mission_id, pong_mission_id,
+                     clock_offset_us, clock_ppm)
+        self.n_frames = n_frames
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn = None
+
+    def start(self):
+        """在子进程中启动模拟下位机"""
+        ctx = multiprocessing.get_context("fork")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_run_fake_mcu,
+                                   args=(self.master_fd, child_conn) + self.args, daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, timeout: float = 5.0) -> dict:
+        """
+        停止模拟下位机
+        :param timeout: 等待结果的超时时间
+        :return: 统计结果，时间戳数组已解码为array
+        """
+        self.conn.send("stop")
+        if not self.conn.poll(timeout):
+            self.process.terminate()
+            raise TimeoutError("FakeMcu did not report")
+        report = self.conn.recv()
+        self.process.join(timeout)
+        self.conn.close()
+
+        for key, typecode in (("send_ns", 'q'), ("corrupted", 'l'), ("rx_seq", 'l'),
+                              ("rx_ns", 'q')):
+            values = array(typecode)
+            values.frombytes(report[key])
+            report[key] = values
+        return report
+
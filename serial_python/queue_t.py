@@ -1,3 +1,12 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Sequence, Tuple
+
+from metrics import Histogram
+
+
 class Queue_T:
     def __init__(self, max_length=100):
         self.QUEUE_MAX_LENGTH = max_length
@@ -42,4 +51,579 @@ class Queue_T:
         return self.size() == 0
     
     def is_full(self):
-        return self.size() == self.QUEUE_MAX_LENGTH
\ No newline at end of file
+        return self.size() == self.QUEUE_MAX_LENGTH
+
+class ByteRingBuffer:
+    # 溢出策略
+    OVERFLOW_DROP_OLDEST = "drop_oldest"
+    OVERFLOW_DROP_NEWEST = "drop_newest"
+    OVERFLOW_RAISE = "raise"
+
+    def __init__(self, capacity=4096, overflow=OVERFLOW_DROP_OLDEST):
+        """
+        基于bytearray的字节环形缓冲区
+        :param capacity: 容量（字节）
+        :param overflow: 溢出策略，drop_oldest丢弃最旧数据，drop_newest丢弃新数据，raise抛出OverflowError
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if overflow not in (self.OVERFLOW_DROP_OLDEST, self.OVERFLOW_DROP_NEWEST,
+                            self.OVERFLOW_RAISE):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.capacity = capacity
+        self.overflow = overflow
+        self.buffer = bytearray(capacity)
+        self.head = 0
+        self.length = 0
+
+        # 溢出统计
+        self.overflow_count = 0
+        self.dropped_bytes = 0
+
+    def size(self):
+        return self.length
+
+    def free(self):
+        return self.capacity - self.length
+
+    def __len__(self):
+        return self.length
+
+    def is_empty(self):
+        return self.length == 0
+
+    def is_full(self):
+        return self.length == self.capacity
+
+    def clear(self):
+        self.head = 0
+        self.length = 0
+
+    def push_bytes(self, data) -> int:
+        """
+        批量写入数据
+        :param data: 支持buffer协议的数据
+        :return: 实际写入的字节数
+        """
+        view = memoryview(data).cast('B')
+        n = len(view)
+        if n == 0:
+            return 0
+
+        free = self.capacity - self.length
+        if n > free:
+            self.overflow_count += 1
+            if self.overflow == self.OVERFLOW_RAISE:
+                self.dropped_bytes += n
+                raise OverflowError(f"ByteRingBuffer overflow: {n} bytes, {free} free")
+            elif self.overflow == self.OVERFLOW_DROP_NEWEST:
+                self.dropped_bytes += n - free
+                view = view[:free]
+                n = free
+            else:
+                if n > self.capacity:
+                    self.dropped_bytes += n - self.capacity
+                    view = view[n - self.capacity:]
+                    n = self.capacity
+                discard = n - (self.capacity - self.length)
+                self.dropped_bytes += discard
+                self.skip(discard)
+
+        if n == 0:
+            return 0
+
+        tail = (self.head + self.length) % self.capacity
+        first = min(n, self.capacity - tail)
+        self.buffer[tail:tail + first] = view[:first]
+        if first < n:
+            self.buffer[:n - first] = view[first:]
+        self.length += n
+        return n
+
+    def push(self, x):
+        """写入单个字节，与Queue_T接口兼容"""
+        self.push_bytes(bytes((x & 0xFF,)))
+
+    def pop(self):
+        """弹出单个字节，与Queue_T接口兼容"""
+        if self.length == 0:
+            return 0
+
+        x = self.buffer[self.head]
+        self.skip(1)
+        return x
+
+    def value(self, index):
+        """读取第index个字节，与Queue_T接口兼容"""
+        if self.length < index + 1:
+            return 0
+
+        return self.buffer[(self.head + index) % self.capacity]
+
+    def __getitem__(self, index):
+        return self.value(index)
+
+    def skip(self, n: int):
+        """
+        丢弃队首的n个字节
+        :param n: 字节数
+        """
+        n = min(n, self.length)
+        self.length -= n
+        if self.length == 0:
+            # 队列为空时回到起点，减少回绕
+            self.head = 0
+        else:
+            self.head = (self.head + n) % self.capacity
+
+    def linear(self) -> tuple:
+        """
+        保证数据在底层缓冲区中连续，必要时搬移一次数据
+        :return: (底层缓冲区, 起始下标, 结束下标)
+        """
+        if self.head + self.length > self.capacity:
+            first = self.capacity - self.head
+            wrapped = bytes(self.buffer[:self.length - first])
+            self.buffer[:first] = self.buffer[self.head:]
+            self.buffer[first:self.length] = wrapped
+            self.head = 0
+        return self.buffer, self.head, self.head + self.length
+
+    def peek(self, n: Optional[int] = None) -> memoryview:
+        """
+        不拷贝地查看队首数据
+        :param n: 查看的字节数，默认为全部
+        :return: 指向底层缓冲区的memoryview，在下一次写入前有效
+        """
+        buf, start, end = self.linear()
+        if n is not None:
+            end = min(end, start + n)
+        return memoryview(buf)[start:end]
+
+    def pop_into(self, out) -> int:
+        """
+        将队首数据拷贝到调用者的缓冲区并出队
+        :param out: 可写的缓冲区
+        :return: 拷贝的字节数
+        """
+        view = memoryview(out).cast('B')
+        n = min(len(view), self.length)
+        first = min(n, self.capacity - self.head)
+        with memoryview(self.buffer) as source:
+            view[:first] = source[self.head:self.head + first]
+            if first < n:
+                view[first:n] = source[:n - first]
+        self.skip(n)
+        return n
+
+
+class WriteLane:
+    # 溢出策略
+    OVERFLOW_BLOCK = "block"
+    OVERFLOW_DROP_OLDEST = "drop_oldest"
+    OVERFLOW_DROP_NEWEST = "drop_newest"
+    OVERFLOW_RAISE = "raise"
+
+    def __init__(self, name: str, strict: bool = False, share: float = 1.0, rate_hz: float = 0.0,
+                 burst: int = 1, max_frames: int = 300,
+                 overflow: str = OVERFLOW_DROP_OLDEST, missions: Sequence[int] = (),
+                 conflate: bool = False):
+        """
+        写队列中的一条通道
+        :param name: 通道名
+        :param strict: 严格优先，有帧时总是先于其他通道发送，且不占用send_frequency_hz的发送节奏
+        :param share: 非严格通道之间按该权重分配发送的字节数
+        :param rate_hz: 本通道的限速（帧/秒），0表示不限速
+        :param burst: 限速时最多连续发送的帧数
+        :param max_frames: 本通道最大帧数
+        :param overflow: 溢出策略，block阻塞等待，drop_oldest丢弃最旧帧，drop_newest丢弃新帧，raise抛出queue.Full
+        :param missions: 归入本通道的任务ID
+        :param conflate: 按任务ID合并，同一任务尚未发送的帧被新帧替换，只发送最新值
+        """
+        if share <= 0:
+            raise ValueError("share must be positive")
+        if max_frames <= 0:
+            raise ValueError("max_frames must be positive")
+        if overflow not in (self.OVERFLOW_BLOCK, self.OVERFLOW_DROP_OLDEST,
+                            self.OVERFLOW_DROP_NEWEST, self.OVERFLOW_RAISE):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.name = name
+        self.strict = strict
+        self.share = share
+        self.rate_hz = rate_hz
+        self.burst = max(1, burst)
+        self.max_frames = max_frames
+        self.overflow = overflow
+        self.missions = tuple(missions)
+        self.conflate = conflate
+
+        # (帧, 入队时的monotonic_ns)；带合并键的帧为[帧, 最近一次替换的monotonic_ns, 键]，并登记在slots中
+        self.frames = deque()
+        self.slots = {}
+
+        # 令牌桶限速
+        self.tokens = float(self.burst)
+        self.refill_ns = 0
+
+        # 加权公平调度的虚拟时间
+        self.vtime = 0.0
+
+        # 统计
+        self.overflow_count = 0
+        self.dropped_frames = 0
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.superseded = 0
+        self.wait_ns = Histogram()
+        self.depth = Histogram()
+
+    def _discard(self, item):
+        """移出队列的帧如带合并键，同时注销"""
+        if len(item) == 3:
+            del self.slots[item[2]]
+
+    def _ready_ns(self, now_ns: int) -> int:
+        """补充令牌，返回本通道可以发送下一帧的时间"""
+        if self.rate_hz <= 0:
+            return now_ns
+        self.tokens = min(float(self.burst),
+                          self.tokens + (now_ns - self.refill_ns) * self.rate_hz / 1e9)
+        self.refill_ns = now_ns
+        if self.tokens >= 1.0:
+            return now_ns
+        return now_ns + int((1.0 - self.tokens) / self.rate_hz * 1e9) + 1
+
+    def stats(self) -> dict:
+        return {
+            "strict": self.strict,
+            "conflate": self.conflate,
+            "share": self.share,
+            "rate_hz": self.rate_hz,
+            "depth": len(self.frames),
+            "max_frames": self.max_frames,
+            "sent_frames": self.sent_frames,
+            "sent_bytes": self.sent_bytes,
+            "overflow_count": self.overflow_count,
+            "dropped_frames": self.dropped_frames,
+            "superseded": self.superseded,
+            "wait_us": self.wait_ns.snapshot(1000.0),
+            "queue_depth": self.depth.snapshot(),
+        }
+
+
+class LaneQueue:
+    # 溢出策略，与WriteLane相同
+    OVERFLOW_BLOCK = WriteLane.OVERFLOW_BLOCK
+    OVERFLOW_DROP_OLDEST = WriteLane.OVERFLOW_DROP_OLDEST
+    OVERFLOW_DROP_NEWEST = WriteLane.OVERFLOW_DROP_NEWEST
+    OVERFLOW_RAISE = WriteLane.OVERFLOW_RAISE
+
+    def __init__(self, lanes: Sequence[WriteLane], default: Optional[str] = None,
+                 vofa: Optional[str] = None):
+        """
+        线程安全的多通道写队列，每个元素是一帧不可变的bytes。帧按任务ID（第2字节）归入通道，未指定的任务进入默认通道；
+        严格通道按列表顺序优先发送，其余通道在发送节奏允许时按share加权公平分配（按字节计），各通道可单独限速
+        :param lanes: 通道列表，严格通道应排在最前
+        :param default: 默认通道名，默认为最后一个通道
+        :param vofa: Vofa JustFloat数据使用的通道名，None表示Vofa数据不经过写队列、直接写入串口
+        """
+        if not lanes:
+            raise ValueError("LaneQueue needs at least one lane")
+
+        self.lanes = list(lanes)
+        self.names = {lane.name: lane for lane in self.lanes}
+        if len(self.names) != len(self.lanes):
+            raise ValueError("Lane names must be unique")
+        self.default_lane = self.names[default] if default is not None else self.lanes[-1]
+        self.vofa_lane = self.names[vofa] if vofa is not None else None
+        self.strict_lanes = [lane for lane in self.lanes if lane.strict]
+        self.fair_lanes = [lane for lane in self.lanes if not lane.strict]
+
+        # 按任务ID查通道
+        self.mission_lanes = [self.default_lane] * 256
+        for lane in self.lanes:
+            for mission_id in lane.missions:
+                self.mission_lanes[mission_id] = lane
+
+        self.count = 0
+        self.vtime = 0.0
+        self.wake_count = 0
+        self.mutex = threading.Lock()
+        self.not_empty = threading.Condition(self.mutex)
+        self.not_full = threading.Condition(self.mutex)
+
+    @staticmethod
+    def single(max_frames: int = 300, overflow: str = WriteLane.OVERFLOW_DROP_OLDEST) -> "LaneQueue":
+        """
+        只有一条通道的写队列，所有帧先进先出
+        :param max_frames: 最大帧数
+        :param overflow: 溢出策略
+        :return: 写队列
+        """
+        return LaneQueue([WriteLane("default", max_frames=max_frames, overflow=overflow)])
+
+    def size(self):
+        return self.count
+
+    def __len__(self):
+        return self.count
+
+    def is_empty(self):
+        return self.count == 0
+
+    @property
+    def max_frames(self) -> int:
+        return sum(lane.max_frames for lane in self.lanes)
+
+    @property
+    def overflow_count(self) -> int:
+        return sum(lane.overflow_count for lane in self.lanes)
+
+    @property
+    def dropped_frames(self) -> int:
+        return sum(lane.dropped_frames for lane in self.lanes)
+
+    @property
+    def superseded_frames(self) -> int:
+        return sum(lane.superseded for lane in self.lanes)
+
+    def lane(self, name: str) -> WriteLane:
+        return self.names[name]
+
+    def _lane_of(self, frame, lane) -> WriteLane:
+        if lane is None:
+            return self.mission_lanes[frame[2]] if len(frame) > 2 else self.default_lane
+        if isinstance(lane, str):
+            return self.names[lane]
+        return lane
+
+    def put(self, frame: bytes, timeout: Optional[float] = None, lane=None, key=None) -> bool:
+        """
+        帧入队
+        :param frame: 一帧数据
+        :param timeout: block策略下的最长等待时间，None表示一直等待
+        :param lane: 通道名或WriteLane，默认按任务ID选择
+        :param key: 合并键，通道中已有同键且尚未发送的帧时直接替换（保持原位置），conflate通道默认为任务ID
+        :return: True入队或替换成功，False被丢弃
+        """
+        lane = self._lane_of(frame, lane)
+        if key is None and lane.conflate and len(frame) > 2:
+            key = frame[2]
+        with self.mutex:
+            if key is not None and self._supersede(lane, key, frame):
+                return True
+
+            if len(lane.frames) >= lane.max_frames:
+                lane.overflow_count += 1
+                if lane.overflow == WriteLane.OVERFLOW_DROP_OLDEST:
+                    lane._discard(lane.frames.popleft())
+                    lane.dropped_frames += 1
+                    self.count -= 1
+                elif lane.overflow == WriteLane.OVERFLOW_DROP_NEWEST:
+                    lane.dropped_frames += 1
+                    return False
+                elif lane.overflow == WriteLane.OVERFLOW_RAISE:
+                    lane.dropped_frames += 1
+                    raise queue.Full(f"LaneQueue overflow: lane {lane.name} {lane.max_frames} frames")
+                else:
+                    if not self.not_full.wait_for(lambda: len(lane.frames) < lane.max_frames,
+                                                  timeout):
+                        lane.dropped_frames += 1
+                        return False
+                    if key is not None and self._supersede(lane, key, frame):
+                        return True
+
+            if not lane.frames:
+                # 空闲的通道重新排队时不累积之前的份额
+                lane.vtime = max(lane.vtime, self.vtime)
+            if key is None:
+                lane.frames.append((frame, time.monotonic_ns()))
+            else:
+                item = [frame, time.monotonic_ns(), key]
+                lane.slots[key] = item
+                lane.frames.append(item)
+            self.count += 1
+            self.not_empty.notify()
+            return True
+
+    @staticmethod
+    def _supersede(lane: WriteLane, key, frame: bytes) -> bool:
+        """用新帧替换同键尚未发送的帧，需持有mutex"""
+        item = lane.slots.get(key)
+        if item is None:
+            return False
+        item[0] = frame
+        item[1] = time.monotonic_ns()
+        lane.superseded += 1
+        return True
+
+    def put_front(self, frames: List[bytes], lane=None) -> int:
+        """
+        将未能发送的帧放回各自通道的队首，保持原有顺序，超出max_frames的部分从队尾丢弃
+        :param frames: 按发送顺序排列的帧列表
+        :param lane: 通道名或WriteLane，默认按任务ID选择
+        :return: 放回的帧数
+        """
+        now_ns = time.monotonic_ns()
+        restored = 0
+        with self.mutex:
+            for frame in reversed(frames):
+                target = self._lane_of(frame, lane)
+                if target.conflate and len(frame) > 2:
+                    key = frame[2]
+                    if key in target.slots:
+                        # 断线期间已有更新的值，旧值不再发送
+                        target.superseded += 1
+                        continue
+                    item = [frame, now_ns, key]
+                    target.slots[key] = item
+                    target.frames.appendleft(item)
+                else:
+                    target.frames.appendleft((frame, now_ns))
+                self.count += 1
+                restored += 1
+            for target in self.lanes:
+                dropped = len(target.frames) - target.max_frames
+                if dropped > 0:
+                    target.overflow_count += 1
+                    target.dropped_frames += dropped
+                    for _ in range(dropped):
+                        target._discard(target.frames.pop())
+                    self.count -= dropped
+                    restored -= dropped
+            self.not_empty.notify()
+        return restored
+
+    def _select(self, now_ns: int, paced_until_ns: int) -> Tuple[Optional[WriteLane], Optional[int]]:
+        """
+        选择下一个发送的通道，需持有mutex
+        :return: (通道, None)，或(None, 最早可能有通道可发送的时间，None表示队列为空)
+        """
+        next_ns = None
+        for lane in self.strict_lanes:
+            if lane.frames:
+                ready_ns = lane._ready_ns(now_ns)
+                if ready_ns <= now_ns:
+                    return lane, None
+                next_ns = ready_ns if next_ns is None else min(next_ns, ready_ns)
+
+        best = None
+        for lane in self.fair_lanes:
+            if not lane.frames:
+                continue
+            ready_ns = max(lane._ready_ns(now_ns), paced_until_ns)
+            if ready_ns > now_ns:
+                next_ns = ready_ns if next_ns is None else min(next_ns, ready_ns)
+            elif best is None or lane.vtime < best.vtime:
+                best = lane
+        return best, next_ns
+
+    def _take(self, lane: WriteLane, max_frames: int, now_ns: int) -> List[bytes]:
+        """从通道取出最多max_frames帧并记录等待时间，需持有mutex"""
+        n = min(max_frames, len(lane.frames))
+        if lane.rate_hz > 0:
+            n = max(1, min(n, int(lane.tokens)))
+            lane.tokens -= n
+        lane.depth.record(len(lane.frames))
+
+        batch = []
+        n_bytes = 0
+        for _ in range(n):
+            item = lane.frames.popleft()
+            lane._discard(item)
+            frame = item[0]
+            lane.wait_ns.record(now_ns - item[1])
+            batch.append(frame)
+            n_bytes += len(frame)
+        self.count -= n
+        lane.sent_frames += n
+        lane.sent_bytes += n_bytes
+        if not lane.strict:
+            self.vtime = lane.vtime
+            lane.vtime += n_bytes / lane.share
+        self.not_full.notify_all()
+        return batch
+
+    def get_lane_batch(self, max_frames: int = 1, timeout: Optional[float] = None,
+                       paced_until_ns: int = 0) -> Tuple[Optional[WriteLane], List[bytes]]:
+        """
+        按通道优先级取出同一通道的最多max_frames帧，没有可发送的帧时等待
+        :param max_frames: 最多取出的帧数
+        :param timeout: 最长等待时间，None表示一直等待，被wake()唤醒时可能返回空列表
+        :param paced_until_ns: 发送节奏，非严格通道在该monotonic_ns时间之前不发送
+        :return: (通道, 帧列表)，没有帧时为(None, [])
+        """
+        with self.mutex:
+            wake_count = self.wake_count
+            deadline_ns = None if timeout is None else time.monotonic_ns() + int(timeout * 1e9)
+            while True:
+                now_ns = time.monotonic_ns()
+                lane, next_ns = self._select(now_ns, paced_until_ns)
+                if lane is not None:
+                    return lane, self._take(lane, max_frames, now_ns)
+
+                wait_ns = None if next_ns is None else next_ns - now_ns
+                if deadline_ns is not None:
+                    if now_ns >= deadline_ns:
+                        return None, []
+                    wait_ns = deadline_ns - now_ns if wait_ns is None else min(wait_ns,
+                                                                              deadline_ns - now_ns)
+                self.not_empty.wait(None if wait_ns is None else wait_ns / 1e9)
+                if self.wake_count != wake_count:
+                    return None, []
+
+    def get_batch(self, max_frames: int = 1, timeout: Optional[float] = None) -> List[bytes]:
+        """
+        取出最多max_frames帧，不考虑发送节奏
+        :param max_frames: 最多取出的帧数
+        :param timeout: 最长等待时间，None表示一直等待
+        :return: 帧列表
+        """
+        return self.get_lane_batch(max_frames, timeout)[1]
+
+    def next_ready_ns(self, now_ns: int, paced_until_ns: int = 0) -> Optional[int]:
+        """
+        供外部事件循环计算下一次发送时间
+        :param now_ns: 当前monotonic_ns时间戳
+        :param paced_until_ns: 发送节奏，见get_lane_batch
+        :return: 最早有帧可发送的时间，None表示队列为空
+        """
+        with self.mutex:
+            lane, next_ns = self._select(now_ns, paced_until_ns)
+        return now_ns if lane is not None else next_ns
+
+    def strict_pending(self) -> bool:
+        """严格通道中是否有待发送的帧"""
+        for lane in self.strict_lanes:
+            if lane.frames:
+                return True
+        return False
+
+    def clear(self) -> int:
+        """
+        清空所有通道
+        :return: 清除的帧数
+        """
+        with self.mutex:
+            n = self.count
+            for lane in self.lanes:
+                lane.frames.clear()
+                lane.slots.clear()
+            self.count = 0
+            self.not_full.notify_all()
+            return n
+
+    def wake(self):
+        """唤醒所有等待取帧的线程"""
+        with self.mutex:
+            self.wake_count += 1
+            self.not_empty.notify_all()
+
+    def stats(self) -> dict:
+        """
+        获取各通道的统计快照
+        :return: {通道名: 统计}，等待时间单位为微秒
+        """
+        return {lane.name: lane.stats() for lane in self.lanes}
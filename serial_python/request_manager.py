@@ -0,0 +1,313 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, Dict, List, Optional
+
+from metrics import Histogram
+from mission_schema import MissionRegistry
+
+# 序号字段的struct格式字符对应的序号空间
+SEQ_SPACE = {"B": 1 << 8, "H": 1 << 16, "I": 1 << 32}
+
+
+class _Request:
+    __slots__ = ("mission", "args", "kwargs", "future", "seq_space", "timeout_ns", "retries",
+                 "seq", "frame", "attempts", "sent_ns", "deadline_ns")
+
+    def __init__(self, mission, args: tuple, kwargs: dict, seq_space: int, timeout_ns: int,
+                 retries: int):
+        self.mission = mission
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.seq_space = seq_space
+        self.timeout_ns = timeout_ns
+        self.retries = retries
+        self.seq = -1
+        self.frame = b''
+        self.attempts = 0
+        self.sent_ns = 0
+        self.deadline_ns = 0
+
+
+def _complete(future: Future, result=None, error: Optional[BaseException] = None):
+    """完成Future，已被调用者取消时忽略"""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class RequestManager:
+    def __init__(self, registry: MissionRegistry, build: Callable[..., bytes],
+                 send: Callable[[bytes], None], window: int = 16, timeout: float = 0.2,
+                 retries: int = 2, seq_field: str = "seq"):
+        """
+        请求/应答管理：为请求帧分配序号，按序号匹配应答并完成对应的Future
+        请求任务与应答任务的第一个字段都是序号（字段名为seq_field，格式为B/H/I），下位机在应答帧中原样带回；
+        最多window个请求同时等待应答，其余按提交顺序排队。超时的请求只重发这一帧（序号不变），
+        重发retries次后仍无应答则以TimeoutError结束
+        :param registry: 任务注册表
+        :param build: build(任务, 参数, 关键字参数) -> 帧，参数的第一个值为序号
+        :param send: send(帧)，发送一帧
+        :param window: 同时等待应答的最大请求数
+        :param timeout: 每次发送后等待应答的超时时间（秒）
+        :param retries: 超时后的最大重发次数
+        :param seq_field: 序号字段名
+        """
+        self.registry = registry
+        self.build = build
+        self.send = send
+        self.window = window
+        self.timeout = timeout
+        self.retries = retries
+        self.seq_field = seq_field
+
+        self.mutex = threading.Lock()
+        self.in_flight: Dict[int, _Request] = {}
+        self.backlog = deque()
+        self.next_seq = 0
+        self.closed = False
+
+        # 定时器将在armed_ns唤醒，出现更早的截止时间时调用wakeup(截止时间)
+        self.armed_ns: Optional[int] = None
+        self.wakeup: Optional[Callable[[int], None]] = None
+        self.timer_event = threading.Event()
+        self.timer_thread: Optional[threading.Thread] = None
+
+        # 统计
+        self.requests = 0
+        self.replies = 0
+        self.retransmits = 0
+        self.timeouts = 0
+        self.unmatched_replies = 0
+        self.rtt_ns = Histogram()
+
+    def submit(self, mission, args: tuple = (), kwargs: Optional[dict] = None,
+               timeout: Optional[float] = None, retries: Optional[int] = None) -> Future:
+        """
+        提交一个请求，窗口已满时排队，不阻塞
+        :param mission: 请求任务ID或任务名
+        :param args: 序号之后按字段顺序的值
+        :param kwargs: 按字段名的值
+        :param timeout: 本请求的超时时间（秒），默认为self.timeout
+        :param retries: 本请求的最大重发次数，默认为self.retries
+        :return: Future，结果为应答帧中序号之后的字段值
+        """
+        schema = self.registry.get(mission)
+        if schema.field_names[:1] != (self.seq_field,) or schema.fields[0][1] not in SEQ_SPACE:
+            raise ValueError(f"{schema.name} needs '{self.seq_field}' (B, H or I) as its first field")
+        seq_space = SEQ_SPACE[schema.fields[0][1]]
+        if self.window > seq_space:
+            raise ValueError(f"window {self.window} exceeds the sequence space of {schema.name}")
+
+        request = _Request(mission, args, kwargs or {}, seq_space,
+                           int((self.timeout if timeout is None else timeout) * 1e9),
+                           self.retries if retries is None else retries)
+        with self.mutex:
+            if self.closed:
+                request.future.cancel()
+                return request.future
+            self.requests += 1
+            self.backlog.append(request)
+            admitted, failed = self._admit(time.monotonic_ns())
+
+        self._send_admitted(admitted, failed)
+        return request.future
+
+    def _admit(self, now_ns: int) -> tuple:
+        """
+        窗口有空位时从排队的请求中取出，分配序号并编码，需持有mutex
+        :return: (待发送的请求列表, [(编码失败的请求, 异常)])
+        """
+        admitted = []
+        failed = []
+        while self.backlog and len(self.in_flight) < self.window:
+            request = self.backlog.popleft()
+            if request.future.cancelled():
+                continue
+
+            seq = self._alloc_seq(request.seq_space)
+            try:
+                request.frame = self.build(request.mission, (seq,) + request.args, request.kwargs)
+            except Exception as e:
+                failed.append((request, e))
+                continue
+
+            request.seq = seq
+            request.attempts = 1
+            request.sent_ns = now_ns
+            request.deadline_ns = now_ns + request.timeout_ns
+            self.in_flight[seq] = request
+            admitted.append(request)
+        return admitted, failed
+
+    def _alloc_seq(self, seq_space: int) -> int:
+        """分配一个未在等待应答的序号，依次递增以免刚超时的请求的迟到应答匹配到新请求，需持有mutex"""
+        while True:
+            seq = self.next_seq % seq_space
+            self.next_seq = (self.next_seq + 1) % SEQ_SPACE["I"]
+            if seq not in self.in_flight:
+                return seq
+
+    def _send_admitted(self, admitted: List[_Request], failed: list):
+        """在锁外发送新进入窗口的请求，并通知定时器"""
+        for request, error in failed:
+            _complete(request.future, error=error)
+        if not admitted:
+            return
+
+        for request in admitted:
+            self._send(request)
+
+        deadline_ns = min(request.deadline_ns for request in admitted)
+        with self.mutex:
+            if self.armed_ns is not None and self.armed_ns <= deadline_ns:
+                return
+            self.armed_ns = deadline_ns
+        if self.wakeup is not None:
+            self.wakeup(deadline_ns)
+
+    def _send(self, request: _Request):
+        try:
+            self.send(request.frame)
+        except Exception as e:
+            with self.mutex:
+                if self.in_flight.get(request.seq) is request:
+                    del self.in_flight[request.seq]
+            _complete(request.future, error=e)
+
+    def on_frame(self, frame) -> bool:
+        """
+        检查收到的帧是否为等待中的请求的应答，读线程在分发前调用
+        :param frame: 一帧数据
+        :return: True已作为应答完成对应的Future，False不是等待中的应答，按普通帧分发
+        """
+        schema = self.registry.schemas.get(frame[self.registry.id_offset])
+        if schema is None or schema.field_names[:1] != (self.seq_field,):
+            return False
+        decoded = self.registry.decode(frame)
+        if decoded is None:
+            return False
+
+        values = decoded[1]
+        now_ns = time.monotonic_ns()
+        with self.mutex:
+            request = self.in_flight.pop(values[0], None)
+            if request is None:
+                # 已超时或重发后的重复应答，也可能是下位机主动发送的帧
+                self.unmatched_replies += 1
+                return False
+
+            self.replies += 1
+            if request.attempts == 1:
+                # 重发过的请求无法区分应答对应哪一次发送，不计入往返时间
+                self.rtt_ns.record(now_ns - request.sent_ns)
+            admitted, failed = self._admit(now_ns)
+
+        _complete(request.future, values[1:])
+        self._send_admitted(admitted, failed)
+        return True
+
+    def expire(self, now_ns: Optional[int] = None) -> Optional[int]:
+        """
+        重发已超时的请求，重发次数用尽的请求以TimeoutError结束，由定时器调用
+        :param now_ns: 当前monotonic_ns时间戳
+        :return: 下一个截止时间，None表示没有等待应答的请求
+        """
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+
+        resend = []
+        expired = []
+        with self.mutex:
+            for seq, request in list(self.in_flight.items()):
+                if request.future.cancelled():
+                    del self.in_flight[seq]
+                elif request.deadline_ns <= now_ns:
+                    if request.attempts <= request.retries:
+                        request.attempts += 1
+                        request.sent_ns = now_ns
+                        request.deadline_ns = now_ns + request.timeout_ns
+                        self.retransmits += 1
+                        resend.append(request)
+                    else:
+                        del self.in_flight[seq]
+                        self.timeouts += 1
+                        expired.append(request)
+            admitted, failed = self._admit(now_ns)
+
+            deadlines = [request.deadline_ns for request in self.in_flight.values()]
+            self.armed_ns = min(deadlines) if deadlines else None
+            next_ns = self.armed_ns
+
+        for request in expired:
+            _complete(request.future, error=TimeoutError(
+                f"request seq {request.seq} got no reply after {request.attempts} attempts"))
+        for request in resend:
+            self._send(request)
+        for request, error in failed:
+            _complete(request.future, error=error)
+        for request in admitted:
+            self._send(request)
+        return next_ns
+
+    def start(self):
+        """启动定时器线程，用于线程模式；asyncio等事件循环可改为设置wakeup并自行调用expire()"""
+        self.wakeup = lambda deadline_ns: self.timer_event.set()
+        self.timer_thread = threading.Thread(target=self._thread_timer, daemon=True)
+        self.timer_thread.start()
+
+    def _thread_timer(self):
+        while not self.closed:
+            try:
+                next_ns = self.expire()
+            except Exception as e:
+                print(f"Request timer error: {str(e)}")
+                next_ns = time.monotonic_ns() + 100000000
+            timeout = None if next_ns is None else max(0.0, (next_ns - time.monotonic_ns()) / 1e9)
+            self.timer_event.wait(timeout)
+            self.timer_event.clear()
+
+    def close(self, error: Optional[BaseException] = None):
+        """
+        结束所有未完成的请求并停止定时器
+        :param error: 未完成请求的异常，None表示取消
+        """
+        with self.mutex:
+            self.closed = True
+            pending = list(self.in_flight.values()) + list(self.backlog)
+            self.in_flight.clear()
+            self.backlog.clear()
+
+        for request in pending:
+            if error is None:
+                request.future.cancel()
+            else:
+                _complete(request.future, error=error)
+
+        self.timer_event.set()
+        if self.timer_thread is not None and self.timer_thread is not threading.current_thread():
+            self.timer_thread.join(timeout=2.0)
+            self.timer_thread = None
+
+    def stats(self) -> dict:
+        """
+        获取统计快照
+        :return: 计数器与往返时间（微秒）
+        """
+        return {
+            "window": self.window,
+            "in_flight": len(self.in_flight),
+            "backlog": len(self.backlog),
+            "requests": self.requests,
+            "replies": self.replies,
+            "retransmits": self.retransmits,
+            "timeouts": self.timeouts,
+            "unmatched_replies": self.unmatched_replies,
+            "rtt_us": self.rtt_ns.snapshot(1000.0),
+        }
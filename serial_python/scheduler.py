@@ -0,0 +1,194 @@
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from metrics import Histogram
+
+
+def advance_deadline(deadline_ns: int, now_ns: int, period_ns: int, slots: int = 1,
+                     policy: str = "skip", max_catch_up: int = 1) -> Tuple[int, int]:
+    """
+    从上一个截止时间推进到下一个，与执行耗时无关，因此不会累积漂移
+    :param deadline_ns: 刚执行的时隙的截止时间（monotonic_ns）
+    :param now_ns: 当前monotonic_ns
+    :param period_ns: 周期（纳秒）
+    :param slots: 本次占用的时隙数，如合并发送的帧数
+    :param policy: 错过时隙时的策略，见DeadlineScheduler
+    :param max_catch_up: catch_up策略下最多补发的时隙数，更早的时隙被跳过
+    :return: (下一个截止时间, 跳过的时隙数)
+    """
+    next_ns = deadline_ns + slots * period_ns
+    if next_ns >= now_ns:
+        return next_ns, 0
+    # 截止时间已过的时隙数
+    behind = (now_ns - next_ns - 1) // period_ns + 1
+    keep = min(behind, max_catch_up) if policy == DeadlineScheduler.POLICY_CATCH_UP else 0
+    skipped = behind - keep
+    return next_ns + skipped * period_ns, skipped
+
+
+class PeriodicTask:
+    def __init__(self, name: str, period_ns: int, callback: Callable[[], None], policy: str,
+                 max_catch_up: int, start_ns: int):
+        """周期任务，第k个时隙的截止时间为start_ns + k * period_ns"""
+        self.name = name
+        self.period_ns = period_ns
+        self.callback = callback
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.next_ns = start_ns
+
+        # 统计
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.lateness_ns = Histogram()  # 实际执行时间相对截止时间的延迟
+
+    def stats(self) -> dict:
+        return {
+            "period_us": self.period_ns / 1000.0,
+            "policy": self.policy,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "lateness_us": self.lateness_ns.snapshot(1000.0),
+        }
+
+
+class DeadlineScheduler:
+    # 错过时隙时的处理策略
+    POLICY_SKIP = "skip"          # 跳过已错过的时隙，从下一个未到期的时隙继续
+    POLICY_CATCH_UP = "catch_up"  # 立即补上错过的时隙，最多max_catch_up个
+
+    def __init__(self, spin_us: float = 200.0, policy: str = POLICY_SKIP, max_catch_up: int = 1):
+        """
+        按绝对截止时间（monotonic_ns）调度周期任务与写队列的发送节奏。等待时先睡眠到截止时间前spin_us，
+        再忙等到截止时间，以少量CPU换取亚毫秒的抖动；同一串口上的任务可以有各自的周期
+        :param spin_us: 忙等时间（微秒），0表示只睡眠
+        :param policy: 错过时隙时的默认策略，skip或catch_up
+        :param max_catch_up: catch_up策略下最多补发的时隙数
+        """
+        if policy not in (self.POLICY_SKIP, self.POLICY_CATCH_UP):
+            raise ValueError(f"Unknown schedule policy: {policy}")
+
+        self.spin_ns = max(0, int(spin_us * 1000))
+        self.policy = policy
+        self.max_catch_up = max(1, max_catch_up)
+        self.tasks: Dict[str, PeriodicTask] = {}
+        self.lock = threading.Lock()
+
+        # 写队列发送节奏的统计
+        self.pacing_lateness_ns = Histogram()
+        self.pacing_skipped = 0
+
+    def add(self, name: str, period_s: float, callback: Callable[[], None],
+            policy: Optional[str] = None, phase_s: float = 0.0) -> PeriodicTask:
+        """
+        添加周期任务，同名任务被替换
+        :param name: 任务名
+        :param period_s: 周期（秒）
+        :param callback: 每个时隙调用一次，在调度线程中执行，不应长时间阻塞
+        :param policy: 错过时隙时的策略，默认为调度器的策略
+        :param phase_s: 第一个时隙相对当前时间的延迟（秒）
+        :return: 周期任务
+        """
+        if period_s <= 0:
+            raise ValueError("period_s must be positive")
+        policy = self.policy if policy is None else policy
+        if policy not in (self.POLICY_SKIP, self.POLICY_CATCH_UP):
+            raise ValueError(f"Unknown schedule policy: {policy}")
+
+        task = PeriodicTask(name, int(period_s * 1e9), callback, policy, self.max_catch_up,
+                            time.monotonic_ns() + int(phase_s * 1e9))
+        with self.lock:
+            self.tasks[name] = task
+        return task
+
+    def remove(self, name: str) -> bool:
+        """
+        移除周期任务
+        :param name: 任务名
+        :return: False表示任务不存在
+        """
+        with self.lock:
+            return self.tasks.pop(name, None) is not None
+
+    def next_deadline_ns(self) -> Optional[int]:
+        """
+        最近一个周期任务的截止时间
+        :return: monotonic_ns，None表示没有周期任务
+        """
+        with self.lock:
+            if not self.tasks:
+                return None
+            return min(task.next_ns for task in self.tasks.values())
+
+    def run_due(self, now_ns: Optional[int] = None) -> int:
+        """
+        执行所有已到期的周期任务，每个任务执行一次，补发的时隙在下一次调用时执行
+        :param now_ns: 当前monotonic_ns，默认现取
+        :return: 执行的任务数
+        """
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        with self.lock:
+            due = [task for task in self.tasks.values() if task.next_ns <= now_ns]
+        for task in due:
+            start_ns = time.monotonic_ns()
+            task.lateness_ns.record(start_ns - task.next_ns)
+            try:
+                task.callback()
+            except Exception as e:
+                task.errors += 1
+                print(f"Scheduled task {task.name} error: {str(e)}")
+            task.runs += 1
+            task.next_ns, skipped = advance_deadline(task.next_ns, time.monotonic_ns(),
+                                                     task.period_ns, 1, task.policy,
+                                                     task.max_catch_up)
+            task.skipped += skipped
+        return len(due)
+
+    def sleep_until(self, deadline_ns: int) -> int:
+        """
+        先睡眠到截止时间前spin_ns，再忙等到截止时间
+        :param deadline_ns: 截止时间（monotonic_ns）
+        :return: 返回时的monotonic_ns
+        """
+        now_ns = time.monotonic_ns()
+        remaining_ns = deadline_ns - now_ns - self.spin_ns
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+            now_ns = time.monotonic_ns()
+        while now_ns < deadline_ns:
+            now_ns = time.monotonic_ns()
+        return now_ns
+
+    def pace(self, deadline_ns: int, now_ns: int, period_ns: int, slots: int = 1) -> int:
+        """
+        写队列发送一批帧后推进发送节奏并记录延迟
+        :param deadline_ns: 本批帧的截止时间
+        :param now_ns: 实际发送时间
+        :param period_ns: 发送周期
+        :param slots: 本批的帧数
+        :return: 下一批帧的截止时间
+        """
+        self.pacing_lateness_ns.record(now_ns - deadline_ns)
+        next_ns, skipped = advance_deadline(deadline_ns, now_ns, period_ns, slots, self.policy,
+                                            self.max_catch_up)
+        self.pacing_skipped += skipped
+        return next_ns
+
+    def stats(self) -> dict:
+        """
+        获取统计快照
+        :return: 写队列发送节奏与各周期任务的延迟（微秒）及跳过的时隙数
+        """
+        with self.lock:
+            tasks = list(self.tasks.values())
+        return {
+            "spin_us": self.spin_ns / 1000.0,
+            "policy": self.policy,
+            "pacing_lateness_us": self.pacing_lateness_ns.snapshot(1000.0),
+            "pacing_skipped": self.pacing_skipped,
+            "tasks": {task.name: task.stats() for task in tasks},
+        }
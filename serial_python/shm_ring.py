@@ -0,0 +1,239 @@
+"""
+共享内存单生产者/单消费者环形队列
+
+两个进程之间传递定长记录，不加锁、不序列化（pickle）：生产者写入记录后发布head，消费者读完记录后释放tail，
+head与tail各自只有一个写者。共享内存布局（8字节对齐）：
+
+    [0:8)       head      已发布的记录总数，生产者写
+    [64:72)     tail      已释放的记录总数，消费者写，与head分处不同缓存行
+    [128:136)   capacity  记录条数
+    [136:144)   record_size 每条记录的字节数
+    [144:160)   dropped/oversize 满时丢弃、超长丢弃的记录数，生产者写
+    [192:256)   counters  8个u64计数器，含义由使用者约定，每个计数器只应有一个写者
+    [256:)      capacity条记录，每条为 <q时间戳 + <I长度 + 4字节保留 + 数据，补齐到8字节
+
+head/tail是对齐的8字节存储，x86-64与aarch64上单次写入不会被撕裂。x86的存储顺序保证消费者看到新的head时
+记录已写完；弱内存序平台上由通知管道的系统调用充当屏障，消费者应在wait()返回后读取。
+
+通知：生产者每次publish()向管道写1字节（非阻塞，管道满时忽略），消费者在wait()中select该管道，
+读空后再检查队列，不会丢失唤醒；fileno()可注册到外部事件循环。
+"""
+
+import multiprocessing
+import os
+import select
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Iterator, Optional, Tuple
+
+# 共享内存头部，以u64为单位的下标
+_HEAD = 0
+_TAIL = 8
+_CAPACITY = 16
+_RECORD_SIZE = 17
+_DROPPED = 18
+_OVERSIZE = 19
+_COUNTERS = 24
+COUNTER_COUNT = 8
+HEADER_SIZE = 256
+
+# 记录头：时间戳、数据长度、保留
+RECORD_HEADER = struct.Struct('<qI4x')
+
+
+class ShmRing:
+    def __init__(self, capacity: int = 1024, max_length: int = 64, name: Optional[str] = None,
+                 notify=None):
+        """
+        共享内存环形队列，name为None时创建，否则按名字打开已创建的队列
+        :param capacity: 记录条数（创建时有效）
+        :param max_length: 单条记录的最大数据长度（创建时有效）
+        :param name: 共享内存名
+        :param notify: 通知管道(读端, 写端)，为multiprocessing的Connection对象，默认新建
+        """
+        if name is None:
+            if capacity <= 0 or max_length <= 0:
+                raise ValueError("capacity and max_length must be positive")
+            record_size = (RECORD_HEADER.size + max_length + 7) & ~7
+            self.shm = shared_memory.SharedMemory(create=True,
+                                                  size=HEADER_SIZE + capacity * record_size)
+            self.owner = True
+            # fork出的子进程继承本对象，只有创建者进程删除共享内存
+            self.owner_pid = os.getpid()
+            self.words = self.shm.buf[:HEADER_SIZE].cast('Q')
+            self.words[_CAPACITY] = capacity
+            self.words[_RECORD_SIZE] = record_size
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+            self.owner_pid = 0
+            self.words = self.shm.buf[:HEADER_SIZE].cast('Q')
+
+        self.capacity = self.words[_CAPACITY]
+        self.record_size = self.words[_RECORD_SIZE]
+        self.max_length = self.record_size - RECORD_HEADER.size
+        self.records = self.shm.buf[HEADER_SIZE:HEADER_SIZE + self.capacity * self.record_size]
+        self.counters = self.words[_COUNTERS:_COUNTERS + COUNTER_COUNT]
+
+        if notify is None:
+            notify = multiprocessing.Pipe(duplex=False)
+        self.notify = notify
+        self.notify_r, self.notify_w = notify[0].fileno(), notify[1].fileno()
+        os.set_blocking(self.notify_r, False)
+        os.set_blocking(self.notify_w, False)
+
+        # 本端尚未发布的head、尚未释放的tail
+        self.local_head = self.words[_HEAD]
+        self.local_tail = self.words[_TAIL]
+
+    def __reduce__(self):
+        # 传给子进程时只传共享内存名与通知管道，子进程按名字重新打开
+        return _attach, (self.shm.name, self.notify)
+
+    # ---------------- 生产者 ----------------
+
+    def push(self, data, timestamp_ns: int = 0) -> bool:
+        """
+        写入一条记录，调用publish()后消费者可见
+        :param data: 支持buffer协议的数据，长度不超过max_length
+        :param timestamp_ns: 时间戳
+        :return: True成功，False队列已满或数据超长（丢弃最新的记录）
+        """
+        length = len(data)
+        if length > self.max_length:
+            self.words[_OVERSIZE] += 1
+            return False
+        head = self.local_head
+        if head - self.words[_TAIL] >= self.capacity:
+            self.words[_DROPPED] += 1
+            return False
+
+        offset = (head % self.capacity) * self.record_size
+        RECORD_HEADER.pack_into(self.records, offset, timestamp_ns, length)
+        start = offset + RECORD_HEADER.size
+        self.records[start:start + length] = data
+        self.local_head = head + 1
+        return True
+
+    def free(self) -> int:
+        """生产者端可写入的记录数"""
+        return self.capacity - (self.local_head - self.words[_TAIL])
+
+    def publish(self):
+        """发布已写入的记录并通知消费者"""
+        if self.local_head == self.words[_HEAD]:
+            return
+        self.words[_HEAD] = self.local_head
+        self.wake()
+
+    def wake(self):
+        """唤醒等待中的消费者"""
+        try:
+            os.write(self.notify_w, b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    # ---------------- 消费者 ----------------
+
+    def available(self) -> int:
+        """已发布、尚未释放的记录数"""
+        return self.words[_HEAD] - self.local_tail
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        等待有记录可读
+        :param timeout: 超时时间（秒），None表示一直等待，0表示不等待
+        :return: True有记录可读
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._drain_notify()
+            if self.available():
+                return True
+            wait = None if deadline is None else deadline - time.monotonic()
+            if wait is not None and wait <= 0:
+                return False
+            select.select([self.notify_r], [], [], wait)
+
+    def _drain_notify(self):
+        try:
+            while os.read(self.notify_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def peek(self, max_records: int = 0) -> Tuple[memoryview, int]:
+        """
+        取出已发布的一批记录，零拷贝；回绕时只返回到缓冲区末尾，剩余部分下次返回
+        处理完后须调用release(n)，之前生产者不会覆盖这些记录
+        :param max_records: 最多取出的记录数，0表示不限制
+        :return: (记录区的memoryview, 记录数)，第i条记录位于[i*record_size, (i+1)*record_size)
+        """
+        tail = self.local_tail
+        n = min(self.words[_HEAD] - tail, self.capacity - tail % self.capacity)
+        if max_records > 0:
+            n = min(n, max_records)
+        offset = (tail % self.capacity) * self.record_size
+        return self.records[offset:offset + n * self.record_size], n
+
+    def release(self, n: int):
+        """
+        释放peek()取出的前n条记录，生产者可以重新写入
+        :param n: 记录数
+        """
+        self.local_tail += n
+        self.words[_TAIL] = self.local_tail
+
+    def iter_records(self, view: memoryview, n: int) -> Iterator[Tuple[int, memoryview]]:
+        """
+        遍历peek()取出的记录
+        :return: 迭代(时间戳, 数据的memoryview)，数据在release()前有效
+        """
+        record_size = self.record_size
+        header = RECORD_HEADER
+        for offset in range(0, n * record_size, record_size):
+            timestamp_ns, length = header.unpack_from(view, offset)
+            start = offset + header.size
+            yield timestamp_ns, view[start:start + length]
+
+    def fileno(self) -> int:
+        """通知管道读端，可读表示可能有新记录"""
+        return self.notify_r
+
+    def stats(self) -> dict:
+        """
+        获取统计快照
+        :return: 容量、当前深度与丢弃计数
+        """
+        words = self.words
+        return {
+            "capacity": self.capacity,
+            "record_size": self.record_size,
+            "depth": words[_HEAD] - words[_TAIL],
+            "dropped": words[_DROPPED],
+            "oversize": words[_OVERSIZE],
+        }
+
+    def close(self):
+        """关闭共享内存，创建者进程同时删除"""
+        if getattr(self, "shm", None) is None:
+            return
+        for view in (self.counters, self.records, self.words):
+            view.release()
+        self.shm.close()
+        if self.owner and self.owner_pid == os.getpid():
+            self.shm.unlink()
+        self.shm = None
+        for conn in self.notify:
+            conn.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except (BufferError, OSError):
+            pass
+
+
+def _attach(name: str, notify) -> ShmRing:
+    return ShmRing(name=name, notify=notify)
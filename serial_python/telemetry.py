@@ -0,0 +1,498 @@
+"""
+压缩遥测
+
+低波特率下原始JustFloat每个通道4字节、每个采样另加4字节帧尾，而相邻采样的值通常变化很小。
+压缩遥测把每个通道按固定步长量化为整数，相邻采样做差分，再用zig-zag变长整数（varint）编码，
+多个采样合为一包，包头与校验只出现一次。下位机需使用相同的格式：
+
+    包头  A5 5A | 类型(1) | 序号(1) | 通道数(1) | 采样数(1) | 负载长度(uint16，小端)
+    负载  采样数 × 通道数 个zig-zag varint，按采样顺序、每个采样内按通道顺序
+    校验  CRC-16/CCITT-FALSE（2字节，高字节在前），覆盖包头与负载
+
+    类型  0 关键包：第一个采样为量化值，其余为与一阶预测值的差
+          1 差分包：所有采样都是与一阶预测值的差，第一个采样接着上一包的最后一个采样预测，序号须连续
+          2 绝对包：所有采样都是量化值（只量化、不差分）
+          3 关键包（二阶）：同类型0，但使用二阶预测
+          4 差分包（二阶）：同类型1，但使用二阶预测
+
+量化值 = round(值 / 步长)。一阶预测值为上一采样，二阶预测值为上一采样加上一采样与上上采样之差（线性外推），
+关键包的第二个采样前只有一个采样，按一阶预测。平滑信号的二阶残差远小于一阶残差，通道多、幅值大时压缩比更高。
+zig-zag为 (n << 1) ^ (n >> 63)，varint每字节低7位有效、最高位为1表示后面还有字节。
+差分包依赖上一包，丢包或校验失败后丢弃差分包直到下一个关键包，因此发送端每隔keyframe_interval包发送一个关键包。
+"""
+
+import binascii
+import struct
+import time
+from typing import List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖
+    np = None
+
+TELEMETRY_MAGIC = b'\xa5\x5a'
+PACKET_HEADER = struct.Struct('<2sBBBBH')
+PACKET_CRC = struct.Struct('>H')
+PACKET_OVERHEAD = PACKET_HEADER.size + PACKET_CRC.size
+
+KIND_KEY = 0
+KIND_DELTA = 1
+KIND_ABSOLUTE = 2
+KIND_KEY2 = 3
+KIND_DELTA2 = 4
+
+# 采样块的值少于该数时逐值编解码，NumPy的固定开销在单个采样上远大于逐值计算
+_NUMPY_MIN_VALUES = 64
+
+# varint最多10字节，可表示任意64位整数
+_VARINT_MAX_BYTES = 10
+
+
+def _scales(scale: Union[float, Sequence[float]], channels: int) -> list:
+    if isinstance(scale, (int, float)):
+        scales = [float(scale)] * channels
+    else:
+        scales = [float(s) for s in scale]
+    if len(scales) != channels or min(scales) <= 0:
+        raise ValueError(f"scale needs {channels} positive values")
+    return scales
+
+
+def _encode_varints(values: List[int]) -> bytearray:
+    """逐个编码zig-zag varint（未安装NumPy时使用）"""
+    out = bytearray()
+    append = out.append
+    for n in values:
+        n = ((n << 1) ^ (n >> 63)) & 0xFFFFFFFFFFFFFFFF
+        while n >= 0x80:
+            append((n & 0x7F) | 0x80)
+            n >>= 7
+        append(n)
+    return out
+
+
+def _decode_varints(payload) -> List[int]:
+    """逐个解码zig-zag varint（未安装NumPy时使用）"""
+    values = []
+    n = 0
+    shift = 0
+    for b in bytes(payload):
+        n |= (b & 0x7F) << shift
+        if b & 0x80:
+            shift += 7
+            continue
+        values.append((n >> 1) ^ -(n & 1))
+        n = 0
+        shift = 0
+    if shift:
+        raise ValueError("truncated varint")
+    return values
+
+
+def _encode_varints_numpy(values) -> bytes:
+    """向量化编码zig-zag varint"""
+    values = values.astype(np.int64).ravel()
+    zz = (values << 1) ^ (values >> 63)
+    zz = zz.view(np.uint64)
+    n_bytes = np.ones(len(zz), np.int64)
+    for k in range(1, _VARINT_MAX_BYTES):
+        n_bytes += zz >= np.uint64(1 << (7 * k))
+    starts = np.zeros(len(zz), np.int64)
+    np.cumsum(n_bytes[:-1], out=starts[1:])
+    out = np.empty(int(n_bytes.sum()), np.uint8)
+    for k in range(int(n_bytes.max()) if len(zz) else 0):
+        mask = n_bytes > k
+        chunk = (zz[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (n_bytes[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + k] = (chunk | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def _decode_varints_numpy(payload, count: int):
+    """向量化解码zig-zag varint，个数不符时返回None"""
+    b = np.frombuffer(payload, np.uint8)
+    ends = np.flatnonzero(b < 0x80)
+    if len(ends) != count or (count and ends[-1] != len(b) - 1) or (not count and len(b)):
+        return None
+    if not count:
+        return np.zeros(0, np.int64)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    if lengths.max() > _VARINT_MAX_BYTES:
+        return None
+    shift = (np.arange(len(b)) - np.repeat(starts, lengths)) * 7
+    parts = (b & 0x7F).astype(np.uint64) << shift.astype(np.uint64)
+    zz = np.bitwise_or.reduceat(parts, starts)
+    return (zz >> np.uint64(1)).astype(np.int64) ^ -(zz & np.uint64(1)).astype(np.int64)
+
+
+def _predict(rows: list, kind: int, last, slope) -> tuple:
+    """
+    逐值计算各采样与预测值的差（未安装NumPy或采样少时使用）
+    :param rows: 量化值，每个采样一个整数列表
+    :param last: 上一包最后一个采样，关键包忽略
+    :param slope: 上一包最后两个采样之差，关键包忽略
+    :return: (按采样顺序展平的残差, (最后一个采样, 最后两个采样之差))
+    """
+    flat = []
+    if kind == KIND_ABSOLUTE:
+        for row in rows:
+            flat.extend(row)
+        return flat, (list(rows[-1]), None)
+
+    second = kind in (KIND_KEY2, KIND_DELTA2)
+    if kind in (KIND_KEY, KIND_KEY2):
+        last = None
+    for row in rows:
+        if last is None:
+            flat.extend(row)
+            slope = [0] * len(row)
+            last = row
+            continue
+        if second:
+            flat.extend(x - p - d for x, p, d in zip(row, last, slope))
+        else:
+            flat.extend(x - p for x, p in zip(row, last))
+        slope = [x - p for x, p in zip(row, last)]
+        last = row
+    return flat, (list(last), slope)
+
+
+def _reconstruct(values: List[int], channels: int, kind: int, last, slope) -> tuple:
+    """
+    逐值由残差恢复量化值，_predict()的逆运算
+    :return: (每个采样一个整数列表, (最后一个采样, 最后两个采样之差))
+    """
+    rows = [values[i:i + channels] for i in range(0, len(values), channels)]
+    if kind == KIND_ABSOLUTE:
+        return rows, (rows[-1], None)
+
+    second = kind in (KIND_KEY2, KIND_DELTA2)
+    if kind in (KIND_KEY, KIND_KEY2):
+        last = None
+    for i, residual in enumerate(rows):
+        if last is None:
+            slope = [0] * channels
+            last = residual
+            continue
+        if second:
+            row = [p + d + e for p, d, e in zip(last, slope, residual)]
+        else:
+            row = [p + e for p, e in zip(last, residual)]
+        slope = [x - p for x, p in zip(row, last)]
+        rows[i] = last = row
+    return rows, (last, slope)
+
+
+def _predict_numpy(rows, kind: int, last, slope) -> tuple:
+    """向量化计算各采样与预测值的差，参数与返回值同_predict()，rows与残差为N×C的int64数组"""
+    if kind == KIND_ABSOLUTE:
+        return rows, (rows[-1].tolist(), None)
+    key = kind in (KIND_KEY, KIND_KEY2)
+    prev = rows[0] if key else np.asarray(last, np.int64)
+    if kind in (KIND_KEY2, KIND_DELTA2):
+        d = np.zeros_like(prev) if key else np.asarray(slope, np.int64)
+        values = np.diff(rows, 2, axis=0, prepend=np.stack((prev - d, prev)))
+    else:
+        values = np.diff(rows, axis=0, prepend=prev.reshape(1, -1))
+    if key:
+        values[0] = rows[0]
+    tail = rows[-2] if len(rows) > 1 else prev
+    return values, (rows[-1].tolist(), (rows[-1] - tail).tolist())
+
+
+def _reconstruct_numpy(values, kind: int, last, slope) -> tuple:
+    """向量化由残差恢复量化值，参数与返回值同_reconstruct()，values为N×C的int64数组"""
+    if kind == KIND_ABSOLUTE:
+        return values, (values[-1].tolist(), None)
+    key = kind in (KIND_KEY, KIND_KEY2)
+    if key:
+        prev, residuals = values[0], values[1:]
+    else:
+        prev, residuals = np.asarray(last, np.int64), values
+    if kind in (KIND_KEY2, KIND_DELTA2):
+        d = np.zeros_like(prev) if key else np.asarray(slope, np.int64)
+        rows = prev + np.cumsum(d + np.cumsum(residuals, axis=0), axis=0)
+    else:
+        rows = prev + np.cumsum(residuals, axis=0)
+    if key:
+        rows = np.concatenate((values[:1], rows))
+    tail = rows[-2] if len(rows) > 1 else prev
+    return rows, (rows[-1].tolist(), (rows[-1] - tail).tolist())
+
+
+class TelemetryEncoder:
+    def __init__(self, channels: int, scale: Union[float, Sequence[float]] = 1e-3,
+                 delta: bool = True, keyframe_interval: int = 16, max_samples: int = 255,
+                 max_payload: int = 1024, order: int = 2):
+        """
+        压缩遥测编码器，格式见模块说明
+        :param channels: 通道数（1-255）
+        :param scale: 量化步长，一个值或每个通道一个值，如1e-3表示保留3位小数
+        :param delta: 是否差分编码，False时只量化（每包都是绝对包）
+        :param keyframe_interval: 每隔多少包发送一个关键包，用于丢包后重新同步
+        :param max_samples: 每包最多的采样数（1-255）
+        :param max_payload: 每包负载的最大字节数，超过时拆包
+        :param order: 差分的预测阶数，1为与上一采样之差，2为与线性外推之差（平滑信号更短）
+        """
+        if not 0 < channels <= 255:
+            raise ValueError("channels must be in 1-255")
+        if order not in (1, 2):
+            raise ValueError("order must be 1 or 2")
+        self.channels = channels
+        self.scales = _scales(scale, channels)
+        self.delta = delta
+        self.order = order
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.max_samples = max(1, min(255, max_samples))
+        self.max_payload = min(0xFFFF, max_payload)
+
+        self.seq = 0
+        self.packets_since_key = self.keyframe_interval  # 第一包为关键包
+        self.last: Optional[list] = None  # 上一包最后一个采样的量化值
+        self.slope: Optional[list] = None  # 上一包最后两个采样量化值之差
+
+        # 统计
+        self.samples = 0
+        self.packets = 0
+        self.encoded_bytes = 0
+
+    @property
+    def raw_bytes(self) -> int:
+        """同样的采样用JustFloat发送的字节数"""
+        return self.samples * (self.channels + 1) * 4
+
+    def reset(self):
+        """下一包从关键包开始，如重连后"""
+        self.packets_since_key = self.keyframe_interval
+        self.last = None
+        self.slope = None
+
+    def _quantize(self, samples):
+        """量化为N×C的int64数组，值少于_NUMPY_MIN_VALUES或未安装NumPy时为整数列表的列表"""
+        if np is not None and isinstance(samples, np.ndarray):
+            if samples.size >= _NUMPY_MIN_VALUES:
+                return self._quantize_numpy(samples)
+            samples = samples.tolist()
+
+        rows = list(samples)
+        if rows and not hasattr(rows[0], '__len__'):
+            rows = [rows]
+        if np is not None and len(rows) * self.channels >= _NUMPY_MIN_VALUES:
+            return self._quantize_numpy(rows)
+        scales = self.scales
+        quantized = []
+        for row in rows:
+            if len(row) != self.channels:
+                raise ValueError(f"samples must be N x {self.channels}")
+            # round()与np.rint()一样舍入到偶数，两条路径的量化值相同
+            quantized.append([round(x / s) for x, s in zip(row, scales)])
+        return quantized
+
+    def _quantize_numpy(self, samples):
+        block = np.asarray(samples, dtype=np.float64)
+        if block.ndim == 1:
+            block = block.reshape(1, -1)
+        if block.ndim != 2 or block.shape[1] != self.channels:
+            raise ValueError(f"samples must be N x {self.channels}")
+        return np.rint(block / np.asarray(self.scales)).astype(np.int64)
+
+    def encode(self, samples) -> bytes:
+        """
+        编码一块采样，按max_samples与max_payload拆为多包
+        :param samples: N×C的二维数据（numpy数组或嵌套序列），一维数据视为单个采样
+        :return: 编码后的包
+        """
+        quantized = self._quantize(samples)
+        out = bytearray()
+        start = 0
+        n_total = len(quantized)
+        while start < n_total:
+            n = min(self.max_samples, n_total - start)
+            while True:
+                packet, state = self._packet(quantized[start:start + n])
+                if len(packet) - PACKET_OVERHEAD <= self.max_payload or n == 1:
+                    break
+                n = max(1, n // 2)
+            self._commit(packet, state, n)
+            out += packet
+            start += n
+        return bytes(out)
+
+    def _packet(self, rows) -> tuple:
+        """
+        编码一包，不改变编码器状态
+        :return: (包, 编码后的(last, slope))
+        """
+        if not self.delta:
+            kind = KIND_ABSOLUTE
+        elif self.last is None or self.packets_since_key >= self.keyframe_interval:
+            kind = KIND_KEY2 if self.order == 2 else KIND_KEY
+        else:
+            kind = KIND_DELTA2 if self.order == 2 else KIND_DELTA
+
+        if isinstance(rows, list):
+            values, state = _predict(rows, kind, self.last, self.slope)
+            payload = _encode_varints(values)
+        else:
+            values, state = _predict_numpy(rows, kind, self.last, self.slope)
+            payload = _encode_varints_numpy(values)
+
+        header = PACKET_HEADER.pack(TELEMETRY_MAGIC, kind, self.seq, self.channels, len(rows), len(payload))
+        crc = binascii.crc_hqx(payload, binascii.crc_hqx(header, 0xFFFF))
+        return header + payload + PACKET_CRC.pack(crc), state
+
+    def _commit(self, packet: bytes, state: tuple, n: int):
+        kind = packet[2]
+        self.packets_since_key = 1 if kind in (KIND_KEY, KIND_KEY2) else self.packets_since_key + 1
+        self.last, self.slope = state
+        self.seq = (self.seq + 1) & 0xFF
+        self.samples += n
+        self.packets += 1
+        self.encoded_bytes += len(packet)
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "packets": self.packets,
+            "encoded_bytes": self.encoded_bytes,
+            "raw_bytes": self.raw_bytes,
+            "compression_ratio": self.raw_bytes / self.encoded_bytes if self.encoded_bytes else 0.0,
+        }
+
+
+class TelemetryDecoder:
+    MAGIC = TELEMETRY_MAGIC
+
+    def __init__(self, channels: int, scale: Union[float, Sequence[float]] = 1e-3,
+                 max_payload: int = 1024):
+        """
+        压缩遥测解码器，与发送端使用相同的通道数与量化步长，在MixedAligner中与任务帧一起对齐
+        :param channels: 通道数
+        :param scale: 量化步长，一个值或每个通道一个值
+        :param max_payload: 每包负载的最大字节数，长度字段超过该值的候选包直接丢弃
+        """
+        if not 0 < channels <= 255:
+            raise ValueError("channels must be in 1-255")
+        self.channels = channels
+        self.scales = _scales(scale, channels)
+        self.max_payload = min(0xFFFF, max_payload)
+        self.min_packet_length = PACKET_OVERHEAD
+
+        self.seq = -1
+        self.last: Optional[list] = None  # 上一包最后一个采样的量化值，None表示需要等关键包
+        self.slope: Optional[list] = None  # 上一包最后两个采样量化值之差
+
+        # 统计
+        self.samples = 0
+        self.packets = 0
+        self.encoded_bytes = 0
+        self.crc_failures = 0
+        self.dropped_packets = 0
+        self.first_ns = 0
+        self.last_ns = 0
+
+    def reset(self):
+        """数据流不连续（如重连）后调用，等待下一个关键包"""
+        self.last = None
+        self.slope = None
+        self.seq = -1
+
+    def match(self, buf, pos: int, end: int) -> int:
+        """
+        检查以pos处包头开始的候选包
+        :return: 包的结束下标，0表示不是合法的包，-1表示数据不完整
+        """
+        if end - pos < PACKET_HEADER.size:
+            return -1
+        _, kind, _, channels, n, length = PACKET_HEADER.unpack_from(buf, pos)
+        if kind > KIND_DELTA2 or channels != self.channels or not n or length > self.max_payload:
+            return 0
+        packet_end = pos + PACKET_OVERHEAD + length
+        if packet_end > end:
+            return -1
+        crc_offset = packet_end - PACKET_CRC.size
+        with memoryview(buf) as view:
+            crc = binascii.crc_hqx(view[pos:crc_offset], 0xFFFF)
+        if crc != PACKET_CRC.unpack_from(buf, crc_offset)[0]:
+            self.crc_failures += 1
+            return 0
+        return packet_end
+
+    def decode(self, buf, pos: int, packet_end: int):
+        """
+        解码match()校验过的包
+        :return: N×C的float32数组（未安装NumPy时为元组列表），差分包缺少参考采样时为None；
+                 采样少的包逐值解码，NumPy的固定开销在单个采样上远大于逐值计算
+        """
+        _, kind, seq, channels, n, length = PACKET_HEADER.unpack_from(buf, pos)
+        in_order = self.seq >= 0 and seq == (self.seq + 1) & 0xFF
+        self.seq = seq
+        self.encoded_bytes += packet_end - pos
+        if kind in (KIND_DELTA, KIND_DELTA2) and (self.last is None or self.slope is None or not in_order):
+            # 丢包后差分包没有参考，等待下一个关键包
+            self.last = None
+            self.dropped_packets += 1
+            return None
+
+        with memoryview(buf) as view:
+            payload = view[pos + PACKET_HEADER.size:pos + PACKET_HEADER.size + length]
+            if np is not None and n * self.channels >= _NUMPY_MIN_VALUES:
+                samples = self._decode_numpy(payload, kind, n)
+            else:
+                samples = self._decode_python(payload, kind, n)
+                if samples is not None and np is not None:
+                    samples = np.array(samples, np.float32)
+        if samples is None:
+            self.last = None
+            self.slope = None
+            self.dropped_packets += 1
+            return None
+
+        now_ns = time.monotonic_ns()
+        if not self.first_ns:
+            self.first_ns = now_ns
+        self.last_ns = now_ns
+        self.samples += n
+        self.packets += 1
+        return samples
+
+    def _decode_numpy(self, payload, kind: int, n: int):
+        values = _decode_varints_numpy(payload, n * self.channels)
+        if values is None:
+            return None
+        rows, (self.last, self.slope) = _reconstruct_numpy(values.reshape(n, self.channels), kind,
+                                                           self.last, self.slope)
+        return (rows * np.asarray(self.scales)).astype(np.float32)
+
+    def _decode_python(self, payload, kind: int, n: int):
+        try:
+            values = _decode_varints(payload)
+        except ValueError:
+            return None
+        if len(values) != n * self.channels:
+            return None
+        rows, (self.last, self.slope) = _reconstruct(values, self.channels, kind, self.last, self.slope)
+        scales = self.scales
+        return [tuple(q * s for q, s in zip(row, scales)) for row in rows]
+
+    def stats(self) -> dict:
+        """
+        获取统计快照
+        :return: 采样数、包数、压缩比（同样采样的JustFloat字节数/实际字节数）、采样率等
+        """
+        raw_bytes = self.samples * (self.channels + 1) * 4
+        span = (self.last_ns - self.first_ns) / 1e9
+        return {
+            "channels": self.channels,
+            "samples": self.samples,
+            "packets": self.packets,
+            "encoded_bytes": self.encoded_bytes,
+            "compression_ratio": raw_bytes / self.encoded_bytes if self.encoded_bytes else 0.0,
+            "samples_per_s": self.samples / span if span > 0 else 0.0,
+            "crc_failures": self.crc_failures,
+            "dropped_packets": self.dropped_packets,
+        }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 库模块按平铺方式导入（from uart import Uart），测试时把库目录加入搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+import serial
+
+from async_uart import AsyncUart
+
+
+def feed(uart: AsyncUart, data: bytes):
+    """模拟串口可读：_on_readable()读到data"""
+    def read_pending_into(view) -> int:
+        view[:len(data)] = data
+        return len(data)
+    uart._read_pending_into = read_pending_into
+    uart._on_readable()
+
+
+def frame(i: int) -> bytes:
+    return b'?!\x01' + bytes([i]) * 4 + b'!'
+
+
+def test_concurrent_readers_each_get_a_frame():
+    async def main():
+        uart = AsyncUart(8)
+        uart.loop = asyncio.get_running_loop()
+        readers = [asyncio.create_task(uart.read_frame()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert len(uart.frame_waiters) == 3
+
+        feed(uart, frame(1) + frame(2))
+        done, pending = await asyncio.wait(readers, timeout=0.1)
+        assert sorted(task.result() for task in done) == [frame(1), frame(2)]
+        assert len(pending) == 1
+
+        feed(uart, frame(3))
+        assert await asyncio.wait_for(pending.pop(), 1.0) == frame(3)
+        assert not uart.frame_waiters
+
+    asyncio.run(main())
+
+
+def test_cancelled_reader_is_removed():
+    async def main():
+        uart = AsyncUart(8)
+        uart.loop = asyncio.get_running_loop()
+        reader = asyncio.create_task(uart.read_frame())
+        await asyncio.sleep(0)
+        reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+        assert not uart.frame_waiters
+
+    asyncio.run(main())
+
+
+def test_error_wakes_all_readers():
+    async def main():
+        uart = AsyncUart(8)
+        uart.loop = asyncio.get_running_loop()
+        readers = [asyncio.create_task(uart.read_frame()) for _ in range(2)]
+        await asyncio.sleep(0)
+        uart._fail(serial.SerialException("unplugged"), show=False)
+        for reader in readers:
+            with pytest.raises(serial.SerialException):
+                await reader
+
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+import os
+import struct
+
+import pytest
+
+from capture import CaptureWriter, CAPTURE_HEADER, DIR_RX, DIR_TX, capture_files, read_capture
+from capture_tool import replay
+from uart import Uart
+
+
+def frame(i: int) -> bytes:
+    return b'?!\x01' + struct.pack('<I', i) + b'!'
+
+
+def test_round_trip_keeps_order_and_timestamps(tmp_path):
+    prefix = str(tmp_path / "uart0")
+    writer = CaptureWriter(prefix)
+    writer.record(DIR_RX, b'abc', timestamp_ns=10)
+    writer.record(DIR_TX, bytearray(b'de'), timestamp_ns=20)
+    writer.record(DIR_RX, memoryview(b'xfghx')[1:4], timestamp_ns=30)
+    writer.close()
+
+    assert list(read_capture(prefix)) == [(10, DIR_RX, b'abc'), (20, DIR_TX, b'de'),
+                                          (30, DIR_RX, b'fgh')]
+    assert writer.stats()["records"] == 3
+    assert writer.stats()["files"] == capture_files(prefix)
+
+
+def test_large_record_is_split(tmp_path):
+    prefix = str(tmp_path / "uart0")
+    writer = CaptureWriter(prefix, chunk_size=64)
+    data = bytes(range(200))
+    writer.record(DIR_RX, data, timestamp_ns=1)
+    writer.close()
+
+    records = list(read_capture(prefix))
+    assert all(len(chunk) <= 64 for _, _, chunk in records)
+    assert b''.join(chunk for _, _, chunk in records) == data
+    assert {timestamp_ns for timestamp_ns, _, _ in records} == {1}
+
+
+def test_rotation_keeps_newest_files(tmp_path):
+    prefix = str(tmp_path / "uart0")
+    # 每条记录占满一个块，每个文件写入两个块后轮转
+    writer = CaptureWriter(prefix, chunk_size=64, n_chunks=64, max_file_bytes=100, max_files=2)
+    for i in range(40):
+        writer.record(DIR_RX, bytes([i]) * 40, timestamp_ns=i)
+    writer.close()
+
+    files = capture_files(prefix)
+    assert len(files) == 2
+    assert files == writer.files
+    timestamps = [timestamp_ns for timestamp_ns, _, _ in read_capture(prefix)]
+    assert timestamps == [36, 37, 38, 39]
+    assert writer.stats()["dropped_records"] == 0
+    assert not os.path.exists(f"{prefix}.0000.scap")
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    prefix = str(tmp_path / "uart0")
+    writer = CaptureWriter(prefix)
+    writer.record(DIR_RX, b'complete', timestamp_ns=1)
+    writer.record(DIR_RX, b'truncated', timestamp_ns=2)
+    writer.close()
+
+    path = capture_files(prefix)[0]
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert list(read_capture(path)) == [(1, DIR_RX, b'complete')]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "data.scap"
+    path.write_bytes(b'NOPE\x01')
+    with pytest.raises(ValueError):
+        list(read_capture(str(path)))
+    path.write_bytes(CAPTURE_HEADER[:-1] + b'\x09')
+    with pytest.raises(ValueError, match="version 9"):
+        list(read_capture(str(path)))
+
+
+@pytest.mark.parametrize("content", [b'', b'SC', CAPTURE_HEADER[:-1]])
+def test_rejects_files_shorter_than_header(tmp_path, content):
+    path = tmp_path / "data.scap"
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match="not a capture file"):
+        list(read_capture(str(path)))
+
+
+class RecordingPort:
+    is_open = True
+
+    def write(self, data) -> int:
+        return len(data)
+
+
+def test_uart_capture_and_replay(tmp_path):
+    prefix = str(tmp_path / "uart0")
+    uart = Uart(8)
+    uart.serial_port = RecordingPort()
+    uart.start_capture(prefix)
+    uart.write_buffer(frame(7))
+    # 接收方向：一帧被拆成两次读取，中间夹杂干扰字节
+    uart.capture.record(DIR_RX, frame(1) + frame(2)[:3])
+    uart.capture.record(DIR_RX, frame(2)[3:] + b'\x00\x01' + frame(3))
+    uart.stop_capture()
+
+    assert [data for _, direction, data in read_capture(prefix) if direction == DIR_TX] == [frame(7)]
+    stats = replay(prefix, 8)
+    assert stats["frames"] == 3
+    assert stats["frames_by_mission"] == {0x01: 3}
+    assert stats["resync_dropped_bytes"] == 2
+    assert replay(prefix, 8, direction=DIR_TX)["frames"] == 1
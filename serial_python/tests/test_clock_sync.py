@@ -0,0 +1,202 @@
+import threading
+import time
+
+import pytest
+
+from clock_sync import ClockSync
+from mission_schema import MissionRegistry
+from pty_harness import PtyLoopback, FakeMcu
+from uart import Uart
+from uart_thread import UartThread__
+
+WRAP_US = 1 << 32
+
+
+def make_registry() -> MissionRegistry:
+    registry = MissionRegistry()
+    registry.register(0x40, [("ping_seq", "H")], "ping")
+    registry.register(0x41, [("ping_seq", "H"), ("mcu_time", "I")], "pong")
+    return registry
+
+
+def make_sync(**kwargs) -> tuple:
+    registry = make_registry()
+    sent = []
+
+    def build(mission, args, kw):
+        frame = bytearray(16)
+        registry.encode_into(frame, mission, *args, **kw)
+        return bytes(frame)
+
+    return ClockSync(registry, "ping", "pong", build, sent.append, **kwargs), sent
+
+
+def exchange(sync: ClockSync, seq: int, sent_ns: int, rtt_ns: int, mcu_ns: int,
+             pong_delay_ns: int = 0) -> bool:
+    """模拟一次ping/pong：下位机在往返中点（加上回程额外延迟前）打时间戳"""
+    sync.pending[seq] = sent_ns
+    return sync.on_pong(seq, (mcu_ns // 1000) % WRAP_US, sent_ns + rtt_ns + pong_delay_ns)
+
+
+def test_ping_builds_frame_and_pong_completes_it():
+    sync, sent = make_sync()
+    sync.ping()
+    sync.ping()
+    assert [frame[2:5] for frame in sent] == [b'\x40\x00\x00', b'\x40\x01\x00']
+
+    pong = bytearray(16)
+    sync.registry.encode_into(pong, "pong", 1, 123)
+    assert sync.on_frame(bytes(pong), sync.pending[1] + 1000)
+    assert not sync.on_frame(bytes(sent[0]), 0)
+    stats = sync.stats()
+    assert (stats["pings"], stats["pongs"], stats["unmatched"]) == (2, 1, 0)
+    assert sync.synced()
+
+    # 重复的pong不再匹配
+    assert not sync.on_pong(1, 123, time.monotonic_ns())
+    assert sync.stats()["unmatched"] == 1
+
+
+def test_unwrap_across_32bit_rollover():
+    sync, _ = make_sync(window=1)
+    offset_ns = 5 * 10 ** 12
+    # 下位机时间从回绕前50ms开始
+    mcu_start_ns = (WRAP_US - 50_000) * 1000
+    for i in range(10):
+        mcu_ns = mcu_start_ns + i * 10_000_000
+        host_ns = mcu_ns + offset_ns
+        assert exchange(sync, i, host_ns - 100_000, 200_000, mcu_ns)
+        assert sync.offset_ns() == pytest.approx(offset_ns, abs=1000)
+
+    # 回绕后的小计数换算到回绕前时间的后面
+    mcu_ns = mcu_start_ns + 95_000_000
+    assert sync.to_host_ns((mcu_ns // 1000) % WRAP_US) == pytest.approx(mcu_ns + offset_ns, abs=1000)
+    # 回绕前的计数仍换算到过去
+    assert sync.to_host_ns(WRAP_US - 1) == pytest.approx(WRAP_US * 1000 - 1000 + offset_ns, abs=1000)
+
+
+def test_min_filter_ignores_delayed_pongs():
+    sync, _ = make_sync(window=4)
+    offset_ns = 10 ** 9
+    for i in range(8):
+        host_ns = 10 ** 10 + i * 10 ** 7
+        # 每个窗口只有一个样本没有排队延迟，其余样本的pong晚到0.5~2ms
+        delay = 0 if i % 4 == 2 else 500_000 * (1 + i % 4)
+        exchange(sync, i, host_ns - 50_000, 100_000, host_ns - offset_ns, delay)
+    assert sync.stats()["measurements"] == 2
+    assert sync.offset_ns() == pytest.approx(offset_ns, abs=1000)
+    assert sync.stats()["rtt_min_us"] == 100
+
+
+def test_fit_tracks_drift():
+    sync, _ = make_sync(window=2, history=16)
+    ppm = 150.0
+    base_ns = 10 ** 11
+    for i in range(40):
+        host_ns = base_ns + i * 50_000_000
+        mcu_ns = int((host_ns - base_ns) * (1 + ppm * 1e-6)) + 7 * 10 ** 9
+        exchange(sync, i, host_ns - 100_000, 200_000, mcu_ns)
+
+    assert sync.stats()["mcu_skew_ppm"] == pytest.approx(ppm, abs=1.0)
+    # 外推0.5秒后的换算误差在几微秒以内
+    host_ns = base_ns + 40 * 50_000_000 + 500_000_000
+    mcu_ns = int((host_ns - base_ns) * (1 + ppm * 1e-6)) + 7 * 10 ** 9
+    assert sync.to_host_ns((mcu_ns // 1000) % WRAP_US) == pytest.approx(host_ns, abs=5000)
+
+
+def test_lost_pings_are_counted():
+    sync, _ = make_sync()
+    sync.max_pending = 4
+    for _ in range(6):
+        sync.ping()
+    assert sync.stats()["lost"] == 2
+    assert list(sync.pending) == [2, 3, 4, 5]
+
+
+def test_pong_needs_unsigned_time_field():
+    registry = MissionRegistry()
+    registry.register(0x40, [("ping_seq", "H")], "ping")
+    registry.register(0x41, [("ping_seq", "H"), ("mcu_time", "f")], "pong")
+    with pytest.raises(ValueError):
+        ClockSync(registry, "ping", "pong", None, None)
+
+
+def test_frame_times_interpolate_by_byte_position():
+    uart = Uart(8)
+    uart.baudrate = 100_000  # 每字节100us
+    uart.rx_prev_stamp_ns = 1_000_000
+    uart.rx_stamp_ns = 2_000_000
+    uart.rx_stamp_bytes = 16
+    # 缓冲区末尾的帧在最近一次读取时到达，前一帧早8个字节时间
+    assert uart._frame_times([8, 16], 16) == [1_200_000, 2_000_000]
+    # 本次读到的字节不早于上一次读取
+    uart.rx_stamp_bytes = 100
+    assert uart._frame_times([0], 80) == [1_000_000]
+    uart.rx_stamp_ns = 0
+    assert uart._frame_times([8], 16) == [0]
+
+
+class SlowPort:
+    """逐字节写入并让出CPU的串口，未加锁的并发写入会交错"""
+    is_open = True
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data) -> int:
+        for byte in bytes(data):
+            self.data.append(byte)
+            time.sleep(0)
+        return len(data)
+
+
+def test_ping_does_not_split_write_thread_batch(tmp_path):
+    uart = UartThread__(8, 100)
+    uart.enable_show_write = False
+    uart.uart_dev = str(tmp_path)
+    uart.serial_port = SlowPort()
+    batch = [b'?!\x01' + bytes([i]) * 4 + b'!' for i in range(32)]
+    ping = b'?!\x40PING!'
+
+    pinger = threading.Thread(target=lambda: [uart._send_ping_frame(ping) for _ in range(50)])
+    pinger.start()
+    for _ in range(10):
+        uart._send_frames(batch)
+    pinger.join()
+
+    data = bytes(uart.serial_port.data)
+    assert data.count(ping) == 50
+    # 去掉ping后剩下完整、按序的批次
+    assert data.replace(ping, b'') == b''.join(batch) * 10
+
+
+def test_pty_clock_sync():
+    registry = make_registry()
+    loopback = PtyLoopback()
+    uart = UartThread__(16, mission_registry=registry)
+    uart.enable_show_read = False
+    uart.enable_show_write = False
+    mcu = FakeMcu(loopback.master_fd, 16, 921600, ping_mission_id=0x40, pong_mission_id=0x41,
+                  clock_offset_us=WRAP_US - 200_000, clock_ppm=100.0)
+    try:
+        assert uart.init_with_threads(loopback.slave_name, enable_thread_read=True, baudrate=921600)
+        mcu.start()
+        clock = uart.enable_clock_sync("ping", "pong", period=0.005, window=4)
+        deadline = time.monotonic() + 5.0
+        while clock.stats()["measurements"] < 8 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = uart.get_stats()["clock"]
+        offset_ns = clock.offset_ns()
+        host_ns = time.monotonic_ns()
+        mcu_ticks = int(host_ns * (1 + 100e-6) / 1000 + WRAP_US - 200_000) % WRAP_US
+        converted = clock.to_host_ns(mcu_ticks)
+    finally:
+        mcu.stop()
+        uart.close()
+        loopback.close()
+
+    assert stats["synced"]
+    assert stats["pongs"] >= 32
+    assert offset_ns is not None
+    # 伪终端往返在毫秒以内，换算误差不超过往返时间
+    assert abs(converted - host_ns) < 2_000_000
@@ -0,0 +1,73 @@
+import pytest
+
+from crc import FrameCrc, crc8, crc16_ccitt, crc16_modbus, make_frame_crc
+from frame_aligner import FrameAligner, VarFrameAligner
+
+CHECK = b'123456789'
+
+
+def test_check_vectors():
+    # 各算法对"123456789"的标准校验值
+    assert crc8(CHECK) == 0xF4
+    assert crc16_modbus(CHECK) == 0x4B37
+    assert crc16_ccitt(CHECK) == 0x29B1
+
+
+def test_incremental():
+    assert crc8(CHECK[4:], crc8(CHECK[:4])) == crc8(CHECK)
+    assert crc16_modbus(CHECK[4:], crc16_modbus(CHECK[:4])) == crc16_modbus(CHECK)
+
+
+@pytest.mark.parametrize("algorithm, field", [
+    (FrameCrc.CRC8, b'\xf4'),
+    (FrameCrc.CRC16_MODBUS, b'\x37\x4b'),
+    (FrameCrc.CRC16_CCITT, b'\x29\xb1'),
+])
+def test_seal_byte_order(algorithm, field):
+    crc = FrameCrc(algorithm)
+    frame = bytearray(CHECK + bytes(crc.size) + b'!')
+    crc.seal(frame)
+    assert frame[len(CHECK):-1] == field
+    assert crc.check(frame, 0, len(frame))
+    frame[3] ^= 0x01
+    assert not crc.check(frame, 0, len(frame))
+    assert crc.failures == 1
+
+
+def test_make_frame_crc():
+    assert make_frame_crc(None) is None
+    crc = FrameCrc(FrameCrc.CRC8)
+    assert make_frame_crc(crc) is crc
+    assert make_frame_crc("crc16_ccitt").size == 2
+    with pytest.raises(ValueError):
+        FrameCrc("crc32")
+
+
+def sealed(crc: FrameCrc, body: bytes) -> bytes:
+    frame = bytearray(body + bytes(crc.size) + b'!')
+    crc.seal(frame)
+    return bytes(frame)
+
+
+def test_aligner_rejects_false_alignment():
+    crc = FrameCrc(FrameCrc.CRC16_MODBUS)
+    good = sealed(crc, b'?!\x01abc')
+    # 头尾帧位置都对但校验错误的候选帧，无校验时会被误认为一帧
+    fake = b'?!\x01xyz\x00\x00!'
+    assert FrameAligner(9).align(fake + good)[0] == [fake, good]
+    aligner = FrameAligner(9, crc=crc)
+    frames, pos = aligner.align(fake + good)
+    assert frames == [good]
+    assert aligner.dropped_bytes == len(fake)
+    assert crc.failures == 1
+
+
+def test_var_aligner_with_crc():
+    crc = FrameCrc(FrameCrc.CRC8)
+    frames = [sealed(crc, b'?!\x02' + len(payload).to_bytes(2, 'little') + payload)
+              for payload in (b'', b'a', b'hello')]
+    corrupted = bytearray(frames[1])
+    corrupted[5] ^= 0xFF
+    aligner = VarFrameAligner(64, crc=crc)
+    got, _ = aligner.align(frames[0] + bytes(corrupted) + frames[2])
+    assert got == [frames[0], frames[2]]
@@ -0,0 +1,184 @@
+import threading
+
+import pytest
+
+from dispatcher import Dispatcher
+from mission_schema import MissionRegistry
+from uart_thread import UartThread__
+
+
+def frame(mission_id: int, i: int = 0) -> bytes:
+    return b'?!' + bytes([mission_id, i]) + b'\x00\x00\x00!'
+
+
+class Gate:
+    """阻塞在第一帧上的回调，用于填满分发队列"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, data: bytes, t_ns: int):
+        self.calls.append((data[2], data[3], t_ns))
+        self.entered.set()
+        assert self.release.wait(5.0)
+
+
+def started(mode=Dispatcher.MODE_THREAD, **kwargs):
+    dispatcher = Dispatcher(mode, **kwargs)
+    gate = Gate()
+    dispatcher.start(gate)
+    return dispatcher, gate
+
+
+def test_inline_calls_in_submitting_thread():
+    calls = []
+    dispatcher = Dispatcher()
+    dispatcher.start(lambda data, t_ns: calls.append((threading.current_thread(), t_ns)))
+    assert dispatcher.submit(frame(1), 5)
+    assert calls == [(threading.current_thread(), 5)]
+    assert dispatcher.stats()["dispatched"] == 1
+
+
+def test_thread_mode_keeps_order():
+    calls = []
+    dispatcher = Dispatcher(Dispatcher.MODE_THREAD)
+    dispatcher.start(lambda data, t_ns: calls.append((data[3], threading.current_thread().name)))
+    for i in range(50):
+        dispatcher.submit(frame(1 + i % 3, i))
+    assert dispatcher.wait_idle(2.0)
+    dispatcher.stop()
+    assert [i for i, _ in calls] == list(range(50))
+    assert {name for _, name in calls} == {"Dispatch-0"}
+
+
+def test_pool_mode_pins_missions_to_workers():
+    calls = []
+    dispatcher = Dispatcher(Dispatcher.MODE_POOL, workers=2)
+    dispatcher.start(lambda data, t_ns: calls.append((data[2], data[3],
+                                                      threading.current_thread().name)))
+    for i in range(40):
+        dispatcher.submit(frame(i % 4, i))
+    assert dispatcher.wait_idle(2.0)
+    dispatcher.stop()
+    for mission_id in range(4):
+        mine = [(i, name) for m, i, name in calls if m == mission_id]
+        assert [i for i, _ in mine] == list(range(mission_id, 40, 4))
+        assert {name for _, name in mine} == {f"Dispatch-{mission_id % 2}"}
+
+
+def test_drop_oldest_when_full():
+    dispatcher, gate = started(max_frames=2)
+    dispatcher.submit(frame(1, 0))
+    assert gate.entered.wait(2.0)
+    for i in range(1, 5):
+        assert dispatcher.submit(frame(1, i))
+    gate.release.set()
+    assert dispatcher.wait_idle(2.0)
+    dispatcher.stop()
+    assert [i for _, i, _ in gate.calls] == [0, 3, 4]
+    assert dispatcher.stats()["dropped_frames"] == 2
+
+
+def test_coalesce_replaces_latest_frame_of_the_same_mission():
+    dispatcher, gate = started(max_frames=2, overflow=Dispatcher.OVERFLOW_COALESCE)
+    dispatcher.submit(frame(1, 0))
+    assert gate.entered.wait(2.0)
+    dispatcher.submit(frame(1, 1), 11)
+    dispatcher.submit(frame(2, 2), 12)
+    dispatcher.submit(frame(1, 3), 13)
+    # 队列中没有任务3的帧时丢弃最旧的帧
+    dispatcher.submit(frame(3, 4), 14)
+    gate.release.set()
+    assert dispatcher.wait_idle(2.0)
+    dispatcher.stop()
+    assert gate.calls[1:] == [(2, 2, 12), (3, 4, 14)]
+    stats = dispatcher.stats()
+    assert (stats["coalesced_frames"], stats["dropped_frames"]) == (1, 1)
+
+
+def test_coalesce_keeps_order_within_mission():
+    dispatcher, gate = started(max_frames=2, overflow=Dispatcher.OVERFLOW_COALESCE)
+    dispatcher.submit(frame(9, 0))
+    assert gate.entered.wait(2.0)
+    dispatcher.submit(frame(1, 1), 1)
+    dispatcher.submit(frame(2, 2), 2)
+    dispatcher.submit(frame(1, 3), 3)
+    gate.release.set()
+    assert dispatcher.wait_idle(2.0)
+    dispatcher.stop()
+    assert gate.calls[1:] == [(1, 3, 3), (2, 2, 2)]
+
+
+def test_block_waits_for_space():
+    dispatcher, gate = started(max_frames=1, overflow=Dispatcher.OVERFLOW_BLOCK)
+    dispatcher.submit(frame(1, 0))
+    assert gate.entered.wait(2.0)
+    dispatcher.submit(frame(1, 1))
+    submitter = threading.Thread(target=dispatcher.submit, args=(frame(1, 2),), daemon=True)
+    submitter.start()
+    submitter.join(0.05)
+    assert submitter.is_alive()
+
+    gate.release.set()
+    submitter.join(2.0)
+    assert not submitter.is_alive()
+    assert dispatcher.wait_idle(2.0)
+    dispatcher.stop()
+    assert [i for _, i, _ in gate.calls] == [0, 1, 2]
+    assert dispatcher.stats()["blocked_count"] == 1
+
+
+def test_callback_error_does_not_stop_worker():
+    calls = []
+
+    def handler(data, t_ns):
+        calls.append(data[3])
+        if data[3] == 0:
+            raise RuntimeError("boom")
+
+    dispatcher = Dispatcher(Dispatcher.MODE_THREAD)
+    dispatcher.start(handler)
+    dispatcher.submit(frame(1, 0))
+    dispatcher.submit(frame(1, 1))
+    assert dispatcher.wait_idle(2.0)
+    dispatcher.stop()
+    assert calls == [0, 1]
+    assert dispatcher.stats()["callback_errors"] == 1
+
+
+def test_stop_without_drain_drops_queue():
+    dispatcher, gate = started()
+    dispatcher.submit(frame(1, 0))
+    assert gate.entered.wait(2.0)
+    dispatcher.submit(frame(1, 1))
+    gate.release.set()
+    dispatcher.stop(drain=False)
+    assert not dispatcher.running
+    assert len(dispatcher) == 0
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        Dispatcher("fiber")
+    with pytest.raises(ValueError):
+        Dispatcher(overflow="drop_newest")
+
+
+def test_uart_callbacks_run_off_the_read_thread():
+    calls = []
+    registry = MissionRegistry()
+    registry.register(1, [("x", "B")], handler=lambda x: calls.append(
+        (x, threading.current_thread().name)))
+    uart = UartThread__(8, 100, mission_registry=registry,
+                        dispatcher=Dispatcher(Dispatcher.MODE_THREAD))
+    uart.enable_show_read = False
+    try:
+        for i in range(5):
+            uart._process_received_data(frame(1, i))
+        assert uart.dispatcher.wait_idle(2.0)
+    finally:
+        uart.close()
+    assert calls == [(i, "Dispatch-0") for i in range(5)]
+    assert uart.get_stats()["dispatch"]["dispatched"] == 5
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from frame_aligner import FrameAligner, VarFrameAligner
+
+
+def frame(i: int, length: int = 8) -> bytes:
+    return b'?!' + bytes([i & 0xFF]) * (length - 3) + b'!'
+
+
+def align_all(aligner, stream: bytes, chunk: int = 0) -> list:
+    """按chunk字节分批送入对齐器，模拟读队列中逐次到达的数据"""
+    chunk = chunk or len(stream)
+    buf = bytearray()
+    frames = []
+    for offset in range(0, len(stream), chunk):
+        buf += stream[offset:offset + chunk]
+        aligned, pos = aligner.align(buf, 0, len(buf))
+        frames.extend(aligned)
+        del buf[:pos]
+    return frames
+
+
+@pytest.mark.parametrize("chunk", [0, 1, 3, 8, 13])
+def test_clean_stream(chunk):
+    frames = [frame(i) for i in range(20)]
+    aligner = FrameAligner(8)
+    assert align_all(aligner, b''.join(frames), chunk) == frames
+    assert aligner.dropped_bytes == 0
+
+
+@pytest.mark.parametrize("chunk", [0, 1, 5])
+def test_resync_after_garbage(chunk):
+    rng = random.Random(1)
+    frames = [frame(i) for i in range(30)]
+    garbage = [bytes(rng.choice(b'abc?') for _ in range(rng.randrange(6))) for _ in frames]
+    stream = b''.join(g + f for g, f in zip(garbage, frames))
+    aligner = FrameAligner(8)
+    assert align_all(aligner, stream, chunk) == frames
+    assert aligner.dropped_bytes == sum(map(len, garbage))
+
+
+def test_false_header_is_skipped():
+    # 垃圾中的头帧后面8字节处不是尾帧，前进一个字节后找到真正的帧
+    stream = b'?!xx' + frame(1) + frame(2)
+    aligner = FrameAligner(8)
+    assert align_all(aligner, stream) == [frame(1), frame(2)]
+    assert aligner.dropped_bytes == 4
+
+
+def test_header_inside_payload_does_not_break_alignment():
+    payload_frame = b'?!?!?!?!'
+    assert align_all(FrameAligner(8), payload_frame + frame(2)) == [payload_frame, frame(2)]
+
+
+def test_partial_frame_and_half_header_are_kept():
+    aligner = FrameAligner(8)
+    buf = bytearray(frame(1) + frame(2)[:5])
+    frames, pos = aligner.align(buf)
+    assert frames == [frame(1)]
+    assert pos == 8
+    # 末尾的单个'?'可能是下一个头帧的前半
+    frames, pos = aligner.align(b'zzzzzzzzzz?')
+    assert frames == [] and pos == 10
+
+
+def test_max_frames_and_ends():
+    stream = b'xx' + frame(1) + frame(2) + frame(3)
+    ends = []
+    frames, pos = FrameAligner(8).align(stream, max_frames=2, ends=ends)
+    assert frames == [frame(1), frame(2)]
+    assert ends == [10, 18]
+    assert pos == 18
+
+
+def var_frame(payload: bytes, mission_id: int = 1) -> bytes:
+    return b'?!' + bytes([mission_id]) + len(payload).to_bytes(2, 'little') + payload + b'!'
+
+
+@pytest.mark.parametrize("chunk", [0, 1, 4, 64])
+def test_var_frames_of_mixed_length(chunk):
+    frames = [var_frame(bytes(i & 0xFF for i in range(n))) for n in (0, 1, 10, 300, 2)]
+    aligner = VarFrameAligner(512)
+    assert align_all(aligner, b''.join(frames), chunk) == frames
+    assert aligner.dropped_bytes == 0
+
+
+@pytest.mark.parametrize("chunk", [0, 1, 7])
+def test_var_resync_after_garbage_and_bad_length(chunk):
+    frames = [var_frame(b'?!abc'), var_frame(b''), var_frame(b'x' * 40)]
+    # 长度字段超过max_payload的假头帧，以及尾帧不对的假头帧
+    bad_length = b'?!\x01\xff\xff'
+    bad_tail = b'?!\x01\x02\x00abX'
+    stream = b'junk' + frames[0] + bad_length + frames[1] + bad_tail + frames[2]
+    aligner = VarFrameAligner(64)
+    assert align_all(aligner, stream, chunk) == frames
+    assert aligner.dropped_bytes == 4 + len(bad_length) + len(bad_tail)
+
+
+def test_var_incomplete_frame_waits():
+    frame = var_frame(b'payload')
+    aligner = VarFrameAligner(64)
+    frames, pos = aligner.align(b'zz' + frame[:-3])
+    assert frames == [] and pos == 2
+    frames, pos = aligner.align(b'zz' + frame)
+    assert frames == [frame] and pos == 2 + len(frame)
+    assert aligner.match_at(frame, memoryview(frame), 0, len(frame) - 1) == -1
+    assert aligner.match_at(frame, memoryview(frame), 0, len(frame)) == len(frame)
@@ -0,0 +1,143 @@
+import struct
+
+import pytest
+
+import frame_batch
+from frame_batch import BatchDecoder, FrameBatch, merge_batches, unpack_columns
+from mission_schema import MissionRegistry
+
+LAYOUT = struct.Struct('<Ifh')
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if frame_batch.np is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(frame_batch, "np", None)
+    return request.param
+
+
+@pytest.fixture
+def registry():
+    registry = MissionRegistry()
+    for mission_id in (1, 2, 3):
+        registry.register(mission_id, [("seq", "I"), ("value", "f"), ("temp", "h")])
+    return registry
+
+
+def make_frame(mission_id: int, seq: int, value: float, temp: int) -> bytes:
+    frame = bytearray(16)
+    frame[0:2] = b'?!'
+    frame[2] = mission_id
+    LAYOUT.pack_into(frame, 3, seq, value, temp)
+    frame[-1] = ord('!')
+    return bytes(frame)
+
+
+def columns(records, registry, mission_id, frame_offset=0):
+    """两种后端的结果统一为{字段名: 列表}"""
+    if frame_batch.np is not None:
+        return {name: records[name].tolist() for name in ("seq", "value", "temp")}
+    schema = registry.get(mission_id)
+    return {name: list(column) for name, column in unpack_columns(records, schema, frame_offset).items()}
+
+
+def row(records, i) -> bytes:
+    return bytes(records[i]) if frame_batch.np is not None else records.tobytes()[i * records.shape[1]:(i + 1) * records.shape[1]]
+
+
+def test_single_mission_is_zero_copy(backend, registry):
+    buf = bytearray(b''.join(make_frame(1, i, i / 2, -i) for i in range(10)))
+    records = BatchDecoder(registry).decode(buf, 10, 16)[1]
+    assert columns(records, registry, 1) == {
+        "seq": list(range(10)), "value": [i / 2 for i in range(10)], "temp": [-i for i in range(10)]}
+    # 结果覆盖在buf上
+    buf[3] = 99
+    assert columns(records, registry, 1)["seq"][0] == 99
+
+
+def test_multi_mission_split_keeps_order_and_times(backend, registry):
+    order = [1, 2, 1, 3, 3, 2, 1]
+    buf = b''.join(make_frame(m, i, 0.0, 0) for i, m in enumerate(order))
+    times = [100 + i for i in range(len(order))]
+    result = BatchDecoder(registry).decode(buf, len(order), 16, times=times)
+    assert sorted(result) == [1, 2, 3]
+    for mission_id, (records, stamps) in result.items():
+        expected = [i for i, m in enumerate(order) if m == mission_id]
+        assert columns(records, registry, mission_id)["seq"] == expected
+        assert list(stamps) == [100 + i for i in expected]
+
+
+def test_time_offset_in_records(backend, registry):
+    records = b''.join(struct.pack('<qI4x', 1000 + i, 16) + make_frame(1 + i % 2, i, 0.0, 0) for i in range(6))
+    result = BatchDecoder(registry).decode(records, 6, 32, frame_offset=16, time_offset=0, copy=True)
+    assert list(result[1][1]) == [1000, 1002, 1004]
+    assert columns(result[2][0], registry, 2, frame_offset=16)["seq"] == [1, 3, 5]
+
+
+def test_unknown_mission_returns_whole_frames(backend, registry):
+    frame = make_frame(9, 1, 0.0, 0)
+    records = BatchDecoder(registry).decode(frame * 2, 2, 16)[9]
+    assert row(records, 1) == frame
+
+
+def test_merge_batches(backend, registry):
+    decoder = BatchDecoder(registry)
+    result = {}
+    for start in (0, 3):
+        buf = b''.join(make_frame(1, i, 0.0, 0) for i in range(start, start + 3))
+        merge_batches(result, decoder.decode(buf, 3, 16, copy=True))
+    assert columns(result[1], registry, 1)["seq"] == list(range(6))
+
+
+def test_frame_batch_read_and_drop_oldest(backend, registry):
+    batch = FrameBatch(registry, max_frames=8)
+    for i in range(20):
+        batch.append(make_frame(1, i, 0.0, 0), i)
+    assert len(batch) == 8
+    records, stamps = batch.read(timeout=0, with_time=True)[1]
+    assert columns(records, registry, 1)["seq"] == list(range(12, 20))
+    assert list(stamps) == list(range(12, 20))
+    assert batch.dropped_frames == 12
+    assert batch.read(timeout=0) == {}
+
+
+def test_frame_batch_partial_read(backend, registry):
+    batch = FrameBatch(registry)
+    for i in range(5):
+        batch.append(make_frame(2, i, 0.0, 0))
+    assert columns(batch.read(max_n=2, timeout=0)[2], registry, 2)["seq"] == [0, 1]
+    assert columns(batch.read(timeout=0)[2], registry, 2)["seq"] == [2, 3, 4]
+
+
+def test_frame_batch_pads_variable_frames(backend):
+    registry = MissionRegistry()
+    registry.register_raw(5)
+    batch = FrameBatch(registry)
+    batch.append(b'?!\x05\x01\x00A!')
+    batch.append(b'?!\x05\x03\x00ABC!')
+    records = batch.read(timeout=0)[5]
+    assert records.shape == (2, 9)
+    assert row(records, 0) == b'?!\x05\x01\x00A!\x00\x00'
+    assert row(records, 1) == b'?!\x05\x03\x00ABC!'
+
+
+def test_unpack_columns_array_field(monkeypatch):
+    monkeypatch.setattr(frame_batch, "np", None)
+    registry = MissionRegistry()
+    schema = registry.register(4, [("xyz", "3h"), ("pad", "2x"), ("name", "2s")])
+    frames = []
+    for i in range(3):
+        frame = bytearray(16)
+        frame[0:2] = b'?!'
+        frame[2] = 4
+        struct.pack_into('<3h2x2s', frame, 3, i, -i, 2 * i, b'ab')
+        frame[-1] = ord('!')
+        frames.append(bytes(frame))
+    records = BatchDecoder(registry).decode(b''.join(frames), 3, 16)[4]
+    result = unpack_columns(records, schema)
+    assert result["xyz"].tolist() == [[0, 0, 0], [1, -1, 2], [2, -2, 4]]
+    assert result["name"] == [b'ab'] * 3
+    assert "pad" not in result
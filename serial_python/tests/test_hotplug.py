@@ -0,0 +1,163 @@
+import os
+import select
+import threading
+import time
+
+import pytest
+
+from dispatcher import Dispatcher
+from hotplug import DeviceWatcher
+from pty_harness import PtyLoopback
+from uart_thread import UartThread__
+
+
+def test_watcher_reports_create_and_delete(tmp_path):
+    path = tmp_path / "ttyUSB0"
+    watcher = DeviceWatcher(str(path), poll_interval=0.05)
+    try:
+        assert not watcher.wait(0.05)
+        path.touch()
+        assert watcher.wait(1.0)
+        assert watcher.last_exists
+        path.unlink()
+        assert watcher.wait(1.0)
+        assert not watcher.last_exists
+        # 同目录下其他设备的事件不唤醒
+        (tmp_path / "ttyUSB1").touch()
+        assert not watcher.wait(0.1)
+    finally:
+        watcher.close()
+
+
+def test_watcher_wake_from_other_thread(tmp_path):
+    watcher = DeviceWatcher(str(tmp_path / "ttyUSB0"))
+    try:
+        threading.Timer(0.02, watcher.wake).start()
+        start = time.monotonic()
+        assert watcher.wait(5.0)
+        assert time.monotonic() - start < 1.0
+    finally:
+        watcher.close()
+
+
+class HotplugUart(UartThread__):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enable_show_read = False
+        self.enable_show_write = False
+        self.disconnected = threading.Event()
+        self.reconnected = threading.Event()
+        self.callback_threads = []
+
+    def _on_serial_disconnected(self):
+        self.disconnected.set()
+
+    def _on_serial_reconnected(self):
+        self.reconnected.set()
+
+    def _on_mission1_received(self, X: int):
+        self.callback_threads.append((X, threading.current_thread().name))
+
+
+def read_frames(fd: int, n_bytes: int, timeout: float = 2.0) -> bytes:
+    data = b''
+    deadline = time.monotonic() + timeout
+    while len(data) < n_bytes and time.monotonic() < deadline:
+        if select.select([fd], [], [], 0.05)[0]:
+            data += os.read(fd, 4096)
+    return data
+
+
+@pytest.fixture
+def device(tmp_path):
+    """指向伪终端slave端的符号链接，删除/重建链接模拟拔出/插入"""
+    loopback = PtyLoopback()
+    link = tmp_path / "ttyUSB0"
+    link.symlink_to(loopback.slave_name)
+    yield loopback, link
+    loopback.close()
+
+
+def test_unplug_and_replug_resumes_threads(device):
+    loopback, link = device
+    uart = HotplugUart(8, 1000)
+    uart.reconnect_backoff_max = 0.1
+    uart.enable_metrics()
+    try:
+        assert uart.init_with_threads(str(link), enable_thread_read=True, enable_thread_write=True)
+        link.unlink()
+        assert uart.disconnected.wait(2.0)
+        assert uart.serial_port is None
+        assert uart.write_thread_suspended
+
+        # 断线期间发送的帧进入写队列，重连后发送
+        uart.mission_send(0x01, 7)
+        assert len(uart.write_buff_queue) == 1
+        link.symlink_to(loopback.slave_name)
+        assert uart.reconnected.wait(2.0)
+        assert read_frames(loopback.master_fd, 8) == b'?!\x01\x07\x00\x00\x00!'
+
+        assert uart.flag_thread_read_uart and uart.flag_thread_write_uart
+        assert uart.reconnect_count == 1
+        stats = uart.get_stats()
+        assert stats["disconnects"] == 1
+        assert stats["reconnects"] == 1
+        assert stats["online"]
+    finally:
+        uart.close()
+
+
+def test_io_error_triggers_reconnect_and_drop_policy(device):
+    loopback, link = device
+    uart = HotplugUart(8, 1000, reconnect_pending=UartThread__.PENDING_DROP)
+    try:
+        assert uart.init_with_threads(str(link))
+        # 写队列中尚未发送的帧
+        uart.write_buff_queue.put(b'?!\x01\x01\x00\x00\x00!')
+
+        # 读写线程报告I/O错误，设备仍在时立即重连，drop策略丢弃未发送的帧
+        uart._on_io_error(OSError(5, "Input/output error"))
+        assert uart.reconnected.wait(2.0)
+        assert uart.disconnected.is_set()
+        assert len(uart.write_buff_queue) == 0
+        assert not uart.io_error.is_set()
+    finally:
+        uart.close()
+
+
+def test_no_auto_reconnect(device):
+    loopback, link = device
+    uart = HotplugUart(8, 1000, auto_reconnect=False)
+    try:
+        assert uart.init_with_threads(str(link), enable_thread_read=True)
+        link.unlink()
+        assert uart.disconnected.wait(2.0)
+        link.symlink_to(loopback.slave_name)
+        assert not uart.reconnected.wait(0.3)
+        assert not uart.flag_thread_read_uart
+    finally:
+        uart.close()
+
+
+def test_dispatcher_survives_reconnect(device):
+    loopback, link = device
+    uart = HotplugUart(8, 1000, dispatcher=Dispatcher(Dispatcher.MODE_THREAD))
+    uart.reconnect_backoff_max = 0.1
+    try:
+        assert uart.init_with_threads(str(link), enable_thread_read=True)
+        link.unlink()
+        assert uart.disconnected.wait(2.0)
+        link.symlink_to(loopback.slave_name)
+        assert uart.reconnected.wait(2.0)
+
+        # 重连后回调仍由分发线程执行
+        assert uart.dispatcher.running
+        os.write(loopback.master_fd, b'?!\x01\x03\x00\x00\x00!')
+        deadline = time.monotonic() + 2.0
+        while not uart.callback_threads and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert uart.dispatcher.wait_idle(2.0)
+        assert uart.callback_threads == [(3, "Dispatch-0")]
+    finally:
+        uart.close()
+    assert not uart.dispatcher.running
@@ -0,0 +1,94 @@
+import random
+import threading
+import time
+
+from metrics import Histogram, MetricsExporter, UartMetrics
+from pty_harness import PtyLoopback, FakeMcu
+from uart_thread import UartThread__
+
+
+def test_histogram_small_values_are_exact():
+    histogram = Histogram()
+    for value in range(16):
+        histogram.record(value)
+    assert histogram.count == 16
+    assert (histogram.min, histogram.max) == (0, 15)
+    assert histogram.percentile(0.5) == 7
+    assert histogram.percentile(1.0) == 15
+
+
+def test_histogram_relative_error():
+    rng = random.Random(1)
+    values = sorted(rng.randrange(1, 10 ** 9) for _ in range(5000))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        estimate = histogram.percentile(q)
+        assert exact <= estimate <= exact * 1.125 + 1
+    assert histogram.percentile(1.0) == values[-1]
+
+
+def test_histogram_snapshot_and_reset():
+    histogram = Histogram()
+    histogram.record(-5)
+    histogram.record(3000)
+    snapshot = histogram.snapshot(1000.0)
+    assert snapshot["count"] == 2
+    assert snapshot["min"] == 0.0
+    assert snapshot["max"] == 3.0
+    assert snapshot["avg"] == 1.5
+    histogram.reset()
+    assert histogram.snapshot()["count"] == 0
+    assert histogram.percentile(0.5) == 0
+
+
+def test_uart_metrics_snapshot_lists_received_missions():
+    metrics = UartMetrics()
+    metrics.frames_in[0x01] += 3
+    metrics.send_interval_ns.record(2000)
+    snapshot = metrics.snapshot()
+    assert snapshot["frames_in"] == {0x01: 3}
+    assert snapshot["send_interval_us"]["max"] == 2.0
+
+
+def test_metrics_exporter_delivers_snapshots():
+    snapshots = []
+    got = threading.Event()
+
+    def callback(stats):
+        snapshots.append(stats)
+        got.set()
+
+    exporter = MetricsExporter(lambda: {"n": len(snapshots)}, callback, interval=0.01)
+    exporter.start()
+    assert got.wait(2.0)
+    exporter.stop()
+    assert snapshots[0] == {"n": 0}
+
+
+def test_get_stats_counts_received_frames():
+    loopback = PtyLoopback()
+    mcu = FakeMcu(loopback.master_fd, frame_length=8, baudrate=921600, n_frames=50)
+    uart = UartThread__(8, 100)
+    uart.enable_show_read = False
+    uart.enable_metrics()
+    try:
+        assert uart.init_with_threads(loopback.slave_name, enable_thread_read=True, baudrate=921600)
+        mcu.start()
+        for _ in range(200):
+            if uart.metrics.frames_in[0x01] >= 50:
+                break
+            time.sleep(0.01)
+        mcu.stop()
+        stats = uart.get_stats()
+    finally:
+        uart.close()
+        loopback.close()
+
+    assert stats["metrics_enabled"]
+    assert stats["bytes_in"] == 50 * 8
+    assert stats["frames_in"] == {0x01: 50}
+    assert stats["read_to_callback_us"]["count"] == 50
+    assert stats["resync_dropped_bytes"] == 0
@@ -0,0 +1,98 @@
+import struct
+
+import pytest
+
+from mission_schema import MissionRegistry
+
+
+def empty_frame(length: int = 16) -> bytearray:
+    frame = bytearray(length)
+    frame[0:2] = b'?!'
+    frame[-1] = ord('!')
+    return frame
+
+
+@pytest.fixture
+def registry():
+    registry = MissionRegistry()
+    registry.register(0x10, [("seq", "H"), ("value", "f"), ("flag", "?")], "status")
+    registry.register_raw(0x20, "blob")
+    return registry
+
+
+def test_encode_decode_round_trip(registry):
+    frame = empty_frame()
+    schema = registry.encode_into(frame, "status", 7, 1.5, flag=True)
+    assert frame[2] == 0x10
+    assert frame[3:10] == struct.pack('<Hf?', 7, 1.5, True)
+    assert frame[-1] == ord('!')
+    assert registry.decode(frame) == (schema, (7, 1.5, True))
+    assert schema.decode_dict(frame) == {"seq": 7, "value": 1.5, "flag": True}
+
+
+def test_keyword_errors(registry):
+    frame = empty_frame()
+    with pytest.raises(TypeError):
+        registry.encode_into(frame, "status", 7, value=1.5)
+    with pytest.raises(TypeError):
+        registry.encode_into(frame, "status", 7, 1.5, flag=True, extra=1)
+
+
+def test_frame_too_short(registry):
+    with pytest.raises(ValueError):
+        registry.encode_into(empty_frame(8), 0x10, 7, 1.5, True)
+    frame = empty_frame()
+    registry.encode_into(frame, 0x10, 7, 1.5, True)
+    assert registry.decode(bytes(frame[:10])) is None
+    assert not registry.dispatch(bytes(frame[:10]))
+
+
+def test_raw_payload(registry):
+    frame = empty_frame(9)
+    registry.encode_into(frame, "blob", b'abcde')
+    schema, (payload,) = registry.decode(frame)
+    assert schema.name == "blob"
+    assert payload == b'abcde'
+
+
+def test_dispatch_calls_handler(registry):
+    received = []
+    registry.set_handler("status", lambda *values, t_ns: received.append((values, t_ns)), with_time=True)
+    frame = empty_frame()
+    registry.encode_into(frame, "status", 1, 2.0, False)
+    assert registry.dispatch(bytes(frame), t_ns=123)
+    assert received == [((1, 2.0, False), 123)]
+
+
+def test_unknown_mission_is_not_dispatched(registry):
+    frame = empty_frame()
+    frame[2] = 0x99
+    assert registry.decode(frame) is None
+    assert not registry.dispatch(frame)
+    assert 0x99 not in registry and "status" in registry
+
+
+def test_reregister_keeps_handler(registry):
+    received = []
+    registry.set_handler(0x10, lambda seq: received.append(seq))
+    registry.register(0x10, [("seq", "I")], "status2")
+    assert "status" not in registry
+    frame = empty_frame()
+    registry.encode_into(frame, "status2", 70000)
+    registry.dispatch(frame)
+    assert received == [70000]
+
+
+def test_clock_converts_mcu_time():
+    registry = MissionRegistry()
+    received = []
+    registry.register(0x01, [("mcu_time", "I"), ("x", "h")],
+                      handler=lambda mcu_time, x, t_ns: received.append(t_ns), with_time=True)
+    registry.set_clock(lambda mcu_time: mcu_time * 1000 if mcu_time else None)
+    frame = empty_frame(10)
+    registry.encode_into(frame, 0x01, 5, -1)
+    registry.dispatch(frame, t_ns=1)
+    registry.encode_into(frame, 0x01, 0, -1)
+    registry.dispatch(frame, t_ns=2)
+    # 尚未同步（返回None）时使用接收时间
+    assert received == [5000, 2]
@@ -0,0 +1,121 @@
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from native_serial import NativeSerial
+from pty_harness import PtyLoopback, FakeMcu
+from uart import Uart
+from uart_thread import UartThread__
+
+
+@pytest.fixture
+def loopback():
+    loopback = PtyLoopback()
+    yield loopback
+    loopback.close()
+
+
+def test_read_write(loopback):
+    port = NativeSerial(loopback.slave_name, 921600, timeout=1.0)
+    try:
+        assert port.is_open and port.fileno() >= 0
+        assert port.write(bytearray(b'?!\x01\x02\x03\x04\x05!')) == 8
+        assert select.select([loopback.master_fd], [], [], 1.0)[0]
+        assert os.read(loopback.master_fd, 64) == b'?!\x01\x02\x03\x04\x05!'
+
+        os.write(loopback.master_fd, b'abcdef')
+        deadline = time.monotonic() + 1.0
+        while port.in_waiting < 6 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert port.in_waiting == 6
+        buf = bytearray(4)
+        assert port.readinto(buf) == 4 and buf == b'abcd'
+        assert port.read(2) == b'ef'
+    finally:
+        port.close()
+    assert not port.is_open
+    port.close()
+
+
+def test_read_timeout_returns_partial_data(loopback):
+    port = NativeSerial(loopback.slave_name, timeout=0.05)
+    try:
+        os.write(loopback.master_fd, b'ab')
+        start = time.monotonic()
+        assert port.read(8) == b'ab'
+        assert time.monotonic() - start >= 0.04
+        port.timeout = 0
+        assert port.read(8) == b''
+    finally:
+        port.close()
+
+
+def test_read_waits_for_late_bytes(loopback):
+    port = NativeSerial(loopback.slave_name, timeout=1.0)
+    try:
+        threading.Timer(0.02, os.write, (loopback.master_fd, b'5678')).start()
+        os.write(loopback.master_fd, b'1234')
+        assert port.read(8) == b'12345678'
+    finally:
+        port.close()
+
+
+def test_raw_mode(loopback):
+    port = NativeSerial(loopback.slave_name)
+    try:
+        # 原始模式下\r、\n与控制字符原样传输
+        data = bytes(range(32)) + b'\r\n\x7f'
+        os.write(loopback.master_fd, data)
+        assert port.read(len(data)) == data
+    finally:
+        port.close()
+
+
+def test_uart_native_backend(loopback):
+    received = []
+    done = threading.Event()
+
+    class NativeUart(UartThread__):
+        def _on_mission1_received(self, X: int):
+            received.append(X)
+            if len(received) == 100:
+                done.set()
+
+    mcu = FakeMcu(loopback.master_fd, 8, 921600, n_frames=100)
+    uart = NativeUart(8, 100, backend=Uart.BACKEND_NATIVE)
+    uart.enable_show_read = False
+    try:
+        assert uart.init_with_threads(loopback.slave_name, enable_thread_read=True, baudrate=921600)
+        assert isinstance(uart.serial_port, NativeSerial)
+        mcu.start()
+        assert done.wait(5.0)
+        assert uart.get_stats()["backend"] == Uart.BACKEND_NATIVE
+    finally:
+        mcu.stop()
+        uart.close()
+    assert received == list(range(100))
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        Uart(8, backend="ftdi")
+
+
+def test_uart_does_not_import_native_backend():
+    # native_serial依赖termios，导入uart时不应加载，否则Windows上无法使用pyserial后端
+    code = "import sys, uart; print('native_serial' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == "False"
+
+
+def test_native_backend_needs_posix(monkeypatch):
+    monkeypatch.setattr(os, "name", "nt")
+    with pytest.raises(ValueError, match="POSIX"):
+        Uart(8, backend=Uart.BACKEND_NATIVE)
+    Uart(8)
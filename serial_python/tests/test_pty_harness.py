@@ -0,0 +1,65 @@
+import os
+import struct
+import threading
+import time
+
+import pytest
+
+from pty_harness import PtyLoopback, FakeMcu
+from uart_thread import UartThread__
+
+
+class Recorder(UartThread__):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enable_show_read = False
+        self.enable_show_write = False
+        self.received = []
+        self.done = threading.Event()
+        self.expected = 0
+
+    def _on_mission1_received(self, X: int):
+        self.received.append(X)
+        if len(self.received) >= self.expected:
+            self.done.set()
+
+
+@pytest.fixture
+def loopback():
+    loopback = PtyLoopback()
+    yield loopback
+    loopback.close()
+
+
+def test_fake_mcu_frames_reach_callbacks(loopback):
+    mcu = FakeMcu(loopback.master_fd, frame_length=8, baudrate=921600, n_frames=200)
+    uart = Recorder(8, 100)
+    uart.expected = 200
+    assert uart.init_with_threads(loopback.slave_name, enable_thread_read=True, baudrate=921600)
+    mcu.start()
+    try:
+        assert uart.done.wait(5.0)
+    finally:
+        report = mcu.stop()
+        uart.close()
+
+    assert uart.received == list(range(200))
+    assert report["tx_frames"] == 200
+    assert report["tx_bytes"] == 200 * 8
+    assert len(report["send_ns"]) == 200
+
+
+def test_fake_mcu_counts_host_frames(loopback):
+    mcu = FakeMcu(loopback.master_fd, frame_length=8)
+    mcu.start()
+    frames = b''.join(b'?!\x01' + struct.pack('<I', i) + b'!' for i in range(10))
+    # 半帧分两次写入，FakeMcu按帧尾对齐
+    os.write(loopback.slave_fd, frames[:20])
+    time.sleep(0.05)
+    os.write(loopback.slave_fd, frames[20:] + b'\x00\x00\x80\x7f')
+    time.sleep(0.1)
+    report = mcu.stop()
+
+    assert list(report["rx_seq"]) == list(range(10))
+    assert report["rx_bytes"] == len(frames) + 4
+    assert report["rx_vofa_samples"] == 1
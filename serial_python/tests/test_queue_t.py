@@ -0,0 +1,207 @@
+import random
+import time
+
+import pytest
+
+from queue_t import ByteRingBuffer, LaneQueue, WriteLane
+
+
+def wrapped(capacity: int = 8, head: int = 6) -> ByteRingBuffer:
+    """head位于末尾附近、下一次写入会回绕的缓冲区"""
+    ring = ByteRingBuffer(capacity)
+    ring.push_bytes(bytes(head))
+    ring.push_bytes(b'x')
+    ring.skip(head)
+    return ring
+
+
+def test_push_wraps_around():
+    ring = wrapped()
+    ring.push_bytes(b'abcd')
+    assert ring.head == 6
+    assert len(ring) == 5
+    assert [ring[i] for i in range(5)] == list(b'xabcd')
+    assert ring.buffer[:3] == b'bcd'
+
+
+def test_linear_and_peek_unwrap():
+    ring = wrapped()
+    ring.push_bytes(b'abcd')
+    assert bytes(ring.peek()) == b'xabcd'
+    assert ring.head == 0
+    buf, start, end = ring.linear()
+    assert bytes(buf[start:end]) == b'xabcd'
+    assert bytes(ring.peek(2)) == b'xa'
+
+
+def test_pop_into_across_the_end():
+    ring = wrapped()
+    ring.push_bytes(b'abcd')
+    out = bytearray(4)
+    assert ring.pop_into(out) == 4
+    assert out == b'xabc'
+    assert ring.pop() == ord('d')
+    assert ring.is_empty() and ring.head == 0
+
+
+def test_matches_reference_under_random_traffic():
+    rng = random.Random(2)
+    ring = ByteRingBuffer(37)
+    reference = bytearray()
+    for _ in range(2000):
+        if rng.random() < 0.6:
+            data = bytes(rng.randrange(256) for _ in range(rng.randrange(20)))
+            ring.push_bytes(data)
+            reference += data
+            del reference[:max(0, len(reference) - 37)]
+        else:
+            out = bytearray(rng.randrange(20))
+            n = ring.pop_into(out)
+            assert out[:n] == reference[:n]
+            del reference[:n]
+        assert len(ring) == len(reference)
+    assert bytes(ring.peek()) == bytes(reference)
+
+
+@pytest.mark.parametrize("overflow, expected, dropped", [
+    (ByteRingBuffer.OVERFLOW_DROP_OLDEST, b'cdefgh', 2),
+    (ByteRingBuffer.OVERFLOW_DROP_NEWEST, b'abcdef', 2),
+])
+def test_overflow_policies(overflow, expected, dropped):
+    ring = ByteRingBuffer(6, overflow)
+    ring.push_bytes(b'abcd')
+    ring.push_bytes(b'efgh')
+    assert bytes(ring.peek()) == expected
+    assert ring.dropped_bytes == dropped
+    assert ring.overflow_count == 1
+
+
+def test_overflow_raise_keeps_data():
+    ring = ByteRingBuffer(4, ByteRingBuffer.OVERFLOW_RAISE)
+    ring.push_bytes(b'ab')
+    with pytest.raises(OverflowError):
+        ring.push_bytes(b'cde')
+    assert bytes(ring.peek()) == b'ab'
+
+
+def test_push_larger_than_capacity_keeps_newest():
+    ring = wrapped()
+    ring.push_bytes(bytes(range(20)))
+    assert bytes(ring.peek()) == bytes(range(12, 20))
+    assert ring.dropped_bytes == 12 + 1
+
+
+def mission_frame(mission_id: int, i: int = 0, length: int = 8) -> bytes:
+    return b'?!' + bytes([mission_id]) + bytes([i & 0xFF]) * (length - 4) + b'!'
+
+
+def control_lanes(**telemetry) -> LaneQueue:
+    return LaneQueue([
+        WriteLane("control", strict=True, missions=[0x01]),
+        WriteLane("telemetry", **telemetry),
+    ])
+
+
+def test_strict_lane_preempts_backlog():
+    queue = control_lanes()
+    for i in range(100):
+        queue.put(mission_frame(0x10, i))
+    queue.put(mission_frame(0x01, 1))
+
+    lane, batch = queue.get_lane_batch(8, timeout=0)
+    assert lane.name == "control"
+    assert batch == [mission_frame(0x01, 1)]
+    assert queue.get_lane_batch(1, timeout=0)[0].name == "telemetry"
+
+
+def test_strict_lane_ignores_send_pacing():
+    queue = control_lanes()
+    queue.put(mission_frame(0x10))
+    paced_until_ns = time.monotonic_ns() + 10 ** 9
+    assert queue.get_lane_batch(1, timeout=0, paced_until_ns=paced_until_ns) == (None, [])
+
+    queue.put(mission_frame(0x01))
+    lane, batch = queue.get_lane_batch(1, timeout=0, paced_until_ns=paced_until_ns)
+    assert lane.name == "control" and batch == [mission_frame(0x01)]
+    assert queue.strict_pending() is False
+
+
+def test_fair_lanes_share_bytes_by_weight():
+    queue = LaneQueue([WriteLane("a", share=3, missions=[0x0A]), WriteLane("b", share=1)])
+    for i in range(100):
+        queue.put(mission_frame(0x0A, i))
+        queue.put(mission_frame(0x0B, i))
+    taken = [queue.get_lane_batch(1, timeout=0)[0].name for _ in range(40)]
+    assert taken.count("a") == 30
+
+
+def test_rate_limited_lane():
+    queue = control_lanes(rate_hz=10, burst=2)
+    for i in range(5):
+        queue.put(mission_frame(0x10, i))
+    assert len(queue.get_lane_batch(8, timeout=0)[1]) == 2
+    now_ns = time.monotonic_ns()
+    assert queue.get_lane_batch(1, timeout=0) == (None, [])
+    assert queue.next_ready_ns(now_ns) > now_ns + 50_000_000
+
+
+def test_conflating_lane_keeps_latest_value_in_place():
+    queue = LaneQueue([WriteLane("setpoints", conflate=True)])
+    queue.put(mission_frame(0x20, 1))
+    queue.put(mission_frame(0x21, 1))
+    queue.put(mission_frame(0x20, 2))
+    assert queue.get_batch(8, timeout=0) == [mission_frame(0x20, 2), mission_frame(0x21, 1)]
+    assert queue.superseded_frames == 1
+
+
+def test_keyed_put_replaces_pending_frame():
+    queue = LaneQueue.single(8)
+    queue.put(mission_frame(0x20, 1), key="left")
+    queue.put(mission_frame(0x20, 2), key="right")
+    queue.put(mission_frame(0x20, 3), key="left")
+    queue.put(mission_frame(0x20, 4))
+    assert len(queue) == 3
+    assert queue.get_batch(1, timeout=0) == [mission_frame(0x20, 3)]
+
+    # 已取出的键重新入队排到队尾
+    queue.put(mission_frame(0x20, 5), key="left")
+    assert queue.get_batch(8, timeout=0) == [mission_frame(0x20, 2), mission_frame(0x20, 4),
+                                             mission_frame(0x20, 5)]
+    assert queue.lane("default").stats()["superseded"] == 1
+
+
+def test_put_front_drops_frames_with_newer_value():
+    queue = LaneQueue([WriteLane("setpoints", conflate=True)])
+    sent = [mission_frame(0x20, 1), mission_frame(0x21, 1)]
+    queue.put(mission_frame(0x20, 2))
+    assert queue.put_front(sent) == 1
+    assert queue.get_batch(8, timeout=0) == [mission_frame(0x21, 1), mission_frame(0x20, 2)]
+    assert queue.superseded_frames == 1
+
+
+def test_lane_overflow_is_per_lane():
+    queue = control_lanes(max_frames=3)
+    queue.put(mission_frame(0x01, 0))
+    for i in range(5):
+        queue.put(mission_frame(0x10, i))
+    assert queue.lane("telemetry").dropped_frames == 2
+    assert queue.get_batch(1, timeout=0) == [mission_frame(0x01, 0)]
+    assert queue.get_batch(8, timeout=0) == [mission_frame(0x10, i) for i in range(2, 5)]
+
+
+def test_put_front_restores_order():
+    queue = control_lanes()
+    frames = [mission_frame(0x10, i) for i in range(3)]
+    queue.put(mission_frame(0x10, 9))
+    assert queue.put_front(frames) == 3
+    assert queue.get_batch(8, timeout=0) == frames + [mission_frame(0x10, 9)]
+
+
+def test_single_lane_overflow_policies():
+    queue = LaneQueue.single(2, LaneQueue.OVERFLOW_DROP_NEWEST)
+    assert queue.put(mission_frame(0x10, 0)) and queue.put(mission_frame(0x10, 1))
+    assert not queue.put(mission_frame(0x10, 2))
+    assert queue.get_batch(8, timeout=0) == [mission_frame(0x10, 0), mission_frame(0x10, 1)]
+    assert queue.dropped_frames == 1
+    with pytest.raises(ValueError):
+        WriteLane("default", overflow="drop_all")
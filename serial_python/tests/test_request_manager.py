@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from mission_schema import MissionRegistry
+from request_manager import RequestManager
+
+REQUEST = 0x30
+REPLY = 0x31
+
+
+@pytest.fixture
+def registry():
+    registry = MissionRegistry()
+    registry.register(REQUEST, [("seq", "B"), ("cmd", "H")], "get")
+    registry.register(REPLY, [("seq", "B"), ("value", "h")], "reply")
+    return registry
+
+
+def make_frame(registry, mission, *args) -> bytes:
+    frame = bytearray(b'?!' + bytes(6) + b'!')
+    registry.encode_into(frame, mission, *args)
+    return bytes(frame)
+
+
+@pytest.fixture
+def manager(registry):
+    sent = []
+    manager = RequestManager(registry, lambda mission, args, kwargs: make_frame(registry, mission, *args),
+                             sent.append, window=2, timeout=0.1, retries=2)
+    manager.sent = sent
+    yield manager
+    manager.close()
+
+
+def seq_of(frame: bytes) -> int:
+    return frame[3]
+
+
+def test_reply_completes_future(manager, registry):
+    future = manager.submit("get", (7,))
+    assert len(manager.sent) == 1
+    assert registry.decode(manager.sent[0])[1] == (0, 7)
+
+    assert manager.on_frame(make_frame(registry, "reply", 0, -5))
+    assert future.result(timeout=0) == (-5,)
+    assert manager.stats()["rtt_us"]["count"] == 1
+    # 重复的应答不再匹配
+    assert not manager.on_frame(make_frame(registry, "reply", 0, -5))
+    assert manager.unmatched_replies == 1
+
+
+def test_retransmit_then_timeout(manager):
+    future = manager.submit("get", (1,))
+    start_ns = time.monotonic_ns()
+    timeout_ns = 100_000_000
+
+    assert manager.expire(start_ns) is not None
+    assert len(manager.sent) == 1
+    for attempt in range(2):
+        manager.expire(start_ns + (attempt + 2) * timeout_ns)
+        # 只重发这一帧，序号不变
+        assert manager.sent[-1] == manager.sent[0]
+    assert len(manager.sent) == 3
+    assert not future.done()
+
+    assert manager.expire(start_ns + 10 * timeout_ns) is None
+    with pytest.raises(TimeoutError):
+        future.result(timeout=0)
+    stats = manager.stats()
+    assert (stats["retransmits"], stats["timeouts"], stats["in_flight"]) == (2, 1, 0)
+
+
+def test_reply_after_retransmit_is_not_timed(manager, registry):
+    future = manager.submit("get", (1,))
+    manager.expire(time.monotonic_ns() + 200_000_000)
+    assert manager.on_frame(make_frame(registry, "reply", 0, 3))
+    assert future.result(timeout=0) == (3,)
+    assert manager.stats()["rtt_us"]["count"] == 0
+
+
+def test_window_queues_requests(manager, registry):
+    futures = [manager.submit("get", (i,)) for i in range(3)]
+    assert [seq_of(frame) for frame in manager.sent] == [0, 1]
+    assert manager.stats()["backlog"] == 1
+
+    # 应答可以乱序，空出的位置让排队的请求以新序号发送
+    assert manager.on_frame(make_frame(registry, "reply", 1, 11))
+    assert [seq_of(frame) for frame in manager.sent] == [0, 1, 2]
+    assert futures[1].result(timeout=0) == (11,)
+    assert not futures[0].done()
+
+
+def test_close_fails_pending(manager):
+    futures = [manager.submit("get", (i,)) for i in range(3)]
+    manager.close(ConnectionError("unplugged"))
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result(timeout=0)
+    assert manager.submit("get", (0,)).cancelled()
+
+
+def test_request_mission_needs_seq_field(registry):
+    registry.register(0x40, [("cmd", "H")], "no_seq")
+    manager = RequestManager(registry, lambda *a: b'', lambda frame: None, window=300)
+    with pytest.raises(ValueError):
+        manager.submit("no_seq")
+    with pytest.raises(ValueError):
+        # 窗口超过B序号的取值范围
+        manager.submit("get", (1,))
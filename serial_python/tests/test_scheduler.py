@@ -0,0 +1,110 @@
+import os
+import select
+import time
+
+import pytest
+
+from pty_harness import PtyLoopback
+from scheduler import DeadlineScheduler, advance_deadline
+from uart_thread import UartThread__
+
+MS = 1_000_000
+
+
+def test_advance_on_time():
+    # 执行耗时不影响下一个截止时间
+    assert advance_deadline(10 * MS, 13 * MS, 5 * MS) == (15 * MS, 0)
+    assert advance_deadline(10 * MS, 15 * MS, 5 * MS) == (15 * MS, 0)
+    # 合并发送的帧占用多个时隙
+    assert advance_deadline(10 * MS, 11 * MS, 5 * MS, slots=3) == (25 * MS, 0)
+
+
+def test_advance_skip_missed_slots():
+    # 15、20、25已过，跳到30
+    assert advance_deadline(10 * MS, 27 * MS, 5 * MS) == (30 * MS, 3)
+    # 正好落在时隙上的截止时间不算错过
+    assert advance_deadline(10 * MS, 25 * MS, 5 * MS) == (25 * MS, 2)
+
+
+def test_advance_catch_up_is_bounded():
+    policy = DeadlineScheduler.POLICY_CATCH_UP
+    assert advance_deadline(10 * MS, 27 * MS, 5 * MS, policy=policy) == (25 * MS, 2)
+    assert advance_deadline(10 * MS, 27 * MS, 5 * MS, policy=policy, max_catch_up=2) == (20 * MS, 1)
+    assert advance_deadline(10 * MS, 27 * MS, 5 * MS, policy=policy, max_catch_up=5) == (15 * MS, 0)
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        DeadlineScheduler(policy="burst")
+    scheduler = DeadlineScheduler()
+    with pytest.raises(ValueError):
+        scheduler.add("a", 0.01, lambda: None, policy="burst")
+    with pytest.raises(ValueError):
+        scheduler.add("a", 0, lambda: None)
+
+
+def test_run_due_advances_each_task():
+    calls = []
+    scheduler = DeadlineScheduler()
+    fast = scheduler.add("fast", 0.01, lambda: calls.append("fast"))
+    slow = scheduler.add("slow", 0.03, lambda: calls.append("slow"), phase_s=0.005)
+    start_ns = fast.next_ns
+    assert scheduler.next_deadline_ns() == start_ns
+
+    assert scheduler.run_due(start_ns) == 1
+    assert calls == ["fast"]
+    assert fast.next_ns == start_ns + 10 * MS
+    assert scheduler.next_deadline_ns() == slow.next_ns
+
+    assert scheduler.remove("slow")
+    assert not scheduler.remove("slow")
+    assert scheduler.next_deadline_ns() == fast.next_ns
+    assert scheduler.remove("fast")
+    assert scheduler.next_deadline_ns() is None
+
+
+def test_run_due_counts_errors_and_skips():
+    def fail():
+        raise RuntimeError("boom")
+
+    scheduler = DeadlineScheduler()
+    task = scheduler.add("fail", 0.001, fail)
+    task.next_ns -= 10 * MS
+    assert scheduler.run_due() == 1
+    stats = scheduler.stats()["tasks"]["fail"]
+    assert (stats["runs"], stats["errors"]) == (1, 1)
+    assert stats["skipped"] >= 9
+    assert task.next_ns > time.monotonic_ns() - MS
+
+
+def test_sleep_until_and_pace():
+    scheduler = DeadlineScheduler(spin_us=500)
+    deadline_ns = time.monotonic_ns() + 5 * MS
+    assert scheduler.sleep_until(deadline_ns) >= deadline_ns
+
+    assert scheduler.pace(deadline_ns, deadline_ns + 12 * MS, 5 * MS) == deadline_ns + 15 * MS
+    stats = scheduler.stats()
+    assert stats["pacing_skipped"] == 2
+    assert stats["pacing_lateness_us"]["count"] == 1
+
+
+def test_schedule_mission():
+    loopback = PtyLoopback()
+    uart = UartThread__(8, 100)
+    uart.enable_show_write = False
+    values = iter((i,) for i in range(5))
+    try:
+        assert uart.init_with_threads(loopback.slave_name, enable_thread_write=True)
+        task = uart.schedule_mission(0x01, 0.01, lambda: next(values, None))
+        data = b''
+        deadline = time.monotonic() + 2.0
+        while len(data) < 40 and time.monotonic() < deadline:
+            if select.select([loopback.master_fd], [], [], 0.05)[0]:
+                data += os.read(loopback.master_fd, 4096)
+        assert uart.unschedule_mission(0x01)
+    finally:
+        uart.close()
+        loopback.close()
+
+    assert data == b''.join(b'?!\x01' + bytes([i]) + b'\x00\x00\x00!' for i in range(5))
+    assert task.runs >= 5 and task.errors == 0
@@ -0,0 +1,145 @@
+import multiprocessing
+import struct
+import time
+
+import pytest
+
+from mission_schema import MissionRegistry
+from pty_harness import PtyLoopback, FakeMcu
+from shm_ring import ShmRing
+from uart_process import UartProcess
+
+
+@pytest.fixture
+def ring():
+    ring = ShmRing(capacity=4, max_length=8)
+    yield ring
+    ring.close()
+
+
+def records(ring: ShmRing, max_records: int = 0) -> list:
+    view, n = ring.peek(max_records)
+    result = [(timestamp_ns, bytes(data)) for timestamp_ns, data in ring.iter_records(view, n)]
+    view.release()
+    ring.release(n)
+    return result
+
+
+def test_records_are_visible_after_publish(ring):
+    assert ring.push(b'abc', 1)
+    assert ring.available() == 0
+    ring.publish()
+    assert ring.wait(0)
+    assert records(ring) == [(1, b'abc')]
+    assert not ring.wait(0.01)
+
+
+def test_full_ring_drops_newest_and_oversize(ring):
+    for i in range(4):
+        assert ring.push(bytes([i]), i)
+    assert not ring.push(b'x')
+    assert not ring.push(b'123456789')
+    ring.publish()
+    stats = ring.stats()
+    assert (stats["depth"], stats["dropped"], stats["oversize"]) == (4, 1, 1)
+
+    assert records(ring, 2) == [(0, b'\x00'), (1, b'\x01')]
+    assert ring.free() == 2
+
+
+def test_peek_stops_at_wraparound(ring):
+    for i in range(3):
+        ring.push(bytes([i]), i)
+    ring.publish()
+    records(ring)
+    for i in range(3, 7):
+        ring.push(bytes([i]), i)
+    ring.publish()
+
+    # 第3条记录位于缓冲区末尾，回绕后的记录下次返回
+    assert records(ring) == [(3, b'\x03')]
+    assert records(ring) == [(i, bytes([i])) for i in range(4, 7)]
+
+
+def _produce(ring: ShmRing, n: int):
+    for i in range(n):
+        while not ring.push(struct.pack('<I', i), i):
+            ring.publish()
+        ring.publish()
+    ring.counters[0] = n
+    ring.wake()
+
+
+def test_cross_process_order():
+    ring = ShmRing(capacity=16, max_length=8)
+    ctx = multiprocessing.get_context("fork")
+    producer = ctx.Process(target=_produce, args=(ring, 1000))
+    producer.start()
+    received = []
+    deadline = time.monotonic() + 10.0
+    while len(received) < 1000 and time.monotonic() < deadline:
+        if ring.wait(0.1):
+            received.extend(struct.unpack('<I', data)[0] for _, data in records(ring))
+    producer.join(5.0)
+    assert ring.counters[0] == 1000
+    ring.close()
+
+    assert received == list(range(1000))
+
+
+
+def _push_and_close(ring: ShmRing):
+    ring.push(b'child', 1)
+    ring.publish()
+    ring.close()
+
+
+def test_forked_child_close_keeps_shared_memory():
+    ring = ShmRing(capacity=4, max_length=8)
+    child = multiprocessing.get_context("fork").Process(target=_push_and_close, args=(ring,))
+    child.start()
+    child.join(5.0)
+    assert child.exitcode == 0
+
+    # 子进程关闭继承的对象不删除共享内存，创建者仍可按名字打开并读取
+    attached = ShmRing(name=ring.shm.name)
+    attached.close()
+    assert ring.wait(1.0)
+    assert records(ring) == [(1, b'child')]
+    ring.close()
+
+def test_uart_process_round_trip():
+    loopback = PtyLoopback()
+    mcu = FakeMcu(loopback.master_fd, frame_length=8, baudrate=921600, n_frames=100)
+    registry = MissionRegistry.default()
+    received = []
+    registry.set_handler(0x01, received.append)
+    uart = UartProcess(8, mission_registry=registry)
+    try:
+        assert uart.open(loopback.slave_name, 921600)
+        mcu.start()
+        deadline = time.monotonic() + 5.0
+        while len(received) < 100 and time.monotonic() < deadline:
+            uart.process_received(timeout=0.1)
+        for i in range(10):
+            assert uart.mission_send(0x01, 1000 + i)
+        time.sleep(0.2)
+        stats = uart.get_stats()
+    finally:
+        report = mcu.stop()
+        uart.close()
+        loopback.close()
+
+    assert received == list(range(100))
+    assert stats["frames_in"] == 100
+    assert stats["frames_out"] == 10
+    assert list(report["rx_seq"]) == [1000 + i for i in range(10)]
+
+
+def test_uart_process_rejects_sample_streams():
+    uart = UartProcess(8)
+    with pytest.raises(ValueError, match="UartThread__"):
+        uart.enable_just_float_receive(channels=2)
+    with pytest.raises(ValueError, match="UartThread__"):
+        uart.enable_telemetry_receive(channels=2)
+    assert uart.just_float is None and uart.telemetry is None
@@ -0,0 +1,154 @@
+import math
+import random
+
+import pytest
+
+import telemetry
+from frame_aligner import FrameAligner, MixedAligner
+from telemetry import (KIND_ABSOLUTE, KIND_DELTA, KIND_DELTA2, KIND_KEY, KIND_KEY2,
+                       TelemetryDecoder, TelemetryEncoder)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if telemetry.np is None:
+            pytest.skip("numpy is not installed")
+        # 小块也走向量化路径
+        monkeypatch.setattr(telemetry, "_NUMPY_MIN_VALUES", 1)
+    else:
+        monkeypatch.setattr(telemetry, "np", None)
+    return request.param
+
+
+def signal(n: int, channels: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [[(c + 1) * math.sin(i / 40 + c) + rng.gauss(0, 0.002) for c in range(channels)]
+            for i in range(n)]
+
+
+def packets(stream: bytes) -> list:
+    """按包头中的负载长度切分连续的包"""
+    result = []
+    pos = 0
+    while pos < len(stream):
+        length = telemetry.PACKET_HEADER.unpack_from(stream, pos)[-1]
+        end = pos + telemetry.PACKET_OVERHEAD + length
+        result.append(stream[pos:end])
+        pos = end
+    return result
+
+
+def decode_all(decoder, stream: bytes) -> list:
+    samples = []
+    for packet in packets(stream):
+        assert decoder.match(packet, 0, len(packet)) == len(packet)
+        block = decoder.decode(packet, 0, len(packet))
+        if block is not None:
+            samples.extend(tuple(float(x) for x in row) for row in block)
+    return samples
+
+
+def assert_close(got, expected, scale: float = 1e-3):
+    assert len(got) == len(expected)
+    for row, want in zip(got, expected):
+        assert max(abs(a - b) for a, b in zip(row, want)) <= scale / 2 + 1e-6
+
+
+@pytest.mark.parametrize("order", [1, 2])
+@pytest.mark.parametrize("block", [1, 3, 50])
+def test_round_trip(backend, order, block):
+    rows = signal(200, 4)
+    encoder = TelemetryEncoder(4, order=order, keyframe_interval=4)
+    stream = b''.join(encoder.encode(rows[i:i + block]) for i in range(0, len(rows), block))
+    assert_close(decode_all(TelemetryDecoder(4), stream), rows)
+
+
+def test_kinds(backend):
+    rows = signal(4, 2)
+    for order, key, delta in ((1, KIND_KEY, KIND_DELTA), (2, KIND_KEY2, KIND_DELTA2)):
+        encoder = TelemetryEncoder(2, order=order, keyframe_interval=2)
+        kinds = [encoder.encode(rows[i:i + 1])[2] for i in range(4)]
+        assert kinds == [key, delta, key, delta]
+    encoder = TelemetryEncoder(2, delta=False)
+    assert encoder.encode(rows)[2] == KIND_ABSOLUTE
+
+
+def test_backends_produce_same_bytes(monkeypatch):
+    if telemetry.np is None:
+        pytest.skip("numpy is not installed")
+    rows = signal(100, 3)
+    monkeypatch.setattr(telemetry, "_NUMPY_MIN_VALUES", 1)
+    vectorized = TelemetryEncoder(3).encode(rows)
+    monkeypatch.setattr(telemetry, "np", None)
+    assert TelemetryEncoder(3).encode(rows) == vectorized
+
+
+def test_second_order_is_shorter_for_smooth_signals(backend):
+    rows = [[(c + 1) * 10 * math.sin(i / 80) for c in range(16)] for i in range(500)]
+    sizes = {}
+    for order in (1, 2):
+        encoder = TelemetryEncoder(16, order=order)
+        for i in range(0, len(rows), 10):
+            encoder.encode(rows[i:i + 10])
+        sizes[order] = encoder.stats()["compression_ratio"]
+    assert sizes[2] > sizes[1]
+    assert sizes[2] >= 3
+
+
+def test_single_sample(backend):
+    encoder = TelemetryEncoder(3)
+    decoder = TelemetryDecoder(3)
+    rows = signal(5, 3)
+    stream = b''.join(encoder.encode(row) for row in rows)
+    assert len(packets(stream)) == 5
+    assert_close(decode_all(decoder, stream), rows)
+
+
+def test_lost_packet_drops_deltas_until_keyframe(backend):
+    rows = signal(8, 2)
+    encoder = TelemetryEncoder(2, keyframe_interval=4)
+    stream = [encoder.encode(rows[i:i + 1]) for i in range(8)]
+    decoder = TelemetryDecoder(2)
+    # 丢掉第2包（差分包），第3、4包没有参考，第5包为关键包
+    got = decode_all(decoder, b''.join(stream[:1] + stream[2:]))
+    assert_close(got, rows[:1] + rows[4:])
+    assert decoder.stats()["dropped_packets"] == 2
+
+
+def test_crc_failure(backend):
+    packet = bytearray(TelemetryEncoder(2).encode([[1.0, 2.0]]))
+    decoder = TelemetryDecoder(2)
+    packet[telemetry.PACKET_HEADER.size] ^= 0x01
+    assert decoder.match(packet, 0, len(packet)) == 0
+    assert decoder.match(packet, 0, len(packet) - 1) == -1
+    assert decoder.stats()["crc_failures"] == 1
+
+
+def test_max_payload_splits_packets(backend):
+    encoder = TelemetryEncoder(8, max_payload=32)
+    rows = signal(20, 8)
+    stream = encoder.encode(rows)
+    assert all(len(p) - telemetry.PACKET_OVERHEAD <= 32 for p in packets(stream))
+    assert_close(decode_all(TelemetryDecoder(8), stream), rows)
+
+
+def test_interleaved_with_frames(backend):
+    rows = signal(30, 2)
+    encoder = TelemetryEncoder(2, keyframe_interval=3)
+    frames = [b'?!' + bytes([i, 0xa5, 0x5a, 3, 4]) + b'!' for i in range(10)]
+    stream = b''.join(encoder.encode(rows[i:i + 3]) + frames[i // 3] for i in range(0, 30, 3))
+
+    for chunk in (1, 7, len(stream)):
+        aligner = MixedAligner(FrameAligner(8), telemetry=TelemetryDecoder(2))
+        buf = bytearray()
+        got_frames, samples = [], []
+        for offset in range(0, len(stream), chunk):
+            buf += stream[offset:offset + chunk]
+            aligned, pos = aligner.align(buf, 0, len(buf))
+            got_frames.extend(aligned)
+            for block, _ in aligner.telemetry_blocks:
+                samples.extend(tuple(float(x) for x in row) for row in block)
+            del buf[:pos]
+        assert got_frames == frames
+        assert_close(samples, rows)
@@ -0,0 +1,115 @@
+import os
+import threading
+
+import pytest
+import serial
+
+from telemetry import TelemetryEncoder
+from uart import Uart
+from vofa import JustFloatEncoder
+
+
+class PipePort:
+    """用管道模拟支持fileno()的串口，写端由测试持有"""
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        self.is_open = True
+
+    def fileno(self) -> int:
+        return self.read_fd
+
+    def close(self):
+        for fd in (self.read_fd, self.write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.is_open = False
+
+
+@pytest.fixture
+def piped():
+    uart = Uart(8, read_chunk_size=64)
+    port = PipePort()
+    uart.serial_port = port
+    yield uart, port
+    port.close()
+
+
+def test_read_available_drains_pending_bytes(piped):
+    uart, port = piped
+    data = bytes(range(40))
+    os.write(port.write_fd, data)
+
+    assert uart.read_available(timeout=1.0) == len(data)
+    assert bytes(uart.read_chunk[:len(data)]) == data
+    assert uart.read_ready_ns > 0
+    assert uart.read_available(timeout=0.0) == 0
+
+
+def test_read_available_is_bounded_by_read_chunk(piped):
+    uart, port = piped
+    os.write(port.write_fd, bytes(100))
+
+    assert uart.read_available(timeout=1.0) == 64
+    assert uart.read_available(timeout=1.0) == 36
+
+
+def test_read_available_batch_window_collects_late_bytes(piped):
+    uart, port = piped
+    os.write(port.write_fd, b'?!\x01')
+    writer = threading.Timer(0.02, os.write, (port.write_fd, b'\x02\x03\x04\x05!'))
+    writer.start()
+
+    assert uart.read_available(timeout=1.0, batch_bytes=8, batch_window=1.0) == 8
+    writer.join()
+    assert bytes(uart.read_chunk[:8]) == b'?!\x01\x02\x03\x04\x05!'
+
+
+def test_read_available_reports_eof_as_disconnect(piped):
+    uart, port = piped
+    os.close(port.write_fd)
+
+    with pytest.raises(serial.SerialException):
+        uart.read_available(timeout=1.0)
+
+
+def test_get_aligned_from_queue_just_float_only():
+    uart = Uart(8)
+    uart.enable_just_float_receive(channels=2)
+    uart.read_buff_queue.push_bytes(bytes(JustFloatEncoder().encode([[float(i), -1.0] for i in range(5)])))
+
+    ret, frame = uart.get_aligned_from_queue()
+
+    assert ret == -1
+    assert frame is None
+    samples = [sample for block, _ in uart.just_float_blocks for sample in block]
+    assert [tuple(sample) for sample in samples] == [(float(i), -1.0) for i in range(5)]
+
+
+def test_get_aligned_from_queue_frame_after_samples():
+    uart = Uart(8)
+    uart.enable_just_float_receive(channels=2)
+    frame = b'?!\x01\x02\x03\x04\x05!'
+    uart.read_buff_queue.push_bytes(bytes(JustFloatEncoder().encode([[1.0, 2.0]])) + frame)
+
+    ret, aligned = uart.get_aligned_from_queue()
+
+    assert ret == 1
+    assert aligned == frame
+    assert len(uart.just_float_blocks) == 1
+
+
+def test_get_aligned_from_queue_telemetry_only():
+    uart = Uart(8)
+    uart.enable_telemetry_receive(channels=2)
+    uart.read_buff_queue.push_bytes(TelemetryEncoder(2).encode([[i * 0.5, -1.0] for i in range(5)]))
+
+    ret, frame = uart.get_aligned_from_queue()
+
+    assert ret == -1
+    assert frame is None
+    samples = [sample for block, _ in uart.telemetry_blocks for sample in block]
+    assert [tuple(float(x) for x in sample) for sample in samples] == [(i * 0.5, -1.0) for i in range(5)]
@@ -0,0 +1,122 @@
+import os
+import select
+import threading
+import time
+
+import pytest
+
+from pty_harness import PtyLoopback, FakeMcu
+from uart_hub import UartHub
+from uart_thread import UartThread__
+
+
+class HubUart(UartThread__):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enable_show_read = False
+        self.enable_show_write = False
+        self.received = []
+        self.expected = 0
+        self.done = threading.Event()
+        self.disconnected = threading.Event()
+        self.reconnected = threading.Event()
+
+    def _on_mission1_received(self, X: int):
+        self.received.append(X)
+        if len(self.received) >= self.expected:
+            self.done.set()
+
+    def _on_serial_disconnected(self):
+        self.disconnected.set()
+
+    def _on_serial_reconnected(self):
+        self.reconnected.set()
+
+
+def read_exactly(fd: int, n_bytes: int, timeout: float = 2.0) -> bytes:
+    data = b''
+    deadline = time.monotonic() + timeout
+    while len(data) < n_bytes and time.monotonic() < deadline:
+        if select.select([fd], [], [], 0.05)[0]:
+            data += os.read(fd, 4096)
+    return data
+
+
+@pytest.fixture
+def hub():
+    hub = UartHub()
+    yield hub
+    hub.close()
+
+
+def test_one_loop_reads_many_ports(hub):
+    loopbacks = [PtyLoopback() for _ in range(3)]
+    mcus = [FakeMcu(loopback.master_fd, baudrate=921600, n_frames=100) for loopback in loopbacks]
+    uarts = [HubUart(8, 100, hub=hub) for _ in loopbacks]
+    try:
+        for uart, loopback in zip(uarts, loopbacks):
+            uart.expected = 100
+            assert uart.init_with_threads(loopback.slave_name, enable_thread_read=True)
+            # 使用hub时不创建本串口的线程
+            assert uart.thread_read_uart is None and uart.thread_check_serial is None
+        for mcu in mcus:
+            mcu.start()
+        for uart in uarts:
+            assert uart.done.wait(5.0)
+            assert uart.received == list(range(100))
+        assert hub.stats()["ports"] == 3
+        assert hub.stats()["threads"] == 1
+    finally:
+        for mcu in mcus:
+            mcu.stop()
+        for uart in uarts:
+            uart.close()
+        for loopback in loopbacks:
+            loopback.close()
+    assert hub.stats()["ports"] == 0
+
+
+def test_paced_writes(hub):
+    loopback = PtyLoopback()
+    uart = HubUart(8, 200, hub=hub)
+    try:
+        assert uart.init_with_threads(loopback.slave_name, enable_thread_write=True)
+        start = time.monotonic()
+        for i in range(10):
+            uart.mission_send(0x01, i)
+        data = read_exactly(loopback.master_fd, 80)
+        elapsed = time.monotonic() - start
+    finally:
+        uart.close()
+        loopback.close()
+
+    assert data == b''.join(b'?!\x01' + bytes([i]) + b'\x00\x00\x00!' for i in range(10))
+    # 200Hz发送10帧，扣除一个周期的突发余量后至少需要8个周期
+    assert elapsed >= 8 / 200 * 0.9
+
+
+def test_reconnect_from_loop(hub, tmp_path):
+    loopback = PtyLoopback()
+    link = tmp_path / "ttyUSB0"
+    link.symlink_to(loopback.slave_name)
+    uart = HubUart(8, 1000, hub=hub)
+    uart.reconnect_backoff_max = 0.1
+    try:
+        assert uart.init_with_threads(str(link), enable_thread_read=True, enable_thread_write=True)
+        link.unlink()
+        assert uart.disconnected.wait(2.0)
+        uart.mission_send(0x01, 5)
+        link.symlink_to(loopback.slave_name)
+        assert uart.reconnected.wait(2.0)
+        assert read_exactly(loopback.master_fd, 8) == b'?!\x01\x05\x00\x00\x00!'
+        assert uart.flag_thread_read_uart and uart.flag_thread_write_uart
+        assert uart.reconnect_count == 1
+
+        # 重连后继续读取
+        uart.expected = 1
+        os.write(loopback.master_fd, b'?!\x01\x09\x00\x00\x00!')
+        assert uart.done.wait(2.0)
+        assert uart.received == [9]
+    finally:
+        uart.close()
+        loopback.close()
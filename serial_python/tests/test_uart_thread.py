@@ -0,0 +1,80 @@
+import struct
+import threading
+
+from mission_schema import MissionRegistry
+from queue_t import LaneQueue
+from uart_thread import UartThread__
+
+
+def make_uart(**kwargs) -> UartThread__:
+    registry = MissionRegistry()
+    registry.register(1, [("x", "B")])
+    uart = UartThread__(5, 100, mission_registry=registry, **kwargs)
+    uart.enable_show_write = False
+    return uart
+
+
+def test_blocking_write_queue_does_not_hold_write_mutex():
+    uart = make_uart(write_queue_size=1, write_queue_overflow=LaneQueue.OVERFLOW_BLOCK)
+    # 模拟写线程已开启但暂时取不走帧
+    uart.flag_thread_write_uart = True
+    uart.mission_send(1, 1)
+
+    sender = threading.Thread(target=uart.mission_send, args=(1, 2), daemon=True)
+    sender.start()
+    sender.join(0.05)
+    assert sender.is_alive()
+
+    # 被阻塞的发送者不持有mutex_write_uart，其他发送者与写线程中的周期任务仍可编码
+    assert uart.mutex_write_uart.acquire(timeout=1.0)
+    uart.mutex_write_uart.release()
+
+    assert [frame[3] for frame in uart.write_buff_queue.get_batch(1, timeout=0)] == [1]
+    sender.join(1.0)
+    assert not sender.is_alive()
+    assert [frame[3] for frame in uart.write_buff_queue.get_batch(1, timeout=0)] == [2]
+
+
+def test_mission_send_latest_keeps_latest_value_per_key():
+    uart = make_uart()
+    uart.mission_registry.register(2, [("x", "B")])
+    uart.flag_thread_write_uart = True
+    for i in range(5):
+        uart.mission_send_latest(1, i)
+        uart.mission_send_latest(2, 10 + i)
+    uart.mission_send_latest(1, 7, key="other")
+    uart.mission_send(1, 8)
+
+    frames = uart.write_buff_queue.get_batch(8, timeout=0)
+    assert [(frame[2], frame[3]) for frame in frames] == [(1, 4), (2, 14), (1, 7), (1, 8)]
+    assert uart.get_stats()["write_queue"]["superseded_frames"] == 8
+
+
+def mission2_frame(X: int, Y: float) -> bytes:
+    return b'?!\x02' + struct.pack('<Hf', X, Y) + b'!'
+
+
+def test_mission2_hook_accepts_x_and_y():
+    received = []
+
+    class Receiver(UartThread__):
+        def _on_mission2_received(self, X: int, Y: float):
+            received.append((X, Y))
+
+    uart = Receiver(10, 100)
+    uart.enable_show_read = False
+    uart._process_received_data(mission2_frame(7, 1.5))
+    assert received == [(7, 1.5)]
+
+
+def test_legacy_mission2_hook_receives_x_only():
+    received = []
+
+    class LegacyReceiver(UartThread__):
+        def _on_mission2_received(self, X: int):
+            received.append(X)
+
+    uart = LegacyReceiver(10, 100)
+    uart.enable_show_read = False
+    uart._process_received_data(mission2_frame(7, 1.5))
+    assert received == [7]
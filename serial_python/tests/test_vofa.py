@@ -0,0 +1,176 @@
+import random
+import struct
+
+import pytest
+
+import vofa
+from frame_aligner import FrameAligner, MixedAligner
+from uart import Uart
+from vofa import JustFloatDecoder, JustFloatEncoder, JUST_FLOAT_TAIL
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if vofa.np is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(vofa, "np", None)
+    return request.param
+
+
+def encode(rows) -> bytes:
+    return bytes(JustFloatEncoder().encode(rows))
+
+
+def frame(payload: bytes) -> bytes:
+    return b'?!' + payload + b'!'
+
+
+def align_all(aligner, stream: bytes, chunk: int = 0):
+    """按chunk字节分批送入对齐器，返回(任务帧, 采样)"""
+    chunk = chunk or len(stream)
+    buf = bytearray()
+    frames, samples = [], []
+    for offset in range(0, len(stream), chunk):
+        buf += stream[offset:offset + chunk]
+        aligned, pos = aligner.align(buf, 0, len(buf))
+        frames.extend(aligned)
+        for block, _ in aligner.blocks:
+            samples.extend(tuple(float(x) for x in row) for row in block)
+        del buf[:pos]
+    return frames, samples
+
+
+def test_encoder_layout():
+    data = encode([[1.0, -2.5]])
+    assert data == struct.pack('<2f', 1.0, -2.5) + JUST_FLOAT_TAIL
+
+
+def test_encode_block(backend):
+    rows = [[float(i), i * 0.5, -float(i)] for i in range(4)]
+    expected = b''.join(struct.pack('<3f', *row) + JUST_FLOAT_TAIL for row in rows)
+    assert encode(rows) == expected
+    # 一维数据视为单个采样
+    assert encode(rows[1]) == expected[16:32]
+
+
+def test_encode_numpy_block():
+    if vofa.np is None:
+        pytest.skip("numpy is not installed")
+    block = vofa.np.arange(12, dtype=vofa.np.float64).reshape(4, 3)
+    assert encode(block) == encode(block.tolist())
+
+
+def test_encoder_reuses_and_grows_buffer(backend):
+    encoder = JustFloatEncoder(initial_size=16)
+    small = encoder.encode([[1.0]])
+    buffer = encoder.buffer
+    assert bytes(encoder.encode([[2.0]])) == struct.pack('<f', 2.0) + JUST_FLOAT_TAIL
+    assert encoder.buffer is buffer
+
+    # 扩容时换新缓冲区，之前返回的视图不会导致BufferError
+    large = encoder.encode([[float(i), 0.0] for i in range(10)])
+    assert encoder.buffer is not buffer
+    assert len(large) == 10 * 12
+    small.release()
+
+
+class RecordingPort:
+    is_open = True
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, data) -> int:
+        self.writes.append(bytes(data))
+        return len(data)
+
+
+def test_block_send_is_one_write(backend):
+    uart = Uart(8)
+    uart.serial_port = RecordingPort()
+    rows = [[float(i), 1.0] for i in range(50)]
+
+    assert uart.write_vofa_just_float_block(rows) == 50 * 12
+    assert uart.serial_port.writes == [encode(rows)]
+    assert uart.write_vofa_just_float([1.0, 2.0]) == 12
+
+
+def test_match_counts_consecutive_samples(backend):
+    decoder = JustFloatDecoder(channels=3)
+    data = encode([[float(i)] * 3 for i in range(5)]) + b'\x00' * 16
+    assert decoder.match(data, 0, len(data)) == 5
+    assert decoder.match(data, 1, len(data)) == 0
+    # 不完整的采样不计入
+    assert decoder.match(data, 0, 5 * 16 - 1) == 4
+
+
+def test_decode_joins_runs(backend):
+    decoder = JustFloatDecoder(channels=2)
+    data = encode([[1.0, 2.0], [3.0, 4.0]]) + frame(b'\x01' * 5) + encode([[5.0, 6.0]])
+    block = decoder.decode(data, [(0, 2), (24 + 8, 1)])
+    assert [tuple(row) for row in block] == [(1.0, 2.0), (3.0, 4.0), (5.0, 6.0)]
+    assert decoder.stats()["samples"] == 3
+
+
+def test_interleaved_frames_and_samples(backend):
+    rng = random.Random(1)
+    rows, frames, stream = [], [], bytearray()
+    for i in range(300):
+        row = [float(rng.randrange(-1000, 1000)) for _ in range(4)]
+        rows.append(tuple(row))
+        stream += encode([row])
+        if rng.random() < 0.3:
+            frames.append(frame(bytes(rng.randrange(256) for _ in range(5))))
+            stream += frames[-1]
+
+    for chunk in (0, 7, 64):
+        aligner = MixedAligner(FrameAligner(8), JustFloatDecoder(channels=4))
+        got_frames, got_rows = align_all(aligner, bytes(stream), chunk)
+        assert got_frames == frames
+        assert got_rows == rows
+        assert aligner.dropped_bytes == 0
+
+
+def test_header_bytes_inside_samples(backend):
+    # 0.75的float32为 00 00 40 3f，后跟 0x21 即为 "?!"，不能把采样切开
+    value = struct.unpack('<f', b'\x21\x00\x00\x00')[0]
+    rows = [(0.75, value, 0.75)] * 20
+    aligner = MixedAligner(FrameAligner(8), JustFloatDecoder(channels=3))
+    got_frames, got_rows = align_all(aligner, encode(rows))
+    assert got_frames == []
+    assert got_rows == [tuple(float(x) for x in struct.unpack('<3f', struct.pack('<3f', *row))) for row in rows]
+
+
+def test_resync_after_garbage(backend):
+    aligner = MixedAligner(FrameAligner(8), JustFloatDecoder(channels=2))
+    stream = b'\x13\x37\x00' + encode([[1.0, 2.0]]) + frame(b'abcde') + b'\xff' * 5 + encode([[3.0, 4.0]])
+    got_frames, got_rows = align_all(aligner, stream)
+    assert got_frames == [frame(b'abcde')]
+    assert got_rows == [(1.0, 2.0), (3.0, 4.0)]
+    assert aligner.dropped_bytes == 8
+
+
+def test_infer_channels(backend):
+    decoder = JustFloatDecoder()
+    aligner = MixedAligner(FrameAligner(8), decoder)
+    rows = [(float(i), float(-i), 0.5) for i in range(10)]
+    _, got_rows = align_all(aligner, encode(rows), chunk=16)
+    assert decoder.channels == 3
+    # 确定通道数前收到的采样被丢弃
+    assert got_rows == rows[len(rows) - len(got_rows):]
+    assert len(got_rows) >= 6
+
+
+def test_relock_when_channel_count_changes(backend):
+    decoder = JustFloatDecoder(relock_misses=2)
+    aligner = MixedAligner(FrameAligner(8), decoder)
+    align_all(aligner, encode([[1.0, 2.0]] * 10))
+    assert decoder.channels == 2
+
+    _, got_rows = align_all(aligner, encode([[1.0, 2.0, 3.0, 4.0]] * 20), chunk=40)
+    assert decoder.channels == 4
+    assert decoder.stats()["relocks"] == 1
+    # 重新推断前，4通道采样的后半段恰好也是合法的2通道采样
+    assert got_rows[-10:] == [(1.0, 2.0, 3.0, 4.0)] * 10
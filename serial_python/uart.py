@@ -2,8 +2,17 @@ import serial
 import time
 import struct
 import os
-from typing import Optional, List
-from queue_t import Queue_T
+import select
+import threading
+from typing import Optional, List, Union
+from frame_aligner import FrameAligner, VarFrameAligner, MixedAligner
+from queue_t import ByteRingBuffer
+from mission_schema import MissionRegistry
+from crc import FrameCrc, make_frame_crc
+from vofa import JustFloatEncoder, JustFloatDecoder
+from telemetry import TelemetryEncoder, TelemetryDecoder
+from metrics import UartMetrics
+from capture import CaptureWriter, DIR_RX, DIR_TX
 
 
 class ColorPrint:
@@ -31,21 +40,106 @@ class ColorPrint:
 
 
 class Uart:
-    def __init__(self, uart_length=16):
+    # 帧格式
+    FRAMING_FIXED = "fixed"        # 定长帧：头帧 + 任务ID + 字段 + 尾帧，长度为uart_length
+    FRAMING_VARIABLE = "variable"  # 变长帧：头帧 + 任务ID + 负载长度(uint16) + 负载 + 尾帧
+    
+    # 串口后端
+    BACKEND_PYSERIAL = "pyserial"  # serial.Serial
+    BACKEND_NATIVE = "native"      # termios与文件描述符直接读写，见native_serial.py（Linux/POSIX）
+    
+    def __init__(self, uart_length=16, queue_capacity=4096,
+                 queue_overflow=ByteRingBuffer.OVERFLOW_DROP_OLDEST, read_chunk_size=4096,
+                 mission_registry: Optional[MissionRegistry] = None, crc=None,
+                 framing=FRAMING_FIXED, max_payload=4096, backend=BACKEND_PYSERIAL):
         """
         初始化串口基类
         :param uart_length: 每帧数据长度
+        :param queue_capacity: 读线程队列容量（字节）
+        :param queue_overflow: 读线程队列溢出策略，见ByteRingBuffer
+        :param read_chunk_size: read_available单次最多读取的字节数
+        :param mission_registry: 任务注册表，默认包含任务1、任务2
+        :param crc: 帧校验，None表示不校验（兼容无校验的下位机），或算法名/FrameCrc对象，见crc.py
+        :param framing: 帧格式，fixed或variable
+        :param max_payload: 变长帧的最大负载长度（字节）
+        :param backend: 串口后端，pyserial或native
         """
+        if framing not in (self.FRAMING_FIXED, self.FRAMING_VARIABLE):
+            raise ValueError(f"Unknown framing: {framing}")
+        if backend not in (self.BACKEND_PYSERIAL, self.BACKEND_NATIVE):
+            raise ValueError(f"Unknown serial backend: {backend}")
+        if backend == self.BACKEND_NATIVE and os.name != "posix":
+            # native_serial依赖termios与fcntl，只在用到时导入，Windows上仍可使用pyserial后端
+            raise ValueError("The native serial backend needs termios and is only available on POSIX, "
+                             "use backend='pyserial'")
+        
         self.uart_length = uart_length
-        self.serial_port: Optional[serial.Serial] = None
+        self.framing = framing
+        self.backend = backend
+        self.serial_port: Optional[Union[serial.Serial, "NativeSerial"]] = None
         self.uart_dev = ""
+        self.baudrate = 115200
         
         # 缓冲区
         self.write_buff = bytearray(uart_length)
         self.read_buff = bytearray(uart_length)
         
-        # 读线程队列
-        self.read_buff_queue = Queue_T()
+        # read_available使用的预分配缓冲区，及本批数据首次可读的时间戳
+        self.read_chunk = bytearray(read_chunk_size)
+        self.read_ready_ns = 0
+        
+        # 最近一次读取完成时的monotonic_ns时间戳及读到的字节数，用于按字节位置插值每帧的接收时间
+        self.rx_stamp_ns = 0
+        self.rx_prev_stamp_ns = 0
+        self.rx_stamp_bytes = 0
+        # 最近一次get_aligned_frames_from_queue取出的各帧的接收时间戳（帧尾到达的monotonic_ns）
+        self.frame_ns: List[int] = []
+        # 最近一次get_aligned_frames_from_queue解码出的JustFloat采样块、压缩遥测采样块及其最后一个采样的接收时间戳
+        self.just_float_blocks: List[tuple] = []
+        self.telemetry_blocks: List[tuple] = []
+        
+        # 帧校验，收发两侧使用同一配置
+        self.crc: Optional[FrameCrc] = make_frame_crc(crc)
+        
+        # 读线程队列及帧对齐器，变长帧的队列至少能容纳两个最长帧
+        if framing == self.FRAMING_VARIABLE:
+            self.frame_aligner = VarFrameAligner(max_payload, crc=self.crc)
+            queue_capacity = max(queue_capacity, 2 * self.frame_aligner.max_frame_length)
+            payload_offset = VarFrameAligner.PAYLOAD_OFFSET
+        else:
+            self.frame_aligner = FrameAligner(uart_length, crc=self.crc)
+            payload_offset = 3
+        self.read_buff_queue = ByteRingBuffer(queue_capacity, queue_overflow)
+        
+        # 任务注册表，编码与解码共用同一份字段布局，字段不得覆盖CRC
+        if mission_registry is None:
+            mission_registry = MissionRegistry.default(payload_offset)
+        elif mission_registry.payload_offset != payload_offset:
+            raise ValueError(f"{framing} framing needs a MissionRegistry with "
+                             f"payload_offset={payload_offset}")
+        self.mission_registry = mission_registry
+        if self.crc is not None:
+            trailer_length = self.crc.tail_length + self.crc.size
+            if mission_registry.trailer_length < trailer_length:
+                mission_registry.set_trailer_length(trailer_length)
+        
+        # Vofa JustFloat编码器，复用同一块缓冲区
+        self.vofa_encoder = JustFloatEncoder()
+        # Vofa JustFloat接收解码器，None表示只接收任务帧
+        self.just_float: Optional[JustFloatDecoder] = None
+        
+        # 压缩遥测的编码器与接收解码器，None表示关闭
+        self.telemetry_encoder: Optional[TelemetryEncoder] = None
+        self.telemetry: Optional[TelemetryDecoder] = None
+        
+        # 统计，None表示关闭
+        self.metrics: Optional[UartMetrics] = None
+        
+        # 抓包，None表示关闭
+        self.capture: Optional[CaptureWriter] = None
+        
+        # 串口写锁，写线程的批量发送、ping与周期任务等多个线程直接写串口时，每次write()写完整块数据后才轮到下一个
+        self.mutex_write_port = threading.Lock()
     
     def init_serial_port(self, dev: str, baudrate: int = 115200, 
                         timeout: float = 1.0) -> bool:
@@ -59,19 +153,24 @@ class Uart:
         ColorPrint.blue("SerialPort Connecting ..")
         
         self.uart_dev = dev
+        self.baudrate = baudrate
         
         try:
-            self.serial_port = serial.Serial(
-                port=dev,
-                baudrate=baudrate,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE,
-                timeout=timeout,
-                xonxoff=False,
-                rtscts=False,
-                dsrdtr=False
-            )
+            if self.backend == self.BACKEND_NATIVE:
+                from native_serial import NativeSerial
+                self.serial_port = NativeSerial(dev, baudrate, timeout)
+            else:
+                self.serial_port = serial.Serial(
+                    port=dev,
+                    baudrate=baudrate,
+                    bytesize=serial.EIGHTBITS,
+                    parity=serial.PARITY_NONE,
+                    stopbits=serial.STOPBITS_ONE,
+                    timeout=timeout,
+                    xonxoff=False,
+                    rtscts=False,
+                    dsrdtr=False
+                )
             
             if self.serial_port.is_open:
                 ColorPrint.green(f"Open Port {dev} Success!")
@@ -103,19 +202,148 @@ class Uart:
             return 0
         
         try:
-            data = self.serial_port.read(self.uart_length)
-            self.read_buff = bytearray(data)
+            # 直接读入预分配的read_buff，不再每次新建bytes
+            read_buff = self.read_buff
+            if len(read_buff) != self.uart_length:
+                read_buff = self.read_buff = bytearray(self.uart_length)
+            n = self.serial_port.readinto(read_buff) or 0
+            if n:
+                self._stamp_read(n)
             # 如果读取长度不足，用0填充
-            while len(self.read_buff) < self.uart_length:
-                self.read_buff.append(0)
-            return len(data)
+            if n < self.uart_length:
+                read_buff[n:] = bytes(self.uart_length - n)
+            if self.metrics is not None:
+                self.metrics.bytes_in += n
+            if self.capture is not None and n:
+                self.capture.record(DIR_RX, memoryview(read_buff)[:n])
+            return n
         except Exception as e:
             print(f"Read buffer error: {str(e)}")
+            if self.metrics is not None:
+                self.metrics.read_errors += 1
+            if isinstance(e, OSError):
+                self._on_io_error(e)
             return 0
     
+    def _wait_readable(self, timeout: Optional[float]) -> bool:
+        """
+        等待串口可读
+        :param timeout: 超时时间（秒），None表示一直等待
+        :return: True可读，False超时
+        """
+        try:
+            fd = self.serial_port.fileno()
+        except (AttributeError, NotImplementedError, OSError):
+            fd = None
+        
+        if fd is not None:
+            readable, _, _ = select.select([fd], [], [], timeout)
+            return bool(readable)
+        
+        # 不支持fileno的平台（如Windows）退化为轮询in_waiting
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.serial_port.in_waiting == 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.0005)
+        return True
+    
+    def _read_pending_into(self, view: memoryview) -> int:
+        """
+        将已到达的数据一次性读入view，不阻塞
+        :param view: 目标缓冲区
+        :return: 读取的字节数
+        """
+        try:
+            fd = self.serial_port.fileno()
+        except (AttributeError, NotImplementedError, OSError):
+            fd = None
+        
+        if fd is not None:
+            try:
+                n = os.readv(fd, [view])
+            except BlockingIOError:
+                return 0
+            if n == 0:
+                # 可读但读不到数据，说明设备已断开
+                raise serial.SerialException("device reports readiness to read but returned no data")
+            return n
+        
+        n = min(self.serial_port.in_waiting, len(view))
+        if n == 0:
+            return 0
+        return self.serial_port.readinto(view[:n])
+    
+    def _stamp_read(self, n_bytes: int):
+        """
+        记录一次读取完成的时间，读到的最后一个字节不晚于此时到达
+        :param n_bytes: 本次读到的字节数
+        """
+        self.rx_prev_stamp_ns = self.rx_stamp_ns
+        self.rx_stamp_ns = time.monotonic_ns()
+        self.rx_stamp_bytes = n_bytes
+    
+    def _frame_times(self, ends: List[int], end: int) -> List[int]:
+        """
+        按字节位置插值各帧帧尾到达的时间：队列末尾的字节在最近一次读取时到达，
+        往前每个字节早一个字节时间（8N1为10个比特），且本次读到的字节不早于上一次读取
+        :param ends: 各帧在缓冲区中的结束下标
+        :param end: 缓冲区中数据的结束下标
+        :return: 各帧的monotonic_ns时间戳，尚未读取过数据时为0
+        """
+        stamp = self.rx_stamp_ns
+        if not stamp:
+            return [0] * len(ends)
+        byte_ns = 1e10 / self.baudrate
+        batch = self.rx_stamp_bytes
+        prev = self.rx_prev_stamp_ns
+        times = []
+        for frame_end in ends:
+            after = end - frame_end
+            t_ns = stamp - int(after * byte_ns)
+            if after < batch and t_ns < prev:
+                t_ns = prev
+            times.append(t_ns)
+        return times
+    
+    def read_available(self, timeout: Optional[float] = 0.1, batch_bytes: int = 0,
+                       batch_window: float = 0.0) -> int:
+        """
+        等待串口可读，并将所有待读数据读入预分配的read_chunk，不补零
+        :param timeout: 等待第一个字节的超时时间（秒）
+        :param batch_bytes: 凑批的最少字节数，0表示有数据即返回
+        :param batch_window: 收到第一个字节后为凑批最多再等待的时间（秒），越大吞吐越高、延迟越大
+        :return: 读取的字节数，数据位于read_chunk[:n]
+        """
+        if self.serial_port is None or not self.serial_port.is_open:
+            return 0
+        
+        if not self._wait_readable(timeout):
+            return 0
+        
+        self.read_ready_ns = time.perf_counter_ns()
+        view = memoryview(self.read_chunk)
+        total = self._read_pending_into(view)
+        
+        if batch_bytes > 0 and batch_window > 0:
+            deadline = time.monotonic() + batch_window
+            while total < min(batch_bytes, len(view)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._wait_readable(remaining):
+                    break
+                total += self._read_pending_into(view[total:])
+        
+        if total:
+            self._stamp_read(total)
+        if self.metrics is not None:
+            self.metrics.bytes_in += total
+        if self.capture is not None and total:
+            self.capture.record(DIR_RX, view[:total])
+        return total
+    
     def write_buffer(self, write_buff: bytearray) -> int:
         """
-        写串口
+        写串口，持有mutex_write_port，多个线程的写入不会交错
         :param write_buff: 写入的数据
         :return: 写入的字节数
         """
@@ -123,55 +351,202 @@ class Uart:
             return 0
         
         try:
-            return self.serial_port.write(write_buff)
+            with self.mutex_write_port:
+                written = self.serial_port.write(write_buff)
+                if self.metrics is not None:
+                    self.metrics.bytes_out += written
+                if self.capture is not None and written:
+                    self.capture.record(DIR_TX, memoryview(write_buff)[:written])
+            return written
         except Exception as e:
             print(f"Write buffer error: {str(e)}")
+            if self.metrics is not None:
+                self.metrics.write_errors += 1
+            if isinstance(e, OSError):
+                self._on_io_error(e)
             return 0
     
+    def _on_io_error(self, error: OSError):
+        """
+        读写串口发生I/O错误（如设备被拔出）时调用（可重写）
+        :param error: 异常
+        """
+        pass
+    
     def write_vofa_just_float(self, data: List[float]) -> int:
         """
         发送兼容Vofa JustFloat协议的串口数据
         :param data: 待发送的浮点数数据
         :return: 写入的字节数，-1表示失败
         """
-        if not data:
+        if not len(data):
             return -1
         
-        # 转换Vofa JustFloat协议
-        buffer = bytearray()
-        for value in data:
-            buffer.extend(struct.pack('<f', value))  # 小端序浮点数
-        
-        # 添加协议尾部标识
-        buffer.extend([0x00, 0x00, 0x80, 0x7f])
+        return self.write_buffer(self.vofa_encoder.encode([data]))
+    
+    def write_vofa_just_float_block(self, samples) -> int:
+        """
+        批量发送兼容Vofa JustFloat协议的串口数据，整块编码后一次写入
+        :param samples: N个采样 × C个通道的二维数据（numpy数组、buffer协议对象或嵌套序列）
+        :return: 写入的字节数，-1表示失败
+        """
+        buffer = self.vofa_encoder.encode(samples)
+        if not len(buffer):
+            return -1
         
         return self.write_buffer(buffer)
     
-    def show_read_buff(self):
-        """打印读到的串口数据"""
-        print("readBuff: ", end="")
-        for byte in self.read_buff:
-            print(f"{byte:02x} ", end="")
-        print()
+    def write_telemetry_block(self, samples) -> int:
+        """
+        压缩编码一块采样并一次写入，需先enable_telemetry_send()
+        :param samples: N个采样 × C个通道的二维数据
+        :return: 写入的字节数，-1表示失败
+        """
+        data = self.telemetry_encoder.encode(samples)
+        if not data:
+            return -1
+        
+        return self.write_buffer(data)
+    
+    def enable_just_float_receive(self, channels: int = 0, max_channels: int = 64) -> JustFloatDecoder:
+        """
+        开启Vofa JustFloat接收，下位机发来的JustFloat采样与任务帧可以交错在同一串口上
+        :param channels: 通道数，0表示由相邻帧尾的间距推断（确定前收到的采样被丢弃，任务帧交错频繁时建议指定）
+        :param max_channels: 推断时允许的最大通道数
+        :return: JustFloat解码器
+        """
+        self.just_float = JustFloatDecoder(channels, max_channels)
+        self._update_frame_aligner()
+        return self.just_float
+    
+    def disable_just_float_receive(self):
+        """关闭Vofa JustFloat接收"""
+        self.just_float = None
+        self.just_float_blocks = []
+        self._update_frame_aligner()
+    
+    def enable_telemetry_send(self, channels: int, scale=1e-3, delta=True,
+                              keyframe_interval=16, order=2) -> TelemetryEncoder:
+        """
+        开启压缩遥测发送，格式见telemetry.py
+        :param channels: 通道数
+        :param scale: 量化步长，一个值或每个通道一个值
+        :param delta: 是否差分编码，False时只量化
+        :param keyframe_interval: 每隔多少包发送一个关键包
+        :param order: 差分的预测阶数，2（线性外推）对平滑信号更短，下位机只支持一阶差分时用1
+        :return: 压缩遥测编码器，stats()给出压缩比
+        """
+        self.telemetry_encoder = TelemetryEncoder(channels, scale, delta, keyframe_interval, order=order)
+        return self.telemetry_encoder
+    
+    def enable_telemetry_receive(self, channels: int, scale=1e-3, max_payload=1024) -> TelemetryDecoder:
+        """
+        开启压缩遥测接收，压缩遥测包可以与任务帧、JustFloat采样交错在同一串口上
+        :param channels: 通道数，与发送端相同
+        :param scale: 量化步长，与发送端相同
+        :param max_payload: 每包负载的最大字节数
+        :return: 压缩遥测解码器，stats()给出压缩比与采样率
+        """
+        self.telemetry = TelemetryDecoder(channels, scale, max_payload)
+        self._update_frame_aligner()
+        return self.telemetry
+    
+    def disable_telemetry_receive(self):
+        """关闭压缩遥测接收"""
+        self.telemetry = None
+        self.telemetry_blocks = []
+        self._update_frame_aligner()
+    
+    def _update_frame_aligner(self):
+        """按JustFloat与压缩遥测的接收配置包装或还原任务帧对齐器"""
+        inner = self.frame_aligner
+        if isinstance(inner, MixedAligner):
+            inner = inner.inner
+        if self.just_float is None and self.telemetry is None:
+            self.frame_aligner = inner
+        else:
+            self.frame_aligner = MixedAligner(inner, self.just_float, self.telemetry)
+    
+    def show_read_buff(self, read_buff=None):
+        """
+        打印读到的串口数据
+        :param read_buff: 要打印的数据，默认为readBuff
+        """
+        if read_buff is None:
+            read_buff = self.read_buff
+        print("readBuff:", bytes(read_buff).hex(" "))
     
     def show_write_buff(self, write_buff: bytearray):
         """打印写的串口数据"""
-        print("writeBuff: ", end="")
-        for byte in write_buff:
-            print(f"{byte:02x} ", end="")
-        print()
+        print("writeBuff:", bytes(write_buff).hex(" "))
     
-    def clear_write_buff(self):
-        """清空writeBuff并加上头尾帧"""
-        # 清空
-        self.write_buff = bytearray(self.uart_length)
+    def start_capture(self, path_prefix: str, **kwargs) -> CaptureWriter:
+        """
+        开启抓包，收发的原始数据连同time.monotonic_ns()时间戳由后台线程写入二进制文件
+        :param path_prefix: 文件路径前缀
+        :param kwargs: CaptureWriter的其他参数（块大小、轮转大小等）
+        :return: 抓包写入器
+        """
+        self.stop_capture()
+        self.capture = CaptureWriter(path_prefix, **kwargs)
+        return self.capture
+    
+    def stop_capture(self):
+        """停止抓包并写入剩余数据"""
+        capture = self.capture
+        self.capture = None
+        if capture is not None:
+            capture.close()
+    
+    def clear_write_buff(self, payload_length: int = 0):
+        """
+        清空writeBuff并加上头尾帧
+        :param payload_length: 变长帧的负载长度，定长帧忽略
+        """
+        if self.framing == self.FRAMING_VARIABLE:
+            # 变长帧按负载长度分配，并写入长度字段
+            aligner = self.frame_aligner
+            if payload_length > aligner.max_payload:
+                raise ValueError(f"payload of {payload_length} bytes exceeds max_payload "
+                                 f"{aligner.max_payload}")
+            self.write_buff = bytearray(aligner.frame_length(payload_length))
+            VarFrameAligner.LENGTH_FIELD.pack_into(self.write_buff, VarFrameAligner.LENGTH_OFFSET,
+                                                   payload_length)
+        else:
+            # 清空
+            self.write_buff = bytearray(self.uart_length)
         
         # 头帧
         self.write_buff[0] = ord('?')
         self.write_buff[1] = ord('!')
         
         # 尾帧
-        self.write_buff[self.uart_length - 1] = ord('!')
+        self.write_buff[len(self.write_buff) - 1] = ord('!')
+    
+    def assign_write_buff(self, mission, *args, **kwargs):
+        """
+        清空writeBuff，再按赋值函数或任务注册表为其赋值
+        :param mission: 为write_buff赋值的函数，或已注册的任务ID/任务名
+        :param args: 函数参数或按字段顺序的值
+        :param kwargs: 函数关键字参数或按字段名的值
+        """
+        if callable(mission):
+            self.clear_write_buff()
+            mission(self, *args, **kwargs)
+        else:
+            # 变长帧按该任务的负载长度分配，不同任务的帧长各不相同
+            payload_length = 0
+            if self.framing == self.FRAMING_VARIABLE:
+                schema = self.mission_registry.get(mission)
+                payload_length = schema.payload_size(*args, **kwargs)
+            self.clear_write_buff(payload_length)
+            self.mission_registry.encode_into(self.write_buff, mission, *args, **kwargs)
+        self.seal_write_buff()
+    
+    def seal_write_buff(self):
+        """按crc配置在帧尾前写入校验值，未开启校验时不做任何事；手动为write_buff赋值后需调用"""
+        if self.crc is not None:
+            self.crc.seal(self.write_buff)
     
     def push_read_buff_to_queue(self, read_length: int = 0):
         """
@@ -179,41 +554,59 @@ class Uart:
         :param read_length: 读到的串口数据长度，默认为0则把所有readBuff加入队列
         """
         if read_length == 0:
-            for i in range(self.uart_length):
-                self.read_buff_queue.push(self.read_buff[i])
+            self.read_buff_queue.push_bytes(self.read_buff)
         else:
-            for i in range(read_length):
-                self.read_buff_queue.push(self.read_buff[i])
+            self.read_buff_queue.push_bytes(memoryview(self.read_buff)[:read_length])
     
-    def get_aligned_from_queue(self) -> tuple:
+    def get_aligned_frames_from_queue(self, max_frames: Optional[int] = None) -> tuple:
         """
-        从队列中提取对齐好的数据
-        :return: (状态码, 数据数组) 
+        从队列中提取所有对齐好的数据帧，并一次性丢弃帧间的无效数据
+        :param max_frames: 最多提取的帧数，默认不限制
+        :return: (状态码, 数据帧列表)，各帧的接收时间戳见frame_ns，开启JustFloat或压缩遥测接收时解码出的采样块
+                 见just_float_blocks与telemetry_blocks
                 状态码: 0表示队列长度不足，-1表示提取失败，1表示提取成功
         """
-        if self.uart_length > self.read_buff_queue.size():
-            return 0, None
+        if self.frame_aligner.min_frame_length > self.read_buff_queue.size():
+            self.frame_ns = []
+            self.just_float_blocks = []
+            self.telemetry_blocks = []
+            return 0, []
         
-        # 判断队列长度与数据帧长度
-        while self.uart_length <= self.read_buff_queue.size():
-            if (self.read_buff_queue[0] == ord('?') and
-                self.read_buff_queue[1] == ord('!') and
-                self.read_buff_queue[self.uart_length - 1] == ord('!')):
-                
-                # 队列中存在合法数据，赋值并返回
-                data = bytearray()
-                for i in range(self.uart_length):
-                    data.append(self.read_buff_queue.pop())
-                
-                return 1, data
-            else:
-                # 队首的数据不合法，出队
-                self.read_buff_queue.pop()
+        buf, start, end = self.read_buff_queue.linear()
+        ends = []
+        frames, pos = self.frame_aligner.align(buf, start, end, max_frames, ends)
+        self.read_buff_queue.skip(pos - start)
+        self.frame_ns = self._frame_times(ends, end)
+        if isinstance(self.frame_aligner, MixedAligner):
+            self.just_float_blocks = self._block_times(self.frame_aligner.blocks, end)
+            self.telemetry_blocks = self._block_times(self.frame_aligner.telemetry_blocks, end)
+            if self.just_float_blocks or self.telemetry_blocks:
+                return 1, frames
         
-        return -1, None
+        return (1 if frames else -1), frames
+    
+    def _block_times(self, blocks: List[tuple], end: int) -> List[tuple]:
+        """将(采样块, 结束下标)换成(采样块, 最后一个采样的接收时间戳)"""
+        if not blocks:
+            return []
+        block_ns = self._frame_times([block_end for _, block_end in blocks], end)
+        return [(block, t_ns) for (block, _), t_ns in zip(blocks, block_ns)]
+    
+    def get_aligned_from_queue(self) -> tuple:
+        """
+        从队列中提取对齐好的数据
+        :return: (状态码, 数据数组) 
+                状态码: 0表示队列长度不足，-1表示没有任务帧（JustFloat或压缩遥测采样仍可能已解码，见just_float_blocks与
+                telemetry_blocks），1表示提取成功
+        """
+        ret, frames = self.get_aligned_frames_from_queue(max_frames=1)
+        if frames:
+            return 1, frames[0]
+        return (-1 if ret == 1 else ret), None
     
     def close(self):
         """关闭串口"""
+        self.stop_capture()
         if self.serial_port and self.serial_port.is_open:
             self.serial_port.close()
             ColorPrint.green(f"Serial port {self.uart_dev} closed.")
\ No newline at end of file
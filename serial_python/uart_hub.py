@@ -0,0 +1,405 @@
+"""
+多串口共用的selectors事件循环
+
+每个UartThread__默认有自己的检查线程、读线程和写线程，串口较多时大部分线程都在睡眠中争抢GIL。
+UartHub用少量线程（默认1个）的selectors循环统一处理所有串口的读、按发送频率定时写、
+设备节点事件与健康检查、断线重连。串口类本身不变，创建时传入hub即可：
+
+    hub = UartHub()
+    uart = UartThread__(uart_length=8, hub=hub)
+    uart.init_with_threads("/dev/ttyUSB0", enable_thread_read=True, enable_thread_write=True)
+
+接收回调、断线/重连回调都在hub的循环线程中调用，回调中不应长时间阻塞。
+仅支持提供fileno()的POSIX串口。
+"""
+
+import os
+import selectors
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from hotplug import DeviceWatcher
+
+# 注册到selector的数据类型
+_KIND_WAKEUP = 0
+_KIND_READ = 1
+_KIND_WATCH = 2
+
+
+class _HubPort:
+    def __init__(self, uart, loop: "_HubLoop"):
+        """hub中一个串口的状态，只在所属循环线程中修改"""
+        self.uart = uart
+        self.loop = loop
+        self.serial_port = None
+        self.fd = -1
+        self.reading = False
+        self.watcher: Optional[DeviceWatcher] = None
+        self.detached = False
+
+        # 最近一个到期的定时任务，0表示需要立即处理，None表示没有定时任务
+        self.deadline: Optional[int] = 0
+
+        # 发送定时器，write_idle表示写队列为空、等待notify_write()唤醒
+        self.next_send_ns = 0
+        self.write_idle = False
+        self.write_pending = False
+
+        # 健康检查与重连
+        self.next_check_ns = 0
+        self.reconnect_at_ns = 0
+        self.backoff_ns = 0
+        self.disconnect_ns = 0
+        self.resume_read = False
+        self.resume_write = False
+
+
+class _HubLoop:
+    def __init__(self, index: int):
+        """一个selectors循环线程"""
+        self.index = index
+        self.selector = selectors.DefaultSelector()
+        self.ports: List[_HubPort] = []
+        self.pending = deque()
+        self.iterations = 0
+        self.running = True
+
+        # 用于从其他线程唤醒select()
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        os.set_blocking(self.wakeup_r, False)
+        os.set_blocking(self.wakeup_w, False)
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, (_KIND_WAKEUP, None))
+
+        self.thread = threading.Thread(target=self._thread_loop, name=f"UartHub-{index}",
+                                       daemon=True)
+
+    def wake(self):
+        try:
+            os.write(self.wakeup_w, b'\0')
+        except OSError:
+            pass
+
+    def call_soon(self, func, *args):
+        """在循环线程中执行func，可从任意线程调用"""
+        self.pending.append((func, args))
+        self.wake()
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self.thread
+
+    def _thread_loop(self):
+        """循环线程函数"""
+        while self.running:
+            timeout = self._service(time.monotonic_ns())
+            events = self.selector.select(timeout)
+            for key, _ in events:
+                kind, port = key.data
+                try:
+                    if kind == _KIND_WAKEUP:
+                        DeviceWatcher._drain(self.wakeup_r)
+                    elif kind == _KIND_READ:
+                        self._on_readable(port)
+                    elif port.watcher.poll():
+                        port.next_check_ns = 0
+                        port.reconnect_at_ns = min(port.reconnect_at_ns, time.monotonic_ns())
+                        port.deadline = 0
+                except Exception as e:
+                    print(f"Hub loop error: {str(e)}")
+
+            while self.pending:
+                func, args = self.pending.popleft()
+                try:
+                    func(*args)
+                except Exception as e:
+                    print(f"Hub loop error: {str(e)}")
+            self.iterations += 1
+
+        for port in list(self.ports):
+            self._remove(port)
+        self.selector.close()
+        for fd in (self.wakeup_r, self.wakeup_w):
+            os.close(fd)
+
+    def _service(self, now_ns: int) -> Optional[float]:
+        """
+        处理所有串口到期的定时任务
+        :return: 距最近一个定时任务的秒数，None表示没有定时任务
+        """
+        deadline = None
+        for port in self.ports:
+            port_deadline = port.deadline
+            if port.write_pending or (port_deadline is not None and port_deadline <= now_ns):
+                port.write_pending = False
+                try:
+                    port_deadline = self._service_port(port, now_ns)
+                except Exception as e:
+                    print(f"Hub loop error: {str(e)}")
+                    port_deadline = now_ns + 100_000_000
+                port.deadline = port_deadline
+            if port_deadline is not None and (deadline is None or port_deadline < deadline):
+                deadline = port_deadline
+        if deadline is None:
+            return None
+        return max(0.0, (deadline - time.monotonic_ns()) / 1e9)
+
+    def _service_port(self, port: _HubPort, now_ns: int) -> Optional[int]:
+        uart = port.uart
+        if port.reconnect_at_ns:
+            if now_ns >= port.reconnect_at_ns:
+                self._try_reconnect(port, now_ns)
+            if port.reconnect_at_ns:
+                return port.reconnect_at_ns
+        if uart.serial_port is None:
+            return None
+
+        # 健康检查，设备节点事件会将next_check_ns清零以立即检查
+        if now_ns >= port.next_check_ns:
+            port.next_check_ns = now_ns + int(uart.check_interval * 1e9)
+            if not uart._is_serial_port_healthy():
+                self._disconnect(port)
+                return port.reconnect_at_ns or None
+        deadline = port.next_check_ns
+
+        send_ns = self._service_write(port, now_ns)
+        if send_ns is not None and send_ns < deadline:
+            deadline = send_ns
+        return deadline
+
+    def _service_write(self, port: _HubPort, now_ns: int) -> Optional[int]:
+        """执行到期的周期任务（不忙等），再按发送频率从写队列取帧发送，返回下一次需要处理的时间"""
+        uart = port.uart
+        if not uart.flag_thread_write_uart:
+            return None
+
+        scheduler = uart.write_scheduler
+        scheduler.run_due(now_ns)
+        task_ns = scheduler.next_deadline_ns()
+        send_ns = self._service_queue(port, now_ns)
+        if task_ns is None:
+            return send_ns
+        return task_ns if send_ns is None else min(task_ns, send_ns)
+
+    def _service_queue(self, port: _HubPort, now_ns: int) -> Optional[int]:
+        """按发送频率从写队列取帧发送，返回下一次发送时间"""
+        uart = port.uart
+        queue = uart.write_buff_queue
+        if not len(queue):
+            # 先标记空闲再检查一次，避免与notify_write()之间漏掉唤醒
+            port.write_idle = True
+            if not len(queue):
+                return None
+            port.write_idle = False
+
+        # 严格通道的帧随时可发送，其余通道按发送节奏
+        lane, frames = queue.get_lane_batch(max(1, uart.write_burst), timeout=0,
+                                            paced_until_ns=port.next_send_ns)
+        if not frames:
+            return queue.next_ready_ns(now_ns, port.next_send_ns)
+
+        if uart.metrics is not None:
+            uart.metrics.write_queue_depth.record(len(queue) + len(frames))
+        if not uart._send_frames(frames, lane):
+            return None
+
+        if not lane.strict:
+            # 按固定周期推进发送时间，落后超过一个周期时不补发
+            period_ns = int(1e9 / uart.send_frequency_hz)
+            port.next_send_ns = max(port.next_send_ns, now_ns - period_ns) + len(frames) * period_ns
+        ready_ns = queue.next_ready_ns(now_ns, port.next_send_ns)
+        return ready_ns if ready_ns is not None else port.next_send_ns
+
+    def _on_readable(self, port: _HubPort):
+        uart = port.uart
+        try:
+            uart._read_uart_drain(0.0)
+        except OSError as e:
+            print(f"Read thread error: {str(e)}")
+            if uart.metrics is not None:
+                uart.metrics.read_errors += 1
+            uart.io_error.set()
+            self._disconnect(port)
+
+    def _add(self, port: _HubPort):
+        if port not in self.ports:
+            self.ports.append(port)
+        self._sync(port)
+
+    def _remove(self, port: _HubPort, done: Optional[threading.Event] = None):
+        port.detached = True
+        self._unregister_read(port)
+        if port.watcher is not None:
+            self._unregister(port.watcher.fileno())
+            port.watcher.close()
+            port.watcher = None
+        if port in self.ports:
+            self.ports.remove(port)
+        if done is not None:
+            done.set()
+
+    def _sync(self, port: _HubPort):
+        """按串口对象当前的状态更新注册，enable/disable线程、打开串口或I/O错误后调用"""
+        if port.detached:
+            return
+        uart = port.uart
+        serial_port = uart.serial_port
+        if serial_port is not port.serial_port:
+            self._unregister_read(port)
+            port.serial_port = serial_port
+            port.fd = serial_port.fileno() if serial_port is not None else -1
+            port.next_send_ns = 0
+            port.next_check_ns = 0
+
+        want_read = serial_port is not None and uart.flag_thread_read_uart
+        if want_read and not port.reading:
+            self.selector.register(port.fd, selectors.EVENT_READ, (_KIND_READ, port))
+            port.reading = True
+        elif not want_read:
+            self._unregister_read(port)
+
+        if uart.uart_dev and (port.watcher is None or port.watcher.path != uart.uart_dev):
+            if port.watcher is not None:
+                self._unregister(port.watcher.fileno())
+                port.watcher.close()
+            port.watcher = DeviceWatcher(uart.uart_dev)
+            if port.watcher.fileno() >= 0:
+                self.selector.register(port.watcher.fileno(), selectors.EVENT_READ,
+                                       (_KIND_WATCH, port))
+
+        port.write_idle = False
+        port.deadline = 0
+        if serial_port is not None and uart.io_error.is_set():
+            self._disconnect(port)
+
+    def _unregister(self, fd: int):
+        if fd < 0:
+            return
+        try:
+            self.selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def _unregister_read(self, port: _HubPort):
+        if port.reading:
+            self._unregister(port.fd)
+            port.reading = False
+
+    def _disconnect(self, port: _HubPort):
+        """断线处理，与UartThread__检查线程的流程相同，但重连由定时器驱动不阻塞循环"""
+        uart = port.uart
+        self._unregister_read(port)
+        port.disconnect_ns = time.monotonic_ns()
+        port.resume_read = uart.flag_thread_read_uart
+        port.resume_write = uart.flag_thread_write_uart
+        uart.write_thread_suspended = port.resume_write
+        uart.flag_thread_read_uart = False
+        uart.flag_thread_write_uart = False
+
+        uart._close_disconnected_port()
+        port.serial_port = None
+        if uart.serial_port is not None or not uart.auto_reconnect:
+            # 已在回调中自行重连，或未开启自动重连
+            uart.write_thread_suspended = False
+            self._sync(port)
+            return
+
+        port.backoff_ns = int(uart.reconnect_backoff_min * 1e9)
+        port.reconnect_at_ns = port.disconnect_ns + port.backoff_ns
+        port.deadline = 0
+
+    def _try_reconnect(self, port: _HubPort, now_ns: int):
+        uart = port.uart
+        if os.path.exists(uart.uart_dev):
+            uart.io_error.clear()
+            if uart.init_serial_port(uart.uart_dev, uart.baudrate):
+                port.reconnect_at_ns = 0
+                uart._resume_after_reconnect(port.resume_read, port.resume_write,
+                                             port.disconnect_ns)
+                return
+            uart.serial_port = None
+
+        # 设备节点事件会提前触发重试
+        port.backoff_ns = min(port.backoff_ns * 2, int(uart.reconnect_backoff_max * 1e9))
+        port.reconnect_at_ns = now_ns + port.backoff_ns
+
+
+class UartHub:
+    def __init__(self, n_threads: int = 1):
+        """
+        多串口共用的I/O循环
+        :param n_threads: 循环线程数，串口按数量均分到各线程，同一串口始终在同一线程中处理
+        """
+        if n_threads <= 0:
+            raise ValueError("n_threads must be positive")
+
+        self.loops = [_HubLoop(i) for i in range(n_threads)]
+        self.ports: Dict[int, _HubPort] = {}
+        self.mutex = threading.Lock()
+        for loop in self.loops:
+            loop.thread.start()
+
+    def attach(self, uart):
+        """
+        将已打开的串口加入hub，重复调用只更新状态
+        :param uart: UartThread__对象
+        """
+        with self.mutex:
+            port = self.ports.get(id(uart))
+            if port is None:
+                loop = min(self.loops, key=lambda l: sum(1 for p in self.ports.values()
+                                                          if p.loop is l))
+                port = _HubPort(uart, loop)
+                self.ports[id(uart)] = port
+        port.loop.call_soon(port.loop._add, port)
+
+    def detach(self, uart, timeout: float = 2.0):
+        """
+        将串口移出hub，返回后不再有该串口的回调（在循环线程中调用时立即生效）
+        :param uart: UartThread__对象
+        :param timeout: 等待循环线程处理的超时时间
+        """
+        with self.mutex:
+            port = self.ports.pop(id(uart), None)
+        if port is None:
+            return
+        if port.loop.in_loop_thread():
+            port.loop._remove(port)
+            return
+        done = threading.Event()
+        port.loop.call_soon(port.loop._remove, port, done)
+        done.wait(timeout)
+
+    def update(self, uart):
+        """串口状态（读写线程开关、I/O错误）变化后通知hub"""
+        port = self.ports.get(id(uart))
+        if port is not None:
+            port.loop.call_soon(port.loop._sync, port)
+
+    def notify_write(self, uart):
+        """写队列有新帧时通知hub，仅在该串口的写定时器空闲或有严格通道的帧时唤醒循环"""
+        port = self.ports.get(id(uart))
+        if port is not None and (port.write_idle or uart.write_buff_queue.strict_pending()):
+            port.write_idle = False
+            port.write_pending = True
+            port.loop.wake()
+
+    def stats(self) -> dict:
+        """
+        获取hub状态
+        :return: 线程数、串口数及各线程的循环次数
+        """
+        return {
+            "threads": len(self.loops),
+            "ports": len(self.ports),
+            "iterations": [loop.iterations for loop in self.loops],
+        }
+
+    def close(self):
+        """停止所有循环线程，串口本身由各串口对象的close()关闭"""
+        for loop in self.loops:
+            loop.running = False
+            loop.wake()
+        for loop in self.loops:
+            if loop.thread.is_alive() and not loop.in_loop_thread():
+                loop.thread.join(timeout=2.0)
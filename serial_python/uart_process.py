@@ -0,0 +1,492 @@
+"""
+多进程串口：读、对齐、校验在子进程中完成
+
+主进程中视觉等重负载长时间持有GIL时，UartThread__的读线程拿不到GIL，读取、对齐与回调都会被推迟，
+时间戳也随之失真。UartProcess把串口交给专用子进程：子进程读取、对齐、校验后，将每帧连同帧尾到达的
+monotonic_ns时间戳（按字节位置插值）写入共享内存环形队列（ShmRing，定长记录，不序列化），
+主进程按批零拷贝取出并查表分发；发送方向相同，主进程编码后写入发送队列，由子进程写串口。
+子进程自行处理断线重连。
+"""
+
+import multiprocessing
+import os
+import select
+import threading
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+import serial
+
+from uart import Uart, ColorPrint
+from queue_t import ByteRingBuffer
+from mission_schema import MissionRegistry
+from metrics import Histogram, MetricsExporter
+from shm_ring import ShmRing, RECORD_HEADER
+from frame_batch import BatchDecoder, merge_batches
+
+# 接收队列计数器下标，由子进程写
+STAT_STATE = 0
+STAT_BYTES_IN = 1
+STAT_FRAMES_IN = 2
+STAT_BYTES_OUT = 3
+STAT_FRAMES_OUT = 4
+STAT_RESYNC_DROPPED_BYTES = 5
+STAT_CRC_FAILURES = 6
+STAT_RECONNECTS = 7
+
+# 发送队列计数器下标，由主进程写
+CONTROL_STOP = 0
+
+# writev单次最多提交的帧数
+TX_BATCH = 256
+
+
+def _flush_tx(fd: int, tx_ring: ShmRing, backlog: bytearray, stats) -> bool:
+    """
+    将发送队列中的帧直接从共享内存writev到串口，写不完的部分复制到backlog
+    :return: True发送队列与backlog均已写空
+    """
+    if backlog:
+        try:
+            written = os.write(fd, backlog)
+        except BlockingIOError:
+            written = 0
+        del backlog[:written]
+        stats[STAT_BYTES_OUT] += written
+        if backlog:
+            return False
+
+    view, n = tx_ring.peek(TX_BATCH)
+    while n:
+        frames = [frame for _, frame in tx_ring.iter_records(view, n)]
+        try:
+            written = os.writev(fd, frames)
+        except BlockingIOError:
+            written = 0
+        stats[STAT_BYTES_OUT] += written
+        for frame in frames:
+            if written >= len(frame):
+                written -= len(frame)
+            else:
+                backlog += frame[written:]
+                written = 0
+        del frames
+        view.release()
+        tx_ring.release(n)
+        stats[STAT_FRAMES_OUT] += n
+        if backlog:
+            return False
+        view, n = tx_ring.peek(TX_BATCH)
+    view.release()
+    return True
+
+
+def _run_uart_process(dev: str, baudrate: int, rx_ring: ShmRing, tx_ring: ShmRing,
+                      options: dict, backoff_min: float, backoff_max: float):
+    """UartProcess子进程主循环"""
+    uart = Uart(**options)
+    stats = rx_ring.counters
+    control = tx_ring.counters
+    chunk = memoryview(uart.read_chunk)
+    tx_fd = tx_ring.fileno()
+    tx_backlog = bytearray()
+    fd = -1
+    opened = False
+    backoff = backoff_min
+    retry_ns = 0
+
+    while not control[CONTROL_STOP]:
+        if fd < 0:
+            now = time.monotonic_ns()
+            if now >= retry_ns:
+                if os.path.exists(dev) and uart.init_serial_port(dev, baudrate, timeout=0):
+                    fd = uart.serial_port.fileno()
+                    if opened:
+                        stats[STAT_RECONNECTS] += 1
+                    opened = True
+                    backoff = backoff_min
+                    stats[STAT_STATE] = UartProcess.STATE_ONLINE
+                    rx_ring.wake()
+                    continue
+                uart.serial_port = None
+                stats[STAT_STATE] = UartProcess.STATE_OFFLINE
+                rx_ring.wake()
+                retry_ns = now + int(backoff * 1e9)
+                backoff = min(backoff * 2, backoff_max)
+            # 等待重试时间到达，或被主进程唤醒（停止）
+            select.select([tx_fd], [], [], max(0.0, (retry_ns - time.monotonic_ns()) / 1e9))
+            tx_ring._drain_notify()
+            continue
+
+        try:
+            writable = [fd] if tx_backlog else []
+            readable, writable, _ = select.select([fd, tx_fd], writable, [], 0.1)
+            if fd in readable:
+                n = uart._read_pending_into(chunk)
+                uart._stamp_read(n)
+                stats[STAT_BYTES_IN] += n
+                uart.read_buff_queue.push_bytes(chunk[:n])
+                ret, frames = uart.get_aligned_frames_from_queue()
+                for frame, frame_ns in zip(frames, uart.frame_ns):
+                    rx_ring.push(frame, frame_ns)
+                rx_ring.publish()
+                stats[STAT_FRAMES_IN] += len(frames)
+                stats[STAT_RESYNC_DROPPED_BYTES] = uart.frame_aligner.dropped_bytes
+                if uart.crc is not None:
+                    stats[STAT_CRC_FAILURES] = uart.crc.failures
+            if tx_fd in readable:
+                tx_ring._drain_notify()
+            if writable or tx_ring.available():
+                _flush_tx(fd, tx_ring, tx_backlog, stats)
+        except (OSError, serial.SerialException) as e:
+            # 断线：关闭串口，未发送的帧保留在发送队列中，重连后继续发送
+            ColorPrint.red(f"Uart process {dev} error: {e}")
+            try:
+                uart.close()
+            except (OSError, serial.SerialException):
+                pass
+            uart.serial_port = None
+            uart.read_buff_queue.clear()
+            fd = -1
+            retry_ns = time.monotonic_ns() + int(backoff * 1e9)
+            stats[STAT_STATE] = UartProcess.STATE_OFFLINE
+            rx_ring.wake()
+
+    uart.close()
+    stats[STAT_STATE] = UartProcess.STATE_STOPPED
+    rx_ring.wake()
+    rx_ring.close()
+    tx_ring.close()
+
+
+class UartProcess(Uart):
+    # 子进程状态
+    STATE_STARTING = 0
+    STATE_ONLINE = 1
+    STATE_OFFLINE = 2
+    STATE_STOPPED = 3
+
+    def __init__(self, uart_length=8, rx_records=4096, tx_records=1024, queue_capacity=4096,
+                 queue_overflow=ByteRingBuffer.OVERFLOW_DROP_OLDEST,
+                 mission_registry: Optional[MissionRegistry] = None, crc=None,
+                 framing=Uart.FRAMING_FIXED, max_payload=4096, start_method="spawn",
+                 backend=Uart.BACKEND_PYSERIAL):
+        """
+        多进程串口类，子进程读写串口，主进程通过共享内存环形队列收发帧
+        :param uart_length: 每帧数据长度
+        :param rx_records: 接收队列的记录数，满时子进程丢弃新帧
+        :param tx_records: 发送队列的记录数，满时mission_send返回False
+        :param queue_capacity: 子进程读队列容量（字节）
+        :param queue_overflow: 子进程读队列溢出策略，见ByteRingBuffer
+        :param mission_registry: 任务注册表，默认包含任务1、任务2，只在主进程中使用
+        :param crc: 帧校验，None表示不校验，或算法名/FrameCrc对象，见crc.py
+        :param framing: 帧格式，fixed或variable
+        :param max_payload: 变长帧的最大负载长度（字节）
+        :param start_method: 子进程启动方式，默认spawn，不继承主进程的线程与锁
+        :param backend: 子进程的串口后端，pyserial或native
+        """
+        super().__init__(uart_length, queue_capacity, queue_overflow,
+                         mission_registry=mission_registry, crc=crc, framing=framing,
+                         max_payload=max_payload, backend=backend)
+
+        self.enable_show_read = False
+        self.enable_show_write = False
+        self.rx_records = rx_records
+        self.tx_records = tx_records
+        self.start_method = start_method
+        self.reconnect_backoff_min = 0.05
+        self.reconnect_backoff_max = 2.0
+
+        # 子进程按相同配置创建Uart，CRC只传算法名，失败计数由子进程统计
+        self.options = {
+            "uart_length": uart_length,
+            "queue_capacity": queue_capacity,
+            "queue_overflow": queue_overflow,
+            "crc": self.crc.algorithm if self.crc is not None else None,
+            "framing": framing,
+            "max_payload": max_payload,
+            "backend": backend,
+        }
+        if framing == self.FRAMING_VARIABLE:
+            self.max_frame_length = self.frame_aligner.max_frame_length
+        else:
+            self.max_frame_length = uart_length
+
+        self.process: Optional[multiprocessing.Process] = None
+        self.rx_ring: Optional[ShmRing] = None
+        self.tx_ring: Optional[ShmRing] = None
+        self.mutex_write = threading.Lock()
+
+        # 分发线程
+        self.thread_dispatch = None
+        self.flag_thread_dispatch = False
+
+        # 从子进程读出数据到主进程分发完成的延迟
+        self.dispatch_latency_ns = Histogram()
+        self.batch_decoder = BatchDecoder(self.mission_registry)
+        self.frames_dispatched = 0
+        self.tx_dropped_frames = 0
+        self.metrics_exporter: Optional[MetricsExporter] = None
+
+    def open(self, dev: str, baudrate: int = 115200, timeout: float = 5.0) -> bool:
+        """
+        创建收发队列并启动子进程，等待子进程打开串口
+        :param dev: 串口设备名
+        :param baudrate: 波特率
+        :param timeout: 等待子进程打开串口的超时时间（秒）
+        :return: True串口已打开，False打开失败（子进程仍在后台按退避间隔重试）
+        """
+        if self.process is not None:
+            raise RuntimeError("UartProcess is already open")
+
+        self.uart_dev = dev
+        self.baudrate = baudrate
+        ctx = multiprocessing.get_context(self.start_method)
+        self.rx_ring = ShmRing(self.rx_records, self.max_frame_length, notify=ctx.Pipe(duplex=False))
+        self.tx_ring = ShmRing(self.tx_records, self.max_frame_length, notify=ctx.Pipe(duplex=False))
+        self.process = ctx.Process(target=_run_uart_process,
+                                   args=(dev, baudrate, self.rx_ring, self.tx_ring, self.options,
+                                         self.reconnect_backoff_min, self.reconnect_backoff_max),
+                                   daemon=True)
+        self.process.start()
+
+        deadline = time.monotonic() + timeout
+        stats = self.rx_ring.counters
+        while stats[STAT_STATE] == self.STATE_STARTING and self.process.is_alive():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            select.select([self.rx_ring.fileno(), self.process.sentinel], [], [], remaining)
+        return stats[STAT_STATE] == self.STATE_ONLINE
+
+    def is_serial_port_online(self) -> bool:
+        """
+        检测子进程中的串口是否在线
+        :return: True在线，False离线
+        """
+        return self.rx_ring is not None and self.rx_ring.counters[STAT_STATE] == self.STATE_ONLINE
+
+    def read_batch(self, max_records: int = 0, timeout: Optional[float] = 0.0) -> Tuple[memoryview, int]:
+        """
+        零拷贝取出一批已接收的帧，处理完后须调用release(n)
+        :param max_records: 最多取出的帧数，0表示不限制
+        :param timeout: 没有帧时的等待时间（秒），None表示一直等待
+        :return: (记录区的memoryview, 帧数)，用iter_frames()遍历
+        """
+        if timeout != 0.0 and not self.rx_ring.wait(timeout):
+            return memoryview(b''), 0
+        return self.rx_ring.peek(max_records)
+
+    def iter_frames(self, view: memoryview, n: int) -> Iterator[Tuple[int, memoryview]]:
+        """
+        遍历read_batch()取出的帧
+        :return: 迭代(帧尾到达的monotonic_ns时间戳, 帧的memoryview)，帧在release()前有效
+        """
+        return self.rx_ring.iter_records(view, n)
+
+    def release(self, n: int):
+        """
+        释放read_batch()取出的前n帧
+        :param n: 帧数
+        """
+        self.rx_ring.release(n)
+
+    def process_received(self, max_records: int = 0, timeout: Optional[float] = 0.0) -> int:
+        """
+        取出一批帧，按任务注册表查表解码并调用对应回调
+        :param max_records: 最多处理的帧数，0表示不限制
+        :param timeout: 没有帧时的等待时间（秒），None表示一直等待
+        :return: 处理的帧数
+        """
+        view, n = self.read_batch(max_records, timeout)
+        if n == 0:
+            return 0
+
+        dispatch = self.mission_registry.dispatch
+        latency = self.dispatch_latency_ns
+        enable_show_read = self.enable_show_read
+        try:
+            for frame_ns, frame in self.rx_ring.iter_records(view, n):
+                if enable_show_read:
+                    self.show_read_buff(frame)
+                dispatch(frame, frame_ns)
+                latency.record(time.monotonic_ns() - frame_ns)
+        finally:
+            view.release()
+            self.rx_ring.release(n)
+        self.frames_dispatched += n
+        return n
+
+    def read_frames(self, max_n: int = 0, timeout: Optional[float] = 0.1, with_time: bool = False) -> dict:
+        """
+        取出已接收的帧，按任务ID分组批量解码，直接由共享内存中的定长记录生成，不经过回调
+        :param max_n: 最多取出的帧数，0表示全部
+        :param timeout: 没有帧时的等待时间（秒），None表示一直等待
+        :param with_time: 是否同时返回各帧帧尾到达的monotonic_ns时间戳
+        :return: 见UartThread__.read_frames()
+        """
+        result = {}
+        remaining = max_n
+        while True:
+            view, n = self.read_batch(remaining, timeout)
+            if n == 0:
+                break
+            try:
+                batch = self.batch_decoder.decode(view, n, self.rx_ring.record_size,
+                                                  RECORD_HEADER.size,
+                                                  time_offset=0 if with_time else -1, copy=True)
+            finally:
+                view.release()
+                self.rx_ring.release(n)
+            self.frames_dispatched += n
+            merge_batches(result, batch)
+            # 回绕时peek只返回到缓冲区末尾，继续取剩余部分
+            timeout = 0.0
+            if max_n > 0:
+                remaining -= n
+                if remaining <= 0:
+                    break
+        return result
+
+    def _thread_dispatch(self):
+        """分发线程函数"""
+        while self.flag_thread_dispatch:
+            try:
+                self.process_received(timeout=0.1)
+            except Exception as e:
+                print(f"Dispatch thread error: {str(e)}")
+                time.sleep(0.1)
+
+    def enable_thread_dispatch(self):
+        """开启分发线程，由其调用任务回调"""
+        if not self.flag_thread_dispatch:
+            self.flag_thread_dispatch = True
+            self.thread_dispatch = threading.Thread(target=self._thread_dispatch, daemon=True)
+            self.thread_dispatch.start()
+
+    def disable_thread_dispatch(self):
+        """关闭分发线程"""
+        self.flag_thread_dispatch = False
+        if self.rx_ring is not None:
+            self.rx_ring.wake()
+        if self.thread_dispatch and self.thread_dispatch.is_alive():
+            self.thread_dispatch.join(timeout=2.0)
+
+    def fileno(self) -> int:
+        """接收队列的通知文件描述符，可注册到外部事件循环，可读时调用process_received()"""
+        return self.rx_ring.fileno()
+
+    def mission_send(self, assignment_func, *args, **kwargs) -> bool:
+        """
+        任务发送串口模板函数，编码后写入发送队列，由子进程写串口
+        :param assignment_func: 为write_buff赋值的函数，或已注册的任务ID/任务名
+        :param args: 函数参数或按字段顺序的值
+        :param kwargs: 函数关键字参数或按字段名的值
+        :return: True已入队，False发送队列已满
+        """
+        with self.mutex_write:
+            self.assign_write_buff(assignment_func, *args, **kwargs)
+            if self.enable_show_write:
+                print("Mission Send:", end=" ")
+                self.show_write_buff(self.write_buff)
+            return self._push_tx(self.write_buff)
+
+    def write_frames(self, frames) -> int:
+        """
+        将已编码的帧批量写入发送队列，只通知子进程一次
+        :param frames: 帧列表
+        :return: 入队的帧数
+        """
+        with self.mutex_write:
+            count = 0
+            for frame in frames:
+                if not self.tx_ring.push(frame):
+                    self.tx_dropped_frames += 1
+                    continue
+                count += 1
+            self.tx_ring.publish()
+        return count
+
+    def _push_tx(self, frame) -> bool:
+        """写入一帧并通知子进程，需持有mutex_write"""
+        if self.tx_ring is None or not self.tx_ring.push(frame):
+            self.tx_dropped_frames += 1
+            return False
+        self.tx_ring.publish()
+        return True
+
+    def enable_just_float_receive(self, channels: int = 0, max_channels: int = 64):
+        """
+        不支持：接收队列的记录是按最长帧定长的任务帧，子进程无法把N×C的JustFloat采样块转发给主进程，
+        JustFloat接收请使用UartThread__或AsyncUart
+        """
+        raise ValueError("UartProcess forwards only mission frames through fixed-size shared-memory "
+                         "records, so JustFloat sample blocks cannot reach the main process; "
+                         "use UartThread__ or AsyncUart for JustFloat receive")
+
+    def enable_telemetry_receive(self, channels: int, scale=1e-3, max_payload=1024):
+        """
+        不支持：压缩遥测包需在子进程中解码为采样块，而接收队列只能转发定长的任务帧，
+        压缩遥测接收请使用UartThread__或AsyncUart
+        """
+        raise ValueError("UartProcess forwards only mission frames through fixed-size shared-memory "
+                         "records, so decoded telemetry blocks cannot reach the main process; "
+                         "use UartThread__ or AsyncUart for telemetry receive")
+
+    def get_stats(self) -> dict:
+        """
+        获取统计快照，收发计数由子进程写入共享内存
+        :return: 统计快照（时间单位为微秒）
+        """
+        counters = self.rx_ring.counters if self.rx_ring is not None else [0] * 8
+        return {
+            "port": self.uart_dev,
+            "online": self.is_serial_port_online(),
+            "process_alive": self.process is not None and self.process.is_alive(),
+            "bytes_in": counters[STAT_BYTES_IN],
+            "frames_in": counters[STAT_FRAMES_IN],
+            "bytes_out": counters[STAT_BYTES_OUT],
+            "frames_out": counters[STAT_FRAMES_OUT],
+            "resync_dropped_bytes": counters[STAT_RESYNC_DROPPED_BYTES],
+            "crc_failures": counters[STAT_CRC_FAILURES],
+            "reconnect_count": counters[STAT_RECONNECTS],
+            "frames_dispatched": self.frames_dispatched,
+            "tx_dropped_frames": self.tx_dropped_frames,
+            "rx_ring": self.rx_ring.stats() if self.rx_ring is not None else {},
+            "tx_ring": self.tx_ring.stats() if self.tx_ring is not None else {},
+            "dispatch_latency_us": self.dispatch_latency_ns.snapshot(1000.0),
+        }
+
+    def start_metrics_exporter(self, callback: Callable[[dict], None], interval: float = 1.0):
+        """
+        开启周期性统计导出
+        :param callback: 接收get_stats()快照的回调
+        :param interval: 导出周期（秒）
+        """
+        self.stop_metrics_exporter()
+        self.metrics_exporter = MetricsExporter(self.get_stats, callback, interval)
+        self.metrics_exporter.start()
+
+    def stop_metrics_exporter(self):
+        """停止周期性统计导出"""
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
+
+    def close(self):
+        """停止分发线程与子进程，删除共享内存"""
+        self.stop_metrics_exporter()
+        self.disable_thread_dispatch()
+        if self.process is not None:
+            self.tx_ring.counters[CONTROL_STOP] = 1
+            self.tx_ring.wake()
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1.0)
+            self.process = None
+        for ring in (self.rx_ring, self.tx_ring):
+            if ring is not None:
+                ring.close()
+        self.rx_ring = self.tx_ring = None
+        super().close()
@@ -1,25 +1,104 @@
+import asyncio
+import inspect
+import os
 import threading
 import time
-import queue
 import struct
-from typing import List, Callable, Any
+from concurrent.futures import Future
+from typing import List, Callable, Any, Optional
 from uart import Uart, ColorPrint
+from queue_t import ByteRingBuffer, LaneQueue, WriteLane
+from mission_schema import MissionRegistry
+from metrics import UartMetrics, MetricsExporter
+from hotplug import DeviceWatcher
+from request_manager import RequestManager
+from dispatcher import Dispatcher
+from clock_sync import ClockSync
+from frame_batch import FrameBatch
+from scheduler import DeadlineScheduler, PeriodicTask
 
 
 class UartThread__(Uart):
-    def __init__(self, uart_length=8, send_frequency_hz=300.0):
+    # 读模式
+    READ_MODE_DRAIN = "drain"  # 等待可读后一次读出所有待读数据
+    READ_MODE_FIXED = "fixed"  # 每次阻塞读取uart_length字节（旧行为）
+    
+    # 断线时写队列中未发送帧的处理策略
+    PENDING_KEEP = "keep"  # 保留，重连后继续发送
+    PENDING_DROP = "drop"  # 丢弃，重连后只发送新帧
+    
+    def __init__(self, uart_length=8, send_frequency_hz=300.0, queue_capacity=4096,
+                 queue_overflow=ByteRingBuffer.OVERFLOW_DROP_OLDEST, read_mode=READ_MODE_DRAIN,
+                 write_queue_size=None, write_queue_overflow=LaneQueue.OVERFLOW_DROP_OLDEST,
+                 write_burst=1, mission_registry: Optional[MissionRegistry] = None,
+                 auto_reconnect=True, reconnect_pending=PENDING_KEEP, hub=None, crc=None,
+                 framing=Uart.FRAMING_FIXED, max_payload=4096,
+                 write_lanes: Optional[LaneQueue] = None,
+                 dispatcher: Optional[Dispatcher] = None, backend=Uart.BACKEND_PYSERIAL,
+                 write_scheduler: Optional[DeadlineScheduler] = None):
         """
         初始化多线程串口类
         :param uart_length: 每帧数据长度
         :param send_frequency_hz: 发送频率（Hz）
-        
+        :param queue_capacity: 读线程队列容量（字节）
+        :param queue_overflow: 读线程队列溢出策略，见ByteRingBuffer
+        :param read_mode: 读模式，drain或fixed
+        :param write_queue_size: 写队列最大帧数，默认为1秒的发送量
+        :param write_queue_overflow: 写队列溢出策略，见WriteLane
+        :param write_burst: 写线程单次write()最多合并的帧数，1表示逐帧发送
+        :param mission_registry: 任务注册表，默认包含任务1、任务2
+        :param auto_reconnect: 串口断开后是否自动重连并恢复原有的读写线程
+        :param reconnect_pending: 断线时写队列中未发送帧的处理策略，keep或drop
+        :param hub: UartHub对象，设置后读写、定时发送和断线检测都由hub的循环处理，不再创建本串口的线程
+        :param crc: 帧校验，None表示不校验，或算法名/FrameCrc对象，见crc.py
+        :param framing: 帧格式，fixed为uart_length定长帧，variable为带长度字段的变长帧
+        :param max_payload: 变长帧的最大负载长度（字节）
+        :param write_lanes: 多通道写队列，设置后忽略write_queue_size与write_queue_overflow，见LaneQueue
+        :param dispatcher: 接收回调的分发器，默认在读线程中直接调用回调，见Dispatcher
+        :param backend: 串口后端，pyserial或native（termios直接读写，见native_serial.py）
+        :param write_scheduler: 写线程的截止时间调度器，决定发送节奏的忙等时间与错过时隙的策略，见DeadlineScheduler
         """
-        super().__init__(uart_length)
+        super().__init__(uart_length, queue_capacity, queue_overflow,
+                         mission_registry=mission_registry, crc=crc, framing=framing,
+                         max_payload=max_payload, backend=backend)
         
         # 配置参数
         self.send_frequency_hz = send_frequency_hz  
         self.enable_show_read = True
         self.enable_show_write = True
+        self.write_burst = write_burst
+        
+        # 读模式配置，batch_bytes/batch_window用于在延迟与批量之间折中
+        self.read_mode = read_mode
+        self.read_poll_timeout = 0.1
+        self.read_batch_bytes = 0
+        self.read_batch_window = 0.0
+        
+        # 帧延迟统计（从数据可读到处理完成），单位ns
+        self.frame_latency_count = 0
+        self.frame_latency_total_ns = 0
+        self.frame_latency_max_ns = 0
+        self.frame_latency_last_ns = 0
+        
+        # 统计导出
+        self.metrics_exporter: Optional[MetricsExporter] = None
+        self.last_write_ns = 0
+        
+        # 非严格通道的下一次发送时间（monotonic_ns），按绝对截止时间推进
+        self.next_send_ns = 0
+        
+        # 写线程的截止时间调度器，也执行schedule_mission()添加的周期任务
+        self.write_scheduler = write_scheduler if write_scheduler is not None else DeadlineScheduler()
+        
+        # 请求/应答，None表示未开启
+        self.requests: Optional[RequestManager] = None
+        
+        # 主机与下位机的时钟同步，None表示未开启
+        self.clock_sync: Optional[ClockSync] = None
+        
+        # 帧批量缓冲，None表示未开启；frame_batch_callbacks为False时缓存的帧不再调用回调
+        self.frame_batch: Optional[FrameBatch] = None
+        self.frame_batch_callbacks = False
         
         # 线程相关
         self.thread_read_uart = None
@@ -31,14 +110,43 @@ class UartThread__(Uart):
         self.flag_thread_write_uart = False
         self.flag_thread_check_serial = False
         
+        # 热插拔与自动重连，重连间隔在backoff_min与backoff_max之间指数退避
+        self.auto_reconnect = auto_reconnect
+        self.reconnect_pending = reconnect_pending
+        self.reconnect_backoff_min = 0.05
+        self.reconnect_backoff_max = 2.0
+        self.check_interval = 1.0
+        self.device_watcher: Optional[DeviceWatcher] = None
+        self.io_error = threading.Event()
+        self.write_thread_suspended = False  # 断线期间写线程暂停，发送的帧先进入写队列
+        self.check_serial_event = threading.Event()
+        self.reconnect_count = 0
+        self.last_reconnect_ms = 0.0
+        
         # 线程同步
         self.mutex_write_uart = threading.Lock()
-        self.mutex_write_uart_queue = threading.Lock()
-        self.cv_write_uart_queue = threading.Condition(self.mutex_write_uart_queue)
-        self.write_buff_queue = queue.Queue()
+        if write_lanes is None:
+            if write_queue_size is None:
+                write_queue_size = max(1, int(send_frequency_hz))
+            write_lanes = LaneQueue.single(write_queue_size, write_queue_overflow)
+        self.write_buff_queue = write_lanes
         
-        # 启动检查串口线程
-        self._start_check_serial_thread()
+        # 接收回调的分发器，读线程只负责读取、对齐后提交
+        if dispatcher is None:
+            dispatcher = Dispatcher(id_offset=self.mission_registry.id_offset)
+        self.dispatcher = dispatcher
+        self.dispatcher.start(self.mission_registry.dispatch)
+        
+        # 内置任务的回调，已设置回调的任务保持不变
+        for mission_id, handler in ((0x01, self._on_mission1_received),
+                                    (0x02, self._mission2_handler())):
+            if mission_id in self.mission_registry and self.mission_registry.handlers[mission_id] is None:
+                self.mission_registry.set_handler(mission_id, handler)
+        
+        # 启动检查串口线程，使用hub时由hub负责
+        self.hub = hub
+        if hub is None:
+            self._start_check_serial_thread()
     
     def init_with_threads(self, uart_port: str, enable_thread_read=False, 
                          enable_thread_write=False, baudrate=115200):
@@ -52,6 +160,10 @@ class UartThread__(Uart):
         # 串口初始化
         if not self.init_serial_port(uart_port, baudrate):
             return False
+        self.io_error.clear()
+        self.check_serial_event.set()
+        if self.hub is not None:
+            self.hub.attach(self)
         
         # 开启读串口线程
         if enable_thread_read:
@@ -67,122 +179,272 @@ class UartThread__(Uart):
         """读串口线程函数"""
         while self.flag_thread_read_uart:
             try:
-                # 读取串口
-                read_length = self.read_buffer()
-                
-                if self.enable_show_read:
-                    self.show_read_buff()
-                    print(f"read length {read_length}")
-                
-                # 读取到串口后将数据送入队列
-                self.push_read_buff_to_queue(read_length)
-                
-                # 从队列中获取正确的数据
-                ret, aligned_data = self.get_aligned_from_queue()
-                if ret == 1:
-                    # 从队列中获取正确的数据成功
-                    self._process_received_data(aligned_data)
-                elif ret == -1:
-                    # 从队列中获取正确的数据失败
-                    ColorPrint.red("Failed to get aligned data from queue")
-                    if self.enable_show_read:
-                        self.show_read_buff()
-                
-                time.sleep(0.001)  # 短暂休眠避免CPU占用过高
+                if self.read_mode == self.READ_MODE_DRAIN:
+                    self._read_uart_drain()
+                else:
+                    self._read_uart_fixed()
                 
             except Exception as e:
                 print(f"Read thread error: {str(e)}")
+                if self.metrics is not None:
+                    self.metrics.read_errors += 1
+                if isinstance(e, OSError):
+                    self._on_io_error(e)
                 time.sleep(0.1)
     
-    def _process_received_data(self, data: bytearray):
+    def _read_uart_fixed(self):
+        """定长读取一次串口并处理"""
+        # 读取串口
+        read_length = self.read_buffer()
+        
+        if self.enable_show_read:
+            self.show_read_buff()
+            print(f"read length {read_length}")
+        
+        # 读取到串口后将数据送入队列，补零部分不入队
+        if read_length > 0:
+            self.push_read_buff_to_queue(read_length)
+        
+        # 从队列中获取所有正确的数据帧
+        self._process_queue()
+        
+        time.sleep(0.001)  # 短暂休眠避免CPU占用过高
+    
+    def _read_uart_drain(self, timeout: Optional[float] = None):
+        """
+        等待串口可读，读出所有待读数据并处理
+        :param timeout: 等待可读的超时时间（秒），默认为read_poll_timeout
         """
-        处理接收到的数据
+        if timeout is None:
+            timeout = self.read_poll_timeout
+        read_length = self.read_available(timeout, self.read_batch_bytes, self.read_batch_window)
+        if read_length == 0:
+            return
+        
+        if self.enable_show_read:
+            self.show_read_buff(memoryview(self.read_chunk)[:read_length])
+            print(f"read length {read_length}")
+        
+        self.read_buff_queue.push_bytes(memoryview(self.read_chunk)[:read_length])
+        self._process_queue(self.read_ready_ns)
+    
+    def _process_queue(self, ready_ns: int = 0):
+        """
+        从队列中取出所有对齐的数据帧并处理
+        :param ready_ns: 数据可读时的perf_counter_ns时间戳，非0时统计帧延迟
+        """
+        ret, aligned_frames = self.get_aligned_frames_from_queue()
+        if ret == 1:
+            # 从队列中获取正确的数据成功
+            metrics = self.metrics
+            for aligned_data, frame_ns in zip(aligned_frames, self.frame_ns):
+                self._process_received_data(aligned_data, frame_ns)
+                if ready_ns:
+                    latency_ns = time.perf_counter_ns() - ready_ns
+                    self._record_frame_latency(latency_ns)
+                    if metrics is not None:
+                        metrics.read_to_callback_ns.record(latency_ns)
+            for samples, block_ns in self.just_float_blocks:
+                self._process_just_float(samples, block_ns)
+            for samples, block_ns in self.telemetry_blocks:
+                self._process_telemetry(samples, block_ns)
+        elif ret == -1:
+            # 从队列中获取正确的数据失败
+            if self.metrics is not None:
+                self.metrics.align_failures += 1
+            if self.enable_show_read:
+                ColorPrint.red("Failed to get aligned data from queue")
+    
+    def _record_frame_latency(self, latency_ns: int):
+        """记录一帧的延迟"""
+        self.frame_latency_count += 1
+        self.frame_latency_total_ns += latency_ns
+        self.frame_latency_last_ns = latency_ns
+        if latency_ns > self.frame_latency_max_ns:
+            self.frame_latency_max_ns = latency_ns
+    
+    def get_frame_latency(self) -> dict:
+        """
+        获取帧延迟统计（从数据可读到处理完成）
+        :return: 帧数及平均、最大、最近一帧延迟（微秒）
+        """
+        count = self.frame_latency_count
+        return {
+            "count": count,
+            "avg_us": self.frame_latency_total_ns / count / 1000 if count else 0.0,
+            "max_us": self.frame_latency_max_ns / 1000,
+            "last_us": self.frame_latency_last_ns / 1000,
+        }
+    
+    def _process_received_data(self, data: bytes, t_ns: int = 0):
+        """
+        处理接收到的数据，交给分发器按任务注册表查表解码并调用对应回调
         :param data: 接收到的对齐数据
+        :param t_ns: 帧尾到达的monotonic_ns时间戳
         """
         if len(data) < 3:
             return
         
-        if data[2] == 0x01:
-            # 任务1
-            if len(data) >= 7:
-                X = struct.unpack('<I', data[3:7])[0]  # 小端序32位无符号整数
-                if self.enable_show_read:
-                    print(f"X: {X}")
-                    print("Receive Mission 1:")
-                    self.show_read_buff()
-                
-                # 可以在这里添加任务1的处理逻辑
-                self._on_mission1_received(X)
-        
-        elif data[2] == 0x02:
-            # 任务2
-            if len(data) >= 8:
-                X = struct.unpack('<I', data[4:8])[0]  # 小端序32位无符号整数
-                if self.enable_show_read:
-                    print(f"X: {X}")
-                    print("Receive Mission 2:")
-                    self.show_read_buff()
-                
-                # 可以在这里添加任务2的处理逻辑
-                self._on_mission2_received(X)
+        if self.metrics is not None:
+            self.metrics.frames_in[data[2]] += 1
+        
+        if self.enable_show_read:
+            decoded = self.mission_registry.decode(data)
+            if decoded is not None:
+                schema, values = decoded
+                print(f"Receive Mission {schema.mission_id}: "
+                      f"{dict(zip(schema.field_names, values))}")
+                self.show_read_buff(data)
+        
+        # pong只用于时钟同步，不再分发
+        clock_sync = self.clock_sync
+        if clock_sync is not None and clock_sync.on_frame(data, t_ns):
+            return
+        
+        # 等待中的请求的应答只交给对应的Future
+        requests = self.requests
+        if requests is not None and requests.on_frame(data):
+            return
+        
+        frame_batch = self.frame_batch
+        if frame_batch is not None:
+            frame_batch.append(data, t_ns)
+            if not self.frame_batch_callbacks:
+                return
+        
+        self.dispatcher.submit(data, t_ns)
+    
+    def _process_just_float(self, samples, t_ns: int = 0):
+        """
+        处理一块JustFloat采样，整块调用一次回调
+        :param samples: N×C的float32数组，未安装NumPy时为元组列表
+        :param t_ns: 最后一个采样帧尾到达的monotonic_ns时间戳
+        """
+        if self.metrics is not None:
+            self.metrics.just_float_samples += len(samples)
+        if self.enable_show_read:
+            print(f"Receive JustFloat: {len(samples)} samples x {self.just_float.channels} channels")
+        self._on_just_float_received(samples, t_ns)
+    
+    def _on_just_float_received(self, samples, t_ns: int):
+        """JustFloat采样块接收回调（可重写），samples为N×C的float32数组，t_ns为最后一个采样的接收时间"""
+        pass
+    
+    def _process_telemetry(self, samples, t_ns: int = 0):
+        """
+        处理一包压缩遥测采样，整包调用一次回调
+        :param samples: N×C的float32数组，未安装NumPy时为元组列表
+        :param t_ns: 包尾到达的monotonic_ns时间戳
+        """
+        if self.metrics is not None:
+            self.metrics.telemetry_samples += len(samples)
+        if self.enable_show_read:
+            print(f"Receive Telemetry: {len(samples)} samples x {self.telemetry.channels} channels")
+        self._on_telemetry_received(samples, t_ns)
+    
+    def _on_telemetry_received(self, samples, t_ns: int):
+        """压缩遥测接收回调（可重写），samples为N×C的float32数组，t_ns为包尾的接收时间"""
+        pass
     
     def _on_mission1_received(self, X: int):
         """任务1数据接收回调（可重写）"""
         pass
     
-    def _on_mission2_received(self, X: int):
+    def _on_mission2_received(self, X: int, Y: float):
         """任务2数据接收回调（可重写）"""
         pass
     
+    def _mission2_handler(self) -> Callable:
+        """
+        任务2的回调。旧版_on_mission2_received只接收X，重写的回调不能接收(X, Y)时只传入X
+        :return: 注册到任务2的回调
+        """
+        handler = self._on_mission2_received
+        try:
+            inspect.signature(handler).bind(0, 0.0)
+        except TypeError:
+            return lambda X, Y: handler(X)
+        except ValueError:
+            # 无法获取签名时按新签名调用
+            pass
+        return handler
+    
     def _thread_write_uart(self):
         """写串口线程函数"""
+        scheduler = self.write_scheduler
+        queue = self.write_buff_queue
         while self.flag_thread_write_uart:
             try:
-                # 等待队列有数据
-                with self.cv_write_uart_queue:
-                    while self.write_buff_queue.empty() and self.flag_thread_write_uart:
-                        self.cv_write_uart_queue.wait(timeout=1.0)
-                    
-                    if not self.flag_thread_write_uart:
-                        break
-                    
-                    # 获取队列中的所有数据
-                    local_write_buff = []
-                    while not self.write_buff_queue.empty():
-                        local_write_buff.append(self.write_buff_queue.get())
+                # 周期任务到期前spin_ns醒来，忙等到截止时间后执行
+                now_ns = time.monotonic_ns()
+                task_ns = scheduler.next_deadline_ns()
+                if task_ns is not None and task_ns - scheduler.spin_ns <= now_ns:
+                    scheduler.sleep_until(task_ns)
+                    scheduler.run_due()
+                    continue
+                timeout = 1.0 if task_ns is None else min(1.0, (task_ns - scheduler.spin_ns - now_ns) / 1e9)
                 
-                # 频率检查
-                expected_queue_size = int(self.send_frequency_hz)
-                if len(local_write_buff) >= expected_queue_size * self.uart_length:
-                    ColorPrint.red("Uart Send Frequency isn't Match! The Queue is Overflow!!")
-                    break
+                # 等待队列有数据，一次最多取出write_burst帧
+                metrics = self.metrics
+                if metrics is not None:
+                    metrics.write_queue_depth.record(len(queue))
+                # 严格通道的帧随时可取，其余通道在截止时间前spin_ns取出，再忙等到截止时间
+                deadline_ns = self.next_send_ns
+                idle = not len(queue)
+                lane, frames = queue.get_lane_batch(
+                    max(1, self.write_burst), timeout=timeout,
+                    paced_until_ns=deadline_ns - scheduler.spin_ns)
+                if not frames:
+                    continue
+                
+                if not lane.strict:
+                    # 队列空闲期间到期的时隙不算延迟，从现在重新计时
+                    if idle:
+                        deadline_ns = max(deadline_ns, time.monotonic_ns())
+                    send_ns = scheduler.sleep_until(deadline_ns)
+                
+                if not self._send_frames(frames, lane):
+                    time.sleep(0.1)
+                    continue
                 
-                # 发送数据
-                i = 0
-                while i < len(local_write_buff):
-                    write_buff = bytearray()
-                    for j in range(self.uart_length):
-                        if i + j < len(local_write_buff):
-                            write_buff.append(local_write_buff[i + j])
-                        else:
-                            write_buff.append(0)
-                    
-                    if len(write_buff) == self.uart_length:
-                        self.write_buffer(write_buff)
-                        
-                        if self.enable_show_write:
-                            self.show_write_buff(write_buff)
-                        
-                        # 控制发送频率
-                        sleep_time = 1.0 / self.send_frequency_hz
-                        time.sleep(sleep_time)
-                    
-                    i += self.uart_length
+                # 按绝对截止时间推进发送节奏，合并发送时按帧数顺延，严格通道的帧不占用发送节奏
+                if not lane.strict:
+                    self.next_send_ns = scheduler.pace(deadline_ns, send_ns,
+                                                       int(1e9 / self.send_frequency_hz),
+                                                       len(frames))
                 
             except Exception as e:
                 print(f"Write thread error: {str(e)}")
+                if self.metrics is not None:
+                    self.metrics.write_errors += 1
                 time.sleep(0.1)
     
+    def _send_frames(self, frames: List[bytes], lane: Optional[WriteLane] = None) -> bool:
+        """
+        将从写队列取出的帧合并为一次write()发送
+        :param frames: 帧列表
+        :param lane: 帧所属的通道
+        :return: False表示串口已断开，未发送的帧已按策略放回队首
+        """
+        write_buff = frames[0] if len(frames) == 1 else b''.join(frames)
+        if self.write_buffer(write_buff) == 0 and self.io_error.is_set():
+            # 串口已断开，未发送的帧放回队首等待重连
+            if self.reconnect_pending == self.PENDING_KEEP:
+                self.write_buff_queue.put_front(frames, lane)
+            return False
+        
+        metrics = self.metrics
+        if metrics is not None:
+            now_ns = time.perf_counter_ns()
+            if self.last_write_ns:
+                metrics.send_interval_ns.record((now_ns - self.last_write_ns) // len(frames))
+            self.last_write_ns = now_ns
+            metrics.frames_out += len(frames)
+        
+        if self.enable_show_write:
+            self.show_write_buff(write_buff)
+        return True
+    
     def _start_check_serial_thread(self):
         """启动串口检查线程"""
         self.flag_thread_check_serial = True
@@ -190,35 +452,156 @@ class UartThread__(Uart):
         self.thread_check_serial.start()
     
     def _thread_check_serial(self):
-        """检测串口是否在线线程"""
+        """检测串口是否在线线程，设备节点被删除或读写出现I/O错误时立即进行断线处理"""
         while self.flag_thread_check_serial:
             try:
                 if self.serial_port is None:
-                    time.sleep(1)
+                    self.check_serial_event.wait(1.0)
+                    self.check_serial_event.clear()
                     continue
                 
-                if not self.is_serial_port_online():
-                    self.disable_thread_write_uart()
-                    self.disable_thread_read_uart()
-                    
-                    time.sleep(1)
-                    ColorPrint.red("Uart Select Error!")
-                    
-                    # 串口断线处理
-                    self._on_serial_disconnected()
+                watcher = self._get_device_watcher()
+                if self._is_serial_port_healthy():
+                    # 等待设备节点事件或I/O错误唤醒，超时后再检查一次作为兜底
+                    watcher.wait(self.check_interval)
+                    if self._is_serial_port_healthy():
+                        continue
                 
-                time.sleep(1)
+                self._handle_serial_disconnected()
                 
             except Exception as e:
                 print(f"Check serial thread error: {str(e)}")
                 time.sleep(1)
+        
+        if self.device_watcher is not None:
+            self.device_watcher.close()
+            self.device_watcher = None
+    
+    def _get_device_watcher(self) -> DeviceWatcher:
+        """获取当前串口设备的监视器，设备路径改变时重新创建"""
+        watcher = self.device_watcher
+        if watcher is None or watcher.path != self.uart_dev:
+            if watcher is not None:
+                watcher.close()
+            watcher = DeviceWatcher(self.uart_dev)
+            self.device_watcher = watcher
+        return watcher
+    
+    def _is_serial_port_healthy(self) -> bool:
+        return not self.io_error.is_set() and self.is_serial_port_online()
+    
+    def _on_io_error(self, error: OSError):
+        """读写I/O错误时立即唤醒检查线程"""
+        self.io_error.set()
+        if self.hub is not None:
+            self.hub.update(self)
+            return
+        watcher = self.device_watcher
+        if watcher is not None:
+            watcher.wake()
+    
+    def _handle_serial_disconnected(self):
+        """串口断线处理：停止读写线程，按策略处理未发送帧，再尝试重连并恢复线程"""
+        disconnect_ns = time.monotonic_ns()
+        enable_read = self.flag_thread_read_uart
+        enable_write = self.flag_thread_write_uart
+        self.write_thread_suspended = enable_write
+        self.disable_thread_write_uart()
+        self.disable_thread_read_uart()
+        
+        self._close_disconnected_port()
+        if not self.auto_reconnect or self.serial_port is not None:
+            # 未开启自动重连，或已在回调中自行重连
+            self.write_thread_suspended = False
+            return
+        
+        if not self._reconnect():
+            self.write_thread_suspended = False
+            return
+        
+        self._resume_after_reconnect(enable_read, enable_write, disconnect_ns)
+    
+    def _close_disconnected_port(self):
+        """关闭已断开的串口，按策略处理未发送帧并调用断线回调，读写线程需已停止"""
+        ColorPrint.red("Uart Select Error!")
+        try:
+            self.serial_port.close()
+        except Exception:
+            pass
+        self.serial_port = None
+        
+        if self.reconnect_pending == self.PENDING_DROP:
+            self.write_buff_queue.clear()
+        if self.metrics is not None:
+            self.metrics.disconnects += 1
+        
+        # 串口断线处理
+        self._on_serial_disconnected()
+    
+    def _resume_after_reconnect(self, enable_read: bool, enable_write: bool, disconnect_ns: int):
+        """
+        重连成功后恢复断线前的读写线程并记录重连耗时
+        :param enable_read: 断线前是否开启读线程
+        :param enable_write: 断线前是否开启写线程
+        :param disconnect_ns: 检测到断线时的monotonic_ns时间戳
+        """
+        # 断线前未处理完的半帧已无意义，drop策略下断线期间发送的帧也一并丢弃
+        self.read_buff_queue.clear()
+        if self.just_float is not None or self.telemetry is not None:
+            self.frame_aligner.reset()
+        if self.telemetry_encoder is not None:
+            self.telemetry_encoder.reset()
+        if self.reconnect_pending == self.PENDING_DROP:
+            self.write_buff_queue.clear()
+        self.write_thread_suspended = False
+        if enable_read:
+            self.enable_thread_read_uart()
+        if enable_write:
+            self.enable_thread_write_uart()
+        
+        elapsed_ns = time.monotonic_ns() - disconnect_ns
+        self.reconnect_count += 1
+        self.last_reconnect_ms = elapsed_ns / 1e6
+        if self.metrics is not None:
+            self.metrics.reconnects += 1
+            self.metrics.reconnect_ns.record(elapsed_ns)
+        ColorPrint.green(f"Reconnected {self.uart_dev} in {self.last_reconnect_ms:.1f} ms")
+        
+        self._on_serial_reconnected()
+    
+    def _reconnect(self) -> bool:
+        """
+        等待设备重新出现并打开，失败时按指数退避重试
+        :return: True重连成功，False检查线程已停止
+        """
+        watcher = self._get_device_watcher()
+        backoff = self.reconnect_backoff_min
+        while self.flag_thread_check_serial and self.auto_reconnect:
+            if os.path.exists(self.uart_dev):
+                self.io_error.clear()
+                if self.init_serial_port(self.uart_dev, self.baudrate):
+                    return True
+                self.serial_port = None
+            
+            # 设备节点出现时立即返回
+            watcher.wait(backoff)
+            backoff = min(backoff * 2, self.reconnect_backoff_max)
+        return False
     
     def _on_serial_disconnected(self):
         """串口断开连接回调（可重写）"""
         pass
     
+    def _on_serial_reconnected(self):
+        """串口自动重连成功回调（可重写）"""
+        pass
+    
     def enable_thread_read_uart(self):
         """开启读串口线程"""
+        if self.hub is not None:
+            self.flag_thread_read_uart = True
+            self.hub.update(self)
+            return
         if not self.flag_thread_read_uart:
             self.flag_thread_read_uart = True
             self.thread_read_uart = threading.Thread(target=self._thread_read_uart, daemon=True)
@@ -226,6 +609,10 @@ class UartThread__(Uart):
     
     def enable_thread_write_uart(self):
         """开启写串口线程"""
+        if self.hub is not None:
+            self.flag_thread_write_uart = True
+            self.hub.update(self)
+            return
         if not self.flag_thread_write_uart:
             self.flag_thread_write_uart = True
             self.thread_write_uart = threading.Thread(target=self._thread_write_uart, daemon=True)
@@ -234,78 +621,430 @@ class UartThread__(Uart):
     def disable_thread_read_uart(self):
         """关闭读串口线程"""
         self.flag_thread_read_uart = False
+        if self.hub is not None:
+            self.hub.update(self)
+            return
         if self.thread_read_uart and self.thread_read_uart.is_alive():
             self.thread_read_uart.join(timeout=2.0)
     
     def disable_thread_write_uart(self):
         """关闭写串口线程"""
         self.flag_thread_write_uart = False
-        with self.cv_write_uart_queue:
-            self.cv_write_uart_queue.notify_all()
+        if self.hub is not None:
+            self.hub.update(self)
+            return
+        self.write_buff_queue.wake()
         if self.thread_write_uart and self.thread_write_uart.is_alive():
             self.thread_write_uart.join(timeout=2.0)
     
-    def mission_send(self, assignment_func: Callable, *args, **kwargs):
+    def mission_send(self, assignment_func, *args, **kwargs):
         """
         任务发送串口模板函数
-        :param assignment_func: 为write_buff赋值的函数
-        :param args: 函数参数
-        :param kwargs: 函数关键字参数
+        :param assignment_func: 为write_buff赋值的函数，或已注册的任务ID/任务名
+        :param args: 函数参数或按字段顺序的值
+        :param kwargs: 函数关键字参数或按字段名的值
         """
         with self.mutex_write_uart:
-            # 清空写串口缓冲区
-            self.clear_write_buff()
-            
-            # 为写串口缓冲区赋值
-            assignment_func(self, *args, **kwargs)
-            
-            if not self.flag_thread_write_uart:
-                # 直接写入串口
-                self.write_buffer(self.write_buff)
-            else:
-                # 加入写入队列
-                with self.mutex_write_uart_queue:
-                    for byte in self.write_buff:
-                        self.write_buff_queue.put(byte)
-                    self.cv_write_uart_queue.notify()
-            
+            # 清空写串口缓冲区并赋值
+            self.assign_write_buff(assignment_func, *args, **kwargs)
+            frame = bytes(self.write_buff)
+        self._submit_frame(frame)
+        
+        # 在锁外打印，避免终端输出拖慢其他发送者
+        if self.enable_show_write:
+            print("Mission Send:", end=" ")
+            self.show_write_buff(frame)
+    
+    def schedule_mission(self, assignment_func, period_s: float,
+                         source: Optional[Callable[[], Any]] = None, name: Optional[str] = None,
+                         policy: Optional[str] = None, phase_s: float = 0.0) -> PeriodicTask:
+        """
+        按固定周期发送任务，由写线程在各时隙的截止时间直接写入串口，不经过写队列，
+        不同任务可以有不同的周期；需开启写线程
+        :param assignment_func: 为write_buff赋值的函数，或已注册的任务ID/任务名
+        :param period_s: 周期（秒）
+        :param source: 每个时隙调用一次，返回按字段顺序的值（元组）或按字段名的值（字典），返回None时本时隙不发送；
+                       None表示没有参数
+        :param name: 周期任务名，默认为任务ID/任务名或函数名，同名任务被替换
+        :param policy: 错过时隙时的策略，skip或catch_up，默认为写线程调度器的策略
+        :param phase_s: 第一次发送相对当前时间的延迟（秒）
+        :return: 周期任务，其lateness_ns为每个时隙的发送延迟
+        """
+        if name is None:
+            name = str(getattr(assignment_func, "__name__", assignment_func))
+        
+        def send():
+            values = () if source is None else source()
+            if values is None:
+                return
+            with self.mutex_write_uart:
+                if isinstance(values, dict):
+                    self.assign_write_buff(assignment_func, **values)
+                else:
+                    self.assign_write_buff(assignment_func, *values)
+                frame = bytes(self.write_buff)
+            # 断线时直接丢弃，重连后下一个时隙发送最新值
+            if self.write_buffer(frame) == 0:
+                return
+            if self.metrics is not None:
+                self.metrics.frames_out += 1
             if self.enable_show_write:
-                print("Mission Send:", end=" ")
-                self.show_write_buff(self.write_buff)
+                self.show_write_buff(frame)
+        
+        task = self.write_scheduler.add(name, period_s, send, policy, phase_s)
+        self._wake_writer()
+        return task
+    
+    def unschedule_mission(self, name) -> bool:
+        """
+        停止周期发送
+        :param name: schedule_mission()使用的任务名
+        :return: False表示没有该周期任务
+        """
+        name = str(getattr(name, "__name__", name))
+        removed = self.write_scheduler.remove(name)
+        if removed:
+            self._wake_writer()
+        return removed
+    
+    def _wake_writer(self):
+        """周期任务变化后唤醒写线程或hub，重新计算等待时间"""
+        if self.hub is not None:
+            self.hub.update(self)
+        else:
+            self.write_buff_queue.wake()
+    
+    def mission_send_latest(self, assignment_func, *args, key=None, **kwargs):
+        """
+        合并发送：写队列中同一键尚未发送的帧被新帧替换，写线程按发送频率只发送每个键的最新值，
+        适用于调用频率高于send_frequency_hz的周期性设定值，积压的帧数不超过键的数量
+        :param assignment_func: 为write_buff赋值的函数，或已注册的任务ID/任务名
+        :param args: 函数参数或按字段顺序的值
+        :param key: 合并键，默认为帧中的任务ID
+        :param kwargs: 函数关键字参数或按字段名的值
+        """
+        with self.mutex_write_uart:
+            self.assign_write_buff(assignment_func, *args, **kwargs)
+            frame = bytes(self.write_buff)
+        self._submit_frame(frame, frame[2] if key is None else key)
+        
+        if self.enable_show_write:
+            print("Mission Send Latest:", end=" ")
+            self.show_write_buff(frame)
+    
+    def _submit_frame(self, frame: bytes, key=None):
+        """
+        未开启写线程时直接写入串口，否则加入写队列；调用时不能持有mutex_write_uart，
+        block策略的写队列满时在锁外等待，不挡住其他发送者与写线程中的周期任务
+        :param frame: 一帧数据
+        :param key: 写队列中的合并键，None表示按通道配置
+        """
+        if not self.flag_thread_write_uart and not self.write_thread_suspended:
+            # 直接写入串口
+            with self.mutex_write_uart:
+                self.write_buffer(frame)
+            if self.metrics is not None:
+                self.metrics.frames_out += 1
+        else:
+            # 整帧加入写入队列，溢出按write_queue_overflow策略处理
+            self._enqueue(frame, key=key)
+    
+    def _enqueue(self, frame: bytes, key=None, lane=None):
+        """加入写队列并通知hub，不能持有mutex_write_uart"""
+        self.write_buff_queue.put(frame, key=key, lane=lane)
+        if self.hub is not None:
+            self.hub.notify_write(self)
+    
+    def enable_requests(self, window=16, timeout=0.2, retries=2, seq_field="seq") -> RequestManager:
+        """
+        开启请求/应答，已开启时只更新配置
+        :param window: 同时等待应答的最大请求数
+        :param timeout: 每次发送后等待应答的超时时间（秒）
+        :param retries: 超时后的最大重发次数
+        :param seq_field: 请求与应答任务中序号字段的名字，须为第一个字段
+        :return: 请求管理器
+        """
+        requests = self.requests
+        if requests is None:
+            requests = RequestManager(self.mission_registry, self._build_request_frame,
+                                      self._send_request_frame, window, timeout, retries, seq_field)
+            requests.start()
+            self.requests = requests
+        else:
+            requests.window = window
+            requests.timeout = timeout
+            requests.retries = retries
+            requests.seq_field = seq_field
+        return requests
+    
+    def disable_requests(self):
+        """关闭请求/应答，未完成的请求被取消"""
+        requests = self.requests
+        self.requests = None
+        if requests is not None:
+            requests.close()
+    
+    def request(self, mission, *args, timeout: Optional[float] = None,
+                retries: Optional[int] = None, **kwargs) -> Future:
+        """
+        发送请求并返回Future，不等待应答；未开启请求/应答时按默认配置开启
+        :param mission: 请求任务ID或任务名，第一个字段为序号，由管理器填写
+        :param args: 序号之后按字段顺序的值
+        :param timeout: 本请求的超时时间（秒），默认为enable_requests()的配置
+        :param retries: 本请求的最大重发次数，默认为enable_requests()的配置
+        :param kwargs: 按字段名的值
+        :return: Future，结果为应答帧中序号之后的字段值，超时后抛出TimeoutError
+        """
+        requests = self.requests
+        if requests is None:
+            requests = self.enable_requests()
+        return requests.submit(mission, args, kwargs, timeout, retries)
+    
+    async def request_async(self, mission, *args, timeout: Optional[float] = None,
+                            retries: Optional[int] = None, **kwargs):
+        """
+        request()的协程版本，可在asyncio中await，读写仍由本串口的线程完成
+        :return: 应答帧中序号之后的字段值
+        """
+        return await asyncio.wrap_future(self.request(mission, *args, timeout=timeout,
+                                                      retries=retries, **kwargs))
+    
+    def _build_request_frame(self, mission, args: tuple, kwargs: dict) -> bytes:
+        """按任务布局编码一帧请求"""
+        with self.mutex_write_uart:
+            self.assign_write_buff(mission, *args, **kwargs)
+            return bytes(self.write_buff)
+    
+    def _send_request_frame(self, frame: bytes):
+        """发送（或重发）一帧请求"""
+        self._submit_frame(frame)
+        
+        if self.enable_show_write:
+            print("Request Send:", end=" ")
+            self.show_write_buff(frame)
+    
+    def enable_clock_sync(self, ping_mission, pong_mission, period=0.1, seq_field="ping_seq",
+                          time_field="mcu_time", tick_ns=1000, window=16, history=32) -> ClockSync:
+        """
+        开启主机与下位机的时钟同步，周期性发送ping并由pong估计往返时间与时钟偏移；
+        同步后以with_time注册、含time_field字段的任务回调收到该字段换算后的主机时间
+        :param ping_mission: ping任务ID或任务名，含seq_field字段
+        :param pong_mission: pong任务ID或任务名，含seq_field字段与time_field字段
+        :param period: ping周期（秒）
+        :param seq_field: 序号字段名
+        :param time_field: 下位机时间字段名，数据任务中同名字段按同一时钟换算
+        :param tick_ns: 下位机时间字段每个单位对应的纳秒数
+        :param window: 最小值滤波的样本数
+        :param history: 用于拟合漂移的测量数
+        :return: 时钟同步器
+        """
+        self.disable_clock_sync()
+        clock_sync = ClockSync(self.mission_registry, ping_mission, pong_mission,
+                               self._build_request_frame, self._send_ping_frame, seq_field,
+                               time_field, tick_ns, window, history)
+        self.clock_sync = clock_sync
+        self.mission_registry.set_clock(clock_sync.to_host_ns, time_field)
+        clock_sync.start(period)
+        return clock_sync
+    
+    def disable_clock_sync(self):
+        """关闭时钟同步，回调恢复收到帧的接收时间"""
+        clock_sync = self.clock_sync
+        self.clock_sync = None
+        if clock_sync is not None:
+            clock_sync.stop()
+            self.mission_registry.set_clock(None)
+    
+    def _send_ping_frame(self, frame: bytes):
+        """
+        立即发送一帧ping，不经过写队列，避免排队时间计入往返时间；
+        write_buffer()持有串口写锁，ping不会插入写线程正在写的一批帧中间
+        """
+        if not self._is_serial_port_healthy():
+            return
+        self.write_buffer(frame)
+    
+    def enable_frame_batch(self, max_frames=65536, keep_callbacks=False) -> FrameBatch:
+        """
+        开启帧批量缓冲，读线程把对齐好的帧缓存起来，由read_frames()按批取出
+        :param max_frames: 最多缓存的帧数，满时丢弃最旧的帧
+        :param keep_callbacks: 是否仍逐帧调用任务回调
+        :return: 帧批量缓冲
+        """
+        if self.frame_batch is None or self.frame_batch.max_frames != max_frames:
+            self.frame_batch = FrameBatch(self.mission_registry, max_frames)
+        self.frame_batch_callbacks = keep_callbacks
+        return self.frame_batch
+    
+    def disable_frame_batch(self):
+        """关闭帧批量缓冲，恢复逐帧调用回调，未取出的帧被丢弃"""
+        self.frame_batch = None
+        self.frame_batch_callbacks = False
+    
+    def read_frames(self, max_n=0, timeout: Optional[float] = 0.1, with_time=False) -> dict:
+        """
+        取出上次调用以来缓存的所有帧，按任务ID分组批量解码；未开启帧批量缓冲时按默认配置开启
+        :param max_n: 最多取出的帧数，0表示全部
+        :param timeout: 没有帧时的等待时间（秒），None表示一直等待
+        :param with_time: 是否同时返回各帧的接收时间（monotonic_ns）
+        :return: {任务ID: 结构化数组}，with_time时为{任务ID: (结构化数组, 时间戳数组)}；
+                 字段名与任务布局相同，如records["X"]；未安装NumPy时为二维memoryview，见frame_batch.py
+        """
+        frame_batch = self.frame_batch
+        if frame_batch is None:
+            frame_batch = self.enable_frame_batch()
+        return frame_batch.read(max_n, timeout, with_time)
     
     def mission_send_vofa_just_float(self, data: List[float]):
         """
         发送兼容Vofa JustFloat协议的串口数据
         :param data: 待发送的浮点数数据
         """
-        # 转换Vofa JustFloat协议
-        buffer = bytearray()
-        for value in data:
-            buffer.extend(struct.pack('<f', value))  # 小端序浮点数
-        
-        # 添加协议尾部标识
-        buffer.extend([0x00, 0x00, 0x80, 0x7f])
+        self.mission_send_vofa_just_float_block([data])
+    
+    def mission_send_vofa_just_float_block(self, samples):
+        """
+        批量发送兼容Vofa JustFloat协议的串口数据，整块编码后一次写入
+        :param samples: N个采样 × C个通道的二维数据（numpy数组、buffer协议对象或嵌套序列）
+        """
+        # 编码与写入共用内部缓冲区，写入串口时上锁保护
+        with self.mutex_write_uart:
+            buffer = self.vofa_encoder.encode(samples)
+            queued = self._send_stream(buffer)
+            if self.enable_show_write:
+                shown = bytes(buffer)
+        if queued is not None:
+            self._enqueue(queued, lane=self.write_buff_queue.vofa_lane)
         
+        # 在锁外打印，避免终端输出拖慢其他发送者
         if self.enable_show_write:
-            print("Mission Vofa Send:", end=" ")
-            for byte in buffer:
-                print(f"{byte:02x}", end=" ")
-            print()
-        
-        # 写入串口时上锁保护
+            print("Mission Vofa Send:", shown.hex(" "))
+    
+    def mission_send_telemetry_block(self, samples):
+        """
+        压缩编码一块采样后发送，与Vofa数据走同一通道，需先enable_telemetry_send()
+        :param samples: N个采样 × C个通道的二维数据
+        """
         with self.mutex_write_uart:
-            self.write_vofa_just_float(data)
+            data = self.telemetry_encoder.encode(samples)
+            queued = self._send_stream(data)
+        if queued is not None:
+            self._enqueue(queued, lane=self.write_buff_queue.vofa_lane)
+        
+        if self.enable_show_write:
+            print("Mission Telemetry Send:", data.hex(" "))
+    
+    def _send_stream(self, data) -> Optional[bytes]:
+        """
+        发送Vofa/压缩遥测数据，需持有mutex_write_uart
+        :return: 需经写队列的Vofa通道发送时为数据的副本，由调用者释放mutex_write_uart后用_enqueue()入队；
+                 已直接写入串口时为None
+        """
+        lane = self.write_buff_queue.vofa_lane
+        if lane is not None and (self.flag_thread_write_uart or self.write_thread_suspended):
+            # 经写队列的Vofa通道发送，与任务帧按通道优先级和份额调度；编码器复用内部缓冲区，入队前复制
+            return bytes(data)
+        self.write_buffer(data)
+        return None
+    
+    def enable_metrics(self):
+        """开启统计"""
+        if self.metrics is None:
+            self.last_write_ns = 0
+            self.metrics = UartMetrics()
+    
+    def disable_metrics(self):
+        """关闭统计"""
+        self.metrics = None
+    
+    def get_stats(self) -> dict:
+        """
+        获取统计快照，队列与对齐相关的计数始终可用，其余需先enable_metrics()
+        :return: 统计快照（时间单位为微秒）
+        """
+        stats = {
+            "port": self.uart_dev,
+            "backend": self.backend,
+            "metrics_enabled": self.metrics is not None,
+            "read_queue": {
+                "size": self.read_buff_queue.size(),
+                "capacity": self.read_buff_queue.capacity,
+                "overflow_count": self.read_buff_queue.overflow_count,
+                "dropped_bytes": self.read_buff_queue.dropped_bytes,
+            },
+            "resync_dropped_bytes": self.frame_aligner.dropped_bytes,
+            "crc_failures": self.crc.failures if self.crc is not None else 0,
+            "write_queue": {
+                "depth": len(self.write_buff_queue),
+                "max_frames": self.write_buff_queue.max_frames,
+                "overflow_count": self.write_buff_queue.overflow_count,
+                "dropped_frames": self.write_buff_queue.dropped_frames,
+                "superseded_frames": self.write_buff_queue.superseded_frames,
+                "lanes": self.write_buff_queue.stats(),
+            },
+            "online": self._is_serial_port_healthy(),
+            "reconnect_count": self.reconnect_count,
+            "last_reconnect_ms": self.last_reconnect_ms,
+            "target_send_interval_us": 1e6 / self.send_frequency_hz,
+        }
+        if self.requests is not None:
+            stats["requests"] = self.requests.stats()
+        if self.clock_sync is not None:
+            stats["clock"] = self.clock_sync.stats()
+        if self.frame_batch is not None:
+            stats["frame_batch"] = {
+                "depth": len(self.frame_batch),
+                "max_frames": self.frame_batch.max_frames,
+                "dropped_frames": self.frame_batch.dropped_frames,
+            }
+        stats["dispatch"] = self.dispatcher.stats()
+        stats["scheduler"] = self.write_scheduler.stats()
+        if self.just_float is not None:
+            stats["just_float"] = self.just_float.stats()
+        if self.telemetry is not None:
+            stats["telemetry_rx"] = self.telemetry.stats()
+        if self.telemetry_encoder is not None:
+            stats["telemetry_tx"] = self.telemetry_encoder.stats()
+        if self.metrics is not None:
+            stats.update(self.metrics.snapshot())
+        return stats
+    
+    def start_metrics_exporter(self, callback: Callable[[dict], None], interval: float = 1.0):
+        """
+        开启周期性统计导出
+        :param callback: 接收get_stats()快照的回调
+        :param interval: 导出周期（秒）
+        """
+        self.stop_metrics_exporter()
+        self.metrics_exporter = MetricsExporter(self.get_stats, callback, interval)
+        self.metrics_exporter.start()
+    
+    def stop_metrics_exporter(self):
+        """停止周期性统计导出"""
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
     
     def close(self):
         """关闭串口和所有线程"""
         # 停止所有线程
+        self.stop_metrics_exporter()
+        self.disable_requests()
+        self.disable_clock_sync()
+        if self.hub is not None:
+            self.hub.detach(self)
         self.flag_thread_check_serial = False
+        self.check_serial_event.set()
+        if self.device_watcher is not None:
+            self.device_watcher.wake()
         self.disable_thread_write_uart()
         self.disable_thread_read_uart()
         
         # 等待线程结束
         if self.thread_check_serial and self.thread_check_serial.is_alive():
             self.thread_check_serial.join(timeout=2.0)
+        # 分发器在断线重连期间保持运行，读线程停止后分发完剩余的帧再停止
+        self.dispatcher.stop()
         
         # 关闭串口
         super().close()
@@ -324,9 +1063,8 @@ class UartThreadSpace:
         """
         print("Mission1 Send!")
         
-        # 为写串口缓冲区赋值
-        uart_ptr.write_buff[2] = 0x01
-        struct.pack_into('<I', uart_ptr.write_buff, 3, X)  # 小端序32位无符号整数
+        # 按任务1布局为写串口缓冲区赋值（变长帧时按任务1的长度重新分配）
+        uart_ptr.assign_write_buff(0x01, X)
     
     @staticmethod
     def mission2_assignment(uart_ptr: UartThread__, X: int, Y: float):
@@ -338,8 +1076,6 @@ class UartThreadSpace:
         """
         print("Mission2 Send!")
         
-        # 为写串口缓冲区赋值
-        uart_ptr.write_buff[2] = 0x02
-        struct.pack_into('<H', uart_ptr.write_buff, 3, X)  # 小端序16位无符号整数
-        struct.pack_into('<f', uart_ptr.write_buff, 5, Y)  # 小端序浮点数
+        # 按任务2布局为写串口缓冲区赋值（变长帧时按任务2的长度重新分配）
+        uart_ptr.assign_write_buff(0x02, X, Y)
     
\ No newline at end of file
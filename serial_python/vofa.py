@@ -0,0 +1,230 @@
+import re
+import struct
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖
+    np = None
+
+
+# JustFloat协议帧尾，按小端序float32解释为+inf
+JUST_FLOAT_TAIL = b'\x00\x00\x80\x7f'
+JUST_FLOAT_TAIL_U32 = 0x7F800000
+
+
+class JustFloatEncoder:
+    def __init__(self, initial_size=4096):
+        """
+        Vofa JustFloat批量编码器，将 N个采样 × C个通道 的数据块一次编码进可复用的缓冲区
+        :param initial_size: 缓冲区初始大小（字节）
+        """
+        self.buffer = bytearray(initial_size)
+        self.row_structs = {}
+
+    def _reserve(self, size: int):
+        if len(self.buffer) < size:
+            # 换新缓冲区而不是原地扩容，避免旧的导出视图导致BufferError
+            self.buffer = bytearray(max(size, 2 * len(self.buffer)))
+
+    def encode(self, samples) -> memoryview:
+        """
+        编码一个数据块，每个采样后跟一个JustFloat帧尾
+        :param samples: 二维数据（N×C），可以是numpy数组、支持buffer协议的二维float32/float64对象或嵌套序列；
+                        一维数据视为单个采样
+        :return: 指向内部缓冲区的memoryview，在下一次encode前有效
+        """
+        if np is not None:
+            return self._encode_numpy(samples)
+        return self._encode_python(samples)
+
+    def _encode_numpy(self, samples) -> memoryview:
+        block = np.asarray(samples, dtype='<f4')
+        if block.ndim == 1:
+            block = block.reshape(1, -1)
+        elif block.ndim != 2:
+            raise ValueError(f"samples must be 1-D or 2-D, got {block.ndim}-D")
+
+        n, channels = block.shape
+        stride = (channels + 1) * 4
+        size = n * stride
+        self._reserve(size)
+
+        out = np.frombuffer(self.buffer, dtype='<f4', count=n * (channels + 1))
+        out = out.reshape(n, channels + 1)
+        out[:, :channels] = block
+        out.view('<u4')[:, channels] = JUST_FLOAT_TAIL_U32
+        return memoryview(self.buffer)[:size]
+
+    def _encode_python(self, samples) -> memoryview:
+        rows = self._rows(samples)
+        if not rows:
+            return memoryview(self.buffer)[:0]
+
+        channels = len(rows[0])
+        row_struct = self.row_structs.get(channels)
+        if row_struct is None:
+            row_struct = struct.Struct(f'<{channels}f4s')
+            self.row_structs[channels] = row_struct
+
+        stride = row_struct.size
+        self._reserve(len(rows) * stride)
+        pack_into = row_struct.pack_into
+        buffer = self.buffer
+        offset = 0
+        for row in rows:
+            pack_into(buffer, offset, *row, JUST_FLOAT_TAIL)
+            offset += stride
+        return memoryview(self.buffer)[:offset]
+
+    @staticmethod
+    def _rows(samples) -> list:
+        try:
+            view = memoryview(samples)
+        except TypeError:
+            view = None
+
+        if view is not None and view.ndim == 2:
+            return view.tolist()
+        if view is not None and view.ndim == 1:
+            return [view.tolist()]
+
+        samples = list(samples)
+        if samples and not hasattr(samples[0], '__len__'):
+            return [samples]
+        return samples
+
+
+class JustFloatDecoder:
+    def __init__(self, channels: int = 0, max_channels: int = 64, lock_samples: int = 3,
+                 relock_misses: int = 8):
+        """
+        Vofa JustFloat接收解码器，按帧尾位置成批校验连续的采样，整段解码为float32数组
+        :param channels: 通道数，0表示由相邻帧尾的间距推断
+        :param max_channels: 推断时允许的最大通道数
+        :param lock_samples: 推断时需要连续、等间距的帧尾数
+        :param relock_misses: 推断出通道数后，连续这么多次只能靠跳过数据对上帧尾时重新推断（下位机改变了通道数）
+        """
+        if channels < 0 or max_channels <= 0:
+            raise ValueError("channels must be non-negative and max_channels positive")
+
+        self.inferred = channels == 0
+        self.max_stride = (max_channels + 1) * 4
+        self.lock_samples = max(2, lock_samples)
+        self.relock_misses = relock_misses
+        self.channels = 0
+        self.stride = 0
+        self.row_struct: Optional[struct.Struct] = None
+        self.run_pattern: Optional[re.Pattern] = None
+        if channels:
+            self._lock(channels)
+
+        # 推断用：最近的帧尾在数据流中的绝对位置
+        self.tails: List[int] = []
+        self.misses = 0
+
+        # 统计
+        self.samples = 0
+        self.blocks = 0
+        self.relocks = 0
+
+    def _lock(self, channels: int):
+        self.channels = channels
+        self.stride = (channels + 1) * 4
+        self.row_struct = struct.Struct(f'<{channels}f4x')
+        # 一段连续的采样：每个采样为stride - 4个任意字节后跟帧尾
+        self.run_pattern = re.compile(b'(?:.{%d}%s)+' % (self.stride - 4, re.escape(JUST_FLOAT_TAIL)), re.DOTALL)
+
+    def reset(self):
+        """丢弃推断状态，数据流不连续（如重连）后调用"""
+        self.tails.clear()
+        self.misses = 0
+
+    def miss(self) -> bool:
+        """
+        记录一次跳过数据才对上帧尾
+        :return: True表示推断出的通道数已连续relock_misses次对不上，应在解码完已校验的采样后调用unlock()
+        """
+        self.misses += 1
+        return self.inferred and self.misses >= self.relock_misses
+
+    def unlock(self):
+        """放弃推断出的通道数，重新推断"""
+        if self.inferred and self.channels:
+            self.channels = 0
+            self.stride = 0
+            self.row_struct = None
+            self.run_pattern = None
+            self.relocks += 1
+        self.reset()
+
+    def observe(self, buf, start: int, end: int, base: int) -> bool:
+        """
+        在尚未确定通道数时扫描帧尾，连续lock_samples个帧尾等间距时确定通道数
+        :param buf: 缓冲区
+        :param start: 本次扫描的起始下标
+        :param end: 结束下标（不包含）
+        :param base: buf[start]在数据流中的绝对位置
+        :return: 是否已确定通道数
+        """
+        tails = self.tails
+        index = buf.find(JUST_FLOAT_TAIL, start, end)
+        while index >= 0:
+            position = base + index - start
+            if tails and position - tails[-1] > self.max_stride:
+                tails.clear()
+            tails.append(position)
+            if len(tails) > self.lock_samples:
+                del tails[0]
+            if len(tails) == self.lock_samples:
+                spacing = tails[1] - tails[0]
+                if (spacing >= 8 and spacing % 4 == 0 and
+                        all(b - a == spacing for a, b in zip(tails, tails[1:]))):
+                    self._lock(spacing // 4 - 1)
+                    self.tails.clear()
+                    return True
+            index = buf.find(JUST_FLOAT_TAIL, index + 4, end)
+        return False
+
+    def match(self, buf, pos: int, end: int) -> int:
+        """
+        从pos开始连续、帧尾都在正确位置的采样数，整段在正则引擎中一次比较完
+        :param buf: 缓冲区
+        :param pos: 第一个采样的起始下标
+        :param end: 结束下标（不包含）
+        :return: 采样数
+        """
+        matched = self.run_pattern.match(buf, pos, end)
+        return (matched.end() - pos) // self.stride if matched is not None else 0
+
+    def decode(self, buf, runs: List[Tuple[int, int]]):
+        """
+        将若干段连续的采样解码为一块
+        :param buf: 缓冲区
+        :param runs: [(起始下标, 采样数)]，须已校验帧尾
+        :return: N×C的float32数组；未安装NumPy时为每个采样一个元组的列表
+        """
+        stride = self.stride
+        n = sum(count for _, count in runs)
+        self.samples += n
+        self.blocks += 1
+        if len(runs) == 1:
+            data, offset = buf, runs[0][0]
+        else:
+            with memoryview(buf) as view:
+                data = b''.join([view[pos:pos + count * stride] for pos, count in runs])
+            offset = 0
+        if np is not None:
+            rows = np.frombuffer(data, '<f4', count=n * stride // 4, offset=offset)
+            return rows.reshape(n, self.channels + 1)[:, :self.channels].copy()
+        with memoryview(data) as view:
+            return list(self.row_struct.iter_unpack(view[offset:offset + n * stride]))
+
+    def stats(self) -> dict:
+        return {
+            "channels": self.channels,
+            "inferred": self.inferred,
+            "samples": self.samples,
+            "blocks": self.blocks,
+            "relocks": self.relocks,
+        }